@@ -0,0 +1,87 @@
+"""
+Script para encontrar os subconjuntos de k números que mais apareceram no histórico
+(Lotofácil, Timemania ou Lotomania), com a contagem em paralelo de src/subconjuntos.py
+
+Exemplos:
+    python analisar_subconjuntos.py                 # Lotofácil, k=14
+    python analisar_subconjuntos.py -k 11 --top 20
+    python analisar_subconjuntos.py --jogo lotomania -k 5 --processos 4
+"""
+import argparse
+import time
+
+from src.historico import HistoricoLotofacil
+from src.historico_lotomania import HistoricoLotomania
+from src.historico_timemania import HistoricoTimemania
+from src.matriz import JOGOS, como_matriz
+from src.subconjuntos import SubconjuntoFrequente
+
+HISTORICOS = {
+    'lotofacil': HistoricoLotofacil,
+    'timemania': HistoricoTimemania,
+    'lotomania': HistoricoLotomania,
+}
+
+
+def analisar_subconjuntos(jogo: str = 'lotofacil', k: int = 14, top: int = 10, processos: int = None):
+    """Conta os subconjuntos de k números do histórico e mostra os mais frequentes"""
+
+    # Carrega o histórico
+    print("Carregando histórico...")
+    historico_manager = HISTORICOS[jogo](usar_banco=True)
+    historico = historico_manager.get_historico()
+
+    if not historico:
+        print("Nenhum histórico encontrado. Tentando atualizar...")
+        historico = historico_manager.atualizar_historico(usar_api=False)
+
+    if not historico:
+        print("ERRO: Não foi possível carregar o histórico")
+        return None
+
+    print(f"Histórico carregado: {len(historico)} concursos")
+
+    contagem = SubconjuntoFrequente(como_matriz(historico, jogo), k, processos)
+    print(f"Analisando combinações de {k} números ({contagem.gerados} subconjuntos, "
+          f"{contagem.processos} processo(s))...")
+    inicio = time.perf_counter()
+    resultado = contagem.mais_frequentes(top)
+    print(f"Concluído em {time.perf_counter() - inicio:.2f} s")
+
+    print(f"\nTotal de combinações de {k} números encontradas: {resultado['subconjuntos_distintos']}")
+
+    if not resultado['mais_frequentes']:
+        print("Nenhuma combinação encontrada")
+        return None
+
+    mais_frequente = resultado['mais_frequentes'][0]
+    total_concursos = resultado['total_concursos']
+    print("\n" + "="*60)
+    print("RESULTADO:")
+    print("="*60)
+    print(f"Combinação de {k} números mais frequente:")
+    print(f"  Números: {mais_frequente['numeros']}")
+    print(f"  Frequência: {mais_frequente['quantidade']} vezes")
+    print(f"  Percentual: {(mais_frequente['quantidade'] / total_concursos) * 100:.2f}% dos concursos")
+    print("="*60)
+
+    print(f"\nTop {top} combinações de {k} números mais frequentes:")
+    print("-" * 60)
+    for i, item in enumerate(resultado['mais_frequentes'], 1):
+        print(f"{i}. {item['numeros']} - {item['quantidade']} vezes")
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Subconjuntos de k números mais frequentes no histórico')
+    parser.add_argument('--jogo', choices=sorted(JOGOS), default='lotofacil')
+    parser.add_argument('-k', type=int, default=14, help='quantidade de números do subconjunto')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--processos', type=int, default=None, help='processos da contagem (padrão: CPUs)')
+    args = parser.parse_args()
+    analisar_subconjuntos(args.jogo, args.k, args.top, args.processos)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,9 +14,15 @@ from src.historico_lotomania import HistoricoLotomania
 from src.analise_lotomania import AnalisadorLotomania
 from src.fechamento_lotomania import GeradorFechamentoLotomania
 from src.conferencia_lotomania import ConferidorJogosLotomania
+from src.matriz import como_matriz
+from src.subconjuntos import SubconjuntoFrequente
+from src.limitador import metricas_limitadores
+from src.fontes import metricas_fontes
+import functools
 import json
 import re
 import os
+import threading
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
@@ -29,6 +35,22 @@ MAX_LINES = 10000  # Máximo de linhas no arquivo
 MAX_JOGOS_IMPORT = 1000  # Máximo de jogos por importação
 MAX_QUANTIDADE_JOGOS = 100  # Máximo de jogos gerados por vez
 ALLOWED_EXTENSIONS = {'txt'}
+TEMPO_LIMITE_ATUALIZACAO = 90  # Segundos de busca por chamada (gunicorn --timeout 120)
+MAX_JANELAS = 20  # Máximo de janelas por consulta (?janela=)
+MAX_PONTOS_SERIE = 500  # Máximo de pontos da série móvel (?serie=)
+MAX_TOP_COOCORRENCIA = 200  # Máximo de pares/triplas por consulta (?top=)
+MAX_SUBCONJUNTOS_GERADOS = 20_000_000  # Subconjuntos contados por consulta (~3 s); acima disso, analisar_subconjuntos.py
+# Hedge nas buscas por concurso (LOTERIAS_HEDGE=1): fonte lenta dispara consulta na próxima
+HEDGE_FONTES = os.environ.get('LOTERIAS_HEDGE', '').lower() in ('1', 'true', 'sim')
+
+def obter_tempo_limite() -> float:
+    """Tempo de busca pedido no corpo ({'tempo_limite': s}), limitado a TEMPO_LIMITE_ATUALIZACAO"""
+    data = request.get_json(silent=True) or {}
+    try:
+        tempo = float(data.get('tempo_limite', TEMPO_LIMITE_ATUALIZACAO))
+    except (TypeError, ValueError):
+        tempo = TEMPO_LIMITE_ATUALIZACAO
+    return min(max(tempo, 1.0), TEMPO_LIMITE_ATUALIZACAO)
 
 def allowed_file(filename: str) -> bool:
     """Valida se o arquivo tem extensão permitida"""
@@ -139,6 +161,57 @@ def validate_quantidade(quantidade: any, min_val: int, max_val: int) -> tuple[bo
     except (ValueError, TypeError):
         return False, "Quantidade inválida", 0
 
+def validate_janelas(janela: str, serie: any = None) -> tuple[bool, str, dict]:
+    """
+    Valida o parâmetro janela: lista separada por vírgulas de tamanhos (últimos N
+    concursos, ex: 10,50) e faixas de números de concurso (ex: 3000-3100, 3000- ou -3100)
+    serie: pontos da série móvel de frequência das janelas por tamanho (0 = sem série)
+    """
+    partes = [parte.strip() for parte in (janela or '').split(',') if parte.strip()]
+    if not partes:
+        return False, "Informe ao menos uma janela", {}
+    if len(partes) > MAX_JANELAS:
+        return False, f"Máximo de {MAX_JANELAS} janelas por consulta", {}
+    
+    tamanhos = []
+    faixas = []
+    for parte in partes:
+        try:
+            if '-' in parte:
+                primeiro, ultimo = (limite.strip() for limite in parte.split('-', 1))
+                faixas.append((int(primeiro) if primeiro else None, int(ultimo) if ultimo else None))
+            else:
+                tamanho = int(parte)
+                if tamanho < 1:
+                    return False, "Janelas devem ter ao menos 1 concurso", {}
+                tamanhos.append(tamanho)
+        except ValueError:
+            return False, f"Janela inválida: {parte}", {}
+    
+    is_valid, error_msg, pontos = validate_quantidade(serie or 0, 0, MAX_PONTOS_SERIE)
+    if not is_valid:
+        return False, f"Série: {error_msg}", {}
+    
+    return True, "", {'tamanhos': tamanhos, 'faixas': faixas, 'pontos_serie': pontos}
+
+def validate_coocorrencia(top: any, numeros: str, min_num: int, max_num: int) -> tuple[bool, str, dict]:
+    """
+    Valida os parâmetros de coocorrência: top (pares e triplas devolvidos) e
+    numeros (lista separada por vírgulas para a afinidade, ex: 5,13,22)
+    """
+    is_valid, error_msg, qtd = validate_quantidade(top if top is not None else 20, 1, MAX_TOP_COOCORRENCIA)
+    if not is_valid:
+        return False, f"Top: {error_msg}", {}
+    
+    partes = [parte.strip() for parte in (numeros or '').split(',') if parte.strip()]
+    is_valid, error_msg, numeros_validos = validate_numeros_list(partes, min_num, max_num, max_num - min_num + 1)
+    if not is_valid:
+        return False, error_msg, {}
+    if len(numeros_validos) != len({int(parte) for parte in partes}):
+        return False, f"Números devem estar entre {min_num} e {max_num}", {}
+    
+    return True, "", {'top': qtd, 'numeros': numeros_validos}
+
 def validate_estrategia(estrategia: str, estrategias_validas: list) -> tuple[bool, str]:
     """Valida estratégia escolhida"""
     if not isinstance(estrategia, str):
@@ -149,35 +222,74 @@ def validate_estrategia(estrategia: str, estrategias_validas: list) -> tuple[boo
     
     return True, ""
 
+def absorver_concursos_novos(analisador_atual, historico_novo: list) -> bool:
+    """
+    Leva os concursos novos do histórico atualizado para o analisador, um a um em
+    O(dezenas), sem reconstruir analisador, gerador e conferidor (os três usam a
+    mesma matriz, que é atualizada no lugar). Só o último concurso já analisado é
+    comparado; retorna False quando ele não está na mesma posição do histórico novo
+    (concursos removidos ou renumerados): aí é preciso reconstruir.
+    Deve ser chamada com o lock do jogo (a matriz muda no lugar)
+    """
+    total = len(analisador_atual.matriz)
+    if len(historico_novo) < total:
+        return False
+    if total and historico_novo[total - 1].get('concurso') != int(analisador_atual.matriz.concursos[-1]):
+        return False
+    for concurso in historico_novo[total:]:
+        analisador_atual.adicionar_concurso(concurso)
+    return True
+
+def usando_analise(lock):
+    """
+    Rotas que leem analisador, gerador ou conferidor seguram o lock do jogo: a
+    atualização do histórico muda a matriz e os agregados no lugar
+    """
+    def decorador(rota):
+        @functools.wraps(rota)
+        def executar(*args, **kwargs):
+            with lock:
+                return rota(*args, **kwargs)
+        return executar
+    return decorador
+
+# Um lock por jogo: matriz e agregados só mudam (absorção ou reconstrução) com ele
+lock_lotofacil = threading.Lock()
+lock_timemania = threading.Lock()
+lock_lotomania = threading.Lock()
+
 # Inicializa componentes Lotofácil
-historico_manager = HistoricoLotofacil(usar_banco=True)
+historico_manager = HistoricoLotofacil(usar_banco=True, hedge=HEDGE_FONTES)
 historico = historico_manager.get_historico()
 if not historico or len(historico) < 10:
     print("Banco vazio ou com poucos dados, buscando da API...")
     historico = historico_manager.atualizar_historico(usar_api=True)
-analisador = AnalisadorLotofacil(historico)
-gerador = GeradorFechamento(analisador, historico)
-conferidor = ConferidorJogos(historico)
+matriz = como_matriz(historico, 'lotofacil')
+analisador = AnalisadorLotofacil(matriz, historico_manager.db)
+gerador = GeradorFechamento(analisador, matriz)
+conferidor = ConferidorJogos(matriz)
 
 # Inicializa componentes Timemania
-historico_manager_timemania = HistoricoTimemania(usar_banco=False)
+historico_manager_timemania = HistoricoTimemania(usar_banco=True, hedge=HEDGE_FONTES)
 historico_timemania = historico_manager_timemania.get_historico()
 if not historico_timemania or len(historico_timemania) < 10:
     print("Cache Timemania vazio ou com poucos dados, buscando da API...")
     historico_timemania = historico_manager_timemania.atualizar_historico(usar_api=True)
-analisador_timemania = AnalisadorTimemania(historico_timemania)
-gerador_timemania = GeradorFechamentoTimemania(analisador_timemania, historico_timemania)
-conferidor_timemania = ConferidorJogosTimemania(historico_timemania)
+matriz_timemania = como_matriz(historico_timemania, 'timemania')
+analisador_timemania = AnalisadorTimemania(matriz_timemania)
+gerador_timemania = GeradorFechamentoTimemania(analisador_timemania, matriz_timemania)
+conferidor_timemania = ConferidorJogosTimemania(matriz_timemania)
 
 # Inicializa componentes Lotomania
-historico_manager_lotomania = HistoricoLotomania(usar_banco=False)
+historico_manager_lotomania = HistoricoLotomania(usar_banco=True)
 historico_lotomania = historico_manager_lotomania.get_historico()
 if not historico_lotomania or len(historico_lotomania) < 10:
     print("Cache Lotomania vazio ou com poucos dados, buscando da API...")
     historico_lotomania = historico_manager_lotomania.atualizar_historico(usar_api=True)
-analisador_lotomania = AnalisadorLotomania(historico_lotomania)
-gerador_lotomania = GeradorFechamentoLotomania(analisador_lotomania, historico_lotomania)
-conferidor_lotomania = ConferidorJogosLotomania(historico_lotomania)
+matriz_lotomania = como_matriz(historico_lotomania, 'lotomania')
+analisador_lotomania = AnalisadorLotomania(matriz_lotomania)
+gerador_lotomania = GeradorFechamentoLotomania(analisador_lotomania, matriz_lotomania)
+conferidor_lotomania = ConferidorJogosLotomania(matriz_lotomania)
 
 
 @app.route('/')
@@ -199,10 +311,22 @@ def lotomania():
 
 
 @app.route('/api/estatisticas')
+@usando_analise(lock_lotofacil)
 def get_estatisticas():
     """Retorna estatísticas completas"""
     try:
         stats = analisador.get_estatisticas_completas()
+        
+        # ?janela=10,50,3000-3100 acrescenta frequência, quentes e frios dessas janelas
+        if request.args.get('janela'):
+            is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'error': error_msg
+                }), 400
+            stats['janelas'] = analisador.frequencia_janelas(**parametros)['janelas']
+        
         return jsonify({
             'success': True,
             'data': stats
@@ -214,7 +338,67 @@ def get_estatisticas():
         }), 500
 
 
+@app.route('/api/janelas')
+@usando_analise(lock_lotofacil)
+def get_janelas():
+    """
+    Frequência, números quentes e frios em várias janelas de uma vez
+    ?janela=10,50,3000-3100 (últimos N concursos e faixas de concursos), ?serie=N (série móvel)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador.frequencia_janelas(**parametros)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/coocorrencia')
+@usando_analise(lock_lotofacil)
+def get_coocorrencia():
+    """
+    Pares e triplas que mais saíram juntos (com o lift de cada par)
+    ?top=N (padrão 20), ?numeros=5,13,22 (afinidade dos demais números com esses), ?matriz=1 (matriz de pares)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_coocorrencia(request.args.get('top'), request.args.get('numeros'),
+                                                               1, 25)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        resultado = dict(analisador.coocorrencia(parametros['top']))
+        if parametros['numeros']:
+            resultado['afinidade'] = analisador.afinidade(parametros['numeros'])
+        if request.args.get('matriz') in ('1', 'true', 'sim'):
+            resultado['matriz'] = analisador.matriz_coocorrencia()
+        
+        return jsonify({
+            'success': True,
+            'data': resultado
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/gerar-jogos', methods=['POST'])
+@usando_analise(lock_lotofacil)
 def gerar_jogos():
     """Gera jogos baseado nos parâmetros"""
     try:
@@ -302,27 +486,36 @@ def gerar_jogos():
 def atualizar_historico():
     """Atualiza histórico de concursos"""
     try:
-        global historico, analisador, gerador, conferidor
+        global historico, matriz, analisador, gerador, conferidor
         
-        # Sincroniza banco de dados (busca apenas novos)
+        # Sincroniza banco de dados (busca apenas novos); sincronizações longas são
+        # feitas em pedaços: 'concluido': False pede uma nova chamada, que continua do checkpoint
+        tempo_limite = obter_tempo_limite()
+        resultado_sync = {}
         if historico_manager.usar_banco:
-            resultado_sync = historico_manager.sincronizar_banco()
+            resultado_sync = historico_manager.sincronizar_banco(tempo_limite=tempo_limite)
             if resultado_sync.get('sucesso'):
                 historico = historico_manager.get_historico()
             else:
                 # Se sincronização falhou, tenta busca completa
-                historico = historico_manager.atualizar_historico(usar_api=True)
+                historico = historico_manager.atualizar_historico(usar_api=True, tempo_limite=tempo_limite)
         else:
-            historico = historico_manager.atualizar_historico(usar_api=True)
+            historico = historico_manager.atualizar_historico(usar_api=True, tempo_limite=tempo_limite)
         
-        analisador = AnalisadorLotofacil(historico)
-        gerador = GeradorFechamento(analisador, historico)
-        conferidor = ConferidorJogos(historico)
+        # Concursos novos entram nos agregados já calculados; reconstrói só se o histórico mudou
+        with lock_lotofacil:
+            if not absorver_concursos_novos(analisador, historico):
+                matriz = como_matriz(historico, 'lotofacil')
+                analisador = AnalisadorLotofacil(matriz, historico_manager.db)
+                gerador = GeradorFechamento(analisador, matriz)
+                conferidor = ConferidorJogos(matriz)
         
         return jsonify({
             'success': True,
             'total_concursos': len(historico),
-            'banco_atualizado': historico_manager.usar_banco
+            'banco_atualizado': historico_manager.usar_banco,
+            'concluido': resultado_sync.get('concluido', True),
+            'pendentes': resultado_sync.get('pendentes', 0)
         })
     except Exception as e:
         return jsonify({
@@ -357,6 +550,22 @@ def estatisticas_banco():
         }), 500
 
 
+@app.route('/api/fontes/metricas', methods=['GET'])
+def get_metricas_fontes():
+    """Retorna o limitador de cada host (taxa, concorrência, erros) e a saúde de cada fonte (circuito, custo)"""
+    try:
+        return jsonify({
+            'success': True,
+            'fontes': metricas_limitadores(),
+            'saude': metricas_fontes()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/historico')
 def get_historico():
     """Retorna histórico de concursos"""
@@ -376,11 +585,10 @@ def get_historico():
 
 
 @app.route('/api/combinacao-mais-repetida')
+@usando_analise(lock_lotofacil)
 def get_combinacao_mais_repetida():
     """Retorna a combinação de 15 números que mais se repetiu no histórico"""
     try:
-        global analisador
-        analisador = AnalisadorLotofacil(historico)
         resultado = analisador.combinacao_mais_repetida()
         
         return jsonify({
@@ -395,6 +603,40 @@ def get_combinacao_mais_repetida():
         }), 500
 
 
+@app.route('/api/subconjuntos-frequentes')
+@usando_analise(lock_lotofacil)
+def get_subconjuntos_frequentes():
+    """
+    Subconjuntos de k números que mais saíram juntos
+    ?k=N (padrão 14), ?top=N (padrão 10)
+    """
+    try:
+        is_valid, error_msg, k = validate_quantidade(request.args.get('k', 14), 1, 15)
+        if is_valid:
+            is_valid, error_msg, top = validate_quantidade(request.args.get('top', 10), 1, MAX_TOP_COOCORRENCIA)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        if SubconjuntoFrequente(analisador.matriz, k).gerados > MAX_SUBCONJUNTOS_GERADOS:
+            return jsonify({
+                'success': False,
+                'error': f'Consulta grande demais para k={k}: use analisar_subconjuntos.py'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador.subconjuntos_mais_frequentes(k, top)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 def parsear_arquivo_txt(conteudo: str) -> list:
     """
     Parseia arquivo TXT exportado pelo sistema
@@ -445,6 +687,7 @@ def parsear_arquivo_txt(conteudo: str) -> list:
 
 
 @app.route('/api/importar-jogos', methods=['POST'])
+@usando_analise(lock_lotofacil)
 def importar_jogos():
     """Importa jogos de arquivo TXT e confere"""
     try:
@@ -519,10 +762,6 @@ def importar_jogos():
                 'error': f'Máximo de {MAX_JOGOS_IMPORT} jogos por importação. Arquivo contém {len(jogos)} jogos'
             }), 400
         
-        # Atualiza conferidor com histórico atual
-        global conferidor
-        conferidor = ConferidorJogos(historico)
-        
         # Confere jogos
         resultado = conferidor.conferir_completo(jogos)
         
@@ -539,6 +778,7 @@ def importar_jogos():
 
 
 @app.route('/api/conferir-jogos', methods=['POST'])
+@usando_analise(lock_lotofacil)
 def conferir_jogos():
     """Confere lista de jogos enviada via JSON"""
     try:
@@ -597,10 +837,6 @@ def conferir_jogos():
                 'error': 'Nenhum jogo válido encontrado. Jogos devem ter entre 15 e 20 números de 1 a 25'
             }), 400
         
-        # Atualiza conferidor
-        global conferidor
-        conferidor = ConferidorJogos(historico)
-        
         # Confere jogos
         resultado = conferidor.conferir_completo(jogos_validos)
         
@@ -619,13 +855,22 @@ def conferir_jogos():
 # ==================== ROTAS TIMEMANIA ====================
 
 @app.route('/api/timemania/estatisticas')
+@usando_analise(lock_timemania)
 def get_estatisticas_timemania():
     """Retorna estatísticas completas da Timemania"""
     try:
-        global analisador_timemania
-        analisador_timemania = AnalisadorTimemania(historico_timemania)
         stats = analisador_timemania.get_estatisticas_completas()
         
+        # ?janela=10,50,3000-3100 acrescenta frequência, quentes e frios dessas janelas
+        if request.args.get('janela'):
+            is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'error': error_msg
+                }), 400
+            stats['janelas'] = analisador_timemania.frequencia_janelas(**parametros)['janelas']
+        
         return jsonify({
             'success': True,
             'data': stats
@@ -637,7 +882,67 @@ def get_estatisticas_timemania():
         }), 500
 
 
+@app.route('/api/timemania/janelas')
+@usando_analise(lock_timemania)
+def get_janelas_timemania():
+    """
+    Frequência, números quentes e frios da Timemania em várias janelas de uma vez
+    ?janela=10,50,3000-3100 (últimos N concursos e faixas de concursos), ?serie=N (série móvel)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador_timemania.frequencia_janelas(**parametros)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/timemania/coocorrencia')
+@usando_analise(lock_timemania)
+def get_coocorrencia_timemania():
+    """
+    Pares e triplas da Timemania que mais saíram juntos (com o lift de cada par)
+    ?top=N (padrão 20), ?numeros=5,13,22 (afinidade dos demais números com esses), ?matriz=1 (matriz de pares)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_coocorrencia(request.args.get('top'), request.args.get('numeros'),
+                                                               1, 80)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        resultado = dict(analisador_timemania.coocorrencia(parametros['top']))
+        if parametros['numeros']:
+            resultado['afinidade'] = analisador_timemania.afinidade(parametros['numeros'])
+        if request.args.get('matriz') in ('1', 'true', 'sim'):
+            resultado['matriz'] = analisador_timemania.matriz_coocorrencia()
+        
+        return jsonify({
+            'success': True,
+            'data': resultado
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/timemania/gerar-jogos', methods=['POST'])
+@usando_analise(lock_timemania)
 def gerar_jogos_timemania():
     """Gera jogos da Timemania baseado nos parâmetros"""
     try:
@@ -744,12 +1049,15 @@ def get_historico_timemania():
 def atualizar_historico_timemania():
     """Atualiza histórico de concursos da Timemania"""
     try:
-        global historico_timemania, analisador_timemania, gerador_timemania, conferidor_timemania
+        global historico_timemania, matriz_timemania, analisador_timemania, gerador_timemania, conferidor_timemania
         
-        historico_timemania = historico_manager_timemania.atualizar_historico(usar_api=True)
-        analisador_timemania = AnalisadorTimemania(historico_timemania)
-        gerador_timemania = GeradorFechamentoTimemania(analisador_timemania, historico_timemania)
-        conferidor_timemania = ConferidorJogosTimemania(historico_timemania)
+        historico_timemania = historico_manager_timemania.atualizar_historico(usar_api=True, tempo_limite=obter_tempo_limite())
+        with lock_timemania:
+            if not absorver_concursos_novos(analisador_timemania, historico_timemania):
+                matriz_timemania = como_matriz(historico_timemania, 'timemania')
+                analisador_timemania = AnalisadorTimemania(matriz_timemania)
+                gerador_timemania = GeradorFechamentoTimemania(analisador_timemania, matriz_timemania)
+                conferidor_timemania = ConferidorJogosTimemania(matriz_timemania)
         
         return jsonify({
             'success': True,
@@ -763,11 +1071,10 @@ def atualizar_historico_timemania():
 
 
 @app.route('/api/timemania/combinacao-mais-repetida')
+@usando_analise(lock_timemania)
 def get_combinacao_mais_repetida_timemania():
     """Retorna a combinação de 10 números que mais se repetiu no histórico da Timemania"""
     try:
-        global analisador_timemania
-        analisador_timemania = AnalisadorTimemania(historico_timemania)
         resultado = analisador_timemania.combinacao_mais_repetida()
         
         return jsonify({
@@ -782,6 +1089,40 @@ def get_combinacao_mais_repetida_timemania():
         }), 500
 
 
+@app.route('/api/timemania/subconjuntos-frequentes')
+@usando_analise(lock_timemania)
+def get_subconjuntos_frequentes_timemania():
+    """
+    Subconjuntos de k números da Timemania que mais saíram juntos
+    ?k=N (padrão 5), ?top=N (padrão 10)
+    """
+    try:
+        is_valid, error_msg, k = validate_quantidade(request.args.get('k', 5), 1, 7)
+        if is_valid:
+            is_valid, error_msg, top = validate_quantidade(request.args.get('top', 10), 1, MAX_TOP_COOCORRENCIA)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        if SubconjuntoFrequente(analisador_timemania.matriz, k).gerados > MAX_SUBCONJUNTOS_GERADOS:
+            return jsonify({
+                'success': False,
+                'error': f'Consulta grande demais para k={k}: use analisar_subconjuntos.py'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador_timemania.subconjuntos_mais_frequentes(k, top)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 def parsear_arquivo_txt_timemania(conteudo: str) -> list:
     """Parseia arquivo TXT exportado pelo sistema para Timemania"""
     jogos = []
@@ -809,6 +1150,7 @@ def parsear_arquivo_txt_timemania(conteudo: str) -> list:
 
 
 @app.route('/api/timemania/importar-jogos', methods=['POST'])
+@usando_analise(lock_timemania)
 def importar_jogos_timemania():
     """Importa jogos de arquivo TXT e confere - Timemania"""
     try:
@@ -881,9 +1223,6 @@ def importar_jogos_timemania():
                 'error': f'Máximo de {MAX_JOGOS_IMPORT} jogos por importação. Arquivo contém {len(jogos)} jogos'
             }), 400
         
-        global conferidor_timemania
-        conferidor_timemania = ConferidorJogosTimemania(historico_timemania)
-        
         resultado = conferidor_timemania.conferir_completo(jogos)
         
         return jsonify({
@@ -899,6 +1238,7 @@ def importar_jogos_timemania():
 
 
 @app.route('/api/timemania/conferir-jogos', methods=['POST'])
+@usando_analise(lock_timemania)
 def conferir_jogos_timemania():
     """Confere jogos enviados via JSON - Timemania"""
     try:
@@ -956,9 +1296,6 @@ def conferir_jogos_timemania():
                 'error': 'Nenhum jogo válido encontrado. Jogos devem ter exatamente 10 números de 1 a 80'
             }), 400
         
-        global conferidor_timemania
-        conferidor_timemania = ConferidorJogosTimemania(historico_timemania)
-        
         resultado = conferidor_timemania.conferir_completo(jogos_validos)
         
         return jsonify({
@@ -976,13 +1313,22 @@ def conferir_jogos_timemania():
 # ========== ROTAS LOTOMANIA ==========
 
 @app.route('/api/lotomania/estatisticas')
+@usando_analise(lock_lotomania)
 def get_estatisticas_lotomania():
     """Retorna estatísticas completas da Lotomania"""
     try:
-        global analisador_lotomania
-        analisador_lotomania = AnalisadorLotomania(historico_lotomania)
         stats = analisador_lotomania.get_estatisticas_completas()
         
+        # ?janela=10,50,3000-3100 acrescenta frequência, quentes e frios dessas janelas
+        if request.args.get('janela'):
+            is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'error': error_msg
+                }), 400
+            stats['janelas'] = analisador_lotomania.frequencia_janelas(**parametros)['janelas']
+        
         return jsonify({
             'success': True,
             'data': stats
@@ -994,7 +1340,67 @@ def get_estatisticas_lotomania():
         }), 500
 
 
+@app.route('/api/lotomania/janelas')
+@usando_analise(lock_lotomania)
+def get_janelas_lotomania():
+    """
+    Frequência, números quentes e frios da Lotomania em várias janelas de uma vez
+    ?janela=10,50,3000-3100 (últimos N concursos e faixas de concursos), ?serie=N (série móvel)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_janelas(request.args.get('janela'), request.args.get('serie'))
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador_lotomania.frequencia_janelas(**parametros)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/lotomania/coocorrencia')
+@usando_analise(lock_lotomania)
+def get_coocorrencia_lotomania():
+    """
+    Pares e triplas da Lotomania que mais saíram juntos (com o lift de cada par)
+    ?top=N (padrão 20), ?numeros=5,13,22 (afinidade dos demais números com esses), ?matriz=1 (matriz de pares)
+    """
+    try:
+        is_valid, error_msg, parametros = validate_coocorrencia(request.args.get('top'), request.args.get('numeros'),
+                                                               0, 99)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        resultado = dict(analisador_lotomania.coocorrencia(parametros['top']))
+        if parametros['numeros']:
+            resultado['afinidade'] = analisador_lotomania.afinidade(parametros['numeros'])
+        if request.args.get('matriz') in ('1', 'true', 'sim'):
+            resultado['matriz'] = analisador_lotomania.matriz_coocorrencia()
+        
+        return jsonify({
+            'success': True,
+            'data': resultado
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/lotomania/gerar-jogos', methods=['POST'])
+@usando_analise(lock_lotomania)
 def gerar_jogos_lotomania():
     """Gera jogos da Lotomania baseado nos parâmetros"""
     try:
@@ -1071,12 +1477,15 @@ def gerar_jogos_lotomania():
 def atualizar_historico_lotomania():
     """Atualiza histórico de concursos da Lotomania"""
     try:
-        global historico_lotomania, analisador_lotomania, gerador_lotomania, conferidor_lotomania
+        global historico_lotomania, matriz_lotomania, analisador_lotomania, gerador_lotomania, conferidor_lotomania
         
-        historico_lotomania = historico_manager_lotomania.atualizar_historico(usar_api=True)
-        analisador_lotomania = AnalisadorLotomania(historico_lotomania)
-        gerador_lotomania = GeradorFechamentoLotomania(analisador_lotomania, historico_lotomania)
-        conferidor_lotomania = ConferidorJogosLotomania(historico_lotomania)
+        historico_lotomania = historico_manager_lotomania.atualizar_historico(usar_api=True, tempo_limite=obter_tempo_limite())
+        with lock_lotomania:
+            if not absorver_concursos_novos(analisador_lotomania, historico_lotomania):
+                matriz_lotomania = como_matriz(historico_lotomania, 'lotomania')
+                analisador_lotomania = AnalisadorLotomania(matriz_lotomania)
+                gerador_lotomania = GeradorFechamentoLotomania(analisador_lotomania, matriz_lotomania)
+                conferidor_lotomania = ConferidorJogosLotomania(matriz_lotomania)
         
         return jsonify({
             'success': True,
@@ -1090,11 +1499,10 @@ def atualizar_historico_lotomania():
 
 
 @app.route('/api/lotomania/combinacao-mais-repetida')
+@usando_analise(lock_lotomania)
 def get_combinacao_mais_repetida_lotomania():
     """Retorna a combinação de 20 números que mais se repetiu no histórico da Lotomania"""
     try:
-        global analisador_lotomania
-        analisador_lotomania = AnalisadorLotomania(historico_lotomania)
         resultado = analisador_lotomania.combinacao_mais_repetida()
         
         return jsonify({
@@ -1109,6 +1517,40 @@ def get_combinacao_mais_repetida_lotomania():
         }), 500
 
 
+@app.route('/api/lotomania/subconjuntos-frequentes')
+@usando_analise(lock_lotomania)
+def get_subconjuntos_frequentes_lotomania():
+    """
+    Subconjuntos de k números da Lotomania que mais saíram juntos
+    ?k=N (padrão 5), ?top=N (padrão 10)
+    """
+    try:
+        is_valid, error_msg, k = validate_quantidade(request.args.get('k', 5), 1, 20)
+        if is_valid:
+            is_valid, error_msg, top = validate_quantidade(request.args.get('top', 10), 1, MAX_TOP_COOCORRENCIA)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'error': error_msg
+            }), 400
+        
+        if SubconjuntoFrequente(analisador_lotomania.matriz, k).gerados > MAX_SUBCONJUNTOS_GERADOS:
+            return jsonify({
+                'success': False,
+                'error': f'Consulta grande demais para k={k}: use analisar_subconjuntos.py'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': analisador_lotomania.subconjuntos_mais_frequentes(k, top)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 def parsear_arquivo_txt_lotomania(conteudo: str) -> list:
     """Parseia arquivo TXT exportado pelo sistema para Lotomania"""
     jogos = []
@@ -1155,6 +1597,7 @@ def parsear_arquivo_txt_lotomania(conteudo: str) -> list:
 
 
 @app.route('/api/lotomania/importar-jogos', methods=['POST'])
+@usando_analise(lock_lotomania)
 def importar_jogos_lotomania():
     """Importa jogos de arquivo TXT e confere - Lotomania"""
     try:
@@ -1227,9 +1670,6 @@ def importar_jogos_lotomania():
                 'error': f'Máximo de {MAX_JOGOS_IMPORT} jogos por importação. Arquivo contém {len(jogos)} jogos'
             }), 400
         
-        global conferidor_lotomania
-        conferidor_lotomania = ConferidorJogosLotomania(historico_lotomania)
-        
         resultado = conferidor_lotomania.conferir_completo(jogos)
         
         return jsonify({
@@ -1245,6 +1685,7 @@ def importar_jogos_lotomania():
 
 
 @app.route('/api/lotomania/conferir-jogos', methods=['POST'])
+@usando_analise(lock_lotomania)
 def conferir_jogos_lotomania():
     """Confere jogos enviados via JSON - Lotomania"""
     try:
@@ -1302,9 +1743,6 @@ def conferir_jogos_lotomania():
                 'error': 'Nenhum jogo válido encontrado. Jogos devem ter exatamente 50 números de 0 a 99'
             }), 400
         
-        global conferidor_lotomania
-        conferidor_lotomania = ConferidorJogosLotomania(historico_lotomania)
-        
         resultado = conferidor_lotomania.conferir_completo(jogos_validos)
         
         return jsonify({
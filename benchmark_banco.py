@@ -0,0 +1,162 @@
+"""
+Benchmark de latência por chamada do banco de dados de concursos
+Compara uma conexão nova por chamada (comportamento antigo) com a
+conexão persistente por thread do DatabaseLotofacil, e a importação
+linha a linha com o upsert em lote (executemany)
+"""
+import functools
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from src.database import DatabaseLoteria, DatabaseLotofacil
+
+
+class DatabaseConexaoPorChamada(DatabaseLotofacil):
+    """Reproduz o comportamento antigo: cada chamada abre uma conexão nova e a fecha no fim"""
+
+    def __init__(self, db_path: str):
+        self._abertas = []
+        super().__init__(db_path)
+        self._fechar_abertas()
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        self._abertas.append(conn)
+        return conn
+
+    def _fechar_abertas(self):
+        while self._abertas:
+            self._abertas.pop().close()
+
+
+def _fechando_no_fim(metodo):
+    """Fecha as conexões abertas pelo método quando ele retorna (conn.close() do código antigo)"""
+    @functools.wraps(metodo)
+    def chamada(self, *args, **kwargs):
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            self._fechar_abertas()
+    return chamada
+
+
+for _nome, _metodo in vars(DatabaseLoteria).items():
+    if not _nome.startswith('_') and callable(_metodo):
+        setattr(DatabaseConexaoPorChamada, _nome, _fechando_no_fim(_metodo))
+
+
+def inserir_linha_a_linha(db: DatabaseLotofacil, concursos) -> int:
+    """Reproduz a importação antiga: um INSERT OR REPLACE por concurso"""
+    conn = db._conexao()
+    inseridos = 0
+    with conn:
+        for concurso in concursos:
+            numeros = concurso.get('numeros', [])
+            conn.execute('''
+                INSERT OR REPLACE INTO concursos
+                (numero, data_apuracao, numeros, mascara, data_atualizacao)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (concurso.get('concurso'), concurso.get('data', ''), json.dumps(numeros), db._mascara(numeros)))
+            inseridos += 1
+    return inseridos
+
+
+def gerar_concursos(quantidade: int):
+    """Gera concursos sintéticos da Lotofácil"""
+    return [
+        {
+            'concurso': num,
+            'numeros': sorted(random.sample(range(1, 26), 15)),
+            'data': f"{(num % 28) + 1:02d}/{(num % 12) + 1:02d}/{2003 + num // 156}"
+        }
+        for num in range(1, quantidade + 1)
+    ]
+
+
+def medir(nome: str, funcao, repeticoes: int) -> float:
+    """Executa a função N vezes e retorna a latência média em microssegundos"""
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        funcao(i)
+    media_us = (time.perf_counter() - inicio) / repeticoes * 1_000_000
+    print(f"  {nome:<32} {media_us:10.1f} us/chamada")
+    return media_us
+
+
+def executar_cenarios(db: DatabaseLotofacil, total: int, repeticoes: int):
+    """Mede as operações mais usadas pelas rotas e pela sincronização"""
+    resultados = {}
+    resultados['contar_concursos'] = medir(
+        'contar_concursos', lambda i: db.contar_concursos(), repeticoes)
+    resultados['obter_ultimo_concurso'] = medir(
+        'obter_ultimo_concurso', lambda i: db.obter_ultimo_concurso(), repeticoes)
+    resultados['obter_concurso'] = medir(
+        'obter_concurso', lambda i: db.obter_concurso((i % total) + 1), repeticoes)
+    resultados['verificar_concurso_existe'] = medir(
+        'verificar_concurso_existe', lambda i: db.verificar_concurso_existe((i % total) + 1), repeticoes)
+    resultados['obter_ultimos_concursos(100)'] = medir(
+        'obter_ultimos_concursos(100)', lambda i: db.obter_ultimos_concursos(100), max(1, repeticoes // 10))
+    novos = gerar_concursos(repeticoes)
+    resultados['inserir_concurso'] = medir(
+        'inserir_concurso', lambda i: db.inserir_concurso(dict(novos[i], concurso=total + i + 1)), repeticoes)
+    return resultados
+
+
+def medir_importacao(pasta: str, concursos):
+    """Importação do histórico completo: linha a linha x upsert em lote"""
+    print(f"\nImportação de {len(concursos)} concursos em uma chamada:")
+    alterados = [dict(c, numeros=sorted(random.sample(range(1, 26), 15))) if i % 10 == 0 else c
+                 for i, c in enumerate(concursos)]
+    cenarios = [('banco vazio', concursos), ('reimportação sem mudanças', concursos),
+                ('reimportação com 10% alterados', alterados)]
+
+    db_antigo = DatabaseLotofacil(os.path.join(pasta, 'importacao_antiga', 'lotofacil.db'))
+    db_novo = DatabaseLotofacil(os.path.join(pasta, 'importacao_nova', 'lotofacil.db'))
+    for nome, lote in cenarios:
+        inicio = time.perf_counter()
+        inserir_linha_a_linha(db_antigo, lote)
+        antes_ms = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        relatorio = db_novo.upsert_concursos(lote)
+        depois_ms = (time.perf_counter() - inicio) * 1000
+
+        print(f"  {nome:<32} antes {antes_ms:8.1f} ms  depois {depois_ms:8.1f} ms  {relatorio}")
+    db_antigo.fechar()
+    db_novo.fechar()
+
+
+def main(total: int = 3500, repeticoes: int = 2000):
+    print("=" * 60)
+    print(f"BENCHMARK BANCO DE DADOS ({total} concursos, {repeticoes} chamadas)")
+    print("=" * 60)
+
+    concursos = gerar_concursos(total)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        print("\nAntes - conexão nova por chamada:")
+        db_antigo = DatabaseConexaoPorChamada(os.path.join(pasta, 'antigo', 'lotofacil.db'))
+        db_antigo.inserir_concursos(concursos)
+        antes = executar_cenarios(db_antigo, total, repeticoes)
+
+        print("\nDepois - conexão persistente (WAL + pragmas + statements em cache):")
+        db_novo = DatabaseLotofacil(os.path.join(pasta, 'novo', 'lotofacil.db'))
+        db_novo.inserir_concursos(concursos)
+        depois = executar_cenarios(db_novo, total, repeticoes)
+        db_novo.fechar()
+
+        medir_importacao(pasta, concursos)
+
+    print("\nGanho por operação:")
+    for nome, tempo_antes in antes.items():
+        tempo_depois = depois[nome]
+        ganho = tempo_antes / tempo_depois if tempo_depois > 0 else 0
+        print(f"  {nome:<32} {ganho:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Benchmark da busca de concursos faltantes (sincronizar_banco)
+Sobe um servidor HTTP local que imita a API da Caixa (com latência por
+requisição) e compara a busca sequencial antiga, um concurso por vez com
+pausas, com o BuscadorConcursos em diferentes níveis de paralelismo,
+com e sem a sessão HTTP compartilhada (conexões abertas por cenário), a
+reconstrução do banco com o cache HTTP em disco já populado, a sincronização
+em pedaços com checkpoint (nenhum concurso buscado duas vezes) e um servidor
+que limita requisições simultâneas (429), com e sem o limitador adaptativo
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import requests
+
+from src.busca_concorrente import ResultadoBusca
+from src.cache_http import CacheHTTP
+from src.cliente_http import obter_sessao, requisitar
+from src.database import DatabaseLotofacil
+from src.historico import HistoricoLotofacil
+from src.limitador import limitador_para
+
+
+class ServidorStub(BaseHTTPRequestHandler):
+    """Responde /lotofacil/<numero> no formato da API da Caixa após uma latência fixa"""
+
+    # HTTP/1.1 mantém a conexão aberta entre requisições (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    # Sem Nagle: cabeçalho e corpo saem juntos (senão o ACK atrasado soma ~40 ms por resposta)
+    disable_nagle_algorithm = True
+    latencia = 0.02
+    ultimo = 0
+    conexoes = 0
+    requisicoes = 0
+    # Acima de max_simultaneas requisições em curso o servidor responde 429
+    max_simultaneas = None
+    simultaneas = 0
+    recusadas = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        ServidorStub.conexoes += 1
+        super().setup()
+
+    def do_GET(self):
+        with ServidorStub._lock:
+            ServidorStub.requisicoes += 1
+            ServidorStub.simultaneas += 1
+            recusar = self.max_simultaneas is not None and ServidorStub.simultaneas > self.max_simultaneas
+            if recusar:
+                ServidorStub.recusadas += 1
+        try:
+            time.sleep(self.latencia)
+            if recusar:
+                self.send_response(429)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._responder()
+        finally:
+            with ServidorStub._lock:
+                ServidorStub.simultaneas -= 1
+
+    def _responder(self):
+        try:
+            numero = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+        except ValueError:
+            numero = 0
+        if not 1 <= numero <= self.ultimo:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        gerador = random.Random(numero)
+        corpo = json.dumps({
+            'numero': numero,
+            'dataApuracao': f"{(numero % 28) + 1:02d}/{(numero % 12) + 1:02d}/{2003 + numero // 156}",
+            'listaDezenas': [f"{n:02d}" for n in sorted(gerador.sample(range(1, 26), 15))]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorHTTP(ThreadingHTTPServer):
+    """Servidor com fila de conexões maior que o padrão (5), para não recusar rajadas"""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class HistoricoStub(HistoricoLotofacil):
+    """HistoricoLotofacil apontando para o servidor local"""
+
+    def __init__(self, url_base: str, ultimo: int, pasta: str, paralelismo: Optional[int] = None,
+                 usar_sessao: bool = True, cache_http: Optional[CacheHTTP] = None,
+                 limitado: bool = False):
+        super().__init__(cache_file=os.path.join(pasta, 'historico.json'), usar_banco=False,
+                         paralelismo=paralelismo)
+        self.url_base = url_base
+        self.ultimo = ultimo
+        self.usar_sessao = usar_sessao
+        self.cache_http = cache_http
+        self.limitado = limitado
+        self.usar_banco = True
+        self.db = DatabaseLotofacil(os.path.join(pasta, 'lotofacil.db'))
+
+    def _obter_ultimo_concurso(self) -> Optional[int]:
+        return self.ultimo
+
+    def _consultar_concurso(self, numero: int) -> ResultadoBusca:
+        try:
+            # Sem sessão reproduz o comportamento antigo: uma conexão nova por requisição
+            url = f"{self.url_base}/lotofacil/{numero}"
+            if self.limitado:
+                response = requisitar(url, timeout=3)
+            elif self.cache_http is not None:
+                response = self.cache_http.get(obter_sessao().get, url, timeout=3, imutavel=True,
+                                               validar=self._resposta_valida)
+            else:
+                cliente = obter_sessao() if self.usar_sessao else requests
+                response = cliente.get(url, timeout=3)
+            if response.status_code == 200:
+                return ResultadoBusca(self._processar_concurso(response.json()), 'Servidor local')
+            if response.status_code == 404:
+                return ResultadoBusca(None, inexistente=True)
+        except Exception:
+            pass
+        return ResultadoBusca(None)
+
+
+def sincronizar_sequencial(historico: HistoricoStub) -> int:
+    """Reproduz a sincronização antiga: um concurso por vez, pausa a cada lote de 50"""
+    concursos_novos = []
+    for num in range(1, historico.ultimo + 1):
+        c = historico._buscar_concurso_especifico(num)
+        if c:
+            concursos_novos.append(c)
+        if len(concursos_novos) % 50 == 0:
+            historico.db.inserir_concursos(concursos_novos)
+            concursos_novos = []
+            time.sleep(0.1)
+    if concursos_novos:
+        historico.db.inserir_concursos(concursos_novos)
+    return historico.db.contar_concursos()
+
+
+def main(total: int = 300, latencia_ms: float = 20.0, paralelismos=(1, 4, 8, 16)):
+    print("=" * 60)
+    print(f"BENCHMARK BUSCA DE CONCURSOS ({total} concursos, latência {latencia_ms:.0f} ms)")
+    print("=" * 60)
+
+    ServidorStub.latencia = latencia_ms / 1000
+    ServidorStub.ultimo = total
+    servidor = ServidorHTTP(('127.0.0.1', 0), ServidorStub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            historico = HistoricoStub(url_base, total, os.path.join(pasta, 'sequencial'), usar_sessao=False)
+            inicio = time.perf_counter()
+            ServidorStub.conexoes = 0
+            salvos = sincronizar_sequencial(historico)
+            antes = time.perf_counter() - inicio
+            historico.db.fechar()
+            print(f"\n  {'sequencial (antigo)':<28} {antes:8.2f} s  {salvos} concursos no banco  "
+                  f"{ServidorStub.conexoes:4d} conexões")
+
+            cenarios = [(f'paralelismo {p}', p, True) for p in paralelismos]
+            cenarios.insert(0, (f'paralelismo {paralelismos[-1]} sem sessão', paralelismos[-1], False))
+            for nome, paralelismo, usar_sessao in cenarios:
+                historico = HistoricoStub(url_base, total, os.path.join(pasta, nome.replace(' ', '_')),
+                                          paralelismo=paralelismo, usar_sessao=usar_sessao)
+                inicio = time.perf_counter()
+                ServidorStub.conexoes = 0
+                resultado = historico.sincronizar_banco()
+                depois = time.perf_counter() - inicio
+                historico.db.fechar()
+                ganho = antes / depois if depois > 0 else 0
+                print(f"  {nome:<28} {depois:8.2f} s  {resultado.get('total_banco')} concursos no banco  "
+                      f"{ServidorStub.conexoes:4d} conexões  {ganho:6.1f}x")
+
+            # Reconstrução do banco: a segunda passada sai inteira do cache HTTP
+            cache_http = CacheHTTP(os.path.join(pasta, 'http_cache.db'))
+            for nome in ('cache HTTP vazio', 'cache HTTP populado'):
+                historico = HistoricoStub(url_base, total, os.path.join(pasta, nome.replace(' ', '_')),
+                                          paralelismo=paralelismos[-1], cache_http=cache_http)
+                inicio = time.perf_counter()
+                ServidorStub.conexoes = 0
+                ServidorStub.requisicoes = 0
+                resultado = historico.sincronizar_banco()
+                depois = time.perf_counter() - inicio
+                historico.db.fechar()
+                print(f"  {nome:<28} {depois:8.2f} s  {resultado.get('total_banco')} concursos no banco  "
+                      f"{ServidorStub.requisicoes:4d} requisições")
+
+            # Sincronização em pedaços de 0,1 s: cada chamada continua do checkpoint
+            historico = HistoricoStub(url_base, total, os.path.join(pasta, 'pedacos'), paralelismo=paralelismos[-1])
+            inicio = time.perf_counter()
+            ServidorStub.requisicoes = 0
+            chamadas = 0
+            resultado = {}
+            while not resultado.get('concluido', False) and chamadas < 100:
+                resultado = historico.sincronizar_banco(tempo_limite=0.1)
+                chamadas += 1
+            depois = time.perf_counter() - inicio
+            historico.db.fechar()
+            print(f"  {'pedaços de 0,1 s':<28} {depois:8.2f} s  {resultado.get('total_banco')} concursos no banco  "
+                  f"{ServidorStub.requisicoes:4d} requisições em {chamadas} chamadas")
+
+            # Servidor que aceita poucas requisições simultâneas: sem o limitador os
+            # concursos recusados (429) se perdem; com ele a concorrência se ajusta
+            ServidorStub.max_simultaneas = 4
+            for nome, limitado in (('429 sem limitador', False), ('429 com limitador', True)):
+                historico = HistoricoStub(url_base, total, os.path.join(pasta, nome.replace(' ', '_')),
+                                          paralelismo=paralelismos[-1], limitado=limitado)
+                inicio = time.perf_counter()
+                ServidorStub.requisicoes = 0
+                ServidorStub.recusadas = 0
+                resultado = historico.sincronizar_banco()
+                depois = time.perf_counter() - inicio
+                historico.db.fechar()
+                print(f"  {nome:<28} {depois:8.2f} s  {resultado.get('total_banco')} concursos no banco  "
+                      f"{ServidorStub.recusadas:4d} recusadas")
+            metricas = limitador_para(url_base).metricas()
+            print(f"\n  Limitador: {metricas['taxa_por_segundo']} req/s, concorrência {metricas['concorrencia']}, "
+                  f"taxa de erro {metricas['taxa_erro']:.1%}")
+    finally:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
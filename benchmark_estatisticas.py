@@ -0,0 +1,104 @@
+"""
+Benchmark das estatísticas completas dos analisadores (get_estatisticas_completas)
+Compara o cálculo antigo, em que cada estatística fazia a sua própria passada
+pela matriz (frequência 3x, atraso 2x, quadrantes, pares, quentes/frios e
+intervalos separados), com os agregados de uma única passada
+(HistoricoMatriz.estatisticas), para 1k, 10k e 100k concursos sintéticos
+"""
+import time
+
+import numpy as np
+
+from src.analise import AnalisadorLotofacil
+from src.analise_lotomania import AnalisadorLotomania
+from src.analise_timemania import AnalisadorTimemania
+from src.matriz import JOGOS, HistoricoMatriz
+
+
+ANALISADORES = {
+    'lotofacil': AnalisadorLotofacil,
+    'timemania': AnalisadorTimemania,
+    'lotomania': AnalisadorLotomania,
+}
+
+
+def gerar_matriz(jogo: str, total: int, semente: int = 0) -> HistoricoMatriz:
+    """Matriz de concursos sintéticos (dezenas sem repetição em cada linha)"""
+    menor, maior, dezenas = JOGOS[jogo]
+    gerador = np.random.default_rng(semente)
+    colunas = np.argsort(gerador.random((total, maior - menor + 1)), axis=1)[:, :dezenas]
+    matriz = np.zeros((total, maior - menor + 1), dtype=np.uint8)
+    np.put_along_axis(matriz, colunas, 1, axis=1)
+    concursos = np.arange(1, total + 1, dtype=np.int64)
+    return HistoricoMatriz(matriz, concursos, [''] * total, jogo, {campo: [''] * total for campo in
+                                                                  (('time_coracao',) if jogo == 'timemania' else ())})
+
+
+def _frequencia(matriz: HistoricoMatriz) -> dict:
+    return {int(n): int(f) for n, f in zip(matriz.numeros, matriz.frequencia()) if f > 0}
+
+
+def _atraso(matriz: HistoricoMatriz) -> dict:
+    return {int(n): int(a) for n, a in zip(matriz.numeros, matriz.atraso())}
+
+
+def estatisticas_antigas(matriz: HistoricoMatriz) -> dict:
+    """Reproduz o cálculo antigo: uma passada pela matriz para cada estatística"""
+    if matriz.jogo != 'lotofacil':
+        top = 20 if matriz.jogo == 'timemania' else 30
+        freq = _frequencia(matriz)
+        atrasos = _atraso(matriz)
+        return {
+            'mais_sorteados': sorted(_frequencia(matriz).items(), key=lambda x: x[1], reverse=True)[:top],
+            'menos_sorteados': sorted(_frequencia(matriz).items(), key=lambda x: x[1])[:top],
+            'quentes': sorted(_frequencia(matriz).items(), key=lambda x: x[1], reverse=True)[:top],
+            'frequencia': freq,
+            'atrasos': atrasos
+        }
+
+    limite = min(10, len(matriz))
+    quadrantes = [range(1, 7), range(7, 13), range(13, 19), range(19, 26)]
+    return {
+        'frequencia': _frequencia(matriz),
+        'mais_sorteados': sorted(_frequencia(matriz).items(), key=lambda x: x[1], reverse=True)[:15],
+        'menos_sorteados': sorted(_frequencia(matriz).items(), key=lambda x: x[1])[:10],
+        'atrasos': _atraso(matriz),
+        'numeros_atrasados': [n for n, a in _atraso(matriz).items() if a >= 5],
+        'media_quadrantes': [matriz.contagem_por_concurso(q).mean() for q in quadrantes],
+        'media_pares_impares': matriz.contagem_por_concurso(range(2, 26, 2)).mean(),
+        'numeros_quentes': matriz.ultimos(limite).frequencia(),
+        'numeros_frios': matriz.ultimos(limite).frequencia(),
+        'histograma_intervalos': matriz.histograma_intervalos(),
+    }
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Tempo médio em milissegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main(tamanhos=(1_000, 10_000, 100_000)):
+    print("=" * 60)
+    print("BENCHMARK ESTATÍSTICAS COMPLETAS (passada única x passadas separadas)")
+    print("=" * 60)
+
+    for jogo, classe in ANALISADORES.items():
+        print(f"\n  {jogo}")
+        for total in tamanhos:
+            matriz = gerar_matriz(jogo, total)
+            repeticoes = max(1, 20_000 // total)
+            antes = medir(lambda: estatisticas_antigas(matriz), repeticoes)
+            depois = medir(lambda: classe(matriz).get_estatisticas_completas(), repeticoes)
+            # Fechamentos chamam get_estatisticas_completas de novo no mesmo analisador
+            analisador = classe(matriz)
+            analisador.get_estatisticas_completas()
+            repetida = medir(analisador.get_estatisticas_completas, repeticoes)
+            print(f"    {total:>7} concursos  antes {antes:9.2f} ms  depois {depois:9.2f} ms  "
+                  f"({antes / depois if depois else 0:5.1f}x)  repetida {repetida:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
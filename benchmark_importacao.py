@@ -0,0 +1,142 @@
+"""
+Benchmark da importação offline das planilhas oficiais de resultados
+Gera planilhas sintéticas no layout da Caixa (XLSX e CSV, com colunas de
+ganhadores e linhas extras de cidades) e mede o tempo e o pico de memória
+da importação em streaming para o banco e o cache local, nos três jogos
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+from src.database import DatabaseLoteria
+from src.historico import HistoricoLotofacil
+from src.historico_lotomania import HistoricoLotomania
+from src.historico_timemania import HistoricoTimemania
+from src.matriz import JOGOS
+
+
+TIMES = ['FLAMENGO/RJ', 'CORINTHIANS/SP', 'PALMEIRAS/SP', 'GREMIO/RS', 'BAHIA/BA', 'SANTOS/SP']
+
+
+def gerar_linhas(jogo: str, total: int):
+    """Cabeçalho e linhas no layout da planilha da Caixa (com linhas de cidades)"""
+    menor, maior, dezenas = JOGOS[jogo]
+    cabecalho = ['Concurso', 'Data Sorteio'] + [f'Bola{i}' for i in range(1, dezenas + 1)]
+    if jogo == 'timemania':
+        cabecalho.append('Time Coração')
+    cabecalho += [f'Ganhadores {dezenas} acertos', 'Cidade / UF', f'Rateio {dezenas} acertos', 'Observação']
+    yield cabecalho
+
+    gerador = random.Random(jogo)
+    for numero in range(1, total + 1):
+        data = f"{(numero % 28) + 1:02d}/{(numero % 12) + 1:02d}/{2003 + numero // 156}"
+        linha = [str(numero), data] + [str(n) for n in gerador.sample(range(menor, maior + 1), dezenas)]
+        if jogo == 'timemania':
+            linha.append(gerador.choice(TIMES))
+        ganhadores = gerador.randint(0, 3)
+        linha += [str(ganhadores), 'SAO PAULO/SP' if ganhadores else '', 'R$1.234.567,89', '']
+        yield linha
+        # Demais cidades de ganhadores vêm em linhas sem número de concurso
+        for _ in range(max(0, ganhadores - 1)):
+            yield [''] * (len(cabecalho) - 3) + ['CAMPINAS/SP', '', '']
+
+
+def _coluna(indice: int) -> str:
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def escrever_xlsx(caminho: str, linhas) -> None:
+    """XLSX mínimo: textos na tabela compartilhada, números como células numéricas"""
+    strings = {}
+    partes = []
+    for r, linha in enumerate(linhas, start=1):
+        celulas = []
+        for c, valor in enumerate(linha):
+            if valor == '':
+                continue
+            referencia = f"{_coluna(c)}{r}"
+            if valor.isdigit():
+                celulas.append(f'<c r="{referencia}"><v>{valor}</v></c>')
+            else:
+                indice = strings.setdefault(valor, len(strings))
+                celulas.append(f'<c r="{referencia}" t="s"><v>{indice}</v></c>')
+        partes.append(f'<row r="{r}">{"".join(celulas)}</row>')
+
+    ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    ns_rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml',
+                    '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/></Types>')
+        zf.writestr('xl/workbook.xml',
+                    f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{ns}" xmlns:r="{ns_rel}">'
+                    '<sheets><sheet name="Resultados" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    f'<Relationship Id="rId1" Type="{ns_rel}/worksheet" Target="worksheets/sheet1.xml"/></Relationships>')
+        zf.writestr('xl/worksheets/sheet1.xml',
+                    f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{ns}"><sheetData>{"".join(partes)}</sheetData></worksheet>')
+        textos = ''.join(f'<si><t>{escape(texto)}</t></si>' for texto in strings)
+        zf.writestr('xl/sharedStrings.xml',
+                    f'<?xml version="1.0" encoding="UTF-8"?><sst xmlns="{ns}" count="{len(strings)}">{textos}</sst>')
+
+
+def escrever_csv(caminho: str, linhas) -> None:
+    """CSV exportado pelo Excel em português (separador ';', Latin-1)"""
+    with open(caminho, 'w', encoding='latin-1', newline='') as f:
+        csv.writer(f, delimiter=';').writerows(linhas)
+
+
+def medir(classe, jogo: str, arquivo: str, pasta: str):
+    # Banco e cache em pasta temporária (não toca em data/)
+    historico = classe(cache_file=os.path.join(pasta, f'historico_{jogo}.json'), usar_banco=False)
+    historico.usar_banco = True
+    historico.db = DatabaseLoteria(jogo, os.path.join(pasta, f'{jogo}.db'))
+    inicio = time.perf_counter()
+    resumo = historico.importar_arquivo(arquivo)
+    tempo = time.perf_counter() - inicio
+
+    # Segunda passada só para o pico de memória (o tracemalloc deixa tudo mais lento)
+    tracemalloc.start()
+    historico.importar_arquivo(arquivo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total_banco = historico.db.contar_concursos()
+    historico.db.fechar()
+    return tempo, pico, resumo, total_banco
+
+
+def main(totais=None):
+    totais = totais or {'lotofacil': 3500, 'timemania': 2300, 'lotomania': 2900}
+    classes = {'lotofacil': HistoricoLotofacil, 'timemania': HistoricoTimemania, 'lotomania': HistoricoLotomania}
+    print("=" * 60)
+    print("BENCHMARK IMPORTAÇÃO DE PLANILHAS (streaming, sem pandas)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for jogo, total in totais.items():
+            for formato, escrever in (('xlsx', escrever_xlsx), ('csv', escrever_csv)):
+                arquivo = os.path.join(pasta, f'{jogo}.{formato}')
+                escrever(arquivo, gerar_linhas(jogo, total))
+                destino = os.path.join(pasta, f'{jogo}_{formato}')
+                os.makedirs(destino)
+                tempo, pico, resumo, total_banco = medir(classes[jogo], jogo, arquivo, destino)
+                tamanho_kb = os.path.getsize(arquivo) / 1024
+                print(f"  {jogo:<10} {formato:<5} {tamanho_kb:8.0f} KB  {tempo * 1000:8.1f} ms  "
+                      f"pico {pico / 1024 / 1024:6.1f} MB  {resumo['concursos']} concursos "
+                      f"({resumo['lotes']} lotes)  {total_banco} no banco")
+
+
+if __name__ == "__main__":
+    main()
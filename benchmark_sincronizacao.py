@@ -0,0 +1,111 @@
+"""
+Benchmark da sincronização ponta a ponta contra o servidor de fixtures
+Sobe o servidor local (src/servidor_fixtures.py) com concursos sintéticos no
+formato da API da Caixa para os três jogos, redireciona todas as fontes para
+ele (src/urls.py) e mede sincronizar_banco da Lotofácil e atualizar_historico
+da Timemania e da Lotomania em cenários com latência, erros e limitação, e
+uma cauda lenta na API da Caixa com e sem hedge (Lotofácil e Timemania).
+Banco, cache local e cache HTTP ficam em pasta temporária (nada de data/ é tocado)
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from src.cliente_http import configurar_cache
+from src.database import DatabaseLoteria
+from src.fontes import limpar_fontes
+from src.historico import HistoricoLotofacil
+from src.historico_lotomania import HistoricoLotomania
+from src.historico_timemania import HistoricoTimemania
+from src.limitador import limitador_para
+from src.servidor_fixtures import FixturesHTTP, ServidorFixtures
+from src.urls import configurar_urls
+
+
+TOTAIS = {'lotofacil': 1000, 'timemania': 600, 'lotomania': 1200}
+
+# Fontes com os concursos gravados (a Timemania consulta a LotoDicas em www.)
+FONTES_FIXTURES = ('caixa', 'lotodicas', 'lotodicas_www')
+
+# Cauda lenta: 5% das respostas da Caixa demoram 1 s a mais
+CAUDA_CAIXA = {'latencia': 0.02, 'cauda': 1.0, 'taxa_cauda': 0.05, 'fonte_cauda': 'caixa'}
+
+# (nome, parâmetros do ServidorFixtures, hedge, jogos)
+CENARIOS = [
+    ('sem falhas', {'latencia': 0.02}, False, None),
+    ('latência 20-100 ms', {'latencia': 0.02, 'variacao': 0.08}, False, None),
+    ('erros 5%', {'latencia': 0.02, 'taxa_erro': 0.05}, False, None),
+    ('máx. 4 simultâneas', {'latencia': 0.02, 'max_simultaneas': 4}, False, None),
+    ('100 req/s', {'latencia': 0.02, 'taxa_por_segundo': 100}, False, None),
+    ('cauda 5% +1 s sem hedge', CAUDA_CAIXA, False, ('lotofacil', 'timemania')),
+    ('cauda 5% +1 s com hedge', CAUDA_CAIXA, True, ('lotofacil', 'timemania')),
+]
+
+
+def sincronizar_lotofacil(pasta: str, hedge: bool) -> int:
+    historico = HistoricoLotofacil(cache_file=os.path.join(pasta, 'historico.json'), usar_banco=False, hedge=hedge)
+    historico.usar_banco = True
+    historico.db = DatabaseLoteria('lotofacil', os.path.join(pasta, 'lotofacil.db'))
+    resultado = historico.sincronizar_banco()
+    historico.db.fechar()
+    return resultado.get('total_banco', 0)
+
+
+def atualizar_timemania(pasta: str, hedge: bool) -> int:
+    historico = HistoricoTimemania(cache_file=os.path.join(pasta, 'historico_timemania.json'), hedge=hedge)
+    return len(historico.atualizar_historico())
+
+
+def atualizar_lotomania(pasta: str, hedge: bool) -> int:
+    # Lotomania tem uma fonte só (sem hedge)
+    historico = HistoricoLotomania(cache_file=os.path.join(pasta, 'historico_lotomania.json'))
+    return len(historico.atualizar_historico())
+
+
+SINCRONIZACOES = [
+    ('lotofacil', 'sincronizar_banco', sincronizar_lotofacil),
+    ('timemania', 'atualizar_historico', atualizar_timemania),
+    ('lotomania', 'atualizar_historico', atualizar_lotomania),
+]
+
+
+def main(totais=None, cenarios=None):
+    totais = totais or TOTAIS
+    fixtures = FixturesHTTP.sinteticas(totais, fontes=FONTES_FIXTURES)
+    print("=" * 60)
+    print(f"BENCHMARK SINCRONIZAÇÃO ({len(fixtures)} respostas gravadas: "
+          + ", ".join(f"{jogo} {total}" for jogo, total in totais.items()) + ")")
+    print("=" * 60)
+
+    try:
+        for nome, parametros, hedge, jogos in cenarios or CENARIOS:
+            print(f"\n  {nome}")
+            for jogo, metodo, sincronizar in SINCRONIZACOES:
+                if jogos and jogo not in jogos:
+                    continue
+                # Servidor novo por rodada: limitador do host e saúde das fontes começam do zero
+                with tempfile.TemporaryDirectory() as pasta, ServidorFixtures(fixtures, **parametros) as servidor:
+                    configurar_urls(base=servidor.url_base)
+                    configurar_cache(os.path.join(pasta, 'http_cache.db'))
+                    limpar_fontes()
+
+                    inicio = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        concursos = sincronizar(pasta, hedge)
+                    tempo = time.perf_counter() - inicio
+
+                    metricas = servidor.metricas()
+                    limitador = limitador_para(servidor.url_base).metricas()
+                    print(f"    {jogo:<10} {metodo:<20} {tempo:7.2f} s  {concursos:5d} concursos  "
+                          f"{concursos / tempo if tempo > 0 else 0:7.1f}/s  "
+                          f"{metricas['requisicoes']:5d} req  {metricas['erros']:3d} erros  "
+                          f"{metricas['recusadas']:4d} recusadas  {metricas['lentas']:3d} lentas  "
+                          f"concorrência final {limitador['concorrencia']}")
+    finally:
+        configurar_urls()
+
+
+if __name__ == "__main__":
+    main()
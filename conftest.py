@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from src.matriz import JOGOS
+
+# test_imports.py é um script (troca o sys.stdout ao ser importado): fica fora da coleta do pytest
+collect_ignore = ['test_imports.py']
+
+
+@pytest.fixture
+def gerar_historico():
+    """
+    Fábrica de históricos sintéticos: gerar_historico(jogo, total, semente, repetidas=0.1)
+    Concursos pulados, combinações repetidas (empates) e datas crescentes
+    """
+    def gerar(jogo, total, semente, repetidas=0.1):
+        menor, maior, dezenas = JOGOS[jogo]
+        gerador = random.Random(semente)
+        sorteadas = [sorted(gerador.sample(range(menor, maior + 1), dezenas)) for _ in range(5)]
+        historico = []
+        numero = 0
+        for i in range(total):
+            numero += gerador.choice((1, 1, 1, 2))
+            if gerador.random() < repetidas:
+                numeros = gerador.choice(sorteadas)
+            else:
+                numeros = sorted(gerador.sample(range(menor, maior + 1), dezenas))
+            concurso = {'concurso': numero, 'numeros': numeros,
+                        'data': f'{i % 28 + 1:02d}/{(i // 28) % 12 + 1:02d}/{2000 + i // 336}'}
+            if jogo == 'timemania':
+                concurso['time_coracao'] = f'TIME {i % 7}'
+            historico.append(concurso)
+        return historico
+    return gerar
@@ -0,0 +1,199 @@
+"""
+Agregados incrementais do histórico: frequência, última aparição, atraso,
+frequência nos concursos recentes, histogramas de intervalos, contagem de
+combinações repetidas e coocorrência de pares e triplas. São montados na
+primeira consulta (uma passada pela matriz) e depois só ajustados: cada
+concurso acrescentado no fim, ou removido do início em janelas deslizantes,
+custa O(dezenas sorteadas) (pares: O(dezenas²), triplas: O(dezenas³))
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from src.coocorrencia import matriz_pares, matriz_triplas
+from src.matriz import HistoricoMatriz
+
+
+class AgregadosIncrementais:
+    """
+    Agregados de uma HistoricoMatriz atualizados junto com ela
+    (adicionar/remover alteram a matriz no lugar e ajustam o que já foi calculado)
+    """
+
+    def __init__(self, matriz: HistoricoMatriz, recentes: int = 10, tamanho_combinacao: Optional[int] = None):
+        self.matriz = matriz
+        self.recentes = recentes
+        # Combinações contadas: só concursos com exatamente essa quantidade de números
+        self.tamanho_combinacao = tamanho_combinacao or matriz.dezenas_sorteadas
+        # Sequência do concurso mais antigo (linha i da matriz = sequência _base + i)
+        self._base = 0
+        self._frequencia: Optional[np.ndarray] = None
+        # Sequência da última aparição de cada número (-1 se não saiu)
+        self._ultima: Optional[np.ndarray] = None
+        self._frequencia_recente: Optional[np.ndarray] = None
+        # Colunas dos últimos `recentes` concursos (a mais antiga sai quando entra uma nova)
+        self._linhas_recentes: Deque[np.ndarray] = deque()
+        self._histogramas: Optional[List[Dict[int, int]]] = None
+        # Combinação (bits da linha) -> sequências dos concursos em que saiu
+        self._combinacoes: Optional[Dict[bytes, List[int]]] = None
+        self._pares: Optional[np.ndarray] = None
+        self._triplas: Optional[np.ndarray] = None
+        # Muda a cada concurso acrescentado ou removido (chave de caches derivados)
+        self.versao = 0
+
+    def __len__(self) -> int:
+        return len(self.matriz)
+
+    def _iniciar(self, intervalos: bool):
+        """Monta os agregados a partir da matriz atual (passada única de HistoricoMatriz.estatisticas)"""
+        total = len(self.matriz)
+        estatisticas = self.matriz.estatisticas(self.recentes, intervalos=intervalos)
+        if self._frequencia is None:
+            ultima = estatisticas['ultima_aparicao']
+            self._frequencia = estatisticas['frequencia']
+            self._ultima = np.where(ultima >= 0, ultima + self._base, -1)
+            self._frequencia_recente = estatisticas['frequencia_recente']
+            self._linhas_recentes = deque(
+                np.flatnonzero(linha) for linha in self.matriz.matriz[total - estatisticas['recentes']:]
+            )
+        if intervalos:
+            self._histogramas = estatisticas['histogramas']
+
+    def _iniciar_combinacoes(self):
+        validos = np.flatnonzero(self.matriz.quantidade_por_concurso() == self.tamanho_combinacao)
+        self._combinacoes = {}
+        for linha, chave in zip(validos.tolist(), np.packbits(self.matriz.matriz[validos], axis=1)):
+            self._combinacoes.setdefault(chave.tobytes(), []).append(self._base + linha)
+
+    def _proxima_aparicao(self, coluna: int) -> int:
+        """Linha em que o número volta a sair depois do concurso mais antigo (em blocos crescentes)"""
+        matriz = self.matriz.matriz
+        inicio, bloco = 1, 16
+        while inicio < len(matriz):
+            trecho = matriz[inicio:inicio + bloco, coluna]
+            if trecho.any():
+                return inicio + int(trecho.argmax())
+            inicio += bloco
+            bloco *= 2
+        return -1
+
+    def adicionar(self, concurso: Dict):
+        """Acrescenta um concurso no fim do histórico (concurso no formato padrão)"""
+        sequencia = self._base + len(self.matriz)
+        self.matriz.adicionar(concurso)
+        linha = self.matriz.matriz[-1]
+        colunas = np.flatnonzero(linha)
+
+        if self._histogramas is not None:
+            # Intervalo até a aparição anterior (ainda é a última registrada)
+            numero = int(self.matriz.concursos[-1])
+            for coluna in colunas[self._ultima[colunas] >= 0].tolist():
+                intervalo = numero - int(self.matriz.concursos[self._ultima[coluna] - self._base])
+                histograma = self._histogramas[coluna]
+                histograma[intervalo] = histograma.get(intervalo, 0) + 1
+
+        if self._frequencia is not None:
+            self._frequencia[colunas] += 1
+            self._ultima[colunas] = sequencia
+            if self.recentes > 0:
+                if len(self._linhas_recentes) >= self.recentes:
+                    self._frequencia_recente[self._linhas_recentes.popleft()] -= 1
+                self._linhas_recentes.append(colunas)
+                self._frequencia_recente[colunas] += 1
+
+        if self._combinacoes is not None and len(colunas) == self.tamanho_combinacao:
+            self._combinacoes.setdefault(np.packbits(linha).tobytes(), []).append(sequencia)
+
+        self._somar_coocorrencia(colunas, 1)
+        self.versao += 1
+
+    def remover(self) -> Optional[Dict]:
+        """Remove o concurso mais antigo (janelas deslizantes); devolve o concurso removido"""
+        if not len(self.matriz):
+            return None
+        linha = self.matriz.matriz[0]
+        colunas = np.flatnonzero(linha)
+        sequencia = self._base
+
+        if self._histogramas is not None:
+            # Some o intervalo entre este concurso e a próxima aparição de cada número
+            concursos = self.matriz.concursos
+            for coluna in colunas[self._ultima[colunas] != sequencia].tolist():
+                intervalo = int(concursos[self._proxima_aparicao(coluna)] - concursos[0])
+                histograma = self._histogramas[coluna]
+                histograma[intervalo] -= 1
+                if not histograma[intervalo]:
+                    del histograma[intervalo]
+
+        if self._frequencia is not None:
+            self._frequencia[colunas] -= 1
+            # Números cuja última aparição era este concurso não aparecem em mais nenhum
+            self._ultima[colunas[self._ultima[colunas] == sequencia]] = -1
+            if len(self._linhas_recentes) == len(self.matriz):
+                self._frequencia_recente[self._linhas_recentes.popleft()] -= 1
+
+        if self._combinacoes is not None and len(colunas) == self.tamanho_combinacao:
+            chave = np.packbits(linha).tobytes()
+            sequencias = self._combinacoes[chave]
+            sequencias.pop(0)
+            if not sequencias:
+                del self._combinacoes[chave]
+
+        self._somar_coocorrencia(colunas, -1)
+        self.versao += 1
+        self._base += 1
+        return self.matriz.remover_primeiro()
+
+    def _somar_coocorrencia(self, colunas: np.ndarray, sinal: int):
+        if self._pares is not None:
+            self._pares[np.ix_(colunas, colunas)] += sinal
+        if self._triplas is not None:
+            self._triplas[np.ix_(colunas, colunas, colunas)] += sinal
+
+    def estatisticas(self, intervalos: bool = True) -> Dict:
+        """Mesmo formato (e mesmos valores) de HistoricoMatriz.estatisticas(recentes, intervalos)"""
+        if self._frequencia is None or (intervalos and self._histogramas is None):
+            self._iniciar(intervalos)
+        total = len(self.matriz)
+        ultima = np.where(self._ultima >= 0, self._ultima - self._base, -1)
+        return {
+            'total': total,
+            'frequencia': self._frequencia.copy(),
+            'ultima_aparicao': ultima,
+            'atraso': np.where(ultima >= 0, total - 1 - ultima, total),
+            'recentes': len(self._linhas_recentes),
+            'frequencia_recente': self._frequencia_recente.copy(),
+            'histogramas': [dict(sorted(h.items())) for h in self._histogramas] if intervalos else None
+        }
+
+    def combinacao_mais_repetida(self) -> Dict:
+        """
+        Combinação (de tamanho_combinacao números) que mais se repetiu e quantas vezes
+        Em caso de empate, a que apareceu primeiro
+        """
+        if self._combinacoes is None:
+            self._iniciar_combinacoes()
+        if not self._combinacoes:
+            return {
+                'combinacao': [],
+                'quantidade': 0
+            }
+        chave, sequencias = max(self._combinacoes.items(), key=lambda item: (len(item[1]), -item[1][0]))
+        bits = np.unpackbits(np.frombuffer(chave, dtype=np.uint8), count=self.matriz.matriz.shape[1])
+        return {
+            'combinacao': (np.flatnonzero(bits) + self.matriz.menor_numero).tolist(),
+            'quantidade': len(sequencias)
+        }
+
+    def pares(self) -> np.ndarray:
+        """Matriz R×R de coocorrência de pares (Xᵀ·X; diagonal = frequência). Não alterar"""
+        if self._pares is None:
+            self._pares = matriz_pares(self.matriz)
+        return self._pares
+
+    def triplas(self) -> np.ndarray:
+        """Tensor R×R×R de coocorrência de triplas. Não alterar"""
+        if self._triplas is None:
+            self._triplas = matriz_triplas(self.matriz)
+        return self._triplas
@@ -1,24 +1,107 @@
 """
 Módulo de análise de padrões e estatísticas dos resultados
 """
-from typing import List, Dict, Tuple
-from collections import Counter, defaultdict
+from typing import List, Dict, Tuple, Union, Optional
+
+import numpy as np
+
+from src.agregados import AgregadosIncrementais
+from src.database import DatabaseLoteria
+from src.coocorrencia import afinidade, pares_mais_frequentes, triplas_mais_frequentes
+from src.janelas import frequencia_janelas
+from src.matriz import HistoricoMatriz, Janela, como_matriz, na_janela
+from src.subconjuntos import SubconjuntoFrequente
 
 
 class AnalisadorLotofacil:
     """Classe para analisar padrões nos resultados da Lotofácil"""
     
-    def __init__(self, historico: List[Dict]):
-        self.historico = historico
+    # Concursos considerados por numeros_quentes/numeros_frios no padrão
+    CONCURSOS_RECENTES = 10
+    
+    # Quadrante 1: 1-6, Quadrante 2: 7-12, Quadrante 3: 13-18, Quadrante 4: 19-25
+    QUADRANTES = {
+        'Q1': list(range(1, 7)),
+        'Q2': list(range(7, 13)),
+        'Q3': list(range(13, 19)),
+        'Q4': list(range(19, 26))
+    }
+    
+    def __init__(self, historico: Union[List[Dict], HistoricoMatriz], db: Optional[DatabaseLoteria] = None,
+                 janela: Janela = None):
+        # janela: None = histórico inteiro, N = últimos N concursos, (inicio, fim) = período
+        self.janela = janela
+        self.matriz = como_matriz(historico, 'lotofacil').janela(janela)
         self.numeros_range = range(1, 26)  # Lotofácil: 1 a 25
+        self.db = db
+        self._estatisticas: Optional[Dict[int, Dict]] = None
+        self._agregados: Optional[Dict] = None
+        self._incrementais = AgregadosIncrementais(self.matriz, self.CONCURSOS_RECENTES, tamanho_combinacao=15)
+        self._coocorrencia: Dict[int, Dict] = {}
+        self._coocorrencia_versao = -1
+        self._subconjuntos: Dict[Tuple[int, int], Dict] = {}
+        self._subconjuntos_versao = -1
+    
+    @property
+    def historico(self) -> List[Dict]:
+        """Concursos da janela como lista de dicionários (gerada só quando usada)"""
+        return self.matriz.registros
+    
+    def _estatisticas_banco(self) -> Optional[Dict[int, Dict]]:
+        """
+        Estatísticas materializadas no banco (frequência, último concurso, intervalos)
+        Só são usadas quando o histórico analisado é exatamente o conteúdo do banco
+        (mesmo total, mesmo primeiro/último concurso e sem lacunas)
+        """
+        if self._estatisticas is None:
+            self._estatisticas = {}
+            if self.db is not None and len(self.matriz):
+                total, primeiro, ultimo = self.db.resumo_concursos()
+                concursos = self.matriz.concursos
+                if (total == len(concursos) and primeiro == concursos[0] and ultimo == concursos[-1]
+                        and ultimo - primeiro + 1 == total):
+                    self._estatisticas = self.db.estatisticas_numeros()
+        return self._estatisticas or None
+    
+    def agregados(self) -> Dict:
+        """Frequência, atraso, intervalos e frequência recente da janela (calculados uma vez e ajustados a cada concurso)"""
+        if self._agregados is None:
+            # Com as estatísticas do banco os intervalos já estão materializados
+            self._agregados = self._incrementais.estatisticas(intervalos=self._estatisticas_banco() is None)
+        return self._agregados
+    
+    def adicionar_concurso(self, concurso: Dict):
+        """
+        Acrescenta um concurso novo à análise sem recalcular o histórico: a matriz é
+        atualizada no lugar (gerador e conferidor que usam a mesma matriz também o
+        enxergam) e os agregados são ajustados em O(dezenas). Com janela de N
+        concursos o mais antigo sai; concursos fora de uma janela por período são ignorados
+        """
+        if not na_janela(self.janela, concurso.get('data', '')):
+            return
+        self._incrementais.adicionar(concurso)
+        if isinstance(self.janela, int) and self.janela > 0:
+            while len(self.matriz) > self.janela:
+                self._incrementais.remover()
+        self._estatisticas = None
+        self._agregados = None
+    
+    def remover_concurso(self) -> Optional[Dict]:
+        """Remove o concurso mais antigo da análise (janelas deslizantes) em O(dezenas)"""
+        concurso = self._incrementais.remover()
+        self._estatisticas = None
+        self._agregados = None
+        return concurso
     
     def frequencia_numeros(self) -> Dict[int, int]:
         """Calcula frequência de cada número nos concursos"""
-        frequencias = Counter()
-        for concurso in self.historico:
-            for numero in concurso['numeros']:
-                frequencias[numero] += 1
-        return dict(frequencias)
+        estatisticas = self._estatisticas_banco()
+        if estatisticas:
+            return self.matriz.por_primeira_aparicao(
+                {numero: e['frequencia'] for numero, e in estatisticas.items() if e['frequencia'] > 0})
+        
+        # Ordem da primeira aparição (a do Counter): decide os empates de mais/menos sorteados
+        return self.matriz.por_primeira_aparicao(self.agregados()['frequencia'])
     
     def numeros_mais_sorteados(self, top: int = 15) -> List[Tuple[int, int]]:
         """Retorna os N números mais sorteados"""
@@ -35,174 +118,197 @@ class AnalisadorLotofacil:
         Encontra a combinação de 15 números que mais se repetiu no histórico
         Retorna a combinação e quantas vezes apareceu
         """
-        if not self.historico:
-            return {
-                'combinacao': [],
-                'quantidade': 0
-            }
-        
-        # Conta cada combinação de 15 números
-        combinacoes = Counter()
-        
-        for concurso in self.historico:
-            numeros = concurso.get('numeros', [])
-            if len(numeros) == 15:
-                # Cria uma tupla ordenada para usar como chave
-                combinacao = tuple(sorted(numeros))
-                combinacoes[combinacao] += 1
-        
-        if not combinacoes:
-            return {
-                'combinacao': [],
-                'quantidade': 0
-            }
-        
-        # Encontra a combinação mais frequente
-        combinacao_mais_frequente, quantidade = combinacoes.most_common(1)[0]
-        
-        return {
-            'combinacao': list(combinacao_mais_frequente),
-            'quantidade': quantidade
-        }
+        # Considera apenas concursos com exatamente 15 números (contagem mantida a cada concurso novo)
+        return self._incrementais.combinacao_mais_repetida()
+    
+    def subconjuntos_mais_frequentes(self, k: int, top: int = 10) -> Dict:
+        """
+        Os subconjuntos de k números que mais saíram juntos (qualquer k, não só a
+        combinação inteira), em cache por versão do histórico
+        """
+        versao = self._incrementais.versao
+        if self._subconjuntos_versao != versao:
+            self._subconjuntos = {}
+            self._subconjuntos_versao = versao
+        if (k, top) not in self._subconjuntos:
+            # No próprio processo: a consulta vem de uma requisição do servidor
+            self._subconjuntos[(k, top)] = SubconjuntoFrequente(self.matriz, k, processos=1).mais_frequentes(top)
+        return self._subconjuntos[(k, top)]
     
     def calcular_atraso(self) -> Dict[int, int]:
         """
         Calcula quantos concursos cada número está atrasado
         (última vez que foi sorteado)
         """
-        atrasos = {num: 0 for num in self.numeros_range}
-        ultima_aparicao = {num: -1 for num in self.numeros_range}
-        
-        for idx, concurso in enumerate(self.historico):
-            for numero in concurso['numeros']:
-                ultima_aparicao[numero] = idx
+        estatisticas = self._estatisticas_banco()
+        if estatisticas:
+            return {numero: e['atraso'] for numero, e in estatisticas.items()}
         
-        # Calcula atraso baseado no último concurso
-        ultimo_concurso_idx = len(self.historico) - 1
-        for numero in self.numeros_range:
-            if ultima_aparicao[numero] >= 0:
-                atrasos[numero] = ultimo_concurso_idx - ultima_aparicao[numero]
-            else:
-                atrasos[numero] = len(self.historico)  # Nunca foi sorteado
+        # Números nunca sorteados ficam com atraso = total de concursos
+        atrasos = self.agregados()['atraso']
+        return {int(numero): int(atraso) for numero, atraso in zip(self.matriz.numeros, atrasos)}
+    
+    def histograma_intervalos(self) -> Dict[int, Dict[int, int]]:
+        """
+        Para cada número, quantas vezes ele voltou a sair após k concursos
+        Ex: {1: {1: 310, 2: 150, ...}, ...}
+        """
+        estatisticas = self._estatisticas_banco()
+        if estatisticas:
+            return {numero: e['histograma_intervalos'] for numero, e in estatisticas.items()}
         
-        return atrasos
+        histogramas = self.agregados()['histogramas']
+        return {int(numero): histograma for numero, histograma in zip(self.matriz.numeros, histogramas)}
     
-    def numeros_atrasados(self, limite_atraso: int = 5) -> List[int]:
+    def numeros_atrasados(self, limite_atraso: int = 5, atrasos: Optional[Dict[int, int]] = None) -> List[int]:
         """Retorna números que estão atrasados acima do limite"""
-        atrasos = self.calcular_atraso()
+        atrasos = atrasos if atrasos is not None else self.calcular_atraso()
         return [num for num, atraso in atrasos.items() if atraso >= limite_atraso]
     
     def analisar_sequencias(self) -> Dict[str, int]:
         """Analisa padrões de sequências consecutivas"""
-        sequencias = defaultdict(int)
+        # Par (n, n+1) sorteado junto = coluna j e coluna j+1 ligadas na mesma linha
+        m = self.matriz.matriz
+        pares_consecutivos = (m[:, :-1] & m[:, 1:]).sum(axis=0, dtype=np.int64)
         
-        for concurso in self.historico:
-            numeros = sorted(concurso['numeros'])
-            # Detecta sequências de 2 ou mais números consecutivos
-            for i in range(len(numeros) - 1):
-                if numeros[i+1] - numeros[i] == 1:
-                    sequencias[f"{numeros[i]}-{numeros[i+1]}"] += 1
-        
-        return dict(sequencias)
+        return {
+            f"{numero}-{numero + 1}": int(quantidade)
+            for numero, quantidade in zip(self.matriz.numeros[:-1], pares_consecutivos)
+            if quantidade > 0
+        }
     
     def distribuicao_quadrantes(self) -> Dict[str, List[int]]:
         """
         Analisa distribuição de números por quadrantes
         Quadrante 1: 1-6, Quadrante 2: 7-12, Quadrante 3: 13-18, Quadrante 4: 19-25
         """
-        quadrantes = {
-            'Q1': list(range(1, 7)),
-            'Q2': list(range(7, 13)),
-            'Q3': list(range(13, 19)),
-            'Q4': list(range(19, 26))
-        }
-        
-        distribuicao = defaultdict(list)
+        if not len(self.matriz):
+            return {}
         
-        for concurso in self.historico:
-            for q_name, q_nums in quadrantes.items():
-                count = sum(1 for n in concurso['numeros'] if n in q_nums)
-                distribuicao[q_name].append(count)
-        
-        return dict(distribuicao)
+        return {
+            q_name: self.matriz.contagem_por_concurso(q_nums).tolist()
+            for q_name, q_nums in self.QUADRANTES.items()
+        }
     
     def media_por_quadrante(self) -> Dict[str, float]:
-        """Calcula média de números por quadrante"""
-        dist = self.distribuicao_quadrantes()
-        return {q: sum(counts) / len(counts) if counts else 0.0 for q, counts in dist.items()}
+        """Calcula média de números por quadrante (soma das frequências do quadrante / concursos)"""
+        total = len(self.matriz)
+        if not total:
+            return {}
+        frequencia = self.agregados()['frequencia']
+        return {
+            q: int(frequencia[self.matriz.colunas(q_nums)].sum()) / total
+            for q, q_nums in self.QUADRANTES.items()
+        }
     
     def analisar_pares_impares(self) -> Dict[str, List[int]]:
         """Analisa distribuição de pares e ímpares"""
-        distribuicao = {'pares': [], 'impares': []}
-        
-        for concurso in self.historico:
-            pares = sum(1 for n in concurso['numeros'] if n % 2 == 0)
-            impares = 15 - pares
-            distribuicao['pares'].append(pares)
-            distribuicao['impares'].append(impares)
+        pares = self.matriz.contagem_por_concurso(range(2, 26, 2))
         
-        return distribuicao
+        return {
+            'pares': pares.tolist(),
+            'impares': (15 - pares).tolist()
+        }
     
     def media_pares_impares(self) -> Dict[str, float]:
-        """Calcula média de pares e ímpares"""
-        dist = self.analisar_pares_impares()
-        return {tipo: sum(counts) / len(counts) if counts else 0.0 for tipo, counts in dist.items()}
+        """Calcula média de pares e ímpares (ímpares = 15 - pares em cada concurso)"""
+        total = len(self.matriz)
+        if not total:
+            return {'pares': 0.0, 'impares': 0.0}
+        pares = int(self.agregados()['frequencia'][self.matriz.colunas(range(2, 26, 2))].sum())
+        return {'pares': pares / total, 'impares': (15 * total - pares) / total}
+    
+    def _frequencia_recente(self, limite: int) -> Tuple[int, np.ndarray]:
+        """Limite efetivo e frequência de cada número nos últimos `limite` concursos"""
+        if len(self.matriz) < limite:
+            limite = len(self.matriz)
+        agregados = self.agregados()
+        if limite == agregados['recentes']:
+            return limite, agregados['frequencia_recente']
+        # Outros tamanhos de janela saem da soma prefixada (O(R) depois da primeira vez)
+        return limite, self.matriz.frequencia_intervalo(len(self.matriz) - limite)
     
     def numeros_quentes(self, limite: int = 10) -> List[int]:
         """
         Identifica números quentes (frequentes nos últimos concursos)
         """
-        if len(self.historico) < limite:
-            limite = len(self.historico)
-        
-        ultimos = self.historico[-limite:]
-        freq_recente = Counter()
-        
-        for concurso in ultimos:
-            for numero in concurso['numeros']:
-                freq_recente[numero] += 1
+        limite, freq_recente = self._frequencia_recente(limite)
         
         # Números que apareceram em pelo menos 50% dos últimos concursos
+        # (na ordem da primeira aparição entre eles, como o Counter do código antigo)
         threshold = limite // 2
-        return [num for num, count in freq_recente.items() if count >= threshold]
+        recentes = self.matriz.ultimos(limite).por_primeira_aparicao(freq_recente)
+        return [num for num, count in recentes.items() if count >= threshold]
     
     def numeros_frios(self, limite: int = 10) -> List[int]:
         """
-        Identifica números frios (raros nos últimos concursos)
+        Identifica números frios (raros nos últimos concursos), em ordem crescente
+        (o código antigo devolvia list(set(...)), sem ordem definida)
         """
-        if len(self.historico) < limite:
-            limite = len(self.historico)
-        
-        ultimos = self.historico[-limite:]
-        freq_recente = Counter()
+        limite, freq_recente = self._frequencia_recente(limite)
         
-        for concurso in ultimos:
-            for numero in concurso['numeros']:
-                freq_recente[numero] += 1
-        
-        # Números que apareceram em menos de 30% dos últimos concursos
+        # Números que não saíram ou apareceram em menos de 30% dos últimos concursos
         threshold = limite * 0.3
-        todos_numeros = set(range(1, 26))
-        numeros_que_sairam = set(freq_recente.keys())
-        numeros_que_nao_sairam = todos_numeros - numeros_que_sairam
-        
-        frios = list(numeros_que_nao_sairam)
-        frios.extend([num for num, count in freq_recente.items() if count < threshold])
-        
-        return list(set(frios))
+        return [
+            int(num) for num, count in zip(self.matriz.numeros, freq_recente)
+            if count == 0 or count < threshold
+        ]
+    
+    def frequencia_janelas(self, tamanhos: List[int] = (), faixas: List[Tuple[Optional[int], Optional[int]]] = (),
+                           pontos_serie: int = 0) -> Dict:
+        """
+        Frequência, números quentes e frios de várias janelas de uma vez: últimos N
+        concursos (`tamanhos`, com série móvel de `pontos_serie` pontos) e faixas de
+        concursos (primeiro, ultimo). Cada janela custa O(R) pela soma prefixada
+        """
+        return frequencia_janelas(self.matriz, tamanhos, faixas, pontos_serie)
+    
+    def coocorrencia(self, top: int = 20) -> Dict:
+        """
+        Pares (Xᵀ·X) e triplas que mais saíram juntos, com o lift de cada par
+        As matrizes são ajustadas a cada concurso novo e o resultado fica em cache
+        por versão do histórico
+        """
+        versao = self._incrementais.versao
+        if self._coocorrencia_versao != versao:
+            self._coocorrencia = {}
+            self._coocorrencia_versao = versao
+        if top not in self._coocorrencia:
+            self._coocorrencia[top] = {
+                'total_concursos': len(self.matriz),
+                'pares': pares_mais_frequentes(self.matriz, self._incrementais.pares(), top),
+                'triplas': triplas_mais_frequentes(self.matriz, self._incrementais.triplas(), top)
+            }
+        return self._coocorrencia[top]
+    
+    def matriz_coocorrencia(self) -> List[List[int]]:
+        """Matriz R×R de pares: [i][j] = concursos em que i e j saíram juntos (diagonal = frequência)"""
+        return self._incrementais.pares().tolist()
+    
+    def afinidade(self, numeros: List[int]) -> Dict[int, float]:
+        """
+        Afinidade dos demais números com os informados (média do lift dos pares),
+        do maior para o menor: para completar um jogo com números que costumam sair juntos
+        """
+        return afinidade(self.matriz, self._incrementais.pares(), numeros)
     
     def get_estatisticas_completas(self) -> Dict:
-        """Retorna todas as estatísticas em um dicionário"""
+        """
+        Retorna todas as estatísticas em um dicionário
+        Tudo sai dos agregados de uma única passada pelo histórico (agregados())
+        """
+        frequencia = self.frequencia_numeros()
+        atrasos = self.calcular_atraso()
         return {
-            'frequencia': self.frequencia_numeros(),
-            'mais_sorteados': self.numeros_mais_sorteados(),
-            'menos_sorteados': self.numeros_menos_sorteados(),
-            'atrasos': self.calcular_atraso(),
-            'numeros_atrasados': self.numeros_atrasados(),
+            'frequencia': frequencia,
+            'mais_sorteados': sorted(frequencia.items(), key=lambda x: x[1], reverse=True)[:15],
+            'menos_sorteados': sorted(frequencia.items(), key=lambda x: x[1])[:10],
+            'atrasos': atrasos,
+            'numeros_atrasados': self.numeros_atrasados(atrasos=atrasos),
             'media_quadrantes': self.media_por_quadrante(),
             'media_pares_impares': self.media_pares_impares(),
             'numeros_quentes': self.numeros_quentes(),
             'numeros_frios': self.numeros_frios(),
-            'total_concursos': len(self.historico)
+            'histograma_intervalos': self.histograma_intervalos(),
+            'total_concursos': len(self.matriz)
         }
-
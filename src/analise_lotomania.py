@@ -1,24 +1,64 @@
 """
 Módulo de análise de padrões e estatísticas dos resultados da Lotomania
 """
-from typing import List, Dict, Tuple
-from collections import Counter, defaultdict
+from typing import List, Dict, Optional, Tuple, Union
+
+from src.agregados import AgregadosIncrementais
+from src.coocorrencia import afinidade, pares_mais_frequentes, triplas_mais_frequentes
+from src.janelas import frequencia_janelas
+from src.matriz import HistoricoMatriz, Janela, como_matriz, na_janela
+from src.subconjuntos import SubconjuntoFrequente
 
 
 class AnalisadorLotomania:
     """Classe para analisar padrões nos resultados da Lotomania"""
     
-    def __init__(self, historico: List[Dict]):
-        self.historico = historico
+    def __init__(self, historico: Union[List[Dict], HistoricoMatriz], janela: Janela = None):
+        # janela: None = histórico inteiro, N = últimos N concursos, (inicio, fim) = período
+        self.janela = janela
+        self.matriz = como_matriz(historico, 'lotomania').janela(janela)
         self.numeros_range = range(0, 100)  # Lotomania: 00 a 99
+        self._agregados: Optional[Dict] = None
+        self._incrementais = AgregadosIncrementais(self.matriz, tamanho_combinacao=20)
+        self._coocorrencia: Dict[int, Dict] = {}
+        self._coocorrencia_versao = -1
+        self._subconjuntos: Dict[Tuple[int, int], Dict] = {}
+        self._subconjuntos_versao = -1
+    
+    @property
+    def historico(self) -> List[Dict]:
+        """Concursos da janela como lista de dicionários (gerada só quando usada)"""
+        return self.matriz.registros
+    
+    def agregados(self) -> Dict:
+        """Frequência e atraso da janela (calculados uma vez e ajustados a cada concurso)"""
+        if self._agregados is None:
+            self._agregados = self._incrementais.estatisticas(intervalos=False)
+        return self._agregados
+    
+    def adicionar_concurso(self, concurso: Dict):
+        """
+        Acrescenta um concurso novo à análise em O(dezenas), sem recalcular o histórico
+        (matriz atualizada no lugar; com janela de N concursos o mais antigo sai)
+        """
+        if not na_janela(self.janela, concurso.get('data', '')):
+            return
+        self._incrementais.adicionar(concurso)
+        if isinstance(self.janela, int) and self.janela > 0:
+            while len(self.matriz) > self.janela:
+                self._incrementais.remover()
+        self._agregados = None
+    
+    def remover_concurso(self) -> Optional[Dict]:
+        """Remove o concurso mais antigo da análise (janelas deslizantes) em O(dezenas)"""
+        concurso = self._incrementais.remover()
+        self._agregados = None
+        return concurso
     
     def frequencia_numeros(self) -> Dict[int, int]:
         """Calcula frequência de cada número nos concursos"""
-        frequencias = Counter()
-        for concurso in self.historico:
-            for numero in concurso['numeros']:
-                frequencias[numero] += 1
-        return dict(frequencias)
+        # Ordem da primeira aparição (a do Counter): decide os empates de mais/menos sorteados
+        return self.matriz.por_primeira_aparicao(self.agregados()['frequencia'])
     
     def numeros_mais_sorteados(self, top: int = 30) -> List[Tuple[int, int]]:
         """Retorna os N números mais sorteados"""
@@ -32,29 +72,57 @@ class AnalisadorLotomania:
     
     def calcular_atraso(self) -> Dict[int, int]:
         """Calcula quantos concursos cada número está atrasado"""
-        atrasos = {num: 0 for num in self.numeros_range}
-        ultima_aparicao = {num: -1 for num in self.numeros_range}
-        
-        for idx, concurso in enumerate(self.historico):
-            for numero in concurso['numeros']:
-                ultima_aparicao[numero] = idx
-        
-        ultimo_concurso_idx = len(self.historico) - 1
-        for numero in self.numeros_range:
-            if ultima_aparicao[numero] >= 0:
-                atrasos[numero] = ultimo_concurso_idx - ultima_aparicao[numero]
-            else:
-                atrasos[numero] = ultimo_concurso_idx + 1
-        
-        return atrasos
+        atrasos = self.agregados()['atraso']
+        return {int(numero): int(atraso) for numero, atraso in zip(self.matriz.numeros, atrasos)}
+    
+    def frequencia_janelas(self, tamanhos: List[int] = (), faixas: List[Tuple[Optional[int], Optional[int]]] = (),
+                           pontos_serie: int = 0) -> Dict:
+        """
+        Frequência, números quentes e frios de várias janelas de uma vez: últimos N
+        concursos (`tamanhos`, com série móvel de `pontos_serie` pontos) e faixas de
+        concursos (primeiro, ultimo). Cada janela custa O(R) pela soma prefixada
+        """
+        return frequencia_janelas(self.matriz, tamanhos, faixas, pontos_serie)
+    
+    def coocorrencia(self, top: int = 20) -> Dict:
+        """
+        Pares (Xᵀ·X) e triplas que mais saíram juntos, com o lift de cada par
+        As matrizes são ajustadas a cada concurso novo e o resultado fica em cache
+        por versão do histórico
+        """
+        versao = self._incrementais.versao
+        if self._coocorrencia_versao != versao:
+            self._coocorrencia = {}
+            self._coocorrencia_versao = versao
+        if top not in self._coocorrencia:
+            self._coocorrencia[top] = {
+                'total_concursos': len(self.matriz),
+                'pares': pares_mais_frequentes(self.matriz, self._incrementais.pares(), top),
+                'triplas': triplas_mais_frequentes(self.matriz, self._incrementais.triplas(), top)
+            }
+        return self._coocorrencia[top]
+    
+    def matriz_coocorrencia(self) -> List[List[int]]:
+        """Matriz R×R de pares: [i][j] = concursos em que i e j saíram juntos (diagonal = frequência)"""
+        return self._incrementais.pares().tolist()
+    
+    def afinidade(self, numeros: List[int]) -> Dict[int, float]:
+        """
+        Afinidade dos demais números com os informados (média do lift dos pares),
+        do maior para o menor: para completar um jogo com números que costumam sair juntos
+        """
+        return afinidade(self.matriz, self._incrementais.pares(), numeros)
     
     def get_estatisticas_completas(self) -> Dict:
-        """Retorna estatísticas completas"""
+        """Retorna estatísticas completas (a partir dos agregados de uma única passada)"""
         freq = self.frequencia_numeros()
         atrasos = self.calcular_atraso()
         
+        mais_sorteados = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:30]
+        menos_sorteados = sorted(freq.items(), key=lambda x: x[1])[:30]
+        
         # Números quentes (mais sorteados recentemente)
-        numeros_quentes = [num for num, _ in self.numeros_mais_sorteados(30)]
+        numeros_quentes = [num for num, _ in mais_sorteados]
         
         # Números atrasados (não sorteados há mais tempo)
         numeros_atrasados = sorted(atrasos.items(), key=lambda x: x[1], reverse=True)[:30]
@@ -68,22 +136,22 @@ class AnalisadorLotomania:
         media_dezenas = {}
         for dezena, numeros in dezenas.items():
             total = sum(freq.get(n, 0) for n in numeros)
-            media_dezenas[dezena] = total / len(self.historico) if self.historico else 0
+            media_dezenas[dezena] = total / len(self.matriz) if len(self.matriz) else 0
         
         # Pares e ímpares
         total_pares = sum(freq.get(n, 0) for n in range(0, 100, 2))
         total_impares = sum(freq.get(n, 0) for n in range(1, 100, 2))
         
         return {
-            'total_concursos': len(self.historico),
+            'total_concursos': len(self.matriz),
             'numeros_quentes': numeros_quentes,
             'numeros_atrasados': numeros_atrasados,
-            'mais_sorteados': self.numeros_mais_sorteados(30),
-            'menos_sorteados': self.numeros_menos_sorteados(30),
+            'mais_sorteados': mais_sorteados,
+            'menos_sorteados': menos_sorteados,
             'media_dezenas': media_dezenas,
             'pares_impares': {
-                'pares': total_pares / len(self.historico) if self.historico else 0,
-                'impares': total_impares / len(self.historico) if self.historico else 0
+                'pares': total_pares / len(self.matriz) if len(self.matriz) else 0,
+                'impares': total_impares / len(self.matriz) if len(self.matriz) else 0
             },
             'atrasos': atrasos
         }
@@ -93,30 +161,19 @@ class AnalisadorLotomania:
         Encontra a combinação de 20 números que mais se repetiu no histórico
         Retorna a combinação e quantas vezes apareceu
         """
-        if not self.historico:
-            return {
-                'combinacao': [],
-                'quantidade': 0
-            }
-        
-        combinacoes = Counter()
-        
-        for concurso in self.historico:
-            numeros = concurso.get('numeros', [])
-            if len(numeros) == 20:
-                combinacao = tuple(sorted(numeros))
-                combinacoes[combinacao] += 1
-        
-        if not combinacoes:
-            return {
-                'combinacao': [],
-                'quantidade': 0
-            }
-        
-        combinacao_mais_frequente, quantidade = combinacoes.most_common(1)[0]
-        
-        return {
-            'combinacao': list(combinacao_mais_frequente),
-            'quantidade': quantidade
-        }
+        return self._incrementais.combinacao_mais_repetida()
+
+    def subconjuntos_mais_frequentes(self, k: int, top: int = 10) -> Dict:
+        """
+        Os subconjuntos de k números que mais saíram juntos (qualquer k, não só a
+        combinação inteira), em cache por versão do histórico
+        """
+        versao = self._incrementais.versao
+        if self._subconjuntos_versao != versao:
+            self._subconjuntos = {}
+            self._subconjuntos_versao = versao
+        if (k, top) not in self._subconjuntos:
+            # No próprio processo: a consulta vem de uma requisição do servidor
+            self._subconjuntos[(k, top)] = SubconjuntoFrequente(self.matriz, k, processos=1).mais_frequentes(top)
+        return self._subconjuntos[(k, top)]
 
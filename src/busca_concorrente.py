@@ -0,0 +1,249 @@
+"""
+Módulo de busca concorrente de concursos
+Dispara as requisições por concurso em um pool de threads com limite de
+paralelismo e entrega os resultados na ordem pedida, em lotes para o banco.
+Também localiza o último concurso existente com busca exponencial + binária
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Container, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+if TYPE_CHECKING:
+    from src.checkpoint import CheckpointBusca
+
+
+class ResultadoBusca(NamedTuple):
+    """
+    Resposta da busca de um concurso: o concurso e a fonte que o trouxe; sem concurso,
+    inexistente=True só quando alguma fonte respondeu de forma definitiva (404 ou
+    resposta vazia). Erro, timeout ou circuito aberto deixam o concurso pendente
+    """
+    concurso: Optional[Dict]
+    fonte: Optional[str] = None
+    inexistente: bool = False
+
+    @classmethod
+    def de_respostas(cls, concurso: Optional[Dict], respostas: Dict[str, Optional[Dict]]) -> 'ResultadoBusca':
+        """
+        Monta o resultado a partir das respostas de cada fonte consultada
+        (nome -> concurso devolvido, ou None se a fonte respondeu que ele não existe)
+        """
+        if concurso is not None:
+            # Cópia: com hedge, consultas perdedoras ainda em curso podem escrever em respostas
+            fonte = next((nome for nome, resposta in dict(respostas).items() if resposta is concurso), None)
+            return cls(concurso, fonte)
+        return cls(None, inexistente=bool(respostas))
+
+
+class BuscadorConcursos:
+    """
+    Busca vários concursos em paralelo usando a função de busca de um concurso
+    (ex: HistoricoLotofacil._consultar_concurso) com no máximo `paralelismo`
+    requisições simultâneas. A função retorna um ResultadoBusca ou só o concurso
+    (None = concurso inexistente). sondar: função usada por buscar_ultimo (padrão:
+    a mesma de busca), para sondar sem o cache imutável
+    """
+
+    # Requisições em andamento por thread do pool (mantém as threads ocupadas
+    # enquanto o resultado mais antigo ainda não chegou)
+    FILA_POR_THREAD = 2
+
+    # Concursos buscados sem resultado são pulados por faltantes() durante esse tempo (s)
+    TEMPO_SEM_RESULTADO = 600
+
+    def __init__(self, buscar_concurso: Callable[[int], Union[ResultadoBusca, Optional[Dict]]],
+                 paralelismo: int = 8, tamanho_lote: int = 50,
+                 sondar: Optional[Callable[[int], Union[ResultadoBusca, Optional[Dict]]]] = None):
+        self.buscar_concurso = buscar_concurso
+        self.sondar = sondar or buscar_concurso
+        self.paralelismo = max(1, int(paralelismo))
+        self.tamanho_lote = max(1, int(tamanho_lote))
+        self._sem_resultado: Dict[int, float] = {}
+
+    def _buscar(self, numero: int, buscar_concurso: Optional[Callable] = None) -> ResultadoBusca:
+        """Busca um concurso sem deixar exceções escaparem da thread (exceção = erro, fica pendente)"""
+        try:
+            resultado = (buscar_concurso or self.buscar_concurso)(numero)
+        except Exception:
+            return ResultadoBusca(None)
+        if isinstance(resultado, ResultadoBusca):
+            return resultado
+        return ResultadoBusca(resultado, inexistente=resultado is None)
+
+    def buscar(self, numeros: Iterable[int], limite: Optional[int] = None,
+               gravar: Optional[Callable[[List[Dict]], object]] = None,
+               max_falhas_seguidas: Optional[int] = None,
+               checkpoint: Optional['CheckpointBusca'] = None,
+               prazo: Optional[float] = None) -> List[Dict]:
+        """
+        Busca os concursos na ordem de `numeros` e retorna os encontrados nessa ordem
+        limite: para ao encontrar essa quantidade de concursos
+        gravar: chamada com cada lote (em ordem) de até tamanho_lote concursos
+        max_falhas_seguidas: para após N concursos seguidos não encontrados
+        checkpoint: pula o que uma execução anterior já processou, registra cada
+                    lote depois de gravado e é concluído quando a busca termina
+                    (concursos que deram erro ficam pendentes para a próxima execução)
+        prazo: instante (time.monotonic) em que a busca para de enviar requisições;
+               o que faltar fica para a próxima execução (via checkpoint)
+        """
+        encontrados: List[Dict] = []
+        retomados = 0
+        if checkpoint is not None:
+            # Concursos de uma execução anterior entram no resultado e no limite
+            encontrados = checkpoint.concursos()
+            retomados = len(encontrados)
+            if encontrados:
+                print(f"      Retomando busca: {len(encontrados)} concursos ja processados")
+            if limite and len(encontrados) >= limite:
+                checkpoint.concluir()
+                return encontrados[:limite]
+            pendentes_checkpoint = checkpoint.pendentes(numeros)
+            numeros = list(pendentes_checkpoint) if hasattr(numeros, '__len__') else pendentes_checkpoint
+        # Progresso contra a mesma base: o limite conta os retomados; a lista de números, não
+        total = limite or (len(numeros) if hasattr(numeros, '__len__') else None)
+        base_progresso = 0 if limite else retomados
+        pendentes = iter(numeros)
+        em_andamento = deque()
+        lote: List[Dict] = []
+        sem_resultado: List[int] = []
+        fontes_lote: Dict[int, str] = {}
+        falhas_seguidas = 0
+        com_erro = 0
+        interrompida = False
+
+        def descarregar():
+            if gravar and lote:
+                gravar(lote)
+            # O checkpoint só registra o lote depois de gravado
+            if checkpoint is not None:
+                checkpoint.registrar(lote, sem_resultado, fontes_lote)
+
+        executor = ThreadPoolExecutor(max_workers=self.paralelismo)
+        try:
+            def preencher():
+                while len(em_andamento) < self.paralelismo * self.FILA_POR_THREAD:
+                    if prazo is not None and time.monotonic() >= prazo:
+                        return
+                    numero = next(pendentes, None)
+                    if numero is None:
+                        return
+                    em_andamento.append((numero, executor.submit(self._buscar, numero)))
+
+            preencher()
+            while em_andamento:
+                # Consome na ordem de envio: resultados saem na ordem pedida
+                numero, futuro = em_andamento.popleft()
+                resultado = futuro.result()
+                concurso = resultado.concurso
+                if concurso:
+                    encontrados.append(concurso)
+                    lote.append(concurso)
+                    if resultado.fonte:
+                        fontes_lote[concurso['concurso']] = resultado.fonte
+                    falhas_seguidas = 0
+                    self._sem_resultado.pop(numero, None)
+                elif resultado.inexistente:
+                    falhas_seguidas += 1
+                    sem_resultado.append(numero)
+                    self._sem_resultado[numero] = time.monotonic()
+                else:
+                    # Erro/timeout/circuito aberto: não é resposta definitiva, fica pendente
+                    falhas_seguidas += 1
+                    com_erro += 1
+
+                if len(lote) >= self.tamanho_lote:
+                    descarregar()
+                    lote = []
+                    sem_resultado = []
+                    fontes_lote = {}
+                    processados = len(encontrados) - base_progresso
+                    progresso = f"{processados}/{total}" if total else f"{processados}"
+                    print(f"      Progresso: {progresso} concursos...")
+
+                if limite and len(encontrados) >= limite:
+                    break
+                if max_falhas_seguidas and falhas_seguidas >= max_falhas_seguidas:
+                    print(f"    AVISO - Parando busca apos {falhas_seguidas} concursos seguidos sem resultado")
+                    break
+                preencher()
+            else:
+                # Fila vazia: ou acabaram os números, ou o prazo esgotou
+                interrompida = prazo is not None and time.monotonic() >= prazo and next(pendentes, None) is not None
+        finally:
+            # Descarta o que ainda não começou; espera só as requisições em curso
+            for _, futuro in em_andamento:
+                futuro.cancel()
+            executor.shutdown(wait=True)
+
+        descarregar()
+        limite_atingido = bool(limite) and len(encontrados) >= limite
+        if interrompida:
+            print("      Prazo esgotado: a busca continua na proxima execucao")
+        elif com_erro and not limite_atingido:
+            print(f"      {com_erro} concursos com erro: ficam pendentes para a proxima execucao")
+        elif checkpoint is not None:
+            checkpoint.concluir()
+        return encontrados
+
+    def faltantes(self, numeros: Iterable[int], conhecidos: Container[int] = ()) -> Iterator[int]:
+        """
+        Filtra `numeros` pulando os concursos já conhecidos e os que foram buscados
+        sem resultado há menos de TEMPO_SEM_RESULTADO (evita sondar de novo, um a
+        um, as mesmas faixas sem concurso nas buscas seguintes)
+        """
+        agora = time.monotonic()
+        for numero in numeros:
+            if numero in conhecidos:
+                continue
+            buscado_em = self._sem_resultado.get(numero)
+            if buscado_em is not None and agora - buscado_em < self.TEMPO_SEM_RESULTADO:
+                continue
+            yield numero
+
+    def buscar_ultimo(self, estimativa: int) -> Optional[int]:
+        """
+        Encontra o último concurso existente em O(log n) requisições
+        Busca exponencial a partir da estimativa (passos 1, 2, 4, ... para cima
+        se ela existe, para baixo se não) até cercar o último concurso, seguida
+        de busca binária no intervalo. Retorna None se nenhum concurso responder
+        As sondagens usam self.sondar: o último concurso muda a cada sorteio
+        """
+        sondagens = 0
+
+        def existe(numero: int) -> bool:
+            nonlocal sondagens
+            sondagens += 1
+            return self._buscar(numero, self.sondar).concurso is not None
+
+        estimativa = max(1, int(estimativa))
+        passo = 1
+        if existe(estimativa):
+            # baixo existe; sobe até achar um que não existe
+            baixo = estimativa
+            while existe(baixo + passo):
+                baixo += passo
+                passo *= 2
+            alto = baixo + passo
+        else:
+            # alto não existe; desce até achar um que existe
+            alto = estimativa
+            while True:
+                baixo = max(0, alto - passo)
+                if baixo == 0:
+                    break
+                if existe(baixo):
+                    break
+                alto = baixo
+                passo *= 2
+
+        # Invariante: baixo existe (ou é 0) e alto não existe
+        while alto - baixo > 1:
+            meio = (baixo + alto) // 2
+            if existe(meio):
+                baixo = meio
+            else:
+                alto = meio
+
+        print(f"    Ultimo concurso localizado em {sondagens} sondagens: {baixo or 'nenhum'}")
+        return baixo or None
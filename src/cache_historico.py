@@ -0,0 +1,350 @@
+"""
+Módulo do cache local de histórico em formato binário compacto
+
+Formato (little-endian, versão 1):
+    Cabeçalho (16 bytes): magic 'LTHB', versão, código do jogo, menor número,
+                          quantidade de números, bytes do bitmask, tamanho do
+                          registro e quantidade de registros
+    Registros (largura fixa): concurso (uint32), data AAAAMMDD (uint32),
+                              bitmask dos números sorteados e, na Timemania,
+                              o id do time do coração (uint16)
+    Rodapé (somente Timemania): tabela de nomes dos times (JSON UTF-8)
+
+Os registros são lidos via np.memmap direto para a HistoricoMatriz.
+
+Concursos novos não reescrevem o binário: são anexados a um journal NDJSON
+(uma linha por concurso) e reaplicados na carga (último registro vence).
+Quando o journal cresce, ele é compactado de volta no binário.
+"""
+import json
+import os
+import struct
+import threading
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from src.matriz import HistoricoMatriz, JOGOS, CAMPOS_EXTRAS, data_para_inteiro
+
+
+MAGIC = b'LTHB'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sHBbBBHI')
+CODIGOS_JOGO = {'lotofacil': 1, 'timemania': 2, 'lotomania': 3}
+JOGOS_COM_TIME = ('timemania',)
+
+
+def _dtype_registro(jogo: str) -> np.dtype:
+    """Layout de um registro do arquivo binário para o jogo"""
+    menor, maior, _ = JOGOS[jogo]
+    bytes_mascara = (maior - menor + 1 + 7) // 8
+    campos = [('concurso', '<u4'), ('data', '<u4'), ('mascara', 'u1', (bytes_mascara,))]
+    if jogo in JOGOS_COM_TIME:
+        campos.append(('time', '<u2'))
+    return np.dtype(campos)
+
+
+def inteiro_para_data(valor: int) -> str:
+    """Converte AAAAMMDD de volta para 'DD/MM/AAAA' (formato da Caixa)"""
+    if not valor:
+        return ''
+    valor = int(valor)
+    return f"{valor % 100:02d}/{(valor // 100) % 100:02d}/{valor // 10000:04d}"
+
+
+def campos_guardados(concurso: Dict, jogo: str) -> tuple:
+    """O que o cache guarda de um concurso, normalizado (números ordenados, data AAAAMMDD, extras)"""
+    return ((int(concurso['concurso']), tuple(sorted({int(n) for n in concurso.get('numeros', [])})),
+             data_para_inteiro(concurso.get('data', '')))
+            + tuple(concurso.get(campo) or '' for campo in CAMPOS_EXTRAS[jogo]))
+
+
+def salvar_binario(caminho: str, historico: List[Dict], jogo: str) -> int:
+    """
+    Grava o histórico no formato binário (escrita atômica)
+    Retorna a quantidade de concursos gravados
+    """
+    menor, _, _ = JOGOS[jogo]
+    historico = sorted(
+        (c for c in historico if c.get('concurso')),
+        key=lambda c: int(c['concurso'])
+    )
+    dtype = _dtype_registro(jogo)
+    matriz = HistoricoMatriz.de_historico(historico, jogo)
+
+    registros = np.zeros(len(historico), dtype=dtype)
+    registros['concurso'] = matriz.concursos
+    registros['data'] = [data_para_inteiro(d) for d in matriz.datas]
+    if len(historico):
+        registros['mascara'] = np.packbits(matriz.matriz, axis=1, bitorder='little')
+
+    rodape = b''
+    if jogo in JOGOS_COM_TIME:
+        times = []
+        ids = {}
+        for nome in matriz.extras.get('time_coracao', []):
+            if nome not in ids:
+                ids[nome] = len(times)
+                times.append(nome)
+        registros['time'] = [ids[nome] for nome in matriz.extras.get('time_coracao', [])]
+        tabela = json.dumps(times, ensure_ascii=False).encode('utf-8')
+        rodape = struct.pack('<I', len(tabela)) + tabela
+
+    cabecalho = CABECALHO.pack(
+        MAGIC, VERSAO, CODIGOS_JOGO[jogo], menor, matriz.matriz.shape[1],
+        dtype['mascara'].shape[0], dtype.itemsize, len(registros)
+    )
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(cabecalho)
+        f.write(registros.tobytes())
+        f.write(rodape)
+    os.replace(temporario, caminho)
+    return len(registros)
+
+
+def carregar_binario(caminho: str, jogo: str) -> Optional[HistoricoMatriz]:
+    """
+    Carrega o arquivo binário direto para uma HistoricoMatriz (via memmap)
+    Retorna None se o arquivo não existir ou for de outra versão/jogo
+    """
+    if not os.path.exists(caminho):
+        return None
+
+    with open(caminho, 'rb') as f:
+        bruto = f.read(CABECALHO.size)
+    if len(bruto) < CABECALHO.size:
+        return None
+
+    magic, versao, codigo, menor, total_numeros, _, tamanho_registro, quantidade = CABECALHO.unpack(bruto)
+    dtype = _dtype_registro(jogo)
+    if (magic != MAGIC or versao != VERSAO or codigo != CODIGOS_JOGO[jogo]
+            or tamanho_registro != dtype.itemsize):
+        return None
+
+    if quantidade == 0:
+        registros = np.zeros(0, dtype=dtype)
+    else:
+        registros = np.memmap(caminho, dtype=dtype, mode='r', offset=CABECALHO.size, shape=(quantidade,))
+
+    # Copia para memória e libera o memmap (permite sobrescrever o arquivo depois)
+    matriz = np.unpackbits(registros['mascara'], axis=1, count=total_numeros, bitorder='little')
+    concursos = registros['concurso'].astype(np.int64)
+    datas_inteiras = registros['data'].astype(np.int64)
+    datas = [inteiro_para_data(d) for d in datas_inteiras.tolist()]
+
+    extras = {}
+    if jogo in JOGOS_COM_TIME:
+        ids = registros['time'].tolist()
+        with open(caminho, 'rb') as f:
+            f.seek(CABECALHO.size + quantidade * dtype.itemsize)
+            tamanho = struct.unpack('<I', f.read(4))[0]
+            times = json.loads(f.read(tamanho).decode('utf-8'))
+        extras['time_coracao'] = [times[i] for i in ids]
+
+    del registros
+    return HistoricoMatriz(matriz, concursos, datas, jogo, extras, datas_inteiras=datas_inteiras)
+
+
+class CacheHistorico:
+    """
+    Cache local do histórico de um jogo
+    O arquivo binário (mesmo nome do JSON, extensão .bin) é o snapshot compactado
+    e o journal (.ndjson) guarda os concursos anexados depois dele;
+    o JSON antigo continua sendo importado/exportado para compatibilidade
+    """
+
+    # Quantidade de entradas no journal que dispara a compactação
+    LIMITE_JOURNAL = 256
+
+    def __init__(self, cache_file: str, jogo: str):
+        base = os.path.splitext(cache_file)[0]
+        self.cache_json = cache_file
+        self.cache_binario = base + '.bin'
+        self.cache_journal = base + '.ndjson'
+        self.jogo = jogo
+        self._lock = threading.RLock()
+        self._concursos: Optional[Dict[int, Dict]] = None
+        self._matriz: Optional[HistoricoMatriz] = None
+        self._entradas_journal = 0
+        # Snapshot lido do JSON antigo (o binário ainda não tem esse estado)
+        self._snapshot_json = False
+
+    def existe(self) -> bool:
+        """Verifica se há algum cache (binário, journal ou JSON)"""
+        return any(os.path.exists(caminho) for caminho in
+                   (self.cache_binario, self.cache_journal, self.cache_json))
+
+    def _ler_journal(self) -> List[Dict]:
+        """Lê as entradas do journal (ignora linha final incompleta/corrompida)"""
+        if not os.path.exists(self.cache_journal):
+            return []
+        entradas = []
+        with open(self.cache_journal, 'r', encoding='utf-8') as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    concurso = json.loads(linha)
+                except ValueError:
+                    continue
+                if isinstance(concurso, dict) and concurso.get('concurso'):
+                    entradas.append(concurso)
+        return entradas
+
+    def _carregar_snapshot(self) -> Optional[HistoricoMatriz]:
+        """
+        Carrega o binário; o JSON antigo só é lido quando ainda não há binário
+        (depois disso o binário + journal são a fonte; o JSON é só exportação)
+        A carga nunca grava nada: o JSON só vira binário na próxima escrita (anexar)
+        """
+        if os.path.exists(self.cache_binario):
+            return carregar_binario(self.cache_binario, self.jogo)
+
+        historico = self._ler_json(self.cache_json)
+        if not historico:
+            return None
+        self._snapshot_json = True
+        return HistoricoMatriz.de_historico(historico, self.jogo)
+
+    def _carregar_estado(self):
+        """Carrega snapshot + journal para a memória (somente na primeira vez)"""
+        if self._concursos is not None:
+            return
+
+        matriz = self._carregar_snapshot()
+        registros = matriz.registros if matriz is not None else []
+        entradas = self._ler_journal()
+
+        self._concursos = {c['concurso']: c for c in registros}
+        for concurso in entradas:
+            self._concursos[concurso['concurso']] = concurso
+        self._entradas_journal = len(entradas)
+        # Sem journal o snapshot já é o estado atual
+        self._matriz = matriz if not entradas else None
+
+    def carregar_matriz(self) -> Optional[HistoricoMatriz]:
+        """Carrega o cache como matriz (snapshot + journal, último registro vence)"""
+        with self._lock:
+            self._carregar_estado()
+            if not self._concursos:
+                return None
+            if self._matriz is None:
+                historico = sorted(self._concursos.values(), key=lambda x: x.get('concurso', 0))
+                self._matriz = HistoricoMatriz.de_historico(historico, self.jogo)
+            return self._matriz
+
+    def carregar(self) -> List[Dict]:
+        """Carrega o cache como lista de concursos em ordem crescente"""
+        matriz = self.carregar_matriz()
+        return matriz.registros if matriz is not None else []
+
+    def anexar(self, concursos: List[Dict]) -> int:
+        """
+        Anexa concursos novos ou alterados ao journal (sem reescrever o binário)
+        Retorna a quantidade de concursos anexados
+        """
+        with self._lock:
+            self._carregar_estado()
+            # Só entram no journal concursos novos ou alterados (comparando o que o binário guarda:
+            # data em outro formato ou campos a mais não contam como alteração)
+            novos = []
+            for concurso in concursos:
+                if not concurso.get('concurso'):
+                    continue
+                atual = self._concursos.get(int(concurso['concurso']))
+                if atual is None or campos_guardados(atual, self.jogo) != campos_guardados(concurso, self.jogo):
+                    novos.append(concurso)
+            if not novos:
+                return 0
+
+            linhas = ''.join(
+                json.dumps(concurso, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for concurso in novos
+            ).encode('utf-8')
+            with open(self.cache_journal, 'ab+') as f:
+                # Isola uma linha final incompleta (escrita interrompida)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        linhas = b'\n' + linhas
+                f.write(linhas)
+
+            for concurso in novos:
+                self._concursos[int(concurso['concurso'])] = concurso
+            self._matriz = None
+            self._entradas_journal += len(novos)
+
+            # Primeira escrita depois de ler o JSON antigo também grava o binário
+            if self._entradas_journal >= self.LIMITE_JOURNAL or self._snapshot_json:
+                self.compactar()
+        return len(novos)
+
+    def compactar(self) -> int:
+        """Regrava o binário com o estado atual e descarta o journal"""
+        with self._lock:
+            historico = self.carregar()
+            total = salvar_binario(self.cache_binario, historico, self.jogo)
+            # O binário já contém tudo: se cair antes daqui, o replay é idempotente
+            if os.path.exists(self.cache_journal):
+                os.remove(self.cache_journal)
+            self._entradas_journal = 0
+            self._snapshot_json = False
+            return total
+
+    def salvar(self, historico: List[Dict]) -> int:
+        """Substitui o cache inteiro pelo histórico informado"""
+        with self._lock:
+            total = salvar_binario(self.cache_binario, historico, self.jogo)
+            if os.path.exists(self.cache_journal):
+                os.remove(self.cache_journal)
+            self._concursos = None
+            self._matriz = None
+            self._entradas_journal = 0
+            self._snapshot_json = False
+            return total
+
+    def _ler_json(self, caminho: str) -> List[Dict]:
+        """Lê um histórico em JSON (formato antigo) sem duplicatas, em ordem crescente"""
+        if not os.path.exists(caminho):
+            return []
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            historico_lista = json.load(f)
+
+        # Remove duplicatas (mantém a primeira ocorrência) e ordena
+        historico_unicos = {}
+        for c in historico_lista:
+            num = c.get('concurso')
+            if num and num not in historico_unicos:
+                historico_unicos[num] = c
+        historico = sorted(historico_unicos.values(), key=lambda x: x.get('concurso', 0))
+
+        if len(historico_lista) != len(historico):
+            print(f"Removidas {len(historico_lista) - len(historico)} duplicatas do cache")
+        return historico
+
+    def importar_json(self, caminho: str) -> List[Dict]:
+        """
+        Substitui o cache por um histórico em JSON (formato antigo) e grava o binário
+        Retorna a lista de concursos importada
+        """
+        historico = self._ler_json(caminho)
+        if historico:
+            self.salvar(historico)
+            print(f"Cache JSON importado para formato binário: {len(historico)} concursos")
+        return historico
+
+    def exportar_json(self, caminho: Optional[str] = None) -> int:
+        """Exporta o cache para JSON (por padrão no caminho do JSON antigo)"""
+        caminho = caminho or self.cache_json
+        with self._lock:
+            historico = self.carregar()
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(historico, f, indent=2, ensure_ascii=False)
+            # Mantém o binário como fonte mais recente
+            if caminho == self.cache_json and historico:
+                self.compactar()
+        return len(historico)
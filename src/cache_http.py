@@ -0,0 +1,172 @@
+"""
+Cache em disco das respostas HTTP das fontes de resultados
+Respostas de concursos já apurados nunca mudam e ficam guardadas para sempre;
+endpoints de "último concurso" são servidos do cache por um TTL curto e depois
+revalidados com If-None-Match / If-Modified-Since (304 renova sem baixar o corpo)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CacheHTTP:
+    """Respostas HTTP guardadas em SQLite, chaveadas pela URL"""
+
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', 5000),
+    )
+
+    def __init__(self, db_path: str = "data/http_cache.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._pid = os.getpid()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._criar_tabelas()
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão persistente da thread atual (refeita após fork)"""
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            for pragma, valor in self.PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}={valor}')
+            self._local.conn = conn
+        return conn
+
+    def _criar_tabelas(self):
+        """Cria a tabela de respostas"""
+        conn = self._conexao()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS respostas (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    cabecalhos TEXT NOT NULL,
+                    corpo BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    imutavel INTEGER NOT NULL DEFAULT 0,
+                    armazenado_em REAL NOT NULL
+                )
+            ''')
+            # Respostas vazias guardadas como imutáveis por versões anteriores escondiam
+            # para sempre concursos sorteados depois da consulta
+            conn.execute("DELETE FROM respostas WHERE imutavel = 1 "
+                         "AND trim(CAST(corpo AS TEXT)) IN ('', '{}', '[]', 'null', '\"\"')")
+
+    def _ler(self, url: str) -> Optional[tuple]:
+        return self._conexao().execute(
+            'SELECT status, cabecalhos, corpo, etag, last_modified, imutavel, armazenado_em '
+            'FROM respostas WHERE url = ?', (url,)
+        ).fetchone()
+
+    def _gravar(self, url: str, response: requests.Response, imutavel: bool):
+        cabecalhos = {chave: valor for chave, valor in response.headers.items()
+                      if chave.lower() in ('content-type', 'etag', 'last-modified')}
+        conn = self._conexao()
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO respostas
+                (url, status, cabecalhos, corpo, etag, last_modified, imutavel, armazenado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (url, response.status_code, json.dumps(cabecalhos), response.content,
+                  response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                  int(imutavel), time.time()))
+
+    def _renovar(self, url: str):
+        """Revalidação com 304: a resposta guardada continua válida por mais um TTL"""
+        conn = self._conexao()
+        with conn:
+            conn.execute('UPDATE respostas SET armazenado_em = ? WHERE url = ?', (time.time(), url))
+
+    @staticmethod
+    def _resposta(url: str, linha: tuple) -> requests.Response:
+        """Monta um requests.Response a partir da linha guardada"""
+        status, cabecalhos, corpo, _, _, _, _ = linha
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(cabecalhos))
+        response._content = bytes(corpo)
+        response.url = url
+        response.encoding = 'utf-8'
+        return response
+
+    @staticmethod
+    def _cacheavel(response: requests.Response,
+                   validar: Optional[Callable[[requests.Response], bool]] = None) -> bool:
+        """
+        Só guarda respostas 200 com JSON válido e não vazio (páginas de erro e
+        respostas vazias como {} ou null não entram no cache) que validar aprovar
+        """
+        if response.status_code != 200:
+            return False
+        try:
+            if not json.loads(response.content):
+                return False
+            return validar is None or bool(validar(response))
+        except ValueError:
+            return False
+
+    def get(self, buscar: Callable[..., requests.Response], url: str, timeout: float = 10,
+            imutavel: bool = False, ttl: float = 0,
+            validar: Optional[Callable[[requests.Response], bool]] = None, **kwargs) -> requests.Response:
+        """
+        GET com cache; buscar faz a requisição de rede (ex: sessao.get)
+        imutavel: resposta guardada para sempre (concurso já apurado); exige validar
+        ttl: segundos em que a resposta é servida sem rede; depois é revalidada
+        validar: confirma que o corpo é o que o chamador espera (ex: concurso com
+        todas as dezenas) antes de guardar; um concurso ainda não apurado não fica
+        guardado como inexistente
+        """
+        linha = self._ler(url)
+        cabecalhos = dict(kwargs.pop('headers', None) or {})
+        if linha is not None:
+            etag, last_modified, guardada_imutavel, armazenado_em = linha[3:]
+            if guardada_imutavel or time.time() - armazenado_em < ttl:
+                return self._resposta(url, linha)
+            if etag:
+                cabecalhos['If-None-Match'] = etag
+            if last_modified:
+                cabecalhos['If-Modified-Since'] = last_modified
+
+        try:
+            response = buscar(url, timeout=timeout, headers=cabecalhos, **kwargs)
+        except requests.exceptions.RequestException:
+            # Sem rede: uma resposta vencida ainda é melhor que nenhuma
+            if linha is not None:
+                return self._resposta(url, linha)
+            raise
+
+        if response.status_code == 304 and linha is not None:
+            self._renovar(url)
+            return self._resposta(url, linha)
+        if imutavel and validar is not None and self._cacheavel(response, validar):
+            self._gravar(url, response, imutavel=True)
+        elif ttl and self._cacheavel(response, validar):
+            self._gravar(url, response, imutavel=False)
+        return response
+
+    def limpar(self, apenas_vencidos: bool = False):
+        """Remove respostas guardadas (todas, ou só as revalidáveis)"""
+        conn = self._conexao()
+        with conn:
+            if apenas_vencidos:
+                conn.execute('DELETE FROM respostas WHERE imutavel = 0')
+            else:
+                conn.execute('DELETE FROM respostas')
+
+    def total(self) -> int:
+        """Quantidade de respostas guardadas"""
+        return self._conexao().execute('SELECT COUNT(*) FROM respostas').fetchone()[0]
@@ -0,0 +1,136 @@
+"""
+Checkpoint das buscas de concursos (journal NDJSON)
+
+Cada lote processado por uma busca é anexado ao journal em uma linha:
+concursos encontrados (completos), números que as fontes responderam não
+existir (404 ou resposta vazia) e a fonte que trouxe cada concurso. Concursos
+que deram erro não entram: continuam pendentes. Se a busca for interrompida (timeout do gunicorn, queda do
+processo ou fim do prazo de um pedaço da sincronização), a próxima execução
+da mesma tarefa pula o que já foi processado e continua de onde parou.
+O journal é removido quando a tarefa termina.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class CheckpointBusca:
+    """Progresso persistente de uma tarefa de busca de concursos"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.concluido = False
+        self._lock = threading.Lock()
+        self._encontrados: Optional[Dict[int, Dict]] = None
+        self._sem_resultado: set = set()
+        # Concurso -> fonte que o trouxe
+        self._fontes: Dict[int, str] = {}
+
+    def _carregar(self):
+        """Lê o journal (somente na primeira vez; ignora linha final incompleta)"""
+        if self._encontrados is not None:
+            return
+        self._encontrados = {}
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                if isinstance(entrada, dict):
+                    self._aplicar(entrada)
+
+    def _aplicar(self, entrada: Dict):
+        encontrados = [c for c in entrada.get('encontrados', []) if isinstance(c, dict) and c.get('concurso')]
+        for concurso in encontrados:
+            self._encontrados[int(concurso['concurso'])] = concurso
+            self._sem_resultado.discard(int(concurso['concurso']))
+        self._sem_resultado.update(int(numero) for numero in entrada.get('sem_resultado', []))
+        for fonte, numeros in (entrada.get('fontes') or {}).items():
+            for numero in numeros:
+                self._fontes[int(numero)] = fonte
+
+    def retomado(self) -> bool:
+        """True se há progresso de uma execução anterior"""
+        with self._lock:
+            self._carregar()
+            return bool(self._encontrados or self._sem_resultado)
+
+    def pendentes(self, numeros: Iterable[int]) -> Iterator[int]:
+        """Filtra `numeros` pulando os já processados (encontrados ou sem resultado)"""
+        with self._lock:
+            self._carregar()
+            processados = set(self._encontrados) | self._sem_resultado
+        for numero in numeros:
+            if numero not in processados:
+                yield numero
+
+    def concursos(self) -> List[Dict]:
+        """Concursos já encontrados, em ordem crescente"""
+        with self._lock:
+            self._carregar()
+            return [self._encontrados[numero] for numero in sorted(self._encontrados)]
+
+    def registrar(self, encontrados: List[Dict], sem_resultado: List[int],
+                  fontes: Optional[Dict[int, str]] = None):
+        """
+        Anexa um lote processado ao journal
+        sem_resultado: só concursos que as fontes responderam não existir
+        fontes: concurso -> fonte que o trouxe
+        """
+        if not encontrados and not sem_resultado:
+            return
+        por_fonte: Dict[str, List[int]] = {}
+        for numero, fonte in (fontes or {}).items():
+            por_fonte.setdefault(fonte, []).append(int(numero))
+        entrada = {
+            'encontrados': encontrados,
+            'sem_resultado': [int(numero) for numero in sem_resultado],
+            'fontes': por_fonte
+        }
+        linha = (json.dumps(entrada, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._carregar()
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            with open(self.caminho, 'ab+') as f:
+                # Isola uma linha final incompleta (escrita interrompida)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        linha = b'\n' + linha
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+            self._aplicar(entrada)
+
+    def concluir(self):
+        """Tarefa terminada: descarta o journal"""
+        with self._lock:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+            self._encontrados = {}
+            self._sem_resultado = set()
+            self._fontes = {}
+            self.concluido = True
+
+    def fonte(self, numero: int) -> Optional[str]:
+        """Fonte que trouxe o concurso (None se não foi encontrado por esta tarefa)"""
+        with self._lock:
+            self._carregar()
+            return self._fontes.get(numero)
+
+    def resumo(self) -> Dict:
+        """Quantidades processadas até agora e concursos por fonte"""
+        with self._lock:
+            self._carregar()
+            return {
+                'encontrados': len(self._encontrados),
+                'sem_resultado': sorted(self._sem_resultado),
+                'fontes': dict(Counter(self._fontes[numero] for numero in self._encontrados
+                                       if numero in self._fontes)),
+                'concluido': self.concluido
+            }
@@ -0,0 +1,154 @@
+"""
+Cliente HTTP compartilhado pelas fontes de resultados das loterias
+Uma única requests.Session por processo: conexões keep-alive reaproveitadas
+(pool por host), retry com backoff para falhas transitórias e cabeçalhos padrão.
+requisitar() acrescenta o cache em disco das respostas (src/cache_http.py) e o
+limitador de taxa adaptativo por host (src/limitador.py)
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.cache_http import CacheHTTP
+from src.limitador import STATUS_SOBRECARGA, limitador_para, ler_retry_after
+from src.urls import url_base
+
+
+# Cabeçalhos enviados em todas as requisições (as fontes recusam clientes sem User-Agent)
+CABECALHOS_PADRAO = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+    'Referer': 'https://loterias.caixa.gov.br/'
+}
+
+# Conexões mantidas abertas por fonte (src/urls.py): a API da Caixa recebe as buscas em paralelo
+POOL_POR_FONTE = {
+    'caixa': 32,
+}
+POOL_PADRAO = 8
+
+# Retry de falhas de conexão no urllib3; respostas de sobrecarga (429/5xx) são
+# repetidas por requisitar() depois que o limitador do host reduz a taxa
+TENTATIVAS = 2
+BACKOFF = 0.3
+
+# Cache em disco das respostas e TTL dos endpoints de "último concurso"
+CAMINHO_CACHE_HTTP = "data/http_cache.db"
+TTL_ULTIMO_CONCURSO = 60
+
+_lock = threading.Lock()
+_sessao: Optional[requests.Session] = None
+_pid: Optional[int] = None
+_cache: Optional[CacheHTTP] = None
+
+
+def _adaptador(tamanho_pool: int) -> HTTPAdapter:
+    """Adaptador com pool de conexões e retry de conexão com backoff exponencial"""
+    retry = Retry(
+        total=TENTATIVAS,
+        read=0,  # Timeout de leitura não é repetido (fonte lenta já custou o timeout inteiro)
+        status=0,  # Status de sobrecarga fica com o limitador (ver requisitar)
+        backoff_factor=BACKOFF,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False
+    )
+    return HTTPAdapter(pool_connections=4, pool_maxsize=tamanho_pool, max_retries=retry)
+
+
+def criar_sessao() -> requests.Session:
+    """Cria uma sessão configurada (pool por host, retry e cabeçalhos padrão)"""
+    sessao = requests.Session()
+    sessao.headers.update(CABECALHOS_PADRAO)
+    sessao.mount('https://', _adaptador(POOL_PADRAO))
+    sessao.mount('http://', _adaptador(POOL_PADRAO))
+    # O prefixo mais longo vence: fontes conhecidas ganham um pool maior
+    for fonte, tamanho in POOL_POR_FONTE.items():
+        sessao.mount(url_base(fonte) + '/', _adaptador(tamanho))
+    return sessao
+
+
+def obter_sessao() -> requests.Session:
+    """
+    Retorna a sessão HTTP do processo (criada na primeira chamada)
+    Após um fork (workers do gunicorn) cria uma sessão nova em vez de
+    reaproveitar sockets herdados do processo pai
+    """
+    global _sessao, _pid
+    if _sessao is None or _pid != os.getpid():
+        with _lock:
+            if _sessao is None or _pid != os.getpid():
+                _sessao = criar_sessao()
+                _pid = os.getpid()
+    return _sessao
+
+
+def fechar_sessao():
+    """Fecha as conexões da sessão do processo"""
+    global _sessao
+    with _lock:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
+
+
+def obter_cache() -> CacheHTTP:
+    """Retorna o cache de respostas HTTP do processo (criado na primeira chamada)"""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = CacheHTTP(CAMINHO_CACHE_HTTP)
+    return _cache
+
+
+def configurar_cache(caminho: str) -> CacheHTTP:
+    """Troca o arquivo do cache de respostas HTTP do processo (benchmarks e testes)"""
+    global _cache
+    with _lock:
+        _cache = CacheHTTP(caminho)
+    return _cache
+
+
+def _get_limitado(url: str, timeout: float = 10, **kwargs) -> requests.Response:
+    """
+    GET pela sessão compartilhada passando pelo limitador do host
+    Respostas de sobrecarga são repetidas depois da espera imposta pelo limitador
+    """
+    limitador = limitador_para(url)
+    for tentativa in range(TENTATIVAS + 1):
+        limitador.adquirir()
+        inicio = time.monotonic()
+        try:
+            response = obter_sessao().get(url, timeout=timeout, **kwargs)
+        except requests.exceptions.Timeout:
+            limitador.liberar(timeout=True, latencia=time.monotonic() - inicio)
+            raise
+        except requests.exceptions.RequestException:
+            limitador.liberar()
+            raise
+        limitador.liberar(response.status_code, retry_after=ler_retry_after(response.headers.get('Retry-After')),
+                          latencia=time.monotonic() - inicio)
+        if response.status_code not in STATUS_SOBRECARGA or tentativa == TENTATIVAS:
+            return response
+    return response
+
+
+def requisitar(url: str, timeout: float = 10, imutavel: bool = False, ttl: float = 0,
+               validar: Optional[Callable[[requests.Response], bool]] = None, **kwargs) -> requests.Response:
+    """
+    GET pela sessão compartilhada e pelo limitador do host, passando pelo cache
+    em disco quando pedido (respostas do cache não consomem a taxa do host)
+    imutavel=True: concurso já apurado, a resposta é guardada para sempre se
+    validar(response) confirmar que é um concurso completo
+    ttl=N: servida do cache por N segundos e depois revalidada (ETag/Last-Modified)
+    """
+    if not imutavel and not ttl:
+        return _get_limitado(url, timeout=timeout, **kwargs)
+    return obter_cache().get(_get_limitado, url, timeout=timeout, imutavel=imutavel, ttl=ttl,
+                             validar=validar, **kwargs)
@@ -1,15 +1,23 @@
 """
 Módulo para conferir jogos com resultados
 """
-from typing import List, Dict, Tuple
-from collections import Counter
+from typing import List, Dict, Tuple, Union
+
+import numpy as np
+
+from src.matriz import HistoricoMatriz, como_matriz
 
 
 class ConferidorJogos:
     """Classe para conferir jogos com resultados históricos"""
     
-    def __init__(self, historico: List[Dict]):
-        self.historico = historico
+    def __init__(self, historico: Union[List[Dict], HistoricoMatriz]):
+        self.matriz = como_matriz(historico, 'lotofacil')
+    
+    @property
+    def historico(self) -> List[Dict]:
+        """Concursos como lista de dicionários (acompanha os concursos acrescentados à matriz)"""
+        return self.matriz.registros
     
     def conferir_ultimo_concurso(self, jogos: List[List[int]]) -> List[Dict]:
         """
@@ -60,43 +68,41 @@ class ConferidorJogos:
         
         resultados = []
         
+        frequencias = self.matriz.frequencia()
+        
         for idx, jogo in enumerate(jogos, 1):
             numeros_jogo = set(jogo)
-            
-            # Estatísticas por concurso
-            estatisticas_concursos = []
-            total_acertos = 0
-            max_acertos = 0
             quantidade_numeros_jogo = len(jogo)
-            min_acertos = quantidade_numeros_jogo if self.historico else 0
-            concursos_com_acertos = 0
             
-            for concurso in self.historico:
-                numeros_sorteados = set(concurso['numeros'])
-                acertos = numeros_jogo.intersection(numeros_sorteados)
-                quantidade = len(acertos)
-                
-                total_acertos += quantidade
-                max_acertos = max(max_acertos, quantidade)
-                if quantidade > 0:
-                    concursos_com_acertos += 1
-                    min_acertos = min(min_acertos, quantidade) if min_acertos > 0 else quantidade
-                    
-                    estatisticas_concursos.append({
-                        'concurso': concurso['concurso'],
-                        'data': concurso.get('data', ''),
-                        'acertos': quantidade,
-                        'numeros_acertados': sorted(list(acertos))
-                    })
+            # Acertos do jogo em todos os concursos de uma vez (vetor de N posições)
+            acertos_por_concurso = self.matriz.acertos(jogo)
+            com_acertos = acertos_por_concurso[acertos_por_concurso > 0]
+            
+            total_acertos = int(acertos_por_concurso.sum())
+            max_acertos = int(acertos_por_concurso.max()) if len(acertos_por_concurso) else 0
+            min_acertos = int(com_acertos.min()) if len(com_acertos) else quantidade_numeros_jogo
+            concursos_com_acertos = int(len(com_acertos))
+            
+            # Top 10 concursos com mais acertos (empates mantêm a ordem do histórico)
+            ordem = np.argsort(-acertos_por_concurso, kind='stable')[:10]
+            estatisticas_concursos = []
+            for linha in ordem:
+                quantidade = int(acertos_por_concurso[linha])
+                if quantidade == 0:
+                    break
+                concurso = self.historico[linha]
+                estatisticas_concursos.append({
+                    'concurso': concurso['concurso'],
+                    'data': concurso.get('data', ''),
+                    'acertos': quantidade,
+                    'numeros_acertados': sorted(numeros_jogo.intersection(concurso['numeros']))
+                })
             
             # Estatísticas por número individual
             frequencia_numeros = {}
             for numero in jogo:
-                contador = 0
-                for concurso in self.historico:
-                    if numero in concurso['numeros']:
-                        contador += 1
-                frequencia_numeros[numero] = contador
+                coluna = numero - self.matriz.menor_numero
+                frequencia_numeros[numero] = int(frequencias[coluna]) if 0 <= coluna < len(frequencias) else 0
             
             # Média de acertos
             media_acertos = total_acertos / len(self.historico) if self.historico else 0
@@ -113,7 +119,7 @@ class ConferidorJogos:
                 'max_acertos': max_acertos,
                 'min_acertos': min_acertos,
                 'frequencia_numeros': frequencia_numeros,
-                'estatisticas_concursos': sorted(estatisticas_concursos, key=lambda x: x['acertos'], reverse=True)[:10]  # Top 10
+                'estatisticas_concursos': estatisticas_concursos  # Top 10
             })
         
         return resultados
@@ -0,0 +1,105 @@
+"""
+Coocorrência de números: quantas vezes cada par (e cada tripla) saiu junto
+A matriz de pares é o produto Xᵀ·X da matriz de concursos X (N×R de 0/1) e a
+de triplas é montada número a número com o mesmo produto, restrito aos
+concursos em que o número saiu (R produtos R×R). Os produtos são feitos em
+float32 (BLAS), exatos para contagens abaixo de 2^24
+"""
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.matriz import HistoricoMatriz
+
+
+def matriz_pares(matriz: HistoricoMatriz) -> np.ndarray:
+    """Matriz R×R de coocorrência: [i, j] = concursos com os dois números (diagonal = frequência)"""
+    x = matriz.matriz.astype(np.float32)
+    return np.rint(x.T @ x).astype(np.int64)
+
+
+def matriz_triplas(matriz: HistoricoMatriz) -> np.ndarray:
+    """Tensor R×R×R de coocorrência: [i, j, k] = concursos com os três números"""
+    largura = matriz.matriz.shape[1]
+    triplas = np.zeros((largura, largura, largura), dtype=np.int32)
+    x = matriz.matriz.astype(np.float32)
+    # Transposta contígua: linhas em que cada número saiu sem varrer a matriz inteira por coluna
+    for coluna, linha in enumerate(np.ascontiguousarray(matriz.matriz.T)):
+        com_numero = x[np.flatnonzero(linha)]
+        if len(com_numero):
+            triplas[coluna] = np.rint(com_numero.T @ com_numero)
+    return triplas
+
+
+@lru_cache(maxsize=None)
+def _indices_triplas(largura: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Índices (i, j, k) com i < j < k de um tensor largura³"""
+    i, j, k = np.meshgrid(*(np.arange(largura),) * 3, indexing='ij')
+    validos = (i < j) & (j < k)
+    return i[validos], j[validos], k[validos]
+
+
+def _mais_frequentes(valores: np.ndarray, top: int) -> np.ndarray:
+    """Posições dos `top` maiores valores, do maior para o menor (empate: menor posição primeiro)"""
+    top = min(top, len(valores))
+    if top <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # Valor do top-ésimo maior: candidatos são os que o alcançam (todos os empatados entram no desempate)
+    limite = np.partition(valores, len(valores) - top)[len(valores) - top]
+    candidatos = np.flatnonzero(valores >= limite)
+    return candidatos[np.lexsort((candidatos, -valores[candidatos]))][:top]
+
+
+def pares_mais_frequentes(matriz: HistoricoMatriz, pares: np.ndarray, top: int = 20) -> List[Dict]:
+    """
+    Pares que mais saíram juntos, com o lift (observado / esperado se os números
+    fossem independentes: quantidade × N / (freq_i × freq_j))
+    """
+    i, j = np.triu_indices(pares.shape[0], k=1)
+    quantidades = pares[i, j]
+    total = len(matriz)
+    frequencia = np.diag(pares)
+    resultado = []
+    for posicao in _mais_frequentes(quantidades, top).tolist():
+        a, b = int(i[posicao]), int(j[posicao])
+        esperado = frequencia[a] * frequencia[b]
+        resultado.append({
+            'numeros': [a + matriz.menor_numero, b + matriz.menor_numero],
+            'quantidade': int(quantidades[posicao]),
+            'lift': round(float(quantidades[posicao] * total / esperado), 4) if esperado else 0.0
+        })
+    return resultado
+
+
+def triplas_mais_frequentes(matriz: HistoricoMatriz, triplas: np.ndarray, top: int = 20) -> List[Dict]:
+    """Triplas que mais saíram juntas"""
+    i, j, k = _indices_triplas(triplas.shape[0])
+    quantidades = triplas[i, j, k]
+    return [
+        {
+            'numeros': [int(i[p]) + matriz.menor_numero, int(j[p]) + matriz.menor_numero,
+                        int(k[p]) + matriz.menor_numero],
+            'quantidade': int(quantidades[p])
+        }
+        for p in _mais_frequentes(quantidades, top).tolist()
+    ]
+
+
+def afinidade(matriz: HistoricoMatriz, pares: np.ndarray, numeros: List[int]) -> Dict[int, float]:
+    """
+    Afinidade de cada número com os números informados: média do lift do par
+    (número, escolhido) sobre os escolhidos. Acima de 1 = sai junto mais do que o
+    acaso explicaria. Números já escolhidos ficam de fora
+    """
+    colunas = np.unique(matriz.colunas(numeros))
+    if not len(colunas) or not len(matriz):
+        return {}
+    frequencia = np.diag(pares).astype(np.float64)
+    esperado = np.outer(frequencia, frequencia[colunas])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = np.where(esperado > 0, pares[:, colunas] * len(matriz) / esperado, 0.0)
+    pontuacao = lift.mean(axis=1)
+    candidatos = np.setdiff1d(np.arange(pares.shape[0]), colunas)
+    ordem = candidatos[np.lexsort((candidatos, -pontuacao[candidatos]))]
+    return {int(coluna) + matriz.menor_numero: round(float(pontuacao[coluna]), 4) for coluna in ordem}
@@ -4,34 +4,177 @@ Módulo para gerenciar banco de dados de concursos
 import sqlite3
 import json
 import os
+import threading
 from typing import List, Dict, Optional
-from datetime import datetime
 
+import numpy as np
 
-class DatabaseLotofacil:
-    """Classe para gerenciar banco de dados de concursos da Lotofácil"""
+from src.matriz import HistoricoMatriz, JOGOS, CAMPOS_EXTRAS, decompor_data
+
+
+def numeros_para_mascara(numeros: List[int], menor_numero: int = 1) -> int:
+    """
+    Codifica os números sorteados em um inteiro (bitmask)
+    O bit (numero - menor_numero) fica ligado para cada número sorteado
+    """
+    mascara = 0
+    for numero in numeros:
+        mascara |= 1 << (int(numero) - menor_numero)
+    return mascara
+
+
+def mascara_para_numeros(mascara: int, menor_numero: int = 1) -> List[int]:
+    """Decodifica um bitmask de volta para a lista ordenada de números"""
+    numeros = []
+    bit = 0
+    while mascara:
+        if mascara & 1:
+            numeros.append(bit + menor_numero)
+        mascara >>= 1
+        bit += 1
+    return numeros
+
+
+def data_para_iso(data: str) -> Optional[str]:
+    """
+    Normaliza a data do sorteio para ISO 'YYYY-MM-DD' (ordenável como texto)
+    Aceita 'DD/MM/YYYY' (formato da Caixa) ou ISO; None se vazia/inválida
+    """
+    partes = decompor_data(data)
+    if partes is None:
+        return None
+    ano, mes, dia = partes
+    return f'{ano:04d}-{mes:02d}-{dia:02d}'
+
+
+def _popcount(valor) -> int:
+    """Conta bits ligados (registrada no SQLite como popcount)"""
+    return int(valor).bit_count() if valor is not None else 0
+
+
+class DatabaseLoteria:
+    """
+    Classe genérica para gerenciar banco de dados de concursos de um jogo
+    O jogo define a faixa de números (bits do bitmask) e os campos extras
+    """
     
-    def __init__(self, db_path: str = "data/lotofacil.db"):
-        self.db_path = db_path
+    # Pragmas aplicados a cada conexão persistente
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),       # Leitores não bloqueiam o escritor
+        ('synchronous', 'NORMAL'),     # Seguro com WAL e bem mais rápido que FULL
+        ('cache_size', -16000),        # ~16 MB de cache de páginas
+        ('mmap_size', 268435456),      # Até 256 MB mapeados em memória
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 5000),        # Espera até 5s se outro worker estiver escrevendo
+    )
+    
+    # Quantidade de statements preparados mantidos em cache por conexão
+    STATEMENTS_CACHE = 128
+    
+    # INTEGER do SQLite tem 64 bits com sinal: cada coluna de bitmask guarda 63 números
+    BITS_POR_COLUNA = 63
+    COLUNAS_MASCARA = ('mascara', 'mascara_alta')
+    
+    # Acima desta quantidade de concursos novos, recalcular vetorizado é mais rápido que o incremental
+    LIMITE_ESTATISTICAS_INCREMENTAIS = 64
+    
+    def __init__(self, jogo: str, db_path: Optional[str] = None):
+        self.jogo = jogo
+        self.db_path = db_path or f"data/{jogo}.db"
+        self.menor_numero, self.maior_numero, self.dezenas_sorteadas = JOGOS[jogo]
+        self.campos_extras = CAMPOS_EXTRAS[jogo]
+        
+        # Lotofácil (25 números) usa só 'mascara'; Timemania e Lotomania usam duas colunas
+        total_numeros = self.maior_numero - self.menor_numero + 1
+        quantidade_colunas = (total_numeros + self.BITS_POR_COLUNA - 1) // self.BITS_POR_COLUNA
+        if quantidade_colunas > len(self.COLUNAS_MASCARA):
+            raise ValueError(f"Jogo {jogo} tem números demais para o bitmask ({total_numeros})")
+        self.colunas_mascara = self.COLUNAS_MASCARA[:quantidade_colunas]
+        
+        self._montar_sql()
+        self._local = threading.local()
+        self._pid = os.getpid()
         self._criar_diretorio()
         self._criar_tabelas()
     
+    def _montar_sql(self):
+        """Monta os trechos de SQL que dependem das colunas do jogo"""
+        self._sql_select = ', '.join(('numero', 'data_apuracao', 'numeros') + self.campos_extras)
+        # Soma dos bits em comum com o jogo em todas as colunas de bitmask
+        self._sql_acertos = ' + '.join(f'popcount({coluna} & ?)' for coluna in self.colunas_mascara)
+        self._sql_mascara_igual = ' AND '.join(f'{coluna} = ?' for coluna in self.colunas_mascara)
+        
+        colunas = ('numero', 'data_apuracao', 'data_iso', 'numeros') + self.colunas_mascara + self.campos_extras
+        atualizar = ['numeros = excluded.numeros']
+        atualizar += [f'{coluna} = excluded.{coluna}' for coluna in self.colunas_mascara]
+        # data_iso acompanha data_apuracao (derivada dela na ingestão)
+        atualizar.append("data_iso = CASE WHEN excluded.data_apuracao <> '' "
+                         "THEN excluded.data_iso ELSE concursos.data_iso END")
+        mudou = ['concursos.numeros <> excluded.numeros']
+        # Data e campos extras vazios não apagam o valor já gravado
+        for campo in ('data_apuracao',) + self.campos_extras:
+            atualizar.append(f"{campo} = CASE WHEN excluded.{campo} <> '' "
+                             f"THEN excluded.{campo} ELSE concursos.{campo} END")
+            mudou.append(f"(excluded.{campo} <> '' AND concursos.{campo} IS NOT excluded.{campo})")
+        
+        # Upsert que só reescreve a linha quando os números (ou dados informados) mudaram
+        self._sql_upsert = f'''
+            INSERT INTO concursos ({', '.join(colunas)}, data_atualizacao)
+            VALUES ({', '.join('?' * len(colunas))}, CURRENT_TIMESTAMP)
+            ON CONFLICT(numero) DO UPDATE SET
+                {', '.join(atualizar)},
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE {' OR '.join(mudou)}
+        '''
+    
     def _criar_diretorio(self):
         """Cria diretório de dados se não existir"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão persistente da thread atual
+        Cada thread (e cada worker do gunicorn) mantém sua própria conexão,
+        reaproveitando os statements preparados entre chamadas
+        """
+        # Após um fork (workers do gunicorn) a conexão herdada não pode ser usada
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=self.STATEMENTS_CACHE)
+            for pragma, valor in self.PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}={valor}')
+            # popcount(mascara & ?) conta acertos direto no SQL
+            conn.create_function('popcount', 1, _popcount, deterministic=True)
+            self._local.conn = conn
+        return conn
+    
+    def fechar(self):
+        """Fecha a conexão persistente da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
     def _criar_tabelas(self):
         """Cria tabelas necessárias no banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conexao()
         cursor = conn.cursor()
         
+        colunas_extras = ''.join(f'{campo} TEXT,\n                ' for campo in self.campos_extras)
+        colunas_mascara = ''.join(f'{coluna} INTEGER,\n                ' for coluna in self.colunas_mascara)
+        
         # Tabela de concursos
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS concursos (
                 numero INTEGER PRIMARY KEY,
                 data_apuracao TEXT,
+                data_iso TEXT,
                 numeros TEXT NOT NULL,
-                data_insercao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                {colunas_mascara}{colunas_extras}data_insercao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
@@ -41,94 +184,238 @@ class DatabaseLotofacil:
             CREATE INDEX IF NOT EXISTS idx_numero ON concursos(numero)
         ''')
         
+        # Estatísticas materializadas por dezena (mantidas a cada inserção)
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_data ON concursos(data_apuracao)
+            CREATE TABLE IF NOT EXISTS estatisticas_numero (
+                dezena INTEGER PRIMARY KEY,
+                frequencia INTEGER NOT NULL DEFAULT 0,
+                ultimo_concurso INTEGER,
+                histograma_intervalos TEXT NOT NULL DEFAULT '{}'
+            )
         ''')
         
         conn.commit()
-        conn.close()
+        
+        self._migrar_mascara()
+        self._migrar_data_iso()
+        
+        # Banco antigo (ou recém-criado): calcula as estatísticas uma vez
+        total_dezenas = conn.execute('SELECT COUNT(*) FROM estatisticas_numero').fetchone()[0]
+        if total_dezenas != self.maior_numero - self.menor_numero + 1:
+            self.reconstruir_estatisticas()
+    
+    def _migrar_mascara(self):
+        """
+        Migração: adiciona as colunas de bitmask (e campos extras) em bancos antigos
+        e preenche o bitmask dos concursos que ainda não o possuem
+        """
+        conn = self._conexao()
+        colunas = {row[1] for row in conn.execute('PRAGMA table_info(concursos)')}
+        
+        with conn:
+            for coluna in self.colunas_mascara:
+                if coluna not in colunas:
+                    conn.execute(f'ALTER TABLE concursos ADD COLUMN {coluna} INTEGER')
+            for campo in self.campos_extras:
+                if campo not in colunas:
+                    conn.execute(f'ALTER TABLE concursos ADD COLUMN {campo} TEXT')
+            
+            nulos = ' OR '.join(f'{coluna} IS NULL' for coluna in self.colunas_mascara)
+            pendentes = conn.execute(
+                f'SELECT numero, numeros FROM concursos WHERE {nulos}'
+            ).fetchall()
+            if pendentes:
+                atribuicoes = ', '.join(f'{coluna} = ?' for coluna in self.colunas_mascara)
+                conn.executemany(
+                    f'UPDATE concursos SET {atribuicoes} WHERE numero = ?',
+                    [self._mascaras(json.loads(numeros)) + (numero,) for numero, numeros in pendentes]
+                )
+                print(f"Migração: bitmask preenchido em {len(pendentes)} concursos")
+            
+            # Índice usado para "esta combinação já foi sorteada?"
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_mascara ON concursos({", ".join(self.colunas_mascara)})')
+    
+    def _migrar_data_iso(self):
+        """
+        Migração: adiciona a coluna data_iso (YYYY-MM-DD), preenche a partir de
+        data_apuracao e troca o índice de texto 'DD/MM/YYYY' pelo índice ISO
+        """
+        conn = self._conexao()
+        colunas = {row[1] for row in conn.execute('PRAGMA table_info(concursos)')}
+        
+        with conn:
+            if 'data_iso' not in colunas:
+                conn.execute('ALTER TABLE concursos ADD COLUMN data_iso TEXT')
+            
+            # Sem data ISO ou com uma data inexistente gravada antes da validação (ex.: 2024-02-31)
+            pendentes = conn.execute(
+                "SELECT numero, data_apuracao, data_iso FROM concursos WHERE data_apuracao <> '' "
+                "AND (data_iso IS NULL OR data_iso IS NOT date(data_iso, '+0 days'))"
+            ).fetchall()
+            atualizacoes = []
+            for numero, data, atual in pendentes:
+                iso = data_para_iso(data)
+                if iso != atual:
+                    atualizacoes.append((iso, numero))
+            if atualizacoes:
+                conn.executemany('UPDATE concursos SET data_iso = ? WHERE numero = ?', atualizacoes)
+                print(f"Migração: data ISO preenchida em {len(atualizacoes)} concursos")
+            
+            # O índice em data_apuracao ('DD/MM/YYYY') não serve para intervalos
+            conn.execute('DROP INDEX IF EXISTS idx_data')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_data_iso ON concursos(data_iso)')
+    
+    def _mascara(self, numeros: List[int]) -> int:
+        """Bitmask (inteiro Python, sem limite de bits) dos números no intervalo deste jogo"""
+        return numeros_para_mascara(numeros, self.menor_numero)
+    
+    def _mascaras(self, numeros: List[int]) -> tuple:
+        """Bitmask dividido nas colunas do banco (63 bits por coluna; ignora números fora da faixa)"""
+        mascara = self._mascara(
+            [n for n in numeros if self.menor_numero <= int(n) <= self.maior_numero]
+        )
+        limite = (1 << self.BITS_POR_COLUNA) - 1
+        return tuple(
+            (mascara >> (self.BITS_POR_COLUNA * idx)) & limite
+            for idx in range(len(self.colunas_mascara))
+        )
+    
+    def _juntar_mascaras(self, mascaras) -> int:
+        """Reconstrói o bitmask completo a partir das colunas"""
+        mascara = 0
+        for idx, parte in enumerate(mascaras):
+            mascara |= (parte or 0) << (self.BITS_POR_COLUNA * idx)
+        return mascara
+    
+    def _linha_para_concurso(self, row) -> Dict:
+        """Converte uma linha (colunas de _sql_select) para o dicionário padrão"""
+        concurso = {
+            'concurso': row[0],
+            'data': row[1] or '',
+            'numeros': json.loads(row[2])
+        }
+        for idx, campo in enumerate(self.campos_extras):
+            concurso[campo] = row[3 + idx] or ''
+        return concurso
+    
+    def _linha_concurso(self, concurso: Dict) -> Optional[tuple]:
+        """Parâmetros do upsert para um concurso (None se o concurso for inválido)"""
+        numero = concurso.get('concurso')
+        numeros = concurso.get('numeros')
+        if not numero or not numeros:
+            return None
+        numeros = sorted(map(int, numeros))
+        if numeros[0] < self.menor_numero or numeros[-1] > self.maior_numero:
+            return None
+        # Mesmo texto de json.dumps(numeros), sem o custo do encoder
+        texto = '[' + ', '.join(map(str, numeros)) + ']'
+        data = concurso.get('data', '') or ''
+        extras = tuple(concurso.get(campo, '') or '' for campo in self.campos_extras)
+        return (int(numero), data, data_para_iso(data), texto) + self._mascaras(numeros) + extras
     
     def inserir_concurso(self, concurso: Dict) -> bool:
         """
         Insere ou atualiza um concurso no banco
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            numero = concurso.get('concurso')
-            data = concurso.get('data', '')
-            numeros = json.dumps(concurso.get('numeros', []))
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO concursos 
-                (numero, data_apuracao, numeros, data_atualizacao)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (numero, data, numeros))
+            linha = self._linha_concurso(concurso)
+            if linha is None:
+                print(f"Concurso inválido ignorado: {concurso.get('concurso')}")
+                return False
             
-            conn.commit()
-            conn.close()
-            return True
+            relatorio = self.upsert_concursos([concurso])
+            return 'erro' not in relatorio
         except Exception as e:
             print(f"Erro ao inserir concurso {concurso.get('concurso')}: {e}")
             return False
     
-    def inserir_concursos(self, concursos: List[Dict]) -> int:
+    def _contar_existentes(self, conn: sqlite3.Connection, numeros: List[int]) -> int:
+        """Quantos dos concursos informados já estão no banco (busca pela chave primária)"""
+        existentes = 0
+        for inicio in range(0, len(numeros), 500):
+            bloco = numeros[inicio:inicio + 500]
+            existentes += conn.execute(
+                f'SELECT COUNT(*) FROM concursos WHERE numero IN ({", ".join("?" * len(bloco))})', bloco
+            ).fetchone()[0]
+        return existentes
+    
+    def upsert_concursos(self, concursos: List[Dict]) -> Dict:
         """
-        Insere múltiplos concursos de uma vez (mais eficiente)
-        Retorna quantidade de concursos inseridos
+        Insere/atualiza vários concursos com executemany em uma única transação
+        Linhas com os mesmos números não são reescritas
+        Retorna relatório com inseridos, atualizados, inalterados e inválidos
         """
+        relatorio = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'invalidos': 0}
         if not concursos:
-            return 0
+            return relatorio
+        
+        linhas = []
+        for concurso in concursos:
+            linha = self._linha_concurso(concurso)
+            if linha is None:
+                relatorio['invalidos'] += 1
+            else:
+                linhas.append(linha)
+        
+        if relatorio['invalidos']:
+            print(f"Ignorados {relatorio['invalidos']} concursos inválidos (sem número, dezenas ou fora da faixa)")
+        if not linhas:
+            return relatorio
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            inseridos = 0
-            for concurso in concursos:
-                try:
-                    numero = concurso.get('concurso')
-                    data = concurso.get('data', '')
-                    numeros = json.dumps(concurso.get('numeros', []))
-                    
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO concursos 
-                        (numero, data_apuracao, numeros, data_atualizacao)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (numero, data, numeros))
-                    inseridos += 1
-                except Exception as e:
-                    continue
-            
-            conn.commit()
-            conn.close()
-            return inseridos
+            conn = self._conexao()
+            with conn:
+                maior_antes = conn.execute('SELECT MAX(numero) FROM concursos').fetchone()[0]
+                numeros_lote = sorted({linha[0] for linha in linhas})
+                existentes = self._contar_existentes(conn, numeros_lote)
+                mudancas_antes = conn.total_changes
+                conn.executemany(self._sql_upsert, linhas)
+                alteradas = conn.total_changes - mudancas_antes
+                
+                # total_changes conta inserções e updates efetivos (o WHERE falso não conta)
+                relatorio['inseridos'] = len(numeros_lote) - existentes
+                relatorio['atualizados'] = alteradas - relatorio['inseridos']
+                relatorio['inalterados'] = len(linhas) - alteradas
+                
+                # Estatísticas atualizadas na mesma transação
+                if alteradas:
+                    novas = {linha[0]: linha for linha in linhas}
+                    anexando = relatorio['atualizados'] == 0 and (maior_antes is None or min(novas) > maior_antes)
+                    if anexando and len(novas) <= self.LIMITE_ESTATISTICAS_INCREMENTAIS:
+                        self._aplicar_estatisticas(conn, [novas[numero] for numero in sorted(novas)])
+                    else:
+                        # Lote grande, correção ou concurso antigo: recalcula a partir das máscaras
+                        self._reconstruir_estatisticas(conn)
         except Exception as e:
             print(f"Erro ao inserir concursos: {e}")
-            return 0
+            relatorio['erro'] = str(e)
+        
+        return relatorio
+    
+    def inserir_concursos(self, concursos: List[Dict]) -> int:
+        """
+        Insere múltiplos concursos de uma vez (mais eficiente)
+        Retorna quantidade de concursos inseridos ou atualizados
+        """
+        relatorio = self.upsert_concursos(concursos)
+        return relatorio['inseridos'] + relatorio['atualizados']
     
     def obter_concurso(self, numero: int) -> Optional[Dict]:
         """Obtém um concurso específico pelo número"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT numero, data_apuracao, numeros 
+            cursor.execute(f'''
+                SELECT {self._sql_select} 
                 FROM concursos 
                 WHERE numero = ?
             ''', (numero,))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
-                return {
-                    'concurso': row[0],
-                    'data': row[1] or '',
-                    'numeros': json.loads(row[2])
-                }
+                return self._linha_para_concurso(row)
             return None
         except Exception as e:
             print(f"Erro ao obter concurso {numero}: {e}")
@@ -139,26 +426,17 @@ class DatabaseLotofacil:
         Obtém todos os concursos do banco
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
             ordem = "DESC" if ordenar_desc else "ASC"
-            query = f'SELECT numero, data_apuracao, numeros FROM concursos ORDER BY numero {ordem}'
-            
-            if limite:
-                query += f' LIMIT {limite}'
+            query = f'SELECT {self._sql_select} FROM concursos ORDER BY numero {ordem} LIMIT ?'
             
-            cursor.execute(query)
+            # LIMIT como parâmetro mantém o statement reaproveitável (-1 = sem limite)
+            cursor.execute(query, (int(limite) if limite else -1,))
             rows = cursor.fetchall()
-            conn.close()
             
-            concursos = []
-            for row in rows:
-                concursos.append({
-                    'concurso': row[0],
-                    'data': row[1] or '',
-                    'numeros': json.loads(row[2])
-                })
+            concursos = [self._linha_para_concurso(row) for row in rows]
             
             # Se ordenou DESC, inverte para ter ordem crescente
             if ordenar_desc:
@@ -169,6 +447,46 @@ class DatabaseLotofacil:
             print(f"Erro ao obter concursos: {e}")
             return []
     
+    def obter_matriz(self) -> Optional[HistoricoMatriz]:
+        """
+        Carrega o histórico inteiro direto para uma HistoricoMatriz a partir dos bitmasks
+        (sem json.loads por linha; a lista de dicionários só é montada se for usada)
+        """
+        try:
+            conn = self._conexao()
+            colunas = ('numero', 'data_apuracao', 'data_iso') + self.colunas_mascara + self.campos_extras
+            rows = conn.execute(
+                f'SELECT {", ".join(colunas)} FROM concursos ORDER BY numero'
+            ).fetchall()
+            
+            total_numeros = self.maior_numero - self.menor_numero + 1
+            total = len(rows)
+            inicio_mascaras = 3
+            fim_mascaras = inicio_mascaras + len(self.colunas_mascara)
+            
+            # Cada coluna de bitmask (63 bits) vira 63 colunas de 0/1
+            partes = []
+            for idx in range(inicio_mascaras, fim_mascaras):
+                mascaras = np.fromiter((row[idx] or 0 for row in rows), dtype=np.int64, count=total)
+                bits = np.unpackbits(mascaras.astype('<i8').view(np.uint8).reshape(total, 8),
+                                     axis=1, bitorder='little')
+                partes.append(bits[:, :self.BITS_POR_COLUNA])
+            matriz = np.ascontiguousarray(np.concatenate(partes, axis=1)[:, :total_numeros])
+            
+            concursos = np.fromiter((row[0] for row in rows), dtype=np.int64, count=total)
+            datas = [row[1] or '' for row in rows]
+            datas_inteiras = np.fromiter(
+                (int(row[2].replace('-', '')) if row[2] else 0 for row in rows), dtype=np.int64, count=total
+            )
+            extras = {
+                campo: [row[fim_mascaras + idx] or '' for row in rows]
+                for idx, campo in enumerate(self.campos_extras)
+            }
+            return HistoricoMatriz(matriz, concursos, datas, self.jogo, extras, datas_inteiras=datas_inteiras)
+        except Exception as e:
+            print(f"Erro ao carregar matriz do banco: {e}")
+            return None
+    
     def obter_ultimos_concursos(self, quantidade: int = 100) -> List[Dict]:
         """Obtém os últimos N concursos"""
         return self.obter_todos_concursos(limite=quantidade, ordenar_desc=True)
@@ -176,25 +494,20 @@ class DatabaseLotofacil:
     def obter_ultimo_concurso(self) -> Optional[Dict]:
         """Obtém o último concurso (maior número)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT numero, data_apuracao, numeros 
+            cursor.execute(f'''
+                SELECT {self._sql_select} 
                 FROM concursos 
                 ORDER BY numero DESC 
                 LIMIT 1
             ''')
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
-                return {
-                    'concurso': row[0],
-                    'data': row[1] or '',
-                    'numeros': json.loads(row[2])
-                }
+                return self._linha_para_concurso(row)
             return None
         except Exception as e:
             print(f"Erro ao obter último concurso: {e}")
@@ -203,12 +516,11 @@ class DatabaseLotofacil:
     def contar_concursos(self) -> int:
         """Retorna o total de concursos no banco"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
             cursor.execute('SELECT COUNT(*) FROM concursos')
             count = cursor.fetchone()[0]
-            conn.close()
             
             return count
         except Exception as e:
@@ -217,32 +529,30 @@ class DatabaseLotofacil:
     
     def obter_concursos_por_periodo(self, data_inicio: str, data_fim: str) -> List[Dict]:
         """
-        Obtém concursos em um período específico
-        Formato de data: 'YYYY-MM-DD'
+        Obtém concursos em um período específico (datas inclusivas)
+        Formato de data: 'YYYY-MM-DD' ou 'DD/MM/YYYY'
+        Usa o índice de data_iso (busca por intervalo O(log n))
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            inicio = data_para_iso(data_inicio)
+            fim = data_para_iso(data_fim)
+            if not inicio or not fim:
+                print(f"Período inválido: {data_inicio} a {data_fim}")
+                return []
+            
+            conn = self._conexao()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT numero, data_apuracao, numeros 
+            cursor.execute(f'''
+                SELECT {self._sql_select} 
                 FROM concursos 
-                WHERE data_apuracao >= ? AND data_apuracao <= ?
+                WHERE data_iso BETWEEN ? AND ?
                 ORDER BY numero ASC
-            ''', (data_inicio, data_fim))
+            ''', (inicio, fim))
             
             rows = cursor.fetchall()
-            conn.close()
             
-            concursos = []
-            for row in rows:
-                concursos.append({
-                    'concurso': row[0],
-                    'data': row[1] or '',
-                    'numeros': json.loads(row[2])
-                })
-            
-            return concursos
+            return [self._linha_para_concurso(row) for row in rows]
         except Exception as e:
             print(f"Erro ao obter concursos por período: {e}")
             return []
@@ -250,12 +560,11 @@ class DatabaseLotofacil:
     def verificar_concurso_existe(self, numero: int) -> bool:
         """Verifica se um concurso já existe no banco"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
             cursor.execute('SELECT 1 FROM concursos WHERE numero = ? LIMIT 1', (numero,))
             existe = cursor.fetchone() is not None
-            conn.close()
             
             return existe
         except Exception as e:
@@ -267,13 +576,12 @@ class DatabaseLotofacil:
         Útil para identificar quais concursos precisam ser buscados
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._conexao()
             cursor = conn.cursor()
             
             # Obtém todos os números que existem
             cursor.execute('SELECT numero FROM concursos')
             numeros_existentes = set(row[0] for row in cursor.fetchall())
-            conn.close()
             
             # Gera lista de números esperados
             numeros_esperados = set(range(max(1, ultimo_numero - limite + 1), ultimo_numero + 1))
@@ -285,15 +593,219 @@ class DatabaseLotofacil:
             print(f"Erro ao verificar concursos faltantes: {e}")
             return []
     
+    def _aplicar_estatisticas(self, conn: sqlite3.Connection, linhas: List[tuple]):
+        """
+        Atualização incremental: aplica concursos posteriores ao último já contabilizado
+        Custo O(R + dezenas dos concursos novos), independente do tamanho do histórico
+        """
+        sorteadas = [(linha[0], json.loads(linha[3])) for linha in linhas]
+        alteradas = sorted({dezena for _, dezenas in sorteadas for dezena in dezenas})
+        
+        # Lê só as dezenas afetadas
+        estatisticas = {
+            row[0]: [row[1], row[2], json.loads(row[3])]
+            for row in conn.execute(
+                'SELECT dezena, frequencia, ultimo_concurso, histograma_intervalos FROM estatisticas_numero '
+                f'WHERE dezena IN ({", ".join("?" * len(alteradas))})', alteradas
+            )
+        }
+        for numero, dezenas in sorteadas:
+            for dezena in dezenas:
+                frequencia, ultimo, histograma = estatisticas.setdefault(dezena, [0, None, {}])
+                if ultimo is not None:
+                    intervalo = str(numero - ultimo)
+                    histograma[intervalo] = histograma.get(intervalo, 0) + 1
+                estatisticas[dezena] = [frequencia + 1, numero, histograma]
+        
+        conn.executemany(
+            'INSERT OR REPLACE INTO estatisticas_numero VALUES (?, ?, ?, ?)',
+            [(dezena,) + tuple(estatisticas[dezena][:2]) + (json.dumps(estatisticas[dezena][2]),)
+             for dezena in alteradas]
+        )
+    
+    def _reconstruir_estatisticas(self, conn: sqlite3.Connection):
+        """Recalcula todas as estatísticas a partir das colunas de bitmask (O(N·R))"""
+        colunas = ', '.join(f'COALESCE({coluna}, 0)' for coluna in self.colunas_mascara)
+        rows = conn.execute(f'SELECT numero, {colunas} FROM concursos ORDER BY numero ASC').fetchall()
+        
+        total_numeros = self.maior_numero - self.menor_numero + 1
+        dados = np.array(rows, dtype=np.int64).reshape(len(rows), 1 + len(self.colunas_mascara))
+        matriz = np.zeros((len(rows), total_numeros), dtype=np.uint8)
+        for idx in range(len(self.colunas_mascara)):
+            inicio = idx * self.BITS_POR_COLUNA
+            bits = np.arange(min(self.BITS_POR_COLUNA, total_numeros - inicio))
+            matriz[:, inicio:inicio + len(bits)] = (dados[:, 1 + idx, None] >> bits) & 1
+        
+        historico = HistoricoMatriz(matriz, dados[:, 0], [''] * len(rows), self.jogo)
+        frequencias = historico.frequencia().tolist()
+        ultima = historico.ultima_aparicao().tolist()
+        histogramas = historico.histograma_intervalos()
+        
+        conn.execute('DELETE FROM estatisticas_numero')
+        conn.executemany(
+            'INSERT INTO estatisticas_numero VALUES (?, ?, ?, ?)',
+            [
+                (
+                    coluna + self.menor_numero,
+                    frequencias[coluna],
+                    int(dados[ultima[coluna], 0]) if ultima[coluna] >= 0 else None,
+                    json.dumps({str(k): v for k, v in histogramas[coluna].items()})
+                )
+                for coluna in range(total_numeros)
+            ]
+        )
+    
+    def reconstruir_estatisticas(self):
+        """Recalcula a tabela estatisticas_numero em uma transação"""
+        try:
+            conn = self._conexao()
+            with conn:
+                self._reconstruir_estatisticas(conn)
+        except Exception as e:
+            print(f"Erro ao reconstruir estatísticas: {e}")
+    
+    def resumo_concursos(self) -> tuple:
+        """Retorna (total, primeiro, último) número de concurso em uma consulta"""
+        try:
+            conn = self._conexao()
+            return conn.execute('SELECT COUNT(*), MIN(numero), MAX(numero) FROM concursos').fetchone()
+        except Exception as e:
+            print(f"Erro ao obter resumo dos concursos: {e}")
+            return (0, None, None)
+    
+    def estatisticas_numeros(self) -> Dict[int, Dict]:
+        """
+        Lê as estatísticas materializadas por dezena (O(R), sem varrer os concursos)
+        Atraso = concursos desde a última aparição (total de concursos se nunca saiu)
+        """
+        try:
+            conn = self._conexao()
+            total, _, ultimo_banco = self.resumo_concursos()
+            rows = conn.execute(
+                'SELECT dezena, frequencia, ultimo_concurso, histograma_intervalos '
+                'FROM estatisticas_numero ORDER BY dezena ASC'
+            ).fetchall()
+            return {
+                row[0]: {
+                    'frequencia': row[1],
+                    'ultimo_concurso': row[2],
+                    'atraso': ultimo_banco - row[2] if row[2] is not None else total,
+                    'histograma_intervalos': dict(sorted((int(k), v) for k, v in json.loads(row[3]).items()))
+                }
+                for row in rows
+            }
+        except Exception as e:
+            print(f"Erro ao ler estatísticas: {e}")
+            return {}
+    
+    def conferir_acertos(self, jogo: List[int], minimo_acertos: int = 0) -> List[Dict]:
+        """
+        Confere um jogo contra todos os concursos direto no SQLite
+        Retorna concurso, data e quantidade de acertos (ordem crescente de concurso)
+        """
+        try:
+            conn = self._conexao()
+            mascaras = self._mascaras(jogo)
+            rows = conn.execute(f'''
+                SELECT numero, data_apuracao, {self._sql_acertos} AS acertos
+                FROM concursos
+                WHERE {self._sql_acertos} >= ?
+                ORDER BY numero ASC
+            ''', mascaras + mascaras + (minimo_acertos,)).fetchall()
+            
+            return [
+                {'concurso': row[0], 'data': row[1] or '', 'acertos': row[2]}
+                for row in rows
+            ]
+        except Exception as e:
+            print(f"Erro ao conferir acertos: {e}")
+            return []
+    
+    def distribuicao_acertos(self, jogo: List[int]) -> Dict[int, int]:
+        """
+        Retorna quantos concursos tiveram cada quantidade de acertos para o jogo
+        Ex: {11: 340, 12: 120, 13: 20, ...}
+        """
+        try:
+            conn = self._conexao()
+            rows = conn.execute(f'''
+                SELECT {self._sql_acertos} AS acertos, COUNT(*)
+                FROM concursos
+                GROUP BY acertos
+                ORDER BY acertos ASC
+            ''', self._mascaras(jogo)).fetchall()
+            return {row[0]: row[1] for row in rows}
+        except Exception as e:
+            print(f"Erro ao calcular distribuição de acertos: {e}")
+            return {}
+    
+    def frequencia_numeros(self) -> Dict[int, int]:
+        """Calcula a frequência de cada número em uma única consulta, sem decodificar JSON"""
+        try:
+            conn = self._conexao()
+            bits = range(self.maior_numero - self.menor_numero + 1)
+            colunas = ', '.join(
+                f'SUM(({self.colunas_mascara[bit // self.BITS_POR_COLUNA]} >> {bit % self.BITS_POR_COLUNA}) & 1)'
+                for bit in bits
+            )
+            row = conn.execute(f'SELECT {colunas} FROM concursos').fetchone()
+            return {bit + self.menor_numero: (row[bit] or 0) for bit in bits}
+        except Exception as e:
+            print(f"Erro ao calcular frequência: {e}")
+            return {}
+    
+    def combinacao_ja_sorteada(self, numeros: List[int]) -> List[int]:
+        """
+        Retorna os concursos em que exatamente esta combinação foi sorteada
+        Usa o índice das colunas de bitmask (busca O(log n))
+        """
+        try:
+            conn = self._conexao()
+            rows = conn.execute(
+                f'SELECT numero FROM concursos WHERE {self._sql_mascara_igual} ORDER BY numero ASC',
+                self._mascaras(numeros)
+            ).fetchall()
+            return [row[0] for row in rows]
+        except Exception as e:
+            print(f"Erro ao verificar combinação: {e}")
+            return []
+    
+    def combinacao_mais_repetida(self) -> Dict:
+        """Encontra a combinação sorteada mais vezes agrupando pelo bitmask"""
+        try:
+            conn = self._conexao()
+            colunas = ', '.join(self.colunas_mascara)
+            row = conn.execute(f'''
+                SELECT {colunas}, COUNT(*) AS quantidade
+                FROM concursos
+                GROUP BY {colunas}
+                ORDER BY quantidade DESC, MIN(numero) ASC
+                LIMIT 1
+            ''').fetchone()
+            if row:
+                mascara = self._juntar_mascaras(row[:-1])
+                return {
+                    'combinacao': mascara_para_numeros(mascara, self.menor_numero),
+                    'quantidade': row[-1]
+                }
+        except Exception as e:
+            print(f"Erro ao obter combinação mais repetida: {e}")
+        return {'combinacao': [], 'quantidade': 0}
+    
     def limpar_banco(self):
         """Remove todos os concursos do banco (cuidado!)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM concursos')
-            conn.commit()
-            conn.close()
+            conn = self._conexao()
+            with conn:
+                conn.execute('DELETE FROM concursos')
+                self._reconstruir_estatisticas(conn)
             print("Banco de dados limpo com sucesso")
         except Exception as e:
             print(f"Erro ao limpar banco: {e}")
 
+
+class DatabaseLotofacil(DatabaseLoteria):
+    """Classe para gerenciar banco de dados de concursos da Lotofácil"""
+    
+    def __init__(self, db_path: str = "data/lotofacil.db"):
+        super().__init__('lotofacil', db_path)
@@ -3,18 +3,25 @@ Módulo para gerar fechamentos otimizados de jogos
 """
 import random
 import itertools
-from typing import List, Set, Dict, Tuple
+from typing import List, Set, Dict, Tuple, Union
 from collections import Counter
 
+from src.matriz import HistoricoMatriz, como_matriz
+
 
 class GeradorFechamento:
     """Classe para gerar fechamentos otimizados"""
     
-    def __init__(self, analisador, historico: List[Dict]):
+    def __init__(self, analisador, historico: Union[List[Dict], HistoricoMatriz]):
         self.analisador = analisador
-        self.historico = historico
+        self.matriz = como_matriz(historico, 'lotofacil')
         self.numeros_range = range(1, 26)
     
+    @property
+    def historico(self) -> List[Dict]:
+        """Concursos como lista de dicionários (acompanha os concursos acrescentados à matriz)"""
+        return self.matriz.registros
+    
     def fechamento_por_frequencia(self, quantidade_jogos: int = 10, quantidade_numeros: int = 15) -> List[List[int]]:
         """
         Gera jogos baseados em números de maior frequência
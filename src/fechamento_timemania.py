@@ -2,19 +2,26 @@
 Módulo para gerar fechamentos otimizados de jogos da Timemania
 """
 import random
-from typing import List, Dict
+from typing import List, Dict, Union
 from collections import Counter
 
+from src.matriz import HistoricoMatriz, como_matriz
+
 
 class GeradorFechamentoTimemania:
     """Classe para gerar fechamentos otimizados para Timemania"""
     
-    def __init__(self, analisador, historico: List[Dict]):
+    def __init__(self, analisador, historico: Union[List[Dict], HistoricoMatriz]):
         self.analisador = analisador
-        self.historico = historico
+        self.matriz = como_matriz(historico, 'timemania')
         self.numeros_range = range(1, 81)  # Timemania: 1 a 80
         self.quantidade_numeros = 10  # Timemania: 10 números por jogo
     
+    @property
+    def historico(self) -> List[Dict]:
+        """Concursos como lista de dicionários (acompanha os concursos acrescentados à matriz)"""
+        return self.matriz.registros
+    
     def fechamento_por_frequencia(self, quantidade_jogos: int = 10) -> List[List[int]]:
         """Gera jogos baseados em números de maior frequência"""
         mais_sorteados = [num for num, _ in self.analisador.numeros_mais_sorteados(40)]
@@ -0,0 +1,286 @@
+"""
+Registro de saúde das fontes de resultados (APIs alternativas)
+Cada fonte tem um circuit breaker e uma pontuação móvel (taxa de sucesso e
+latência das últimas respostas). As buscas com várias fontes tentam primeiro
+a mais rápida e saudável e pulam as fontes com circuito aberto até que uma
+sondagem (meio-aberto) volte a ter sucesso.
+consultar_fontes() percorre as fontes nessa ordem e, no modo hedge, dispara a
+mesma consulta na próxima fonte quando a atual passa da sua latência p95
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+from src.limitador import STATUS_SOBRECARGA
+
+T = TypeVar('T')
+
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+
+class SaudeFonte:
+    """Circuit breaker + pontuação móvel de uma fonte"""
+
+    # Falhas seguidas que abrem o circuito
+    LIMIAR_FALHAS = 3
+    # Tempo com o circuito aberto antes da sondagem; dobra a cada sondagem com falha
+    TEMPO_ABERTO = 30.0
+    TEMPO_ABERTO_MAX = 600.0
+    # Uma sondagem sem resposta registrada libera outra depois desse tempo
+    TEMPO_SONDAGEM = 60.0
+    # Respostas consideradas na pontuação
+    JANELA = 20
+    # Latência presumida de uma fonte ainda sem respostas (segundos)
+    LATENCIA_INICIAL = 1.0
+    # Respostas com sucesso necessárias para usar o p95 medido
+    MINIMO_P95 = 5
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.tempo_aberto = self.TEMPO_ABERTO
+        self.aberto_ate = 0.0
+        self.sondagem_em: Optional[float] = None
+        self.resultados = deque(maxlen=self.JANELA)  # (sucesso, latência)
+        self.hedges = 0
+        self.hedges_vencidos = 0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """Indica se a fonte pode ser usada agora (no meio-aberto, só uma sondagem por vez)"""
+        with self._lock:
+            agora = time.monotonic()
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO:
+                if agora < self.aberto_ate:
+                    return False
+                self.estado = MEIO_ABERTO
+                self.sondagem_em = None
+            if self.sondagem_em is not None and agora - self.sondagem_em < self.TEMPO_SONDAGEM:
+                return False
+            self.sondagem_em = agora
+            return True
+
+    def registrar(self, sucesso: bool, latencia: float):
+        """Registra o resultado de uma requisição e atualiza o circuito"""
+        with self._lock:
+            self.resultados.append((sucesso, latencia))
+            if sucesso:
+                self.falhas_seguidas = 0
+                self.estado = FECHADO
+                self.tempo_aberto = self.TEMPO_ABERTO
+                self.sondagem_em = None
+                return
+
+            self.falhas_seguidas += 1
+            if self.estado == MEIO_ABERTO:
+                # Sondagem falhou: reabre por mais tempo
+                self.tempo_aberto = min(self.TEMPO_ABERTO_MAX, self.tempo_aberto * 2)
+                self._abrir()
+            elif self.falhas_seguidas >= self.LIMIAR_FALHAS:
+                self._abrir()
+
+    def _abrir(self):
+        self.estado = ABERTO
+        self.aberto_ate = time.monotonic() + self.tempo_aberto
+        self.sondagem_em = None
+
+    def custo(self) -> float:
+        """
+        Tempo esperado até um resultado (latência média / taxa de sucesso)
+        Menor é melhor; a taxa de sucesso é suavizada para fontes com poucas respostas
+        """
+        with self._lock:
+            sucessos = sum(1 for sucesso, _ in self.resultados if sucesso)
+            latencias = [latencia for sucesso, latencia in self.resultados if sucesso]
+            latencia = sum(latencias) / len(latencias) if latencias else self.LATENCIA_INICIAL
+            taxa_sucesso = (sucessos + 1) / (len(self.resultados) + 2)
+            return latencia / taxa_sucesso
+
+    def latencia_p95(self) -> float:
+        """Percentil 95 da latência das respostas com sucesso (LATENCIA_INICIAL com poucas amostras)"""
+        with self._lock:
+            latencias = sorted(latencia for sucesso, latencia in self.resultados if sucesso)
+        if len(latencias) < self.MINIMO_P95:
+            return self.LATENCIA_INICIAL
+        return latencias[math.ceil(0.95 * len(latencias)) - 1]
+
+    def liberar_sondagem(self):
+        """Devolve a sondagem reservada por permitir() para uma consulta que não chegou a ser feita"""
+        with self._lock:
+            if self.estado == MEIO_ABERTO:
+                self.sondagem_em = None
+
+    def registrar_hedge(self, venceu: bool = False):
+        """Conta uma consulta feita como hedge nesta fonte (e se ela respondeu primeiro)"""
+        with self._lock:
+            if venceu:
+                self.hedges_vencidos += 1
+            else:
+                self.hedges += 1
+
+    def metricas(self) -> Dict:
+        """Estado do circuito e pontuação atuais"""
+        custo = self.custo()
+        p95 = self.latencia_p95()
+        with self._lock:
+            total = len(self.resultados)
+            sucessos = sum(1 for sucesso, _ in self.resultados if sucesso)
+            return {
+                'estado': self.estado,
+                'falhas_seguidas': self.falhas_seguidas,
+                'taxa_sucesso': round(sucessos / total, 4) if total else None,
+                'custo_s': round(custo, 3),
+                'reabre_em_s': round(max(0.0, self.aberto_ate - time.monotonic()), 1) if self.estado == ABERTO else 0.0,
+                'latencia_p95_s': round(p95, 3),
+                'hedges': self.hedges,
+                'hedges_vencidos': self.hedges_vencidos
+            }
+
+
+# Threads das consultas em modo hedge (compartilhadas; as buscas já rodam em paralelo)
+THREADS_HEDGE = 32
+
+_lock = threading.Lock()
+_fontes: Dict[str, SaudeFonte] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_pid: Optional[int] = None
+
+
+def saude_fonte(nome: str) -> SaudeFonte:
+    """Registro de saúde compartilhado da fonte (criado no primeiro uso)"""
+    saude = _fontes.get(nome)
+    if saude is None:
+        with _lock:
+            saude = _fontes.setdefault(nome, SaudeFonte(nome))
+    return saude
+
+
+def ordenar_fontes(fontes: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Percorre as fontes (dicts com 'nome') da mais barata para a mais cara,
+    pulando as de circuito aberto. A permissão é pedida só quando a fonte é
+    alcançada, então parar no meio não consome a sondagem das seguintes.
+    Empates mantêm a ordem declarada
+    """
+    ordenadas = sorted(fontes, key=lambda fonte: saude_fonte(fonte['nome']).custo())
+    for fonte in ordenadas:
+        if saude_fonte(fonte['nome']).permitir():
+            yield fonte
+
+
+def registrar_fonte(nome: str, latencia: float, status: Optional[int] = None, valida: bool = True):
+    """
+    Registra uma resposta da fonte: sem status (erro de conexão/timeout),
+    sobrecarga (STATUS_SOBRECARGA, a mesma regra do limitador) ou conteúdo
+    inválido (valida=False) contam como falha; 404 e 500 são respostas
+    válidas (algumas fontes respondem 500 para concurso inexistente)
+    """
+    sucesso = valida and status is not None and status not in STATUS_SOBRECARGA
+    saude_fonte(nome).registrar(sucesso, latencia)
+
+
+def _executor_hedge() -> ThreadPoolExecutor:
+    """Pool das consultas em modo hedge (recriado após fork)"""
+    global _executor, _pid
+    if _executor is None or _pid != os.getpid():
+        with _lock:
+            if _executor is None or _pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=THREADS_HEDGE, thread_name_prefix='hedge')
+                _pid = os.getpid()
+    return _executor
+
+
+def consultar_fontes(fontes: Iterable[Dict], consultar: Callable[[Dict], Optional[T]],
+                     hedge: bool = False) -> Optional[T]:
+    """
+    Primeiro resultado de consultar(fonte) percorrendo as fontes em ordenar_fontes()
+    consultar retorna None quando a fonte não tem o resultado (a próxima é tentada)
+    hedge=True: se a fonte atual não respondeu dentro da sua latência p95, a mesma
+    consulta é disparada na próxima fonte e vale a primeira resposta. Perdedoras que
+    ainda não começaram são canceladas (sem contar hedge nem gastar a sondagem do
+    circuito); as já em curso não podem ser interrompidas: terminam em segundo plano,
+    registram a própria resposta na saúde da fonte e o resultado é descartado
+    """
+    if not hedge:
+        for fonte in ordenar_fontes(fontes):
+            resultado = consultar(fonte)
+            if resultado is not None:
+                return resultado
+        return None
+
+    executor = _executor_hedge()
+    restantes = ordenar_fontes(fontes)
+    em_curso: Dict = {}  # future -> (fonte, disparada como hedge)
+    ultima = None
+    decidida = threading.Event()
+
+    def executar(fonte: Dict, como_hedge: bool) -> Optional[T]:
+        if decidida.is_set():
+            # A corrida acabou antes de a consulta sair da fila
+            saude_fonte(fonte['nome']).liberar_sondagem()
+            return None
+        if como_hedge:
+            saude_fonte(fonte['nome']).registrar_hedge()
+        return consultar(fonte)
+
+    def disparar(como_hedge: bool) -> bool:
+        nonlocal ultima
+        fonte = next(restantes, None)
+        if fonte is None:
+            return False
+        em_curso[executor.submit(executar, fonte, como_hedge)] = (fonte, como_hedge)
+        ultima = fonte
+        return True
+
+    disparar(False)
+    ha_proxima = True
+    try:
+        while em_curso:
+            # Espera a resposta até o p95 da última fonte disparada; depois dispara o hedge
+            espera = saude_fonte(ultima['nome']).latencia_p95() if ha_proxima else None
+            prontas, _ = wait(em_curso, timeout=espera, return_when=FIRST_COMPLETED)
+            if not prontas:
+                ha_proxima = disparar(True)
+                continue
+            for futuro in prontas:
+                fonte, como_hedge = em_curso.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception:
+                    resultado = None
+                if resultado is not None:
+                    if como_hedge:
+                        saude_fonte(fonte['nome']).registrar_hedge(venceu=True)
+                    return resultado
+            if not em_curso:
+                # Todas as fontes em curso falharam rápido: segue para a próxima sem esperar
+                ha_proxima = disparar(False)
+        return None
+    finally:
+        decidida.set()
+        for futuro, (fonte, _) in em_curso.items():
+            if futuro.cancel():
+                saude_fonte(fonte['nome']).liberar_sondagem()
+
+
+def metricas_fontes() -> Dict[str, Dict]:
+    """Estado de todas as fontes já usadas"""
+    with _lock:
+        fontes = dict(_fontes)
+    return {nome: saude.metricas() for nome, saude in fontes.items()}
+
+
+def limpar_fontes():
+    """Esquece o estado de todas as fontes (circuitos fechados, sem pontuação)"""
+    with _lock:
+        _fontes.clear()
@@ -1,53 +1,70 @@
 """
 Módulo para obter e gerenciar histórico de resultados da Lotofácil
 """
-import requests
-import json
 import os
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
 import time
+from typing import Iterable, List, Dict, Optional
+from datetime import datetime, timedelta
 
-# Torna pandas opcional (só necessário para importar CSV)
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-
+from src.cliente_http import requisitar, TTL_ULTIMO_CONCURSO
 from src.database import DatabaseLotofacil
+from src.matriz import HistoricoMatriz
+from src.cache_historico import CacheHistorico
+from src.busca_concorrente import BuscadorConcursos, ResultadoBusca
+from src.checkpoint import CheckpointBusca
+from src.importador import ImportadorResultados
+from src.fontes import consultar_fontes, ordenar_fontes, registrar_fonte
+from src.urls import url_fonte
 
 
 class HistoricoLotofacil:
     """Classe para gerenciar histórico de resultados da Lotofácil"""
     
-    def __init__(self, cache_file: str = "data/historico.json", usar_banco: bool = True):
+    # Requisições simultâneas ao buscar vários concursos
+    PARALELISMO_BUSCA = 8
+    
+    # Concursos seguidos não encontrados que encerram uma busca para trás
+    MAX_FALHAS_SEGUIDAS = 200
+    
+    def __init__(self, cache_file: str = "data/historico.json", usar_banco: bool = True,
+                 paralelismo: Optional[int] = None, hedge: bool = False):
         self.cache_file = cache_file
+        # Hedge: consulta a próxima fonte em paralelo quando a atual demora mais que o seu p95
+        self.hedge = hedge
+        self.cache = CacheHistorico(cache_file, 'lotofacil')
         self.historico: List[Dict] = []
+        self._matriz: Optional[HistoricoMatriz] = None
         self.usar_banco = usar_banco
         self.db = DatabaseLotofacil() if usar_banco else None
+        self.buscador = BuscadorConcursos(self._consultar_concurso, paralelismo or self.PARALELISMO_BUSCA,
+                                          sondar=self._sondar_concurso)
         self._criar_diretorio()
     
     def _criar_diretorio(self):
         """Cria diretório de dados se não existir"""
         os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
     
-    def obter_historico_api(self) -> List[Dict]:
+    def _checkpoint(self, tarefa: str) -> CheckpointBusca:
+        """Checkpoint de uma tarefa de busca (retomada após interrupção)"""
+        pasta = os.path.dirname(self.cache_file) or '.'
+        return CheckpointBusca(os.path.join(pasta, f'checkpoint_lotofacil_{tarefa}.ndjson'))
+    
+    def obter_historico_api(self, prazo: Optional[float] = None, conhecidos: Iterable[int] = ()) -> List[Dict]:
         """
         Obtém histórico de múltiplas fontes
-        Busca últimos 1000 concursos usando várias APIs
+        Busca os concursos que faltam do último até o concurso 1 (sem truncar o arquivo local)
+        prazo: instante (time.monotonic) em que as buscas por concurso param
+        conhecidos: concursos já guardados (não são buscados de novo)
         Retorna lista de concursos com números sorteados
         """
         concursos = []
         
-        print("Buscando historico de multiplas fontes (ultimos 1000 concursos)...")
+        print("Buscando historico de multiplas fontes...")
         
         # Método 1: Tenta carregar arquivo local primeiro (mais rápido)
         print("  [1/5] Verificando arquivo local...")
         concursos_local = self._buscar_arquivo_local()
         if concursos_local and len(concursos_local) >= 100:
-            # Limita aos últimos 1000 do arquivo local
-            concursos_local = concursos_local[-1000:] if len(concursos_local) > 1000 else concursos_local
             concursos.extend(concursos_local)
             print(f"  OK - Arquivo local: {len(concursos_local)} concursos encontrados")
         
@@ -59,42 +76,26 @@ class HistoricoLotofacil:
             print(f"  OK - API Caixa: {len(concursos_caixa)} concursos encontrados")
         
         # Método 3: APIs alternativas (múltiplas fontes)
-        if len(concursos) < 1000:
-            print("  [3/5] Buscando em APIs alternativas...")
-            concursos_alternativas = self._buscar_apis_alternativas()
-            if concursos_alternativas:
-                concursos.extend(concursos_alternativas)
-                print(f"  OK - APIs alternativas: {len(concursos_alternativas)} concursos encontrados")
+        print("  [3/5] Buscando em APIs alternativas...")
+        concursos_alternativas = self._buscar_apis_alternativas()
+        if concursos_alternativas:
+            concursos.extend(concursos_alternativas)
+            print(f"  OK - APIs alternativas: {len(concursos_alternativas)} concursos encontrados")
         
-        # Método 4: Busca complementar se ainda não tiver 1000
-        if len(concursos) < 1000:
-            print(f"  [4/5] Busca complementar para atingir 1000 (atual: {len(concursos)})...")
-            limite_restante = 1000 - len(concursos)  # Busca o que falta para chegar a 1000
-            if limite_restante > 0:
-                concursos_complementar = self._buscar_concursos_limitado(limite_restante)
-                if concursos_complementar:
-                    concursos.extend(concursos_complementar)
-                    print(f"  OK - Busca complementar: {len(concursos_complementar)} concursos encontrados")
-                
-                # Se ainda não tiver 1000, continua buscando
-                if len(concursos) < 1000:
-                    print(f"  Continuando busca para atingir 1000 (atual: {len(concursos)})...")
-                    while len(concursos) < 1000:
-                        limite_adicional = min(1000 - len(concursos), 100)
-                        concursos_adicionais = self._buscar_concursos_limitado(limite_adicional)
-                        if concursos_adicionais:
-                            concursos.extend(concursos_adicionais)
-                            print(f"    Progresso: {len(concursos)}/1000 concursos...")
-                        else:
-                            break  # Para se não conseguir mais
+        # Método 4: Busca complementar: os concursos que faltam, do último até o concurso 1
+        # (limitada só pelo prazo e pelo limitador de requisições)
+        print(f"  [4/5] Busca complementar ate o concurso 1 (atual: {len(concursos)})...")
+        conhecidos = set(conhecidos) | {c.get('concurso') for c in concursos}
+        concursos_complementar = self._buscar_concursos_limitado(conhecidos=conhecidos, prazo=prazo)
+        if concursos_complementar:
+            concursos.extend(concursos_complementar)
+            print(f"  OK - Busca complementar: {len(concursos_complementar)} concursos encontrados")
         
         # Método 5: Se ainda não tiver, tenta carregar do banco
         if len(concursos) < 100 and self.usar_banco and self.db:
             print("  [5/5] Carregando do banco de dados...")
             concursos_banco = self._carregar_banco()
             if concursos_banco:
-                # Limita aos últimos 1000 do banco
-                concursos_banco = concursos_banco[-1000:] if len(concursos_banco) > 1000 else concursos_banco
                 concursos.extend(concursos_banco)
                 print(f"  OK - Banco de dados: {len(concursos_banco)} concursos encontrados")
         
@@ -111,73 +112,13 @@ class HistoricoLotofacil:
         
         resultado = sorted(concursos_unicos.values(), key=lambda x: x.get('concurso', 0))
         
-        # Limita a 1000 concursos máximo (últimos 1000)
-        if len(resultado) > 1000:
-            resultado = resultado[-1000:]
-        
         if resultado:
-            print(f"OK - Total: {len(resultado)} concursos carregados (ultimos 1000)")
+            print(f"OK - Total: {len(resultado)} concursos carregados")
             return resultado
         else:
             print("AVISO - Nenhum concurso encontrado, usando cache...")
             return self._carregar_cache()
     
-    def _buscar_api_alternativa(self) -> List[Dict]:
-        """Busca em API alternativa pública (mais confiável) - limitado a 1000 concursos"""
-        concursos = []
-        
-        # API pública conhecida - busca últimos 1000 concursos
-        try:
-            url_base = "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json'
-            }
-            
-            # Primeira requisição para pegar estrutura
-            response = requests.get(url_base, timeout=10, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Processa resposta inicial
-                resultado_inicial = self._processar_resposta_lotodicas(data)
-                concursos.extend(resultado_inicial)
-                
-                # Se conseguiu resultados, busca até 1000 concursos
-                if resultado_inicial:
-                    # Encontra o número do último concurso
-                    ultimo_num = max([c['concurso'] for c in resultado_inicial]) if resultado_inicial else None
-                    
-                    if ultimo_num:
-                        # Limita a 1000 concursos
-                        limite_busca = min(1000, ultimo_num)
-                        print(f"  Buscando ultimos {limite_busca} concursos...")
-                        
-                        # Busca em lotes menores com timeout
-                        contador = 0
-                        for num in range(ultimo_num - 1, max(1, ultimo_num - limite_busca), -1):
-                            try:
-                                c = self._buscar_concurso_especifico(num)
-                                if c:
-                                    concursos.append(c)
-                                    contador += 1
-                                    
-                                # Limite de segurança
-                                if len(concursos) >= limite_busca:
-                                    break
-                                
-                                # Delay a cada 50 requisições para não sobrecarregar
-                                if contador % 50 == 0:
-                                    time.sleep(0.1)
-                                    print(f"    Progresso: {contador}/{limite_busca}...")
-                                    
-                            except Exception:
-                                continue  # Continua mesmo se uma requisição falhar
-        except Exception as e:
-            print(f"  Erro na API alternativa: {e}")
-        
-        return concursos
-    
     def _processar_resposta_lotodicas(self, data) -> List[Dict]:
         """Processa resposta da API lotodicas.com.br"""
         concursos = []
@@ -204,12 +145,8 @@ class HistoricoLotofacil:
     def _buscar_api_caixa(self) -> List[Dict]:
         """Busca na API oficial da Caixa"""
         try:
-            url = "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json'
-            }
-            response = requests.get(url, timeout=10, headers=headers)
+            url = url_fonte('caixa', 'lotofacil')
+            response = requisitar(url, timeout=10, ttl=TTL_ULTIMO_CONCURSO)
             response.raise_for_status()
             
             data = response.json()
@@ -237,38 +174,41 @@ class HistoricoLotofacil:
             return []
     
     def _buscar_apis_alternativas(self) -> List[Dict]:
-        """Busca em múltiplas APIs alternativas em paralelo"""
+        """Busca em múltiplas APIs alternativas (a mais saudável primeiro)"""
         concursos = []
         apis = [
             {
                 'nome': 'Loterias Caixa API',
-                'url': 'https://loteriasonline.caixa.gov.br/api/lotofacil',
+                'url': url_fonte('caixa_online', 'lotofacil'),
                 'processar': self._processar_api_loterias_caixa
             },
             {
                 'nome': 'LotoDicas API',
-                'url': 'https://lotodicas.com.br/api/lotofacil',
+                'url': url_fonte('lotodicas', 'lotofacil'),
                 'processar': self._processar_api_lotodicas
             }
         ]
         
-        for api in apis:
+        for api in ordenar_fontes(apis):
+            inicio = time.monotonic()
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Accept': 'application/json'
-                }
-                response = requests.get(api['url'], timeout=8, headers=headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    resultado = api['processar'](data)
-                    if resultado:
-                        concursos.extend(resultado)
-                        print(f"    OK - {api['nome']}: {len(resultado)} concursos")
-                        if len(concursos) >= 100:  # Se já tem bastante, continua
-                            break
+                response = requisitar(api['url'], timeout=8, ttl=TTL_ULTIMO_CONCURSO)
             except Exception:
+                registrar_fonte(api['nome'], time.monotonic() - inicio)
                 continue  # Continua para próxima API
+            latencia = time.monotonic() - inicio
+            resultado = []
+            if response.status_code == 200:
+                try:
+                    resultado = api['processar'](response.json())
+                except ValueError:
+                    pass
+            registrar_fonte(api['nome'], latencia, response.status_code, valida=bool(resultado))
+            if resultado:
+                concursos.extend(resultado)
+                print(f"    OK - {api['nome']}: {len(resultado)} concursos")
+                if len(concursos) >= 100:  # Se já tem bastante, continua
+                    break
         
         return concursos
     
@@ -314,7 +254,7 @@ class HistoricoLotofacil:
         """Tenta carregar de arquivo local se existir"""
         try:
             # Verifica se existe arquivo de histórico
-            if os.path.exists(self.cache_file):
+            if self.cache.existe():
                 historico = self._carregar_cache()
                 if historico and len(historico) > 0:
                     return historico
@@ -322,49 +262,34 @@ class HistoricoLotofacil:
             pass
         return []
     
-    def _buscar_concursos_limitado(self, limite: int = 1000) -> List[Dict]:
-        """Busca concursos limitada - até o limite especificado"""
+    def _buscar_concursos_limitado(self, limite: Optional[int] = None, conhecidos: Optional[set] = None,
+                                   prazo: Optional[float] = None) -> List[Dict]:
+        """
+        Busca concursos do último para trás - até o limite especificado (None: até o concurso 1)
+        Pula os concursos já conhecidos e as faixas já buscadas sem resultado;
+        interrompida (queda ou prazo), continua de onde parou na próxima chamada
+        """
         concursos = []
         
         try:
             # Tenta obter o último concurso
             ultimo_concurso = self._obter_ultimo_concurso()
             if not ultimo_concurso:
-                # Estima baseado na data
-                ano_atual = datetime.now().year
-                anos_desde_inicio = ano_atual - 2003
-                ultimo_concurso = 3000 + (anos_desde_inicio - 21) * 156
+                ultimo_concurso = self._estimar_ultimo_concurso()
             
             if ultimo_concurso:
-                # Usa o limite solicitado (pode ser maior que 1000 se necessário)
-                limite_real = min(limite, ultimo_concurso)
-                print(f"    Buscando {limite_real} concursos...")
+                # Sem limite: até o concurso 1
+                limite_real = min(limite, ultimo_concurso) if limite else None
+                print(f"    Buscando ate {limite_real or ultimo_concurso} concursos (do {ultimo_concurso} para tras)...")
                 
-                # Busca com timeout curto e delays
-                contador = 0
-                numeros_ja_buscados = set()  # Evita buscar o mesmo número duas vezes
-                
-                for num in range(ultimo_concurso - 1, max(1, ultimo_concurso - limite_real), -1):
-                    if num in numeros_ja_buscados:
-                        continue
-                    
-                    try:
-                        c = self._buscar_concurso_especifico(num)
-                        if c:
-                            concursos.append(c)
-                            contador += 1
-                            numeros_ja_buscados.add(num)
-                        
-                        # Limite de segurança
-                        if len(concursos) >= limite_real:
-                            break
-                        
-                        # Delay a cada 50 requisições para não sobrecarregar
-                        if contador % 50 == 0:
-                            time.sleep(0.1)
-                            print(f"      Progresso: {contador}/{limite_real} concursos...")
-                    except Exception:
-                        continue
+                # Busca em paralelo, do mais recente para trás
+                concursos = self.buscador.buscar(
+                    self.buscador.faltantes(range(ultimo_concurso, 0, -1), conhecidos or ()),
+                    limite=limite_real,
+                    max_falhas_seguidas=self.MAX_FALHAS_SEGUIDAS,
+                    checkpoint=self._checkpoint('limitado'),
+                    prazo=prazo
+                )
             
             return concursos
         except Exception as e:
@@ -374,35 +299,61 @@ class HistoricoLotofacil:
     def _obter_ultimo_concurso(self) -> Optional[int]:
         """Obtém o número do último concurso"""
         try:
-            url = "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, timeout=10, headers=headers)
+            url = url_fonte('caixa', 'lotofacil')
+            response = requisitar(url, timeout=10, ttl=TTL_ULTIMO_CONCURSO)
             data = response.json()
             
             # Tenta encontrar o número do último concurso
             if isinstance(data, dict):
+                numero = (data.get('numero') or 
+                         data.get('nuConcurso') or 
+                         data.get('numeroConcurso'))
+                if numero:
+                    return int(numero)
+                
                 lista = data.get('listaDezenas', []) or data.get('resultado', [])
                 if lista and len(lista) > 0:
                     primeiro = lista[0] if isinstance(lista, list) else lista
-                    numero = (primeiro.get('numero') or 
-                             primeiro.get('nuConcurso') or 
-                             primeiro.get('numeroConcurso'))
-                    if numero:
-                        return int(numero)
-            
-            # Se não conseguir, tenta API alternativa
-            return self._obter_ultimo_concurso_alternativo()
+                    if isinstance(primeiro, dict):
+                        numero = (primeiro.get('numero') or 
+                                 primeiro.get('nuConcurso') or 
+                                 primeiro.get('numeroConcurso'))
+                        if numero:
+                            return int(numero)
         except:
+            pass
+        
+        # Se não conseguir, tenta API alternativa
+        try:
+            numero = self._obter_ultimo_concurso_alternativo()
+            if numero:
+                return int(numero)
+        except (ValueError, TypeError):
+            pass
+        
+        # Por fim, localiza o último concurso existente por busca exponencial
+        # + binária a partir do último concurso local (ou da estimativa pela data)
+        try:
+            return self.buscador.buscar_ultimo(self._estimar_ultimo_concurso())
+        except Exception:
             return None
     
+    def _estimar_ultimo_concurso(self) -> int:
+        """Último concurso local ou, sem histórico, estimativa baseada na data"""
+        if self._matriz is not None and len(self._matriz):
+            return int(self._matriz.concursos.max())
+        if self.historico:
+            return max(c.get('concurso', 0) for c in self.historico)
+        ano_atual = datetime.now().year
+        anos_desde_inicio = ano_atual - 2003
+        return 3000 + (anos_desde_inicio - 21) * 156
+    
     def _obter_ultimo_concurso_alternativo(self) -> Optional[int]:
         """Tenta obter último concurso de fonte alternativa"""
         try:
             # API alternativa - busca o último resultado
-            url = "https://lotodicas.com.br/api/lotofacil/ultimo"
-            response = requests.get(url, timeout=10)
+            url = url_fonte('lotodicas', 'lotofacil/ultimo')
+            response = requisitar(url, timeout=10, ttl=TTL_ULTIMO_CONCURSO)
             if response.status_code == 200:
                 data = response.json()
                 return data.get('numero') or data.get('concurso')
@@ -410,33 +361,70 @@ class HistoricoLotofacil:
             pass
         return None
     
-    def _buscar_lote_concursos(self, inicio: int, quantidade: int) -> List[Dict]:
-        """Busca um lote de concursos específicos"""
-        concursos = []
-        for num in range(inicio, max(1, inicio - quantidade), -1):
-            c = self._buscar_concurso_especifico(num)
-            if c:
-                concursos.append(c)
-        return concursos
-    
     def _buscar_concurso_especifico(self, numero: int) -> Optional[Dict]:
         """Busca um concurso específico com timeout reduzido"""
-        try:
-            # Tenta API da Caixa com número específico (timeout curto)
-            url = f"https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil/{numero}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'application/json'
+        return self._consultar_concurso(numero).concurso
+    
+    def _sondar_concurso(self, numero: int) -> ResultadoBusca:
+        """Sondagem do último concurso: sempre na rede, sem gravar no cache imutável"""
+        return self._consultar_concurso(numero, imutavel=False)
+    
+    def _consultar_concurso(self, numero: int, imutavel: bool = True) -> ResultadoBusca:
+        """
+        Busca um concurso e informa a fonte que o trouxe (ou se as fontes responderam que não existe)
+        API da Caixa e LotoDicas, da fonte mais rápida e saudável para a mais lenta;
+        com hedge, a segunda é consultada em paralelo se a primeira passar do seu p95
+        imutavel=False: resposta vem da rede e não fica no cache (sondagens)
+        """
+        fontes = [
+            {
+                'url': url_fonte('caixa', f'lotofacil/{numero}'),
+                'nome': 'API Caixa Oficial'
+            },
+            {
+                'url': url_fonte('lotodicas', f'lotofacil/{numero}'),
+                'nome': 'LotoDicas'
             }
-            
+        ]
+        respostas: Dict[str, Optional[Dict]] = {}
+        concurso = consultar_fontes(fontes, lambda fonte: self._consultar_fonte(fonte, respostas, imutavel),
+                                    hedge=self.hedge)
+        return ResultadoBusca.de_respostas(concurso, respostas)
+    
+    def _consultar_fonte(self, fonte: Dict, respostas: Optional[Dict[str, Optional[Dict]]] = None,
+                         imutavel: bool = True) -> Optional[Dict]:
+        """
+        Consulta um concurso em uma fonte e registra a resposta na saúde da fonte
+        respostas: recebe nome da fonte -> concurso, ou None se a fonte respondeu
+        que ele não existe (404 ou resposta vazia); erros não entram
+        """
+        inicio = time.monotonic()
+        try:
             # Timeout reduzido para não travar
-            response = requests.get(url, timeout=3, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                return self._processar_concurso(data)
-        except:
-            pass
-        return None
+            response = requisitar(fonte['url'], timeout=3, imutavel=imutavel, validar=self._resposta_valida)
+        except Exception:
+            registrar_fonte(fonte['nome'], time.monotonic() - inicio)
+            return None
+        latencia = time.monotonic() - inicio
+        
+        resultado = None
+        vazia = False
+        if response.status_code == 200:
+            try:
+                dados = response.json()
+                vazia = not dados
+                resultado = self._processar_concurso(dados)
+            except ValueError:
+                pass
+        registrar_fonte(fonte['nome'], latencia, response.status_code,
+                        valida=response.status_code != 200 or resultado is not None or vazia)
+        if respostas is not None and (resultado is not None or vazia or response.status_code == 404):
+            respostas[fonte['nome']] = resultado
+        return resultado
+    
+    def _resposta_valida(self, response) -> bool:
+        """Só um concurso completo (todas as dezenas) fica guardado para sempre no cache HTTP"""
+        return self._processar_concurso(response.json()) is not None
     
     def _processar_concurso(self, concurso) -> Optional[Dict]:
         """Processa um concurso e retorna no formato padrão"""
@@ -501,121 +489,76 @@ class HistoricoLotofacil:
     
     def obter_historico_arquivo(self, arquivo: str) -> List[Dict]:
         """
-        Carrega histórico de arquivo CSV ou JSON
-        Formato esperado: CSV com colunas 'concurso' e 'numeros' (separados por vírgula)
+        Carrega histórico de arquivo CSV, XLSX ou JSON
+        Aceita a planilha oficial de resultados da Caixa (Concurso, Data Sorteio, Bola1..Bola15)
+        e o CSV antigo com colunas 'concurso' e 'numeros' (separados por vírgula)
         """
         try:
-            if arquivo.endswith('.csv'):
-                if not PANDAS_AVAILABLE:
-                    # Implementação alternativa sem pandas
-                    concursos = []
-                    with open(arquivo, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                        if lines:
-                            headers = lines[0].strip().split(',')
-                            for line in lines[1:]:
-                                values = line.strip().split(',')
-                                if len(values) >= 2:
-                                    try:
-                                        concurso_num = int(values[0])
-                                        numeros = [int(n.strip()) for n in values[1].split(',')]
-                                        concursos.append({
-                                            'concurso': concurso_num,
-                                            'numeros': sorted(numeros),
-                                            'data': values[2] if len(values) > 2 else ''
-                                        })
-                                    except (ValueError, IndexError):
-                                        continue
-                    return concursos
-                else:
-                    df = pd.read_csv(arquivo)
-                    concursos = []
-                    for _, row in df.iterrows():
-                        numeros = [int(n.strip()) for n in str(row['numeros']).split(',')]
-                        concursos.append({
-                            'concurso': int(row['concurso']),
-                            'numeros': sorted(numeros),
-                            'data': row.get('data', '')
-                        })
-                    return concursos
-            elif arquivo.endswith('.json'):
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return list(ImportadorResultados('lotofacil').concursos(arquivo))
         except Exception as e:
             print(f"Erro ao carregar arquivo: {e}")
             return []
     
+    def importar_arquivo(self, arquivo: str, tamanho_lote: int = 500) -> Dict:
+        """
+        Importa o histórico de uma planilha oficial de resultados (CSV ou XLSX) sem rede
+        A planilha é lida em streaming e gravada em lotes no banco (upsert) e no cache
+        (cada lote vai para o journal ao ser lido: a planilha não fica inteira na memória)
+        """
+        relatorio = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'invalidos': 0}
+        
+        def gravar(lote: List[Dict]):
+            self.cache.anexar(lote)
+            if self.usar_banco and self.db:
+                parcial = self.db.upsert_concursos(lote)
+                for chave in relatorio:
+                    relatorio[chave] += parcial.get(chave, 0)
+        
+        resumo = ImportadorResultados('lotofacil').importar(arquivo, gravar, tamanho_lote)
+        if resumo['concursos']:
+            historico = self._carregar_cache()
+            print(f"Cache salvo: {len(historico)} concursos (sem duplicatas)")
+        print(f"Importados {resumo['concursos']} concursos de {os.path.basename(arquivo)} "
+              f"({resumo['invalidos']} linhas inválidas)")
+        return {**resumo, 'banco': relatorio if self.usar_banco and self.db else None}
+    
     def salvar_cache(self, concursos: List[Dict]):
-        """Salva histórico em cache, evitando duplicatas pelo número do concurso"""
+        """Anexa ao cache (journal) os concursos novos ou alterados (os demais são ignorados)"""
         try:
-            # Carrega histórico existente
-            historico_existente = {}
-            if os.path.exists(self.cache_file):
-                try:
-                    with open(self.cache_file, 'r', encoding='utf-8') as f:
-                        historico_lista = json.load(f)
-                        # Converte para dicionário usando número do concurso como chave
-                        for c in historico_lista:
-                            num = c.get('concurso')
-                            if num:
-                                historico_existente[num] = c
-                except:
-                    pass
-            
-            # Adiciona/atualiza concursos novos (evita duplicatas)
-            for concurso in concursos:
-                num = concurso.get('concurso')
-                if num:
-                    historico_existente[num] = concurso
-            
-            # Converte de volta para lista e ordena
-            historico_final = sorted(historico_existente.values(), key=lambda x: x.get('concurso', 0))
+            self.cache.anexar(concursos)
             
-            # Salva no arquivo
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(historico_final, f, indent=2, ensure_ascii=False)
+            matriz = self.cache.carregar_matriz()
+            historico_final = matriz.registros if matriz is not None else []
             
+            self._matriz = matriz
             self.historico = historico_final
             print(f"Cache salvo: {len(historico_final)} concursos (sem duplicatas)")
         except Exception as e:
             print(f"Erro ao salvar cache: {e}")
     
     def _carregar_cache(self) -> List[Dict]:
-        """Carrega histórico do cache, removendo duplicatas pelo número do concurso"""
+        """Carrega histórico do cache binário (o JSON antigo é importado na primeira carga)"""
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    historico_lista = json.load(f)
-                    
-                    # Remove duplicatas usando número do concurso como chave
-                    historico_unicos = {}
-                    for c in historico_lista:
-                        num = c.get('concurso')
-                        if num:
-                            # Mantém o mais recente se houver duplicata
-                            if num not in historico_unicos:
-                                historico_unicos[num] = c
-                    
-                    # Converte de volta para lista e ordena
-                    historico_final = sorted(historico_unicos.values(), key=lambda x: x.get('concurso', 0))
-                    
-                    if len(historico_final) != len(historico_lista):
-                        print(f"Removidas {len(historico_lista) - len(historico_final)} duplicatas do cache")
-                        # Salva versão sem duplicatas
-                        with open(self.cache_file, 'w', encoding='utf-8') as f:
-                            json.dump(historico_final, f, indent=2, ensure_ascii=False)
-                    
-                    self.historico = historico_final
-                    return historico_final
+            matriz = self.cache.carregar_matriz()
+            if matriz is not None:
+                self._matriz = matriz
+                self.historico = matriz.registros
+                return self.historico
         except Exception as e:
             print(f"Erro ao carregar cache: {e}")
         return []
     
-    def atualizar_historico(self, usar_api: bool = True) -> List[Dict]:
+    def exportar_json(self, arquivo: Optional[str] = None) -> int:
+        """Exporta o cache para JSON (compatibilidade com o formato antigo)"""
+        return self.cache.exportar_json(arquivo)
+    
+    def atualizar_historico(self, usar_api: bool = True, tempo_limite: Optional[float] = None) -> List[Dict]:
         """
         Atualiza histórico, tentando API primeiro, depois banco/cache
         Evita duplicatas usando número do concurso como chave única
+        tempo_limite: segundos para as buscas por concurso (o restante fica para a próxima chamada)
         """
+        prazo = time.monotonic() + tempo_limite if tempo_limite else None
         if usar_api:
             # Carrega histórico existente primeiro (do banco ou cache)
             historico_existente = {}
@@ -637,15 +580,8 @@ class HistoricoLotofacil:
             
             print(f"Historico existente: {len(historico_existente)} concursos")
             
-            # Se já tem 1000 ou mais, retorna os últimos 1000
-            if len(historico_existente) >= 1000:
-                historico_completo = sorted(historico_existente.values(), key=lambda x: x.get('concurso', 0))[-1000:]
-                print(f"Ja possui {len(historico_existente)} concursos, retornando ultimos 1000")
-                return historico_completo
-            
-            # Busca novos concursos da API até atingir 1000
-            print(f"Buscando concursos para atingir 1000 (atual: {len(historico_existente)})...")
-            concursos_api = self.obter_historico_api()
+            # Busca o que falta até o concurso 1 (os já guardados não são buscados de novo)
+            concursos_api = self.obter_historico_api(prazo, conhecidos=historico_existente)
             
             if concursos_api:
                 # Identifica apenas concursos novos (não duplicados)
@@ -665,81 +601,24 @@ class HistoricoLotofacil:
                             # Atualiza se já existir (mantém dados mais recentes)
                             historico_existente[num] = c
                 
-                # Se ainda não tiver 1000, busca mais ativamente
-                if len(historico_existente) < 1000:
-                    print(f"Buscando mais concursos para atingir 1000 (atual: {len(historico_existente)})...")
-                    faltam = 1000 - len(historico_existente)
-                    
-                    # Obtém primeiro e último concurso conhecido
-                    concursos_ordenados = sorted([c.get('concurso', 0) for c in historico_existente.values()])
-                    primeiro_conhecido = concursos_ordenados[0] if concursos_ordenados else 0
-                    ultimo_conhecido = concursos_ordenados[-1] if concursos_ordenados else 0
-                    
-                    print(f"Primeiro concurso conhecido: {primeiro_conhecido}, Ultimo: {ultimo_conhecido}")
-                    
-                    # Busca concursos anteriores ao primeiro conhecido
-                    if primeiro_conhecido > 1:
-                        print(f"Buscando {faltam} concursos anteriores ao {primeiro_conhecido}...")
-                        contador_busca = 0
-                        for num in range(primeiro_conhecido - 1, max(1, primeiro_conhecido - faltam - 50), -1):
-                            if num not in historico_existente:
-                                c = self._buscar_concurso_especifico(num)
-                                if c:
-                                    concursos_novos.append(c)
-                                    historico_existente[num] = c
-                                    contador_busca += 1
-                                    
-                                    if len(historico_existente) >= 1000:
-                                        break
-                                    
-                                    if contador_busca % 50 == 0:
-                                        print(f"  Progresso: {len(historico_existente)}/1000 concursos (buscando anteriores)...")
-                                        time.sleep(0.1)
-                    
-                    # Se ainda não tiver 1000, busca concursos posteriores ao último conhecido
-                    if len(historico_existente) < 1000:
-                        ultimo_api = self._obter_ultimo_concurso()
-                        if ultimo_api and ultimo_conhecido < ultimo_api:
-                            faltam_agora = 1000 - len(historico_existente)
-                            print(f"Buscando {faltam_agora} concursos posteriores ao {ultimo_conhecido}...")
-                            contador_busca = 0
-                            for num in range(ultimo_conhecido + 1, min(ultimo_api + 1, ultimo_conhecido + faltam_agora + 50)):
-                                if num not in historico_existente:
-                                    c = self._buscar_concurso_especifico(num)
-                                    if c:
-                                        concursos_novos.append(c)
-                                        historico_existente[num] = c
-                                        contador_busca += 1
-                                        
-                                        if len(historico_existente) >= 1000:
-                                            break
-                                        
-                                        if contador_busca % 50 == 0:
-                                            print(f"  Progresso: {len(historico_existente)}/1000 concursos (buscando posteriores)...")
-                                            time.sleep(0.1)
-                
                 # Combina histórico existente com novos
                 historico_completo = sorted(historico_existente.values(), key=lambda x: x.get('concurso', 0))
                 
-                # Limita aos últimos 1000 concursos
-                if len(historico_completo) > 1000:
-                    historico_completo = historico_completo[-1000:]
-                    print(f"Limitado aos ultimos 1000 concursos")
-                
                 if concursos_novos:
                     print(f"Encontrados {len(concursos_novos)} concursos novos (total: {len(historico_completo)})")
                     
                     # Salva apenas concursos novos no banco de dados
                     if self.usar_banco and self.db:
                         print(f"Salvando {len(concursos_novos)} concursos novos no banco de dados...")
-                        inseridos = self.db.inserir_concursos(concursos_novos)
-                        print(f"OK - {inseridos} concursos novos salvos no banco")
+                        relatorio = self.db.upsert_concursos(concursos_novos)
+                        print(f"OK - {relatorio['inseridos']} inseridos, {relatorio['atualizados']} atualizados, "
+                              f"{relatorio['inalterados']} inalterados no banco")
                 else:
                     print(f"Total de concursos no historico: {len(historico_completo)}")
                 
-                # Salva histórico completo em cache JSON (evita duplicatas automaticamente)
-                # Mantém apenas os últimos 1000
-                self.salvar_cache(historico_completo)
+                # Só o que veio nesta atualização vai para o journal; o cache ainda
+                # inexistente recebe uma vez o histórico inteiro (carregado do banco)
+                self.salvar_cache(concursos_api if self.cache.existe() else historico_completo)
                 
                 return historico_completo
         
@@ -753,14 +632,15 @@ class HistoricoLotofacil:
         return self._carregar_cache()
     
     def _carregar_banco(self) -> List[Dict]:
-        """Carrega histórico do banco de dados (últimos 1000)"""
+        """Carrega o histórico completo do banco de dados (via bitmasks, direto para a matriz)"""
         try:
             if self.db:
-                historico = self.db.obter_ultimos_concursos(quantidade=1000)
-                if historico:
-                    self.historico = historico
-                    print(f"Carregados {len(historico)} concursos do banco de dados (ultimos 1000)")
-                    return historico
+                matriz = self.db.obter_matriz()
+                if matriz is not None and len(matriz):
+                    self._matriz = matriz
+                    self.historico = matriz.registros
+                    print(f"Carregados {len(matriz)} concursos do banco de dados")
+                    return self.historico
         except Exception as e:
             print(f"Erro ao carregar do banco: {e}")
         return []
@@ -779,6 +659,16 @@ class HistoricoLotofacil:
         
         return self.historico
     
+    def get_matriz(self) -> HistoricoMatriz:
+        """
+        Retorna o histórico atual como HistoricoMatriz
+        A matriz só é reconstruída quando o histórico em memória muda
+        """
+        historico = self.get_historico()
+        if self._matriz is None or self._matriz.registros is not historico:
+            self._matriz = HistoricoMatriz.de_historico(historico, 'lotofacil')
+        return self._matriz
+    
     def get_ultimos_concursos(self, quantidade: int = 100) -> List[Dict]:
         """Retorna os últimos N concursos"""
         # Se usar banco, busca diretamente do banco
@@ -789,10 +679,12 @@ class HistoricoLotofacil:
         historico = self.get_historico()
         return historico[-quantidade:] if historico else []
     
-    def sincronizar_banco(self, forcar_atualizacao: bool = False) -> Dict:
+    def sincronizar_banco(self, forcar_atualizacao: bool = False, tempo_limite: Optional[float] = None) -> Dict:
         """
         Sincroniza banco de dados com API
         Busca apenas concursos novos ou faltantes
+        tempo_limite: segundos de busca nesta chamada; o que faltar fica no checkpoint
+                      e a próxima chamada continua de onde parou ('concluido': False)
         Retorna estatísticas da sincronização
         """
         if not self.usar_banco or not self.db:
@@ -824,35 +716,29 @@ class HistoricoLotofacil:
                     'ultimo_api': ultimo_numero_api
                 }
             
-            # Busca concursos faltantes
+            # Busca concursos faltantes em paralelo, salvando em lotes na ordem dos concursos;
+            # o checkpoint guarda encontrados/sem resultado de cada lote já gravado
             print(f"Buscando concursos de {ultimo_numero_banco + 1} até {ultimo_numero_api}...")
-            concursos_novos = []
-            
-            # Busca em lotes para não sobrecarregar
-            for num in range(ultimo_numero_banco + 1, ultimo_numero_api + 1):
-                c = self._buscar_concurso_especifico(num)
-                if c:
-                    concursos_novos.append(c)
-                
-                if len(concursos_novos) % 50 == 0:
-                    # Salva em lotes
-                    self.db.inserir_concursos(concursos_novos)
-                    print(f"  Progresso: {len(concursos_novos)} concursos novos salvos...")
-                    concursos_novos = []
-                    time.sleep(0.1)
-            
-            # Salva restante
-            if concursos_novos:
-                self.db.inserir_concursos(concursos_novos)
+            checkpoint = self._checkpoint('sincronizacao')
+            faixa = range(ultimo_numero_banco + 1, ultimo_numero_api + 1)
+            self.buscador.buscar(
+                faixa,
+                gravar=self.db.upsert_concursos,
+                checkpoint=checkpoint,
+                prazo=time.monotonic() + tempo_limite if tempo_limite else None
+            )
             
             total_final = self.db.contar_concursos()
+            ultimo_final = self.db.obter_ultimo_concurso() if not checkpoint.concluido else None
             
             return {
                 'sucesso': True,
                 'atualizado': True,
+                'concluido': checkpoint.concluido,
+                'pendentes': 0 if checkpoint.concluido else sum(1 for _ in checkpoint.pendentes(faixa)),
                 'concursos_adicionados': total_final - total_banco,
                 'total_banco': total_final,
-                'ultimo_banco': ultimo_numero_api
+                'ultimo_banco': ultimo_final['concurso'] if ultimo_final else ultimo_numero_api
             }
         except Exception as e:
             return {'sucesso': False, 'erro': str(e)}
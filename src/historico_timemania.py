@@ -2,39 +2,60 @@
 Módulo para obter e gerenciar histórico de resultados da Timemania
 """
 import requests
-import json
 import os
 import re
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
 import time
+from typing import Iterable, List, Dict, Optional
+from datetime import datetime, timedelta
+
+from src.matriz import HistoricoMatriz
+from src.cache_historico import CacheHistorico
+from src.cliente_http import requisitar, TTL_ULTIMO_CONCURSO
+from src.database import DatabaseLoteria
+from src.busca_concorrente import BuscadorConcursos, ResultadoBusca
+from src.checkpoint import CheckpointBusca
+from src.importador import ImportadorResultados
+from src.fontes import consultar_fontes, ordenar_fontes, registrar_fonte
+from src.urls import url_fonte
 
 class HistoricoTimemania:
     """Classe para gerenciar histórico de resultados da Timemania"""
     
-    def __init__(self, cache_file: str = "data/historico_timemania.json", usar_banco: bool = False):
+    # Requisições simultâneas ao buscar vários concursos
+    PARALELISMO_BUSCA = 8
+    
+    # Concursos seguidos não encontrados que encerram uma busca para trás
+    MAX_FALHAS_SEGUIDAS = 200
+    
+    def __init__(self, cache_file: str = "data/historico_timemania.json", usar_banco: bool = False,
+                 paralelismo: Optional[int] = None, hedge: bool = False):
         self.cache_file = cache_file
+        # Hedge: consulta a próxima fonte em paralelo quando a atual demora mais que o seu p95
+        self.hedge = hedge
+        self.cache = CacheHistorico(cache_file, 'timemania')
         self.historico: List[Dict] = []
-        self.usar_banco = usar_banco  # Por enquanto não usa banco (banco é específico para Lotofácil)
-        self.db = None
+        self._matriz: Optional[HistoricoMatriz] = None
+        self.usar_banco = usar_banco
+        self.db = DatabaseLoteria('timemania') if usar_banco else None
+        self.buscador = BuscadorConcursos(self._consultar_concurso, paralelismo or self.PARALELISMO_BUSCA,
+                                          sondar=self._sondar_concurso)
         self._criar_diretorio()
     
     def _criar_diretorio(self):
         """Cria diretório de dados se não existir"""
         os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
     
+    def _checkpoint(self, tarefa: str) -> CheckpointBusca:
+        """Checkpoint de uma tarefa de busca (retomada após interrupção)"""
+        pasta = os.path.dirname(self.cache_file) or '.'
+        return CheckpointBusca(os.path.join(pasta, f'checkpoint_timemania_{tarefa}.ndjson'))
+    
     def _obter_ultimo_concurso(self) -> Optional[int]:
         """Obtém número do último concurso de múltiplas fontes"""
         # Tenta buscar o último concurso diretamente da API
         try:
-            url = "https://servicebus2.caixa.gov.br/portaldeloterias/api/timemania"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'pt-BR,pt;q=0.9',
-                'Referer': 'https://loterias.caixa.gov.br/'
-            }
-            response = requests.get(url, timeout=8, headers=headers, allow_redirects=True)
+            url = url_fonte('caixa', 'timemania')
+            response = requisitar(url, timeout=8, allow_redirects=True, ttl=TTL_ULTIMO_CONCURSO)
             
             if response.status_code == 200:
                 try:
@@ -51,96 +72,116 @@ class HistoricoTimemania:
         except:
             pass
         
-        # Se não conseguiu, tenta buscar um concurso conhecido recente (2335 foi mencionado pelo usuário)
-        # Tenta buscar alguns concursos recentes para encontrar o último válido
+        # Se não conseguiu, localiza o último concurso existente por busca exponencial
+        # + binária a partir do último concurso local (ou da estimativa pela data)
+        estimativa = self._estimar_ultimo_concurso()
         try:
-            for num_teste in range(2335, 2300, -1):
-                try:
-                    url = f"https://servicebus2.caixa.gov.br/portaldeloterias/api/timemania/{num_teste}"
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                        'Accept': 'application/json'
-                    }
-                    response = requests.get(url, timeout=5, headers=headers)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get('numero') or data.get('listaDezenas'):
-                            return int(data.get('numero', num_teste))
-                except:
-                    continue
-        except:
+            ultimo = self.buscador.buscar_ultimo(estimativa)
+            if ultimo:
+                return ultimo
+        except Exception:
             pass
         
-        # Fallback: estimativa baseada na data
-        try:
-            ano_atual = datetime.now().year
-            mes_atual = datetime.now().month
-            anos_desde_inicio = ano_atual - 2008
-            # Aproximadamente 156 concursos por ano (3 por semana)
-            estimativa = 2000 + (anos_desde_inicio - 15) * 156 + (mes_atual * 13)
-            return estimativa
-        except:
-            return None
+        # Fallback: estimativa
+        return estimativa
+    
+    def _estimar_ultimo_concurso(self) -> int:
+        """Último concurso local ou, sem histórico, estimativa baseada na data"""
+        if self._matriz is not None and len(self._matriz):
+            return int(self._matriz.concursos.max())
+        if self.historico:
+            return max(c.get('concurso', 0) for c in self.historico)
+        ano_atual = datetime.now().year
+        mes_atual = datetime.now().month
+        anos_desde_inicio = ano_atual - 2008
+        # Aproximadamente 156 concursos por ano (3 por semana)
+        return 2000 + (anos_desde_inicio - 15) * 156 + (mes_atual * 13)
     
     def _buscar_concurso_especifico(self, numero: int) -> Optional[Dict]:
         """Busca um concurso específico de múltiplas fontes"""
+        return self._consultar_concurso(numero).concurso
+    
+    def _sondar_concurso(self, numero: int) -> ResultadoBusca:
+        """Sondagem do último concurso: sempre na rede, sem gravar no cache imutável"""
+        return self._consultar_concurso(numero, imutavel=False)
+    
+    def _consultar_concurso(self, numero: int, imutavel: bool = True) -> ResultadoBusca:
+        """
+        Busca um concurso de múltiplas fontes e informa a fonte que o trouxe
+        (ou se as fontes responderam que ele não existe)
+        As fontes são tentadas da mais rápida e saudável para a mais lenta; fontes
+        com circuito aberto (falhas seguidas) são puladas até a próxima sondagem.
+        Com hedge, a próxima fonte é consultada em paralelo se a atual passar do seu p95
+        imutavel=False: resposta vem da rede e não fica no cache (sondagens)
+        """
         # Lista de fontes para tentar
         fontes = [
             {
-                'url': f"https://servicebus2.caixa.gov.br/portaldeloterias/api/timemania/{numero}",
+                'url': url_fonte('caixa', f'timemania/{numero}'),
                 'nome': 'API Caixa Oficial'
             },
             {
-                'url': f"https://apiloterias.com.br/app/resultado?loteria=timemania&token=YOUR_TOKEN&concurso={numero}",
-                'nome': 'API Loterias (sem token)',
-                'skip': True  # Pula se precisar de token
-            },
-            {
-                'url': f"https://www.lotodicas.com.br/api/timemania/{numero}",
+                'url': url_fonte('lotodicas_www', f'timemania/{numero}'),
                 'nome': 'LotoDicas'
             },
             {
-                'url': f"https://lottolookup.com.br/api/timemania/{numero}",
+                'url': url_fonte('lottolookup', f'timemania/{numero}'),
                 'nome': 'LottoLookup'
             }
         ]
+        # API Loterias exige token: só entra na lista se estiver configurado
+        token = os.environ.get('APILOTERIAS_TOKEN')
+        if token:
+            fontes.append({
+                'url': url_fonte('apiloterias', f'resultado?loteria=timemania&token={token}&concurso={numero}'),
+                'nome': 'API Loterias'
+            })
         
-        for fonte in fontes:
-            if fonte.get('skip'):
-                continue
-                
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'application/json, text/plain, */*',
-                    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-                    'Referer': 'https://loterias.caixa.gov.br/'
-                }
-                response = requests.get(fonte['url'], timeout=8, headers=headers, allow_redirects=True)
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        resultado = self._processar_concurso(data)
-                        if resultado:
-                            return resultado
-                    except ValueError:
-                        # Se não for JSON, tenta parsear HTML ou texto
-                        texto = response.text
-                        resultado = self._processar_texto_html(texto, numero)
-                        if resultado:
-                            return resultado
-                elif response.status_code == 404:
-                    # Concurso não existe, continua para próxima fonte
-                    continue
-            except requests.exceptions.Timeout:
-                continue
-            except requests.exceptions.RequestException:
-                continue
-            except Exception:
-                continue
+        respostas: Dict[str, Optional[Dict]] = {}
+        concurso = consultar_fontes(fontes, lambda fonte: self._consultar_fonte(fonte, numero, respostas, imutavel),
+                                    hedge=self.hedge)
+        return ResultadoBusca.de_respostas(concurso, respostas)
+    
+    def _consultar_fonte(self, fonte: Dict, numero: int,
+                         respostas: Optional[Dict[str, Optional[Dict]]] = None,
+                         imutavel: bool = True) -> Optional[Dict]:
+        """
+        Consulta um concurso em uma fonte e registra a resposta na saúde da fonte
+        respostas: recebe nome da fonte -> concurso, ou None se a fonte respondeu
+        que ele não existe (404 ou resposta vazia); erros não entram
+        """
+        inicio = time.monotonic()
+        try:
+            response = requisitar(fonte['url'], timeout=8, allow_redirects=True, imutavel=imutavel,
+                                  validar=self._resposta_valida)
+        except requests.exceptions.RequestException:
+            registrar_fonte(fonte['nome'], time.monotonic() - inicio)
+            return None
+        latencia = time.monotonic() - inicio
         
-        return None
+        if response.status_code != 200:
+            # 404: concurso não existe nessa fonte, continua para próxima fonte
+            registrar_fonte(fonte['nome'], latencia, response.status_code)
+            if respostas is not None and response.status_code == 404:
+                respostas[fonte['nome']] = None
+            return None
+        
+        resultado = None
+        vazia = False
+        try:
+            try:
+                data = response.json()
+                vazia = not data
+                resultado = self._processar_concurso(data)
+            except ValueError:
+                # Se não for JSON, tenta parsear HTML ou texto
+                resultado = self._processar_texto_html(response.text, numero)
+        except Exception:
+            pass
+        registrar_fonte(fonte['nome'], latencia, response.status_code, valida=resultado is not None or vazia)
+        if respostas is not None and (resultado is not None or vazia):
+            respostas[fonte['nome']] = resultado
+        return resultado
     
     def _processar_texto_html(self, texto: str, numero: int) -> Optional[Dict]:
         """Tenta extrair dados de HTML ou texto"""
@@ -172,7 +213,7 @@ class HistoricoTimemania:
         """Tenta carregar de arquivo local se existir"""
         try:
             # Verifica se existe arquivo de histórico
-            if os.path.exists(self.cache_file):
+            if self.cache.existe():
                 historico = self._carregar_cache()
                 if historico and len(historico) > 0:
                     return historico
@@ -182,8 +223,6 @@ class HistoricoTimemania:
     
     def _buscar_api_caixa(self) -> List[Dict]:
         """Busca na API oficial da Caixa usando URL com número do concurso"""
-        concursos = []
-        
         # Primeiro tenta obter o último concurso
         ultimo = self._obter_ultimo_concurso()
         if not ultimo:
@@ -197,19 +236,7 @@ class HistoricoTimemania:
         print(f"    Buscando concursos usando URL: /api/timemania/{{numero}}...")
         limite_busca = min(50, ultimo)  # Busca até 50 concursos recentes
         
-        for num in range(ultimo, max(1, ultimo - limite_busca), -1):
-            try:
-                c = self._buscar_concurso_especifico(num)
-                if c:
-                    concursos.append(c)
-                if len(concursos) >= limite_busca:
-                    break
-                time.sleep(0.1)  # Pequeno delay para não sobrecarregar
-            except Exception as e:
-                # Continua mesmo se uma requisição falhar
-                continue
-        
-        return concursos
+        return self.buscador.buscar(range(ultimo, max(1, ultimo - limite_busca), -1), limite=limite_busca)
     
     def _processar_resposta_api(self, data) -> List[Dict]:
         """Processa resposta da API"""
@@ -247,46 +274,45 @@ class HistoricoTimemania:
         apis = [
             {
                 'nome': 'LotoDicas API',
-                'url': 'https://www.lotodicas.com.br/api/timemania',
+                'url': url_fonte('lotodicas_www', 'timemania'),
                 'processar': self._processar_api_lotodicas
             },
             {
                 'nome': 'LotoDicas (alternativa)',
-                'url': 'https://lotodicas.com.br/api/timemania',
+                'url': url_fonte('lotodicas', 'timemania'),
                 'processar': self._processar_api_lotodicas
             },
             {
                 'nome': 'Loterias Caixa API',
-                'url': 'https://loteriasonline.caixa.gov.br/api/timemania',
+                'url': url_fonte('caixa_online', 'timemania'),
                 'processar': self._processar_api_loterias_caixa
             }
         ]
         
-        for api in apis:
+        for api in ordenar_fontes(apis):
+            inicio = time.monotonic()
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'application/json, text/plain, */*',
-                    'Accept-Language': 'pt-BR,pt;q=0.9',
-                    'Referer': 'https://loterias.caixa.gov.br/'
-                }
-                response = requests.get(api['url'], timeout=8, headers=headers, allow_redirects=True)
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        resultado = api['processar'](data)
-                        if resultado:
-                            concursos.extend(resultado)
-                            print(f"    OK - {api['nome']}: {len(resultado)} concursos")
-                            if len(concursos) >= 50:  # Se já tem bastante, continua
-                                break
-                    except ValueError:
-                        # Não é JSON válido
-                        continue
+                response = requisitar(api['url'], timeout=8, allow_redirects=True, ttl=TTL_ULTIMO_CONCURSO)
             except Exception as e:
                 # Mostra erro apenas em debug (comentado)
                 # print(f"    Erro em {api['nome']}: {e}")
+                registrar_fonte(api['nome'], time.monotonic() - inicio)
                 continue  # Continua para próxima API
+            latencia = time.monotonic() - inicio
+            resultado = []
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    resultado = api['processar'](data)
+                except ValueError:
+                    # Não é JSON válido
+                    pass
+            registrar_fonte(api['nome'], latencia, response.status_code, valida=bool(resultado))
+            if resultado:
+                concursos.extend(resultado)
+                print(f"    OK - {api['nome']}: {len(resultado)} concursos")
+                if len(concursos) >= 50:  # Se já tem bastante, continua
+                    break
         
         # Se não conseguiu nada das APIs, tenta buscar últimos concursos diretamente
         if not concursos:
@@ -294,16 +320,7 @@ class HistoricoTimemania:
             ultimo = self._obter_ultimo_concurso()
             if ultimo:
                 # Busca últimos 30 concursos
-                for num in range(ultimo, max(1, ultimo - 30), -1):
-                    try:
-                        c = self._buscar_concurso_especifico(num)
-                        if c:
-                            concursos.append(c)
-                        if len(concursos) >= 30:
-                            break
-                        time.sleep(0.1)
-                    except:
-                        continue
+                concursos = self.buscador.buscar(range(ultimo, max(1, ultimo - 30), -1), limite=30)
         
         return concursos
     
@@ -345,8 +362,13 @@ class HistoricoTimemania:
             pass
         return concursos
     
-    def _buscar_concursos_limitado(self, limite: int = 500) -> List[Dict]:
-        """Busca concursos limitada - até o limite especificado"""
+    def _buscar_concursos_limitado(self, limite: Optional[int] = None, conhecidos: Optional[set] = None,
+                                   prazo: Optional[float] = None) -> List[Dict]:
+        """
+        Busca concursos do último para trás - até o limite especificado (None: até o concurso 1)
+        Pula os concursos já conhecidos e as faixas já buscadas sem resultado;
+        interrompida (queda ou prazo), continua de onde parou na próxima chamada
+        """
         concursos = []
         
         try:
@@ -361,80 +383,28 @@ class HistoricoTimemania:
                 print(f"    AVISO - Estimando ultimo concurso: {ultimo_concurso}")
             
             if ultimo_concurso:
-                # Usa o limite solicitado
-                limite_real = min(limite, ultimo_concurso)
-                print(f"    Buscando {limite_real} concursos (do {ultimo_concurso} para tras)...")
+                # Sem limite: até o concurso 1
+                limite_real = min(limite, ultimo_concurso) if limite else None
+                print(f"    Buscando ate {limite_real or ultimo_concurso} concursos (do {ultimo_concurso} para tras)...")
                 
-                # Busca com timeout e delays
-                contador = 0
-                tentativas = 0
-                numeros_ja_buscados = set()  # Evita buscar o mesmo número duas vezes
-                sem_resultado_seguidos = 0
-                max_sem_resultado = 100  # Para após 100 tentativas sem resultado
-                
-                # Estratégia: começa do último e vai para trás
-                for num in range(ultimo_concurso, max(1, ultimo_concurso - limite_real), -1):
-                    if num in numeros_ja_buscados:
-                        continue
-                    
-                    tentativas += 1
-                    
-                    # Se muitas tentativas sem resultado, tenta estratégia diferente
-                    if sem_resultado_seguidos >= max_sem_resultado:
-                        print(f"    AVISO - Muitas tentativas sem resultado, tentando estrategia alternativa...")
-                        # Tenta buscar em intervalos maiores (últimos 50, 100, 150, etc)
-                        for intervalo in [50, 100, 150, 200]:
-                            num_teste = ultimo_concurso - intervalo
-                            if num_teste > 0 and num_teste not in numeros_ja_buscados:
-                                try:
-                                    c = self._buscar_concurso_especifico(num_teste)
-                                    if c:
-                                        concursos.append(c)
-                                        contador += 1
-                                        numeros_ja_buscados.add(num_teste)
-                                        sem_resultado_seguidos = 0
-                                        print(f"    OK - Encontrado concurso {num_teste}!")
-                                        break
-                                except:
-                                    pass
-                        
-                        # Se ainda não encontrou nada, para
-                        if sem_resultado_seguidos >= max_sem_resultado * 2:
-                            print(f"    AVISO - Parando busca apos muitas tentativas sem resultado")
-                            break
-                    
-                    try:
-                        c = self._buscar_concurso_especifico(num)
-                        if c:
-                            concursos.append(c)
-                            contador += 1
-                            numeros_ja_buscados.add(num)
-                            sem_resultado_seguidos = 0  # Reset contador
-                        else:
-                            sem_resultado_seguidos += 1
-                        
-                        # Limite de segurança
-                        if len(concursos) >= limite_real:
-                            break
-                        
-                        # Mostra progresso a cada 10 tentativas ou a cada 5 concursos encontrados
-                        if tentativas % 10 == 0 or (contador > 0 and contador % 5 == 0):
-                            print(f"      Progresso: {contador}/{limite_real} concursos (buscando {num}...)")
-                            time.sleep(0.1)  # Delay um pouco maior
-                        
-                        # Mostra progresso mesmo se não encontrou nada ainda
-                        if tentativas > 0 and tentativas % 50 == 0 and contador == 0:
-                            print(f"      Buscando... ({tentativas} tentativas realizadas, ainda sem resultados)")
-                            time.sleep(0.2)
-                    except Exception:
-                        sem_resultado_seguidos += 1
-                        continue
+                # Busca em paralelo do último para trás; para após muitas falhas seguidas
+                concursos = self.buscador.buscar(
+                    self.buscador.faltantes(range(ultimo_concurso, 0, -1), conhecidos or ()),
+                    limite=limite_real,
+                    max_falhas_seguidas=self.MAX_FALHAS_SEGUIDAS,
+                    checkpoint=self._checkpoint('limitado'),
+                    prazo=prazo
+                )
             
             return concursos
         except Exception as e:
             print(f"  Erro na busca limitada: {e}")
             return []
     
+    def _resposta_valida(self, response) -> bool:
+        """Só um concurso completo (todas as dezenas) fica guardado para sempre no cache HTTP"""
+        return self._processar_concurso(response.json()) is not None
+    
     def _processar_concurso(self, concurso) -> Optional[Dict]:
         """Processa um concurso e retorna no formato padrão"""
         try:
@@ -549,23 +519,22 @@ class HistoricoTimemania:
         
         return None
     
-    def obter_historico_api(self) -> List[Dict]:
+    def obter_historico_api(self, prazo: Optional[float] = None, conhecidos: Iterable[int] = ()) -> List[Dict]:
         """
         Obtém histórico de múltiplas fontes
-        Busca últimos 450 concursos usando várias APIs
+        Busca os concursos que faltam do último até o concurso 1 (sem truncar o arquivo local)
+        prazo: instante (time.monotonic) em que as buscas por concurso param
+        conhecidos: concursos já guardados (não são buscados de novo)
         Retorna lista de concursos com números sorteados
         """
         concursos = []
-        LIMITE_CONCURSOS = 450
         
-        print(f"Buscando historico Timemania de multiplas fontes (ultimos {LIMITE_CONCURSOS} concursos)...")
+        print("Buscando historico Timemania de multiplas fontes...")
         
         # Método 1: Tenta carregar arquivo local primeiro (mais rápido)
         print("  [1/5] Verificando arquivo local...")
         concursos_local = self._buscar_arquivo_local()
         if concursos_local and len(concursos_local) >= 50:
-            # Limita aos últimos 450 do arquivo local
-            concursos_local = concursos_local[-LIMITE_CONCURSOS:] if len(concursos_local) > LIMITE_CONCURSOS else concursos_local
             concursos.extend(concursos_local)
             print(f"  OK - Arquivo local: {len(concursos_local)} concursos encontrados")
         
@@ -577,57 +546,26 @@ class HistoricoTimemania:
             print(f"  OK - API Caixa: {len(concursos_caixa)} concursos encontrados")
         
         # Método 3: APIs alternativas (múltiplas fontes)
-        if len(concursos) < LIMITE_CONCURSOS:
-            print("  [3/5] Buscando em APIs alternativas...")
-            concursos_alternativas = self._buscar_apis_alternativas()
-            if concursos_alternativas:
-                concursos.extend(concursos_alternativas)
-                print(f"  OK - APIs alternativas: {len(concursos_alternativas)} concursos encontrados")
+        print("  [3/5] Buscando em APIs alternativas...")
+        concursos_alternativas = self._buscar_apis_alternativas()
+        if concursos_alternativas:
+            concursos.extend(concursos_alternativas)
+            print(f"  OK - APIs alternativas: {len(concursos_alternativas)} concursos encontrados")
         
-        # Método 4: Busca complementar se ainda não tiver 450
-        if len(concursos) < LIMITE_CONCURSOS:
-            print(f"  [4/5] Busca complementar para atingir {LIMITE_CONCURSOS} (atual: {len(concursos)})...")
-            limite_restante = LIMITE_CONCURSOS - len(concursos)
-            if limite_restante > 0:
-                concursos_complementar = self._buscar_concursos_limitado(limite_restante)
-                if concursos_complementar:
-                    concursos.extend(concursos_complementar)
-                    print(f"  OK - Busca complementar: {len(concursos_complementar)} concursos encontrados")
-                
-                # Se ainda não tiver 450, continua buscando usando a URL correta
-                if len(concursos) < LIMITE_CONCURSOS:
-                    print(f"  Continuando busca para atingir {LIMITE_CONCURSOS} (atual: {len(concursos)})...")
-                    ultimo = self._obter_ultimo_concurso() or 2335
-                    limite_adicional = LIMITE_CONCURSOS - len(concursos)
-                    print(f"    Buscando mais {limite_adicional} concursos a partir do {ultimo}...")
-                    
-                    contador_complementar = 0
-                    for num in range(ultimo - len(concursos), max(1, ultimo - limite_adicional - len(concursos)), -1):
-                        try:
-                            c = self._buscar_concurso_especifico(num)
-                            if c:
-                                concursos.append(c)
-                                contador_complementar += 1
-                            if len(concursos) >= LIMITE_CONCURSOS:
-                                break
-                            if contador_complementar % 10 == 0:
-                                print(f"      Progresso: {len(concursos)}/{LIMITE_CONCURSOS} concursos...")
-                            time.sleep(0.1)
-                        except:
-                            continue
-                    
-                    if len(concursos) >= LIMITE_CONCURSOS:
-                        print(f"  OK - Limite de {LIMITE_CONCURSOS} concursos atingido!")
-                    else:
-                        print(f"  AVISO - Encontrados {len(concursos)} concursos (objetivo: {LIMITE_CONCURSOS})")
+        # Método 4: Busca complementar: os concursos que faltam, do último até o concurso 1
+        # (limitada só pelo prazo e pelo limitador de requisições)
+        print(f"  [4/5] Busca complementar ate o concurso 1 (atual: {len(concursos)})...")
+        conhecidos = set(conhecidos) | {c.get('concurso') for c in concursos}
+        concursos_complementar = self._buscar_concursos_limitado(conhecidos=conhecidos, prazo=prazo)
+        if concursos_complementar:
+            concursos.extend(concursos_complementar)
+            print(f"  OK - Busca complementar: {len(concursos_complementar)} concursos encontrados")
         
         # Método 5: Se ainda não tiver, tenta carregar do cache
         if len(concursos) < 50:
             print("  [5/5] Carregando do cache...")
             cache = self._carregar_cache()
             if cache:
-                # Limita aos últimos 450 do cache
-                cache = cache[-LIMITE_CONCURSOS:] if len(cache) > LIMITE_CONCURSOS else cache
                 concursos.extend(cache)
                 print(f"  OK - Cache: {len(cache)} concursos encontrados")
         
@@ -644,85 +582,73 @@ class HistoricoTimemania:
         
         resultado = sorted(concursos_unicos.values(), key=lambda x: x.get('concurso', 0))
         
-        # Limita a 450 concursos máximo (últimos 450)
-        if len(resultado) > LIMITE_CONCURSOS:
-            resultado = resultado[-LIMITE_CONCURSOS:]
-        
         if resultado:
-            print(f"OK - Total: {len(resultado)} concursos carregados (ultimos {LIMITE_CONCURSOS})")
+            print(f"OK - Total: {len(resultado)} concursos carregados")
             return resultado
         else:
             print("AVISO - Nenhum concurso encontrado, usando cache...")
-            cache = self._carregar_cache()
-            if cache:
-                # Limita cache também a 450
-                if len(cache) > LIMITE_CONCURSOS:
-                    cache = cache[-LIMITE_CONCURSOS:]
-                return cache
-            return []
+            return self._carregar_cache()
     
     def salvar_cache(self, concursos: List[Dict]):
-        """Salva histórico em cache, evitando duplicatas pelo número do concurso"""
+        """Anexa ao cache (journal) os concursos novos ou alterados (os demais são ignorados)"""
         try:
-            historico_existente = {}
-            if os.path.exists(self.cache_file):
-                try:
-                    with open(self.cache_file, 'r', encoding='utf-8') as f:
-                        historico_lista = json.load(f)
-                        for c in historico_lista:
-                            num = c.get('concurso')
-                            if num:
-                                historico_existente[num] = c
-                except:
-                    pass
+            self.cache.anexar(concursos)
             
-            for concurso in concursos:
-                num = concurso.get('concurso')
-                if num:
-                    historico_existente[num] = concurso
-            
-            historico_final = sorted(historico_existente.values(), key=lambda x: x.get('concurso', 0))
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(historico_final, f, indent=2, ensure_ascii=False)
+            matriz = self.cache.carregar_matriz()
+            historico_final = matriz.registros if matriz is not None else []
             
+            self._matriz = matriz
             self.historico = historico_final
             print(f"Cache salvo: {len(historico_final)} concursos (sem duplicatas)")
         except Exception as e:
             print(f"Erro ao salvar cache: {e}")
     
     def _carregar_cache(self) -> List[Dict]:
-        """Carrega histórico do cache, removendo duplicatas pelo número do concurso"""
+        """Carrega histórico do cache binário (o JSON antigo é importado na primeira carga)"""
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    historico_lista = json.load(f)
-                    
-                    historico_unicos = {}
-                    for c in historico_lista:
-                        num = c.get('concurso')
-                        if num:
-                            if num not in historico_unicos:
-                                historico_unicos[num] = c
-                    
-                    historico_final = sorted(historico_unicos.values(), key=lambda x: x.get('concurso', 0))
-                    
-                    if len(historico_final) != len(historico_lista):
-                        print(f"Removidas {len(historico_lista) - len(historico_final)} duplicatas do cache")
-                        with open(self.cache_file, 'w', encoding='utf-8') as f:
-                            json.dump(historico_final, f, indent=2, ensure_ascii=False)
-                    
-                    self.historico = historico_final
-                    return historico_final
+            matriz = self.cache.carregar_matriz()
+            if matriz is not None:
+                self._matriz = matriz
+                self.historico = matriz.registros
+                return self.historico
         except Exception as e:
             print(f"Erro ao carregar cache: {e}")
         return []
     
-    def atualizar_historico(self, usar_api: bool = True) -> List[Dict]:
+    def importar_arquivo(self, arquivo: str, tamanho_lote: int = 500) -> Dict:
+        """
+        Importa o histórico de uma planilha oficial de resultados (CSV ou XLSX) sem rede
+        A planilha é lida em streaming e gravada em lotes no banco (upsert) e no cache
+        (cada lote vai para o journal ao ser lido: a planilha não fica inteira na memória)
+        """
+        relatorio = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'invalidos': 0}
+        
+        def gravar(lote: List[Dict]):
+            self.cache.anexar(lote)
+            if self.usar_banco and self.db:
+                parcial = self.db.upsert_concursos(lote)
+                for chave in relatorio:
+                    relatorio[chave] += parcial.get(chave, 0)
+        
+        resumo = ImportadorResultados('timemania').importar(arquivo, gravar, tamanho_lote)
+        if resumo['concursos']:
+            historico = self._carregar_cache()
+            print(f"Cache salvo: {len(historico)} concursos (sem duplicatas)")
+        print(f"Importados {resumo['concursos']} concursos de {os.path.basename(arquivo)} "
+              f"({resumo['invalidos']} linhas inválidas)")
+        return {**resumo, 'banco': relatorio if self.usar_banco and self.db else None}
+    
+    def exportar_json(self, arquivo: Optional[str] = None) -> int:
+        """Exporta o cache para JSON (compatibilidade com o formato antigo)"""
+        return self.cache.exportar_json(arquivo)
+    
+    def atualizar_historico(self, usar_api: bool = True, tempo_limite: Optional[float] = None) -> List[Dict]:
         """
         Atualiza histórico, tentando API primeiro, depois cache
         Evita duplicatas usando número do concurso como chave única
+        tempo_limite: segundos para as buscas por concurso (o restante fica para a próxima chamada)
         """
+        prazo = time.monotonic() + tempo_limite if tempo_limite else None
         if usar_api:
             historico_existente = {}
             historico_cache = self._carregar_cache()
@@ -733,7 +659,8 @@ class HistoricoTimemania:
             
             print(f"Historico existente: {len(historico_existente)} concursos")
             
-            concursos_api = self.obter_historico_api()
+            # Busca o que falta até o concurso 1 (os já guardados não são buscados de novo)
+            concursos_api = self.obter_historico_api(prazo, conhecidos=historico_existente)
             
             if concursos_api:
                 concursos_novos = []
@@ -751,26 +678,70 @@ class HistoricoTimemania:
                 
                 historico_completo = sorted(historico_existente.values(), key=lambda x: x.get('concurso', 0))
                 
-                # Limita a 450 concursos máximo
-                LIMITE_CONCURSOS = 450
-                if len(historico_completo) > LIMITE_CONCURSOS:
-                    historico_completo = historico_completo[-LIMITE_CONCURSOS:]
-                    print(f"Limitado aos ultimos {LIMITE_CONCURSOS} concursos")
-                
                 if concursos_novos:
                     print(f"Encontrados {len(concursos_novos)} concursos novos (sem duplicatas)")
                 else:
                     print(f"Total de concursos no historico: {len(historico_completo)}")
                 
-                self.salvar_cache(historico_completo)
+                # Upsert em lote: só grava concursos novos ou alterados
+                if self.usar_banco and self.db:
+                    relatorio = self.db.upsert_concursos(concursos_api)
+                    print(f"Banco: {relatorio['inseridos']} inseridos, {relatorio['atualizados']} atualizados, "
+                          f"{relatorio['inalterados']} inalterados")
+                
+                # Só o que veio nesta atualização vai para o journal; o cache ainda
+                # inexistente recebe uma vez o histórico inteiro (carregado do banco)
+                self.salvar_cache(concursos_api if self.cache.existe() else historico_completo)
                 
                 return historico_completo
         
+        # Tenta carregar do banco primeiro
+        if self.usar_banco and self.db:
+            historico_banco = self._carregar_banco()
+            if historico_banco:
+                return historico_banco
+        
         return self._carregar_cache()
     
+    def _carregar_banco(self) -> List[Dict]:
+        """Carrega histórico do banco de dados (popula o banco a partir do cache na primeira vez)"""
+        try:
+            if self.db:
+                if self.db.contar_concursos() == 0:
+                    cache = self._carregar_cache()
+                    if cache:
+                        relatorio = self.db.upsert_concursos(cache)
+                        print(f"Banco Timemania populado a partir do cache: {relatorio['inseridos']} concursos")
+                
+                matriz = self.db.obter_matriz()
+                if matriz is not None and len(matriz):
+                    self._matriz = matriz
+                    self.historico = matriz.registros
+                    print(f"Carregados {len(matriz)} concursos da Timemania do banco de dados")
+                    return self.historico
+        except Exception as e:
+            print(f"Erro ao carregar do banco: {e}")
+        return []
+    
     def get_historico(self) -> List[Dict]:
-        """Retorna histórico atual"""
+        """Retorna histórico atual (do banco ou cache)"""
         if not self.historico:
+            # Tenta carregar do banco primeiro
+            if self.usar_banco and self.db:
+                historico_banco = self._carregar_banco()
+                if historico_banco:
+                    return historico_banco
+            
+            # Fallback para cache
             self.historico = self._carregar_cache()
         return self.historico
-
+    
+    def get_matriz(self) -> HistoricoMatriz:
+        """
+        Retorna o histórico atual como HistoricoMatriz
+        A matriz só é reconstruída quando o histórico em memória muda
+        """
+        historico = self.get_historico()
+        if self._matriz is None or self._matriz.registros is not historico:
+            self._matriz = HistoricoMatriz.de_historico(historico, 'timemania')
+        return self._matriz
@@ -0,0 +1,276 @@
+"""
+Importador das planilhas oficiais de resultados da Caixa (CSV e XLSX)
+Sem pandas: o CSV é lido linha a linha com o módulo csv e o XLSX direto do
+zip, com iterparse na planilha (cada linha é descartada depois de lida).
+Os concursos saem em lotes para o upsert do banco, sem carregar a planilha
+inteira na memória. Colunas reconhecidas (sem diferenciar acentos/maiúsculas):
+'Concurso', 'Data Sorteio'/'Data', 'Bola1'..'BolaN' (ou 'Dezena1'..), a coluna
+'numeros' do formato antigo (dezenas separadas por vírgula) e, na Timemania,
+'Time Coração'
+"""
+import codecs
+import csv
+import json
+import os
+import re
+import unicodedata
+import zipfile
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from src.matriz import JOGOS
+
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PACOTE = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+COLUNA_BOLA = re.compile(r'^(?:bola|dezena|d)_?(\d+)$')
+# '3.200': ponto como separador de milhar (o XLSX grava 3,2 como '3.2', nunca '3.200')
+MILHAR = re.compile(r'^[+-]?\d{1,3}(?:\.\d{3})+$')
+# Datas do Excel são dias desde 30/12/1899
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+def _normalizar(texto: str) -> str:
+    """'Time Coração' -> 'timecoracao' (sem acentos, espaços e maiúsculas)"""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[\s/.-]+', '', texto.lower())
+
+
+@lru_cache(maxsize=None)
+def _indice_letras(letras: str) -> int:
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - 64)
+    return indice - 1
+
+
+def _indice_coluna(referencia: str) -> int:
+    """'A1' -> 0, 'AB12' -> 27"""
+    return _indice_letras(referencia.rstrip('0123456789'))
+
+
+def _strings_compartilhadas(zf: zipfile.ZipFile) -> List[str]:
+    """Tabela de textos do XLSX (as células de texto guardam só o índice)"""
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ElementTree.iterparse(f):
+            if elem.tag == NS + 'si':
+                strings.append(''.join(t.text or '' for t in elem.iter(NS + 't')))
+                elem.clear()
+    return strings
+
+
+def _primeira_planilha(zf: zipfile.ZipFile) -> str:
+    """Caminho da primeira planilha do workbook dentro do zip"""
+    try:
+        with zf.open('xl/workbook.xml') as f:
+            folha = ElementTree.parse(f).getroot().find(f'{NS}sheets/{NS}sheet')
+        id_relacao = folha.get(NS_REL + 'id')
+        with zf.open('xl/_rels/workbook.xml.rels') as f:
+            for relacao in ElementTree.parse(f).getroot().iter(NS_PACOTE + 'Relationship'):
+                if relacao.get('Id') == id_relacao:
+                    alvo = relacao.get('Target').lstrip('/')
+                    return alvo if alvo.startswith('xl/') else 'xl/' + alvo
+    except (KeyError, AttributeError, ElementTree.ParseError):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _linhas_xlsx(caminho: str) -> Iterator[List[str]]:
+    """Linhas da primeira planilha do XLSX como listas de textos"""
+    celula_tag, linha_tag = NS + 'c', NS + 'row'
+    valor_tag, texto_tag = NS + 'v', NS + 't'
+    with zipfile.ZipFile(caminho) as zf:
+        strings = _strings_compartilhadas(zf)
+        with zf.open(_primeira_planilha(zf)) as f:
+            linha: List[str] = []
+            for _, elem in ElementTree.iterparse(f):
+                tag = elem.tag
+                if tag == celula_tag:
+                    referencia = elem.get('r')
+                    if referencia:
+                        linha.extend([''] * (_indice_coluna(referencia) - len(linha)))
+                    tipo = elem.get('t')
+                    valor = elem.find(valor_tag)
+                    if tipo == 's' and valor is not None:
+                        linha.append(strings[int(valor.text)])
+                    elif tipo == 'inlineStr':
+                        linha.append(''.join(t.text or '' for t in elem.iter(texto_tag)))
+                    else:
+                        linha.append(valor.text or '' if valor is not None else '')
+                    elem.clear()
+                elif tag == linha_tag:
+                    yield linha
+                    linha = []
+                    # Linha lida: só o elemento vazio fica na árvore
+                    elem.clear()
+
+
+def _linhas_csv(caminho: str) -> Iterator[List[str]]:
+    """Linhas do CSV (UTF-8 ou Latin-1; separador ';', ',' ou tabulação)"""
+    with open(caminho, 'rb') as f:
+        amostra = f.read(65536)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+        codificacao = 'utf-8-sig'
+    except UnicodeDecodeError:
+        codificacao = 'latin-1'
+    texto = amostra.decode(codificacao, errors='ignore')
+    try:
+        separador = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=';,\t').delimiter
+    except csv.Error:
+        separador = ';' if ';' in texto else ','
+
+    with open(caminho, 'r', encoding=codificacao, newline='') as f:
+        yield from csv.reader(f, delimiter=separador)
+
+
+def ler_linhas(caminho: str) -> Iterator[List[str]]:
+    """Linhas da planilha (XLSX ou CSV, pela extensão/assinatura do arquivo)"""
+    if caminho.lower().endswith(('.xlsx', '.xlsm')) or zipfile.is_zipfile(caminho):
+        return _linhas_xlsx(caminho)
+    return _linhas_csv(caminho)
+
+
+def _data(valor: str) -> str:
+    """Data da planilha no formato da Caixa (DD/MM/AAAA)"""
+    valor = (valor or '').strip()
+    if not valor:
+        return ''
+    if '/' in valor:
+        return valor
+    try:
+        if '-' in valor:
+            return datetime.strptime(valor[:10], '%Y-%m-%d').strftime('%d/%m/%Y')
+        # Número serial de data do Excel
+        return (EPOCA_EXCEL + timedelta(days=int(float(valor)))).strftime('%d/%m/%Y')
+    except (ValueError, OverflowError):
+        return valor
+
+
+def _inteiro(valor: str) -> Optional[int]:
+    """
+    Inteiro da célula: '3200', '3.200' (milhar) ou '3200.0' (número do XLSX)
+    None para vazio ou valor não inteiro ('3.5', '3,2')
+    """
+    texto = str(valor if valor is not None else '').strip()
+    if MILHAR.match(texto):
+        texto = texto.replace('.', '')
+    try:
+        return int(texto)
+    except ValueError:
+        pass
+    try:
+        numero = float(texto)
+    except ValueError:
+        return None
+    return int(numero) if numero.is_integer() else None
+
+
+class ImportadorResultados:
+    """Lê as planilhas de resultados de um jogo e entrega concursos no formato padrão"""
+
+    def __init__(self, jogo: str):
+        self.jogo = jogo
+        self.menor_numero, self.maior_numero, self.dezenas_sorteadas = JOGOS[jogo]
+        self.invalidos = 0
+
+    def _mapear_cabecalho(self, linha: List[str]) -> Optional[Dict]:
+        """Índices das colunas usadas, ou None se a linha não é o cabeçalho"""
+        colunas = [_normalizar(celula) for celula in linha]
+        if 'concurso' not in colunas:
+            return None
+
+        mapa = {'concurso': colunas.index('concurso'), 'data': None, 'bolas': [], 'numeros': None, 'time': None}
+        bolas = []
+        for indice, coluna in enumerate(colunas):
+            encontrada = COLUNA_BOLA.match(coluna)
+            if encontrada:
+                bolas.append((int(encontrada.group(1)), indice))
+            elif mapa['data'] is None and coluna in ('datasorteio', 'data', 'datadosorteio', 'dataapuracao'):
+                mapa['data'] = indice
+            elif coluna == 'numeros':
+                mapa['numeros'] = indice
+            elif mapa['time'] is None and coluna in ('timecoracao', 'timedocoracao', 'time_coracao'):
+                mapa['time'] = indice
+        mapa['bolas'] = [indice for _, indice in sorted(bolas)]
+        if not mapa['bolas'] and mapa['numeros'] is None:
+            return None
+        return mapa
+
+    def _concurso(self, linha: List[str], mapa: Dict) -> Optional[Dict]:
+        """Converte uma linha da planilha; None para linhas de continuação ou inválidas"""
+        def celula(indice):
+            return linha[indice] if indice is not None and indice < len(linha) else ''
+
+        numero = _inteiro(celula(mapa['concurso']))
+        if not numero:
+            # Linhas extras (ex: cidades dos ganhadores) não têm número de concurso;
+            # um número que não é inteiro ('3.5') é linha inválida
+            if re.search(r'\d', celula(mapa['concurso'])):
+                self.invalidos += 1
+            return None
+
+        if mapa['bolas']:
+            numeros = [_inteiro(celula(indice)) for indice in mapa['bolas']]
+        else:
+            numeros = [_inteiro(parte) for parte in re.split(r'[,;\s-]+', celula(mapa['numeros'])) if parte]
+        numeros = sorted({n for n in numeros if n is not None and self.menor_numero <= n <= self.maior_numero})
+        if len(numeros) != self.dezenas_sorteadas:
+            self.invalidos += 1
+            return None
+
+        concurso = {'concurso': numero, 'numeros': numeros, 'data': _data(celula(mapa['data']))}
+        if self.jogo == 'timemania':
+            concurso['time_coracao'] = celula(mapa['time']).strip()
+        return concurso
+
+    def concursos(self, caminho: str) -> Iterator[Dict]:
+        """Concursos da planilha, na ordem do arquivo"""
+        if caminho.lower().endswith('.json'):
+            # JSON do próprio sistema (lista de concursos já no formato padrão)
+            with open(caminho, 'r', encoding='utf-8') as f:
+                yield from (c for c in json.load(f) if isinstance(c, dict) and c.get('concurso'))
+            return
+
+        mapa = None
+        for linha in ler_linhas(caminho):
+            if mapa is None:
+                mapa = self._mapear_cabecalho(linha)
+                continue
+            concurso = self._concurso(linha, mapa)
+            if concurso:
+                yield concurso
+        if mapa is None:
+            raise ValueError(f"Cabeçalho não encontrado em {os.path.basename(caminho)} (coluna 'Concurso')")
+
+    def lotes(self, caminho: str, tamanho: int = 500) -> Iterator[List[Dict]]:
+        """Concursos da planilha em lotes de até `tamanho`"""
+        lote = []
+        for concurso in self.concursos(caminho):
+            lote.append(concurso)
+            if len(lote) >= tamanho:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def importar(self, caminho: str, gravar: Callable[[List[Dict]], object], tamanho_lote: int = 500) -> Dict:
+        """
+        Lê a planilha em streaming chamando gravar() com cada lote
+        Retorna quantidade de concursos, lotes e linhas inválidas
+        """
+        self.invalidos = 0
+        total = 0
+        lotes = 0
+        for lote in self.lotes(caminho, tamanho_lote):
+            gravar(lote)
+            total += len(lote)
+            lotes += 1
+        return {'concursos': total, 'lotes': lotes, 'invalidos': self.invalidos}
@@ -0,0 +1,85 @@
+"""
+Frequência por janelas de concursos com a soma prefixada da matriz
+(HistoricoMatriz.acumulada): depois de uma passada, a frequência de qualquer
+janela sai em O(R) e a série móvel de uma janela em O(pontos × R), sem varrer
+o histórico de novo. Serve várias janelas de uma vez (últimos N concursos ou
+faixas de concursos) com números quentes e frios de cada uma
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.matriz import HistoricoMatriz
+
+
+def quentes_frios(matriz: HistoricoMatriz, frequencia: np.ndarray, tamanho: int) -> Tuple[List[int], List[int]]:
+    """
+    Números quentes e frios de uma janela de `tamanho` concursos, relativos à
+    frequência esperada (dezenas sorteadas / números do jogo): quente a partir de
+    5/6 do esperado, frio abaixo da metade (na Lotofácil: 50% e 30% da janela,
+    os mesmos limites de AnalisadorLotofacil.numeros_quentes/numeros_frios)
+    """
+    sorteadas, faixa = matriz.dezenas_sorteadas, matriz.matriz.shape[1]
+    limite_quente = tamanho * sorteadas * 5 // (6 * faixa)
+    quentes = (frequencia > 0) & (frequencia >= limite_quente)
+    frios = (frequencia == 0) | (frequencia * 2 * faixa < tamanho * sorteadas)
+    return (matriz.numeros[quentes].tolist(), matriz.numeros[frios].tolist())
+
+
+def resumo_janela(matriz: HistoricoMatriz, inicio: int, fim: int, rotulo: str) -> Dict:
+    """Frequência, quentes e frios das linhas [inicio, fim) do histórico"""
+    frequencia = matriz.frequencia_intervalo(inicio, fim)
+    tamanho = fim - inicio
+    quentes, frios = quentes_frios(matriz, frequencia, tamanho)
+    return {
+        'janela': rotulo,
+        'total_concursos': tamanho,
+        'primeiro_concurso': int(matriz.concursos[inicio]) if tamanho else None,
+        'ultimo_concurso': int(matriz.concursos[fim - 1]) if tamanho else None,
+        'frequencia': dict(zip(matriz.numeros.tolist(), frequencia.tolist())),
+        'numeros_quentes': quentes,
+        'numeros_frios': frios
+    }
+
+
+def serie_janela(matriz: HistoricoMatriz, tamanho: int, pontos: int) -> Dict:
+    """
+    Série móvel da frequência: para cada um dos últimos `pontos` concursos, quantas
+    vezes cada número saiu nos `tamanho` concursos terminados nele
+    """
+    total = len(matriz)
+    tamanho = min(tamanho, total)
+    if not tamanho or pontos <= 0:
+        return {'concursos': [], 'frequencia': {}}
+    fins = np.arange(max(tamanho, total - pontos + 1), total + 1)
+    acumulada = matriz.acumulada
+    serie = (acumulada[fins] - acumulada[fins - tamanho]).T
+    return {
+        'concursos': matriz.concursos[fins - 1].tolist(),
+        'frequencia': dict(zip(matriz.numeros.tolist(), serie.tolist()))
+    }
+
+
+def frequencia_janelas(matriz: HistoricoMatriz, tamanhos: Sequence[int] = (),
+                       faixas: Sequence[Tuple[Optional[int], Optional[int]]] = (),
+                       pontos_serie: int = 0) -> Dict:
+    """
+    Frequência, quentes e frios de várias janelas de uma vez
+    tamanhos: janelas com os últimos N concursos (com série móvel se pontos_serie > 0)
+    faixas: janelas por número de concurso (primeiro, ultimo), inclusive
+    """
+    total = len(matriz)
+    janelas = []
+    for tamanho in tamanhos:
+        resumo = resumo_janela(matriz, max(0, total - tamanho), total, str(tamanho))
+        if pontos_serie > 0:
+            resumo['serie'] = serie_janela(matriz, tamanho, pontos_serie)
+        janelas.append(resumo)
+    for primeiro, ultimo in faixas:
+        inicio, fim = matriz.linhas_concursos(primeiro, ultimo)
+        rotulo = f"{primeiro if primeiro is not None else ''}-{ultimo if ultimo is not None else ''}"
+        janelas.append(resumo_janela(matriz, inicio, fim, rotulo))
+    return {
+        'total_concursos': total,
+        'janelas': janelas
+    }
@@ -0,0 +1,157 @@
+"""
+Limitador de taxa por host com concorrência adaptativa
+Token bucket para a taxa de requisições e um limite de requisições simultâneas
+que cresce enquanto a fonte responde bem e cai pela metade quando ela
+sinaliza sobrecarga (429, 502-504, timeout), respeitando o Retry-After
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+# Respostas que indicam que a fonte está sobrecarregada ou limitando o cliente
+# (500 fica de fora: algumas fontes respondem 500 para concurso inexistente);
+# o circuit breaker das fontes (src/fontes.py) usa a mesma regra
+STATUS_SOBRECARGA = (429, 502, 503, 504)
+
+
+def ler_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos de espera"""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorHost:
+    """
+    Token bucket + concorrência adaptativa (AIMD) para um host
+    Sucesso: taxa e concorrência sobem aos poucos (aumento aditivo)
+    Sobrecarga: concorrência (ou taxa, se já for 1) cai pela metade (redução multiplicativa)
+    """
+
+    def __init__(self, taxa: float = 20.0, taxa_min: float = 0.5, taxa_max: float = 200.0,
+                 concorrencia: int = 8, concorrencia_max: int = 32, rajada: float = 10.0):
+        self.taxa = taxa
+        self.taxa_min = taxa_min
+        self.taxa_max = taxa_max
+        self.concorrencia = concorrencia
+        self.concorrencia_max = concorrencia_max
+        self.rajada = rajada
+
+        self._condicao = threading.Condition()
+        self._tokens = rajada
+        self._atualizado_em = time.monotonic()
+        self._pausado_ate = 0.0
+        self._reduzido_em = 0.0
+        self._em_andamento = 0
+        self._sucessos_seguidos = 0
+
+        self.requisicoes = 0
+        self.sucessos = 0
+        self.erros = {'sobrecarga': 0, 'timeout': 0, 'outros': 0}
+        self.latencia_media = 0.0
+
+    def _repor_tokens(self, agora: float):
+        self._tokens = min(self.rajada, self._tokens + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+    def adquirir(self):
+        """Bloqueia até haver token, vaga de concorrência e nenhuma pausa (Retry-After) ativa"""
+        with self._condicao:
+            while True:
+                agora = time.monotonic()
+                self._repor_tokens(agora)
+                espera = self._pausado_ate - agora
+                if espera <= 0 and self._em_andamento < self.concorrencia:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._em_andamento += 1
+                        self.requisicoes += 1
+                        return
+                    espera = (1 - self._tokens) / self.taxa
+                elif espera <= 0:
+                    espera = None  # Aguarda uma requisição em andamento terminar
+                self._condicao.wait(espera)
+
+    def liberar(self, status: Optional[int] = None, timeout: bool = False,
+                retry_after: Optional[float] = None, latencia: Optional[float] = None):
+        """Registra o resultado da requisição e ajusta taxa/concorrência"""
+        with self._condicao:
+            self._em_andamento -= 1
+            if latencia is not None:
+                self.latencia_media = latencia if not self.latencia_media else 0.8 * self.latencia_media + 0.2 * latencia
+
+            if timeout or status in STATUS_SOBRECARGA:
+                self.erros['timeout' if timeout else 'sobrecarga'] += 1
+                self._sucessos_seguidos = 0
+                agora = time.monotonic()
+                # Só requisições enviadas depois da última redução reduzem de novo
+                # (as que já estavam em curso refletem a concorrência antiga)
+                if agora - (latencia or 0.0) >= self._reduzido_em:
+                    self._reduzido_em = agora
+                    # Reduz a concorrência primeiro; com uma requisição por vez e ainda
+                    # sobrecarregada, a fonte limita por taxa e a taxa cai pela metade
+                    if self.concorrencia > 1:
+                        self.concorrencia = max(1, self.concorrencia // 2)
+                    else:
+                        self.taxa = max(self.taxa_min, self.taxa / 2)
+                    self._tokens = min(self._tokens, 0)
+                if retry_after:
+                    self._pausado_ate = max(self._pausado_ate, agora + retry_after)
+            elif status is None:
+                self.erros['outros'] += 1
+            else:
+                self.sucessos += 1
+                self._sucessos_seguidos += 1
+                self.taxa = min(self.taxa_max, self.taxa + 1)
+                # Uma vaga a mais a cada "concorrencia" sucessos seguidos
+                if self._sucessos_seguidos >= self.concorrencia and self.concorrencia < self.concorrencia_max:
+                    self.concorrencia += 1
+                    self._sucessos_seguidos = 0
+            self._condicao.notify_all()
+
+    def metricas(self) -> Dict:
+        """Taxa, concorrência e contadores atuais"""
+        with self._condicao:
+            pausa = max(0.0, self._pausado_ate - time.monotonic())
+            return {
+                'taxa_por_segundo': round(self.taxa, 2),
+                'concorrencia': self.concorrencia,
+                'em_andamento': self._em_andamento,
+                'requisicoes': self.requisicoes,
+                'sucessos': self.sucessos,
+                'erros': dict(self.erros),
+                'taxa_erro': round(sum(self.erros.values()) / self.requisicoes, 4) if self.requisicoes else 0.0,
+                'latencia_media_ms': round(self.latencia_media * 1000, 1),
+                'pausado_por_s': round(pausa, 2)
+            }
+
+
+_lock = threading.Lock()
+_limitadores: Dict[str, LimitadorHost] = {}
+
+
+def limitador_para(url: str) -> LimitadorHost:
+    """Limitador compartilhado do host da URL (criado na primeira requisição)"""
+    host = urlsplit(url).netloc
+    limitador = _limitadores.get(host)
+    if limitador is None:
+        with _lock:
+            limitador = _limitadores.setdefault(host, LimitadorHost())
+    return limitador
+
+
+def metricas_limitadores() -> Dict[str, Dict]:
+    """Métricas de todos os hosts já usados"""
+    with _lock:
+        limitadores = dict(_limitadores)
+    return {host: limitador.metricas() for host, limitador in limitadores.items()}
@@ -0,0 +1,503 @@
+"""
+Módulo com a representação colunar (NumPy) do histórico de concursos
+"""
+import calendar
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+
+# Faixa de números de cada jogo: (menor número, maior número, dezenas sorteadas)
+JOGOS = {
+    'lotofacil': (1, 25, 15),
+    'timemania': (1, 80, 7),
+    'lotomania': (0, 99, 20),
+}
+
+# Campos além de concurso/numeros/data preservados por jogo
+CAMPOS_EXTRAS = {
+    'lotofacil': (),
+    'timemania': ('time_coracao',),
+    'lotomania': (),
+}
+
+# Janela de análise: None (histórico inteiro), int (últimos N concursos)
+# ou tupla (data inicial, data final) em 'DD/MM/AAAA' ou 'AAAA-MM-DD'
+Janela = Union[None, int, Tuple[Optional[str], Optional[str]]]
+
+
+def decompor_data(data: str) -> Optional[Tuple[int, int, int]]:
+    """
+    (ano, mês, dia) de 'DD/MM/AAAA' (formato da Caixa) ou 'AAAA-MM-DD'
+    None se vazia ou inválida, inclusive datas inexistentes como 31/02
+    """
+    if not data:
+        return None
+    texto = str(data).strip()[:10]
+    # Caminho rápido para o formato da Caixa (strptime é caro em históricos grandes)
+    if len(texto) == 10 and texto[2] == '/' and texto[5] == '/':
+        dia, mes, ano = texto[:2], texto[3:5], texto[6:]
+        if dia.isdigit() and mes.isdigit() and ano.isdigit():
+            dia, mes, ano = int(dia), int(mes), int(ano)
+            if ano >= 1 and 1 <= mes <= 12 and 1 <= dia <= calendar.monthrange(ano, mes)[1]:
+                return ano, mes, dia
+            return None
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            dt = datetime.strptime(texto, formato)
+            return dt.year, dt.month, dt.day
+        except ValueError:
+            continue
+    return None
+
+
+def data_para_inteiro(data: str) -> int:
+    """Converte 'DD/MM/AAAA' (ou 'AAAA-MM-DD') para o inteiro AAAAMMDD (0 se vazia/inválida)"""
+    partes = decompor_data(data)
+    if partes is None:
+        return 0
+    ano, mes, dia = partes
+    return ano * 10000 + mes * 100 + dia
+
+
+def na_janela(janela: Janela, data: str) -> bool:
+    """Se um concurso com essa data entra na janela (só janelas por período filtram)"""
+    if not isinstance(janela, (tuple, list)):
+        return True
+    inicio, fim = janela
+    valor = data_para_inteiro(data)
+    return (not inicio or valor >= data_para_inteiro(inicio)) and (not fim or valor <= data_para_inteiro(fim))
+
+
+class HistoricoMatriz:
+    """
+    Histórico de concursos como uma matriz N×R de 0/1 (uint8)
+    Linha i = i-ésimo concurso (ordem crescente), coluna j = número (menor_numero + j)
+    Frequência, atraso e acertos viram operações vetoriais sobre a matriz
+    """
+
+    def __init__(self, matriz: np.ndarray, concursos: np.ndarray, datas: List[str],
+                 jogo: str, extras: Optional[Dict[str, List]] = None,
+                 registros: Optional[List[Dict]] = None,
+                 datas_inteiras: Optional[np.ndarray] = None,
+                 acumulada: Optional[np.ndarray] = None):
+        self.matriz = matriz
+        self.concursos = concursos
+        self.datas = datas
+        self.jogo = jogo
+        self.menor_numero, self.maior_numero, self.dezenas_sorteadas = JOGOS[jogo]
+        self.extras = extras or {}
+        self._registros = registros
+        self._datas_inteiras = datas_inteiras
+        self._acumulada = acumulada
+        # Buffers próprios de adicionar()/remover_primeiro(): linhas [_inicio, _fim) em uso
+        self._buffer: Optional[np.ndarray] = None
+        self._buffer_concursos: Optional[np.ndarray] = None
+        self._buffer_datas: Optional[np.ndarray] = None
+        self._buffer_acumulada: Optional[np.ndarray] = None
+        self._inicio = 0
+        self._fim = 0
+
+    @classmethod
+    def de_historico(cls, historico: List[Dict], jogo: str) -> 'HistoricoMatriz':
+        """Constrói a matriz a partir da lista de concursos (formato de get_historico)"""
+        menor, maior, _ = JOGOS[jogo]
+        total = len(historico)
+        matriz = np.zeros((total, maior - menor + 1), dtype=np.uint8)
+
+        linhas = []
+        colunas = []
+        for idx, concurso in enumerate(historico):
+            numeros = concurso.get('numeros', [])
+            linhas.extend([idx] * len(numeros))
+            colunas.extend(numeros)
+
+        if colunas:
+            linhas = np.asarray(linhas, dtype=np.int64)
+            colunas = np.asarray(colunas, dtype=np.int64) - menor
+            # Ignora números fora da faixa do jogo
+            validos = (colunas >= 0) & (colunas < matriz.shape[1])
+            matriz[linhas[validos], colunas[validos]] = 1
+
+        concursos = np.fromiter((c.get('concurso', 0) for c in historico), dtype=np.int64, count=total)
+        datas = [c.get('data', '') or '' for c in historico]
+        extras = {
+            campo: [c.get(campo, '') or '' for c in historico]
+            for campo in CAMPOS_EXTRAS[jogo]
+        }
+        return cls(matriz, concursos, datas, jogo, extras, registros=historico)
+
+    def __len__(self) -> int:
+        return self.matriz.shape[0]
+
+    @property
+    def numeros(self) -> np.ndarray:
+        """Números do jogo na ordem das colunas"""
+        return np.arange(self.menor_numero, self.maior_numero + 1)
+
+    @property
+    def registros(self) -> List[Dict]:
+        """Histórico no formato de lista de dicionários (gerado sob demanda)"""
+        if self._registros is None:
+            # Um único nonzero na matriz inteira, fatiado por concurso
+            _, colunas = np.nonzero(self.matriz)
+            numeros = (colunas + self.menor_numero).tolist()
+            fins = np.cumsum(self.quantidade_por_concurso()).tolist()
+            concursos = self.concursos.tolist()
+            registros = []
+            inicio = 0
+            for idx, fim in enumerate(fins):
+                registro = {'concurso': concursos[idx], 'numeros': numeros[inicio:fim], 'data': self.datas[idx]}
+                for campo, valores in self.extras.items():
+                    registro[campo] = valores[idx]
+                registros.append(registro)
+                inicio = fim
+            self._registros = registros
+        return self._registros
+
+    @property
+    def datas_inteiras(self) -> np.ndarray:
+        """Datas como inteiros AAAAMMDD (0 quando ausente), calculadas uma única vez"""
+        if self._datas_inteiras is None:
+            self._datas_inteiras = np.fromiter(
+                (data_para_inteiro(d) for d in self.datas), dtype=np.int64, count=len(self.datas)
+            )
+        return self._datas_inteiras
+
+    @property
+    def acumulada(self) -> np.ndarray:
+        """
+        Soma prefixada da matriz ((N+1)×R): acumulada[b] - acumulada[a] é a frequência
+        de cada número nas linhas [a, b). Calculada uma vez e mantida por adicionar()
+        e remover_primeiro(); só as diferenças entre linhas têm significado
+        """
+        if self._acumulada is None:
+            total, largura = self.matriz.shape
+            acumulada = np.zeros((total + 1, largura), dtype=np.int32)
+            np.cumsum(self.matriz, axis=0, dtype=np.int32, out=acumulada[1:])
+            self._acumulada = acumulada
+        return self._acumulada
+
+    def frequencia_intervalo(self, inicio: int, fim: Optional[int] = None) -> np.ndarray:
+        """Frequência de cada número nas linhas [inicio, fim) em O(R), pela soma prefixada"""
+        inicio, fim, _ = slice(inicio, fim).indices(len(self))
+        acumulada = self.acumulada
+        return (acumulada[max(inicio, fim)] - acumulada[inicio]).astype(np.int64)
+
+    def linhas_concursos(self, primeiro: Optional[int] = None, ultimo: Optional[int] = None) -> Tuple[int, int]:
+        """Linhas [inicio, fim) dos concursos de primeiro a ultimo (inclusive; limite vazio não restringe)"""
+        inicio = int(np.searchsorted(self.concursos, primeiro, side='left')) if primeiro is not None else 0
+        fim = int(np.searchsorted(self.concursos, ultimo, side='right')) if ultimo is not None else len(self)
+        return inicio, max(inicio, fim)
+
+    def concurso(self, idx: int) -> Dict:
+        """Concurso da linha idx no formato padrão de dicionário"""
+        registro = {
+            'concurso': int(self.concursos[idx]),
+            'numeros': (np.flatnonzero(self.matriz[idx]) + self.menor_numero).tolist(),
+            'data': self.datas[idx]
+        }
+        for campo, valores in self.extras.items():
+            registro[campo] = valores[idx]
+        return registro
+
+    def colunas(self, numeros: List[int]) -> np.ndarray:
+        """Índices de coluna dos números informados (ignora números fora da faixa)"""
+        idx = np.asarray(list(numeros), dtype=np.int64) - self.menor_numero
+        return idx[(idx >= 0) & (idx < self.matriz.shape[1])]
+
+    def fatia(self, inicio: int, fim: Optional[int] = None) -> 'HistoricoMatriz':
+        """Sub-histórico das linhas [inicio, fim) sem copiar a matriz"""
+        inicio, fim, _ = slice(inicio, fim).indices(len(self))
+        fim = max(inicio, fim)
+        registros = self._registros[inicio:fim] if self._registros is not None else None
+        extras = {campo: valores[inicio:fim] for campo, valores in self.extras.items()}
+        datas_inteiras = self._datas_inteiras[inicio:fim] if self._datas_inteiras is not None else None
+        acumulada = self._acumulada[inicio:fim + 1] if self._acumulada is not None else None
+        return HistoricoMatriz(self.matriz[inicio:fim], self.concursos[inicio:fim],
+                               self.datas[inicio:fim], self.jogo, extras, registros, datas_inteiras, acumulada)
+
+    def _selecionar(self, indices: np.ndarray) -> 'HistoricoMatriz':
+        """Sub-histórico das linhas informadas (copia a matriz se não forem contíguas)"""
+        if len(indices) == 0:
+            return self.fatia(len(self))
+        inicio, fim = int(indices[0]), int(indices[-1]) + 1
+        if fim - inicio == len(indices):
+            return self.fatia(inicio, fim)
+        lista = indices.tolist()
+        registros = [self._registros[i] for i in lista] if self._registros is not None else None
+        extras = {campo: [valores[i] for i in lista] for campo, valores in self.extras.items()}
+        return HistoricoMatriz(self.matriz[indices], self.concursos[indices],
+                               [self.datas[i] for i in lista], self.jogo, extras, registros,
+                               self.datas_inteiras[indices])
+
+    def ultimos(self, quantidade: int) -> 'HistoricoMatriz':
+        """Sub-histórico com os últimos N concursos"""
+        if quantidade <= 0:
+            return self.fatia(len(self))
+        return self.fatia(max(0, len(self) - quantidade))
+
+    def periodo(self, inicio: Optional[str] = None, fim: Optional[str] = None) -> 'HistoricoMatriz':
+        """
+        Sub-histórico dos concursos com data entre inicio e fim (inclusive)
+        Datas em 'DD/MM/AAAA' ou 'AAAA-MM-DD'; limite vazio não restringe
+        """
+        datas = self.datas_inteiras
+        selecionados = np.ones(len(datas), dtype=bool)
+        if inicio:
+            selecionados &= datas >= data_para_inteiro(inicio)
+        if fim:
+            selecionados &= datas <= data_para_inteiro(fim)
+        return self._selecionar(np.flatnonzero(selecionados))
+
+    def janela(self, janela: Janela = None) -> 'HistoricoMatriz':
+        """
+        Aplica a janela de análise: None (ou N <= 0) = histórico inteiro (sem cópia),
+        int = últimos N concursos (view), (inicio, fim) = período por data
+        """
+        if janela is None:
+            return self
+        if isinstance(janela, (tuple, list)):
+            inicio, fim = janela
+            return self.periodo(inicio, fim)
+        if int(janela) <= 0:
+            return self
+        return self.ultimos(int(janela))
+
+    def _crescer(self, capacidade: int):
+        """
+        Copia o histórico para buffers próprios com espaço para `capacidade` concursos
+        (as listas também são copiadas: nada do que foi recebido no construtor é alterado)
+        """
+        total, largura = self.matriz.shape
+        self._buffer = np.zeros((capacidade, largura), dtype=np.uint8)
+        self._buffer[:total] = self.matriz
+        self._buffer_concursos = np.zeros(capacidade, dtype=np.int64)
+        self._buffer_concursos[:total] = self.concursos
+        self._buffer_datas = None
+        if self._datas_inteiras is not None:
+            self._buffer_datas = np.zeros(capacidade, dtype=np.int64)
+            self._buffer_datas[:total] = self._datas_inteiras
+        self._buffer_acumulada = None
+        if self._acumulada is not None:
+            self._buffer_acumulada = np.zeros((capacidade + 1, largura), dtype=np.int32)
+            self._buffer_acumulada[:total + 1] = self._acumulada - self._acumulada[0]
+        self._inicio, self._fim = 0, total
+        self.datas = list(self.datas)
+        self.extras = {campo: list(valores) for campo, valores in self.extras.items()}
+        if self._registros is not None:
+            self._registros = self._registros[:total]
+
+    def _preparar_derivados(self):
+        """Leva para os buffers as datas inteiras e a soma prefixada calculadas depois do último crescimento"""
+        if self._datas_inteiras is not None and self._buffer_datas is None:
+            self._buffer_datas = np.zeros(len(self._buffer), dtype=np.int64)
+            self._buffer_datas[self._inicio:self._fim] = self._datas_inteiras
+        if self._acumulada is not None and self._buffer_acumulada is None:
+            self._buffer_acumulada = np.zeros((len(self._buffer) + 1, self._buffer.shape[1]), dtype=np.int32)
+            self._buffer_acumulada[self._inicio:self._fim + 1] = self._acumulada
+
+    def _atualizar_vistas(self):
+        self.matriz = self._buffer[self._inicio:self._fim]
+        self.concursos = self._buffer_concursos[self._inicio:self._fim]
+        if self._buffer_datas is not None:
+            self._datas_inteiras = self._buffer_datas[self._inicio:self._fim]
+        if self._buffer_acumulada is not None:
+            self._acumulada = self._buffer_acumulada[self._inicio:self._fim + 1]
+
+    def adicionar(self, concurso: Dict):
+        """
+        Acrescenta um concurso no fim do histórico, no lugar (O(dezenas) amortizado:
+        a capacidade dobra quando o buffer enche). Fatias já tiradas não mudam
+        """
+        total = len(self)
+        if self._buffer is None or self._fim == len(self._buffer):
+            self._crescer(max(16, 2 * total))
+        self._preparar_derivados()
+
+        colunas = np.unique(self.colunas(concurso.get('numeros', [])))
+        linha = self._fim
+        self._buffer[linha] = 0
+        self._buffer[linha, colunas] = 1
+        self._buffer_concursos[linha] = concurso.get('concurso', 0)
+        data = concurso.get('data', '') or ''
+        if self._buffer_datas is not None:
+            self._buffer_datas[linha] = data_para_inteiro(data)
+        if self._buffer_acumulada is not None:
+            self._buffer_acumulada[linha + 1] = self._buffer_acumulada[linha] + self._buffer[linha]
+        self._fim += 1
+        self._atualizar_vistas()
+
+        self.datas.append(data)
+        registro = {'concurso': int(self._buffer_concursos[linha]),
+                    'numeros': (colunas + self.menor_numero).tolist(), 'data': data}
+        for campo in CAMPOS_EXTRAS[self.jogo]:
+            registro[campo] = concurso.get(campo, '') or ''
+            self.extras.setdefault(campo, [''] * total).append(registro[campo])
+        if self._registros is not None:
+            self._registros.append(registro)
+
+    def remover_primeiro(self) -> Optional[Dict]:
+        """Remove o concurso mais antigo do histórico, no lugar (janelas deslizantes)"""
+        if not len(self):
+            return None
+        concurso = self.concurso(0)
+        if self._buffer is None:
+            self._crescer(len(self))
+        self._preparar_derivados()
+        self._inicio += 1
+        self._atualizar_vistas()
+        del self.datas[0]
+        for valores in self.extras.values():
+            del valores[0]
+        if self._registros is not None:
+            del self._registros[0]
+        return concurso
+
+    def frequencia(self) -> np.ndarray:
+        """Quantidade de vezes que cada número foi sorteado (vetor de R posições)"""
+        return self.matriz.sum(axis=0, dtype=np.int64)
+
+    def ultima_aparicao(self) -> np.ndarray:
+        """Índice da última linha em que cada número saiu (-1 se nunca saiu)"""
+        total = len(self)
+        if total == 0:
+            return np.full(self.matriz.shape[1], -1, dtype=np.int64)
+        invertida = self.matriz[::-1]
+        ultima = total - 1 - invertida.argmax(axis=0)
+        return np.where(invertida.any(axis=0), ultima, -1)
+
+    def primeira_aparicao(self) -> np.ndarray:
+        """
+        Índice da primeira linha em que cada número saiu (-1 se nunca saiu)
+        Varre do começo em blocos crescentes até achar todos (em geral só o início é lido)
+        """
+        primeira = np.full(self.matriz.shape[1], -1, dtype=np.int64)
+        faltam = np.ones(self.matriz.shape[1], dtype=bool)
+        inicio = 0
+        bloco = 64
+        while inicio < len(self) and faltam.any():
+            trecho = self.matriz[inicio:inicio + bloco]
+            achou = faltam & trecho.any(axis=0)
+            primeira[achou] = inicio + trecho.argmax(axis=0)[achou]
+            faltam &= ~achou
+            inicio += bloco
+            bloco *= 2
+        return primeira
+
+    def por_primeira_aparicao(self, valores: Union[np.ndarray, Dict[int, int]]) -> Dict[int, int]:
+        """
+        {número: valor} dos números que já saíram, na ordem em que apareceram pela
+        primeira vez (no mesmo concurso, do menor para o maior): a ordem do Counter
+        percorrendo o histórico, que decide os empates de mais/menos sorteados
+        valores: vetor por coluna ou dicionário por número
+        """
+        primeira = self.primeira_aparicao()
+        colunas = np.flatnonzero(primeira >= 0)
+        colunas = colunas[np.argsort(primeira[colunas], kind='stable')]
+        numeros = (colunas + self.menor_numero).tolist()
+        if isinstance(valores, dict):
+            return {numero: valores[numero] for numero in numeros if numero in valores}
+        return {numero: int(valor) for numero, valor in zip(numeros, valores[colunas].tolist())}
+
+    def atraso(self) -> np.ndarray:
+        """Concursos desde a última aparição de cada número (N se nunca saiu)"""
+        total = len(self)
+        ultima = self.ultima_aparicao()
+        return np.where(ultima >= 0, total - 1 - ultima, total)
+
+    def histograma_intervalos(self) -> List[Dict[int, int]]:
+        """
+        Para cada coluna, quantas vezes o número voltou a sair após k concursos
+        (intervalo medido pelo número do concurso). Ex: [{1: 120, 2: 60, ...}, ...]
+        """
+        return self.estatisticas(recentes=0)['histogramas']
+
+    def estatisticas(self, recentes: int = 10, intervalos: bool = True) -> Dict:
+        """
+        Agregados do histórico com uma única passada pela matriz: frequência,
+        última aparição, atraso, frequência nos últimos `recentes` concursos e,
+        se pedido, histograma de intervalos de cada número (mesmos valores de
+        frequencia(), ultima_aparicao(), atraso() e histograma_intervalos())
+        """
+        total, largura = self.matriz.shape
+        recentes = max(0, min(recentes, total))
+        histogramas: Optional[List[Dict[int, int]]] = None
+
+        if intervalos:
+            # A passada é pela transposta contígua (uma linha por número): posições de cada
+            # número dão frequência, última aparição e intervalos de uma vez
+            frequencia = np.zeros(largura, dtype=np.int64)
+            ultima = np.full(largura, -1, dtype=np.int64)
+            histogramas = []
+            for coluna, linha in enumerate(np.ascontiguousarray(self.matriz.T)):
+                posicoes = np.flatnonzero(linha)
+                frequencia[coluna] = len(posicoes)
+                if len(posicoes):
+                    ultima[coluna] = posicoes[-1]
+                histogramas.append(self._histograma(np.diff(self.concursos[posicoes])))
+        else:
+            frequencia = self.matriz.sum(axis=0, dtype=np.int64)
+            ultima = self._ultima_aparicao_recente(frequencia > 0)
+
+        return {
+            'total': total,
+            'frequencia': frequencia,
+            'ultima_aparicao': ultima,
+            'atraso': np.where(ultima >= 0, total - 1 - ultima, total),
+            'recentes': recentes,
+            'frequencia_recente': self.matriz[total - recentes:].sum(axis=0, dtype=np.int64),
+            'histogramas': histogramas
+        }
+
+    def _ultima_aparicao_recente(self, procurar: np.ndarray) -> np.ndarray:
+        """
+        Última aparição varrendo a matriz do fim para o começo em blocos crescentes
+        até achar todas as colunas de `procurar` (só o final do histórico é lido)
+        """
+        ultima = np.full(self.matriz.shape[1], -1, dtype=np.int64)
+        faltam = procurar.copy()
+        fim = len(self)
+        bloco = 64
+        while fim > 0 and faltam.any():
+            inicio = max(0, fim - bloco)
+            invertido = self.matriz[inicio:fim][::-1]
+            achou = faltam & invertido.any(axis=0)
+            ultima[achou] = fim - 1 - invertido.argmax(axis=0)[achou]
+            faltam &= ~achou
+            fim = inicio
+            bloco *= 2
+        return ultima
+
+    @staticmethod
+    def _histograma(intervalos: np.ndarray) -> Dict[int, int]:
+        """{intervalo: quantidade} em ordem crescente (bincount quando a faixa é pequena)"""
+        if not len(intervalos):
+            return {}
+        menor = int(intervalos.min())
+        if int(intervalos.max()) - menor <= 4 * len(intervalos) + 1024:
+            contagens = np.bincount(intervalos - menor)
+            valores = np.flatnonzero(contagens)
+            return dict(zip((valores + menor).tolist(), contagens[valores].tolist()))
+        valores, contagens = np.unique(intervalos, return_counts=True)
+        return dict(zip(valores.tolist(), contagens.tolist()))
+
+    def contagem_por_concurso(self, numeros: List[int]) -> np.ndarray:
+        """Quantos dos números informados saíram em cada concurso (vetor de N posições)"""
+        return self.matriz[:, self.colunas(numeros)].sum(axis=1, dtype=np.int64)
+
+    def acertos(self, jogo: List[int]) -> np.ndarray:
+        """Acertos do jogo em cada concurso do histórico"""
+        return self.contagem_por_concurso(jogo)
+
+    def quantidade_por_concurso(self) -> np.ndarray:
+        """Quantidade de dezenas registradas em cada concurso"""
+        return self.matriz.sum(axis=1, dtype=np.int64)
+
+
+def como_matriz(historico: Union[List[Dict], HistoricoMatriz], jogo: str) -> HistoricoMatriz:
+    """Aceita lista de concursos ou HistoricoMatriz e devolve sempre a matriz"""
+    if isinstance(historico, HistoricoMatriz):
+        return historico
+    return HistoricoMatriz.de_historico(historico or [], jogo)
@@ -0,0 +1,330 @@
+"""
+Servidor HTTP local de fixtures das fontes de resultados (gravar/reproduzir)
+Responde no formato <base>/<fonte>/<caminho> (o mesmo de LOTERIAS_URL_BASE,
+src/urls.py) com respostas gravadas em um arquivo NDJSON. No modo gravação os
+caminhos desconhecidos são buscados na fonte real e guardados no arquivo.
+Injeta latência (fixa + variação + cauda lenta em uma fração das requisições,
+opcionalmente só em uma fonte), erros (503) e limitação (429 acima de N
+requisições simultâneas ou de uma taxa por segundo), com sorteio reproduzível.
+
+Uso: python -m src.servidor_fixtures --arquivo data/fixtures/respostas.ndjson --gravar
+     LOTERIAS_URL_BASE=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple, Union
+
+from src.matriz import JOGOS
+from src.urls import FONTES
+
+
+# Tokens de acesso não vão para o arquivo de fixtures
+TOKEN = re.compile(r'(token=)[^&]*')
+
+
+def _chave(caminho: str) -> str:
+    return TOKEN.sub(r'\1', caminho)
+
+
+class FixturesHTTP:
+    """Respostas gravadas: caminho -> (status, content-type, corpo)"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho
+        self.respostas: Dict[str, Tuple[int, str, bytes]] = {}
+        self._lock = threading.Lock()
+        if caminho and os.path.exists(caminho):
+            self.carregar(caminho)
+
+    def __len__(self) -> int:
+        return len(self.respostas)
+
+    def carregar(self, caminho: str):
+        """Lê um arquivo NDJSON de respostas (ignora linhas inválidas)"""
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                    self.adicionar(entrada['caminho'], entrada['status'], entrada['corpo'], entrada.get('tipo'))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def salvar(self, caminho: Optional[str] = None):
+        """Grava todas as respostas em NDJSON (uma por linha, em ordem de caminho)"""
+        caminho = caminho or self.caminho
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with self._lock:
+            respostas = sorted(self.respostas.items())
+        with open(caminho, 'w', encoding='utf-8') as f:
+            for chave, (status, tipo, corpo) in respostas:
+                f.write(json.dumps({'caminho': chave, 'status': status, 'tipo': tipo,
+                                    'corpo': corpo.decode('utf-8', errors='replace')},
+                                   ensure_ascii=False) + '\n')
+
+    def adicionar(self, caminho: str, status: int, corpo: Union[bytes, str, Dict, list],
+                  tipo: Optional[str] = None):
+        if isinstance(corpo, (dict, list)):
+            corpo = json.dumps(corpo, ensure_ascii=False)
+        if isinstance(corpo, str):
+            corpo = corpo.encode('utf-8')
+        with self._lock:
+            self.respostas[_chave(caminho)] = (status, tipo or 'application/json', corpo)
+
+    def obter(self, caminho: str) -> Optional[Tuple[int, str, bytes]]:
+        return self.respostas.get(_chave(caminho))
+
+    @classmethod
+    def sinteticas(cls, concursos: Dict[str, int], semente: int = 0,
+                   fontes: Tuple[str, ...] = ('caixa',)) -> 'FixturesHTTP':
+        """
+        Fixtures geradas no formato da API da Caixa: /<fonte>/<jogo>/<numero> para
+        os concursos 1..N de cada jogo e /<fonte>/<jogo> com o último concurso,
+        com o mesmo corpo em cada uma das fontes pedidas
+        """
+        fixtures = cls()
+        for jogo, total in concursos.items():
+            menor, maior, dezenas = JOGOS[jogo]
+            gerador = random.Random(f'{semente}-{jogo}')
+            corpo = None
+            for numero in range(1, total + 1):
+                corpo = {
+                    'numero': numero,
+                    'dataApuracao': f"{(numero % 28) + 1:02d}/{(numero % 12) + 1:02d}/{2000 + numero // 156}",
+                    'listaDezenas': [f"{n:02d}" for n in sorted(gerador.sample(range(menor, maior + 1), dezenas))]
+                }
+                if jogo == 'timemania':
+                    corpo['nomeTimeCoracaoMesSorte'] = gerador.choice(['FLAMENGO/RJ', 'BAHIA/BA', 'GREMIO/RS'])
+                for fonte in fontes:
+                    fixtures.adicionar(f'/{fonte}/{jogo}/{numero}', 200, corpo)
+            if corpo is not None:
+                for fonte in fontes:
+                    fixtures.adicionar(f'/{fonte}/{jogo}', 200, corpo)
+        return fixtures
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre requisições (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    # Sem Nagle: cabeçalho e corpo saem juntos (senão o ACK atrasado soma ~40 ms por resposta)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        self.server.fixtures_servidor._contar('conexoes')
+        super().setup()
+
+    def do_GET(self):
+        self.server.fixtures_servidor._atender(self)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    """Fila de conexões maior que o padrão (5), para não recusar rajadas"""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class ServidorFixtures:
+    """Servidor local que reproduz (ou grava) respostas das fontes com falhas injetadas"""
+
+    def __init__(self, fixtures: FixturesHTTP, latencia: float = 0.0, variacao: float = 0.0,
+                 cauda: float = 0.0, taxa_cauda: float = 0.0, fonte_cauda: Optional[str] = None,
+                 taxa_erro: float = 0.0, max_simultaneas: Optional[int] = None,
+                 taxa_por_segundo: Optional[float] = None, retry_after: Optional[int] = None,
+                 gravar: bool = False, semente: int = 0, host: str = '127.0.0.1', porta: int = 0):
+        """
+        latencia/variacao: segundos de espera por resposta (fixa + uniforme em [0, variacao])
+        cauda/taxa_cauda: segundos a mais em uma fração das respostas (só da fonte_cauda, se dada)
+        taxa_erro: fração das requisições respondidas com 503
+        max_simultaneas: acima disso em curso responde 429
+        taxa_por_segundo: token bucket do servidor; sem ficha responde 429 (com Retry-After se dado)
+        gravar: caminhos sem fixture são buscados na fonte real e guardados
+        """
+        self.fixtures = fixtures
+        self.latencia = latencia
+        self.variacao = variacao
+        self.cauda = cauda
+        self.taxa_cauda = taxa_cauda
+        self.fonte_cauda = fonte_cauda
+        self.taxa_erro = taxa_erro
+        self.max_simultaneas = max_simultaneas
+        self.taxa_por_segundo = taxa_por_segundo
+        self.retry_after = retry_after
+        self.gravar = gravar
+        self.endereco = (host, porta)
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._fichas = float(taxa_por_segundo or 0)
+        self._reposto_em = time.monotonic()
+        self._simultaneas = 0
+        self._servidor: Optional[_ServidorHTTP] = None
+        self.zerar_metricas()
+
+    def zerar_metricas(self):
+        self.contadores = {'conexoes': 0, 'requisicoes': 0, 'respondidas': 0, 'nao_encontradas': 0,
+                           'erros': 0, 'recusadas': 0, 'lentas': 0, 'gravadas': 0}
+
+    def metricas(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.contadores)
+
+    def _contar(self, contador: str):
+        with self._lock:
+            self.contadores[contador] += 1
+
+    @property
+    def url_base(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> str:
+        """Sobe o servidor em uma thread e retorna a URL base (para LOTERIAS_URL_BASE)"""
+        self._servidor = _ServidorHTTP(self.endereco, _Manipulador)
+        self._servidor.fixtures_servidor = self
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self.url_base
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if self.gravar and self.fixtures.caminho:
+            self.fixtures.salvar()
+
+    def __enter__(self) -> 'ServidorFixtures':
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.parar()
+
+    def _sem_ficha(self) -> bool:
+        """Token bucket do servidor (chamado com o lock)"""
+        if not self.taxa_por_segundo:
+            return False
+        agora = time.monotonic()
+        self._fichas = min(self.taxa_por_segundo, self._fichas + (agora - self._reposto_em) * self.taxa_por_segundo)
+        self._reposto_em = agora
+        if self._fichas < 1:
+            return True
+        self._fichas -= 1
+        return False
+
+    def _atender(self, manipulador: BaseHTTPRequestHandler):
+        with self._lock:
+            self.contadores['requisicoes'] += 1
+            self._simultaneas += 1
+            recusar = ((self.max_simultaneas is not None and self._simultaneas > self.max_simultaneas)
+                       or self._sem_ficha())
+            erro = not recusar and self._aleatorio.random() < self.taxa_erro
+            atraso = self.latencia + (self._aleatorio.uniform(0, self.variacao) if self.variacao else 0)
+            fonte = manipulador.path.lstrip('/').split('/', 1)[0]
+            if (self.taxa_cauda and (self.fonte_cauda is None or fonte == self.fonte_cauda)
+                    and self._aleatorio.random() < self.taxa_cauda):
+                atraso += self.cauda
+                self.contadores['lentas'] += 1
+        try:
+            if atraso > 0:
+                time.sleep(atraso)
+            if recusar:
+                self._contar('recusadas')
+                cabecalhos = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+                self._enviar(manipulador, 429, cabecalhos=cabecalhos)
+                return
+            if erro:
+                self._contar('erros')
+                self._enviar(manipulador, 503)
+                return
+
+            resposta = self.fixtures.obter(manipulador.path)
+            if resposta is None and self.gravar:
+                resposta = self._buscar_real(manipulador.path)
+            if resposta is None:
+                self._contar('nao_encontradas')
+                self._enviar(manipulador, 404)
+                return
+            status, tipo, corpo = resposta
+            self._contar('respondidas' if status == 200 else 'nao_encontradas')
+            self._enviar(manipulador, status, corpo, tipo)
+        finally:
+            with self._lock:
+                self._simultaneas -= 1
+
+    @staticmethod
+    def _enviar(manipulador: BaseHTTPRequestHandler, status: int, corpo: bytes = b'',
+                tipo: str = 'application/json', cabecalhos: Optional[Dict[str, str]] = None):
+        manipulador.send_response(status)
+        if corpo:
+            manipulador.send_header('Content-Type', tipo)
+        for chave, valor in (cabecalhos or {}).items():
+            manipulador.send_header(chave, valor)
+        manipulador.send_header('Content-Length', str(len(corpo)))
+        manipulador.end_headers()
+        manipulador.wfile.write(corpo)
+
+    def _buscar_real(self, caminho: str) -> Optional[Tuple[int, str, bytes]]:
+        """Modo gravação: busca /<fonte>/<resto> na URL pública da fonte e guarda 200/404"""
+        # Importado aqui: a sessão compartilhada só é necessária no modo gravação
+        from src.cliente_http import obter_sessao
+
+        fonte, _, resto = caminho.lstrip('/').partition('/')
+        if fonte not in FONTES:
+            return None
+        try:
+            response = obter_sessao().get(f"{FONTES[fonte]}/{resto}", timeout=10)
+        except Exception as e:
+            print(f"  Erro ao gravar {caminho}: {e}")
+            return None
+        if response.status_code not in (200, 404):
+            return None
+        tipo = response.headers.get('Content-Type', 'application/json')
+        self.fixtures.adicionar(caminho, response.status_code, response.content, tipo)
+        self._contar('gravadas')
+        return self.fixtures.obter(caminho)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local de fixtures das fontes de resultados')
+    parser.add_argument('--arquivo', default='data/fixtures/respostas.ndjson', help='NDJSON de respostas')
+    parser.add_argument('--gravar', action='store_true', help='busca e grava caminhos sem fixture')
+    parser.add_argument('--sinteticas', type=int, default=0, help='gera N concursos sintéticos por jogo')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia-ms', type=float, default=0.0)
+    parser.add_argument('--variacao-ms', type=float, default=0.0)
+    parser.add_argument('--taxa-erro', type=float, default=0.0)
+    parser.add_argument('--max-simultaneas', type=int, default=None)
+    parser.add_argument('--taxa-por-segundo', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.sinteticas:
+        fixtures = FixturesHTTP.sinteticas({jogo: args.sinteticas for jogo in JOGOS})
+        fixtures.caminho = args.arquivo if args.gravar else None
+    else:
+        fixtures = FixturesHTTP(args.arquivo)
+    servidor = ServidorFixtures(fixtures, latencia=args.latencia_ms / 1000, variacao=args.variacao_ms / 1000,
+                                taxa_erro=args.taxa_erro, max_simultaneas=args.max_simultaneas,
+                                taxa_por_segundo=args.taxa_por_segundo, gravar=args.gravar, porta=args.porta)
+    url = servidor.iniciar()
+    print(f"Servidor de fixtures em {url} ({len(fixtures)} respostas{', gravando' if args.gravar else ''})")
+    print(f"Use: LOTERIAS_URL_BASE={url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.parar()
+        print(f"Métricas: {servidor.metricas()}")
+
+
+if __name__ == "__main__":
+    main()
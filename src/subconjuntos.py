@@ -0,0 +1,222 @@
+"""
+Subconjuntos de k números que mais saíram juntos, para qualquer k e os três jogos
+Cada subconjunto vira um inteiro: o posto colexicográfico (soma de C(coluna, posição))
+ou, quando C(R, k) não cabe em 63 bits (Lotomania com k >= 18), os bytes da sua
+máscara de bits. As contagens são feitas com np.unique sobre arrays desses códigos,
+sem tuplas nem Counter. O espaço é dividido pelos menores números do subconjunto
+(prefixo): cada subconjunto pertence a uma única partição, então as partições são
+contadas em processos separados e o top-N global sai do top-N de cada uma
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.matriz import HistoricoMatriz
+
+
+# Máximo de códigos gerados por partição (acima disso o prefixo ganha mais um número)
+LIMITE_PARTICAO = 1 << 23
+
+# Abaixo desse total de códigos a contagem roda no próprio processo (pool não compensa)
+LIMITE_PARALELO = 1 << 20
+
+
+# Poucos pares (quantidade, tamanho) por contagem; o limite evita guardar tabelas grandes de contagens antigas
+@lru_cache(maxsize=16)
+def _combinacoes(quantidade: int, tamanho: int) -> np.ndarray:
+    """Índices das combinações de `tamanho` posições entre `quantidade` (C × tamanho)"""
+    return np.array(list(combinations(range(quantidade), tamanho)), dtype=np.intp).reshape(
+        comb(quantidade, tamanho), tamanho)
+
+
+def _binomiais(largura: int, k: int) -> np.ndarray:
+    """Tabela C(n, i) para n < largura e i <= k (0 onde não cabe em 64 bits: nunca usado no posto)"""
+    return np.array([[valor if valor < 1 << 64 else 0 for valor in (comb(n, i) for i in range(k + 1))]
+                     for n in range(largura)], dtype=np.uint64)
+
+
+def _estimar(matriz: np.ndarray, k: int, prefixo: Tuple[int, ...]) -> int:
+    """Quantos códigos a partição gera (concursos com o prefixo × combinações dos números acima dele)"""
+    linhas = matriz[:, list(prefixo)].all(axis=1) if prefixo else slice(None)
+    acima = matriz[linhas, prefixo[-1] + 1 if prefixo else 0:].sum(axis=1, dtype=np.int64)
+    restantes = k - len(prefixo)
+    return sum(int(vezes) * comb(quantidade, restantes)
+               for quantidade, vezes in enumerate(np.bincount(acima)) if vezes)
+
+
+def _planejar(matriz: np.ndarray, k: int, limite: int) -> List[Tuple[Tuple[int, ...], int]]:
+    """
+    Prefixos das partições com a estimativa de cada uma, da maior para a menor
+    Parte do menor número e estende o prefixo das partições acima do limite
+    """
+    largura = matriz.shape[1]
+    particoes = []
+    pendentes = [()]
+    while pendentes:
+        prefixo = pendentes.pop()
+        estimativa = _estimar(matriz, k, prefixo)
+        if not estimativa:
+            continue
+        if prefixo and (estimativa <= limite or len(prefixo) >= k - 1):
+            particoes.append((prefixo, estimativa))
+            continue
+        # Próximo número do prefixo: ainda precisa sobrar espaço para os demais
+        inicio = prefixo[-1] + 1 if prefixo else 0
+        pendentes.extend(prefixo + (coluna,) for coluna in range(inicio, largura - (k - len(prefixo)) + 1))
+    particoes.sort(key=lambda particao: -particao[1])
+    return particoes
+
+
+def _contar_particao(matriz: np.ndarray, k: int, top: int, binomiais: Optional[np.ndarray],
+                     prefixo: Tuple[int, ...]) -> Tuple[int, List[Tuple[int, int, object]]]:
+    """
+    Conta os subconjuntos cujos menores números são `prefixo`
+    Devolve (subconjuntos distintos, [(quantidade, linha da primeira aparição, código)])
+    com os `top` mais frequentes da partição e os empatados com o último deles
+    """
+    largura = matriz.shape[1]
+    inicio = prefixo[-1] + 1
+    linhas = np.flatnonzero(matriz[:, list(prefixo)].all(axis=1))
+    acima = matriz[linhas, inicio:]
+    quantidade_acima = acima.sum(axis=1, dtype=np.int64)
+    restantes = k - len(prefixo)
+    base = sum(comb(coluna, posicao + 1) for posicao, coluna in enumerate(prefixo))
+
+    blocos, linhas_blocos = [], []
+    for quantidade in np.unique(quantidade_acima).tolist():
+        if quantidade < restantes:
+            continue
+        grupo = quantidade_acima == quantidade
+        colunas = np.nonzero(acima[grupo])[1].reshape(int(grupo.sum()), quantidade) + inicio
+        indices = _combinacoes(quantidade, restantes)
+        linhas_blocos.append(np.repeat(linhas[grupo], len(indices)))
+        if binomiais is not None:
+            codigos = np.full((len(colunas), len(indices)), base, dtype=np.uint64)
+            for posicao in range(restantes):
+                codigos += binomiais[colunas[:, indices[:, posicao]], len(prefixo) + posicao + 1]
+            blocos.append(codigos.ravel())
+        else:
+            # Máscara com a coluna mais alta no primeiro bit (bytes comparáveis como inteiro)
+            bits = np.zeros((len(colunas) * len(indices), largura), dtype=np.uint8)
+            bits[:, list(prefixo)] = 1
+            sequencia = np.arange(len(bits))
+            for posicao in range(restantes):
+                bits[sequencia, colunas[:, indices[:, posicao]].ravel()] = 1
+            mascaras = np.ascontiguousarray(np.packbits(bits[:, ::-1], axis=1))
+            blocos.append(mascaras.view(f'V{mascaras.shape[1]}').ravel())
+
+    if not blocos:
+        return 0, []
+    codigos = np.concatenate(blocos)
+    linhas_codigos = np.concatenate(linhas_blocos)
+    # Uma ordenação só: por código e, no mesmo código, pela linha (a primeira aparição abre o grupo)
+    ordem = np.lexsort((linhas_codigos, codigos))
+    codigos, linhas_codigos = codigos[ordem], linhas_codigos[ordem]
+    inicios = np.concatenate(([0], np.flatnonzero(codigos[1:] != codigos[:-1]) + 1))
+    quantidades = np.diff(np.append(inicios, len(codigos)))
+    primeiras = linhas_codigos[inicios]
+
+    ordem = np.lexsort((primeiras, -quantidades))
+    if len(ordem) > top > 0:
+        # Empatados com o último do top (mesma quantidade e mesma primeira aparição) seguem
+        # para o desempate final pelos números, feito depois de juntar as partições
+        ultimo = ordem[top - 1]
+        empatados = (quantidades[ordem] == quantidades[ultimo]) & (primeiras[ordem] == primeiras[ultimo])
+        ordem = ordem[:top + int(empatados[top:].sum())]
+    else:
+        ordem = ordem[:top]
+    if binomiais is not None:
+        codigos_top = codigos[inicios[ordem]].tolist()
+    else:
+        codigos_top = [int.from_bytes(codigo.tobytes(), 'big') for codigo in codigos[inicios[ordem]]]
+    return len(inicios), list(zip(quantidades[ordem].tolist(), primeiras[ordem].tolist(), codigos_top))
+
+
+# Estado de cada processo do pool (recebido uma vez no initializer)
+_processo: Dict = {}
+
+
+def _iniciar_processo(matriz: np.ndarray, k: int, top: int, binomiais: Optional[np.ndarray]):
+    _processo.update(matriz=matriz, k=k, top=top, binomiais=binomiais)
+
+
+def _contar_no_processo(prefixo: Tuple[int, ...]) -> Tuple[int, List[Tuple[int, int, object]]]:
+    return _contar_particao(prefixo=prefixo, **_processo)
+
+
+class SubconjuntoFrequente:
+    """
+    Subconjuntos de k números mais frequentes de uma HistoricoMatriz
+    (k = 14 na Lotofácil: as combinações de 14 que mais saíram; k = dezenas
+    sorteadas: combinações repetidas inteiras)
+    """
+
+    def __init__(self, matriz: HistoricoMatriz, k: int, processos: Optional[int] = None):
+        if k < 1 or k > matriz.matriz.shape[1]:
+            raise ValueError(f"k deve estar entre 1 e {matriz.matriz.shape[1]}")
+        self.matriz = matriz
+        self.k = k
+        self.processos = max(1, processos or os.cpu_count() or 1)
+        # Posto colexicográfico em uint64 enquanto C(R, k) couber; senão, máscara em bytes
+        largura = matriz.matriz.shape[1]
+        self._binomiais = _binomiais(largura, k) if comb(largura, k) < 1 << 63 else None
+        # Subconjuntos gerados pela contagem (com repetição): o custo da consulta
+        self.gerados = _estimar(matriz.matriz, k, ())
+
+    def _numeros(self, codigo: int) -> List[int]:
+        """Números do subconjunto a partir do código"""
+        largura = self.matriz.matriz.shape[1]
+        if self._binomiais is None:
+            mascara = codigo >> (-largura % 8)
+            colunas = [coluna for coluna in range(largura) if mascara >> coluna & 1]
+        else:
+            colunas = []
+            for posicao in range(self.k, 0, -1):
+                coluna = posicao - 1
+                while comb(coluna + 1, posicao) <= codigo:
+                    coluna += 1
+                colunas.append(coluna)
+                codigo -= comb(coluna, posicao)
+            colunas.reverse()
+        return [coluna + self.matriz.menor_numero for coluna in colunas]
+
+    def mais_frequentes(self, top: int = 10) -> Dict:
+        """
+        Os `top` subconjuntos de k números que mais saíram, do mais para o menos
+        frequente (empate: o que apareceu primeiro; no mesmo concurso, pelos números)
+        """
+        matriz = np.ascontiguousarray(self.matriz.matriz)
+        particoes = _planejar(matriz, self.k, LIMITE_PARTICAO)
+        total = sum(estimativa for _, estimativa in particoes)
+        prefixos = [prefixo for prefixo, _ in particoes]
+
+        if self.processos > 1 and total >= LIMITE_PARALELO and len(prefixos) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.processos, len(prefixos)), initializer=_iniciar_processo,
+                                     initargs=(matriz, self.k, top, self._binomiais)) as executor:
+                resultados = list(executor.map(_contar_no_processo, prefixos,
+                                               chunksize=max(1, len(prefixos) // (4 * self.processos))))
+        else:
+            resultados = [_contar_particao(matriz, self.k, top, self._binomiais, prefixo) for prefixo in prefixos]
+
+        candidatos = [(quantidade, primeira, self._numeros(codigo))
+                      for _, top_particao in resultados for quantidade, primeira, codigo in top_particao]
+        candidatos.sort(key=lambda candidato: (-candidato[0], candidato[1], candidato[2]))
+        return {
+            'k': self.k,
+            'total_concursos': len(self.matriz),
+            'subconjuntos_gerados': total,
+            'subconjuntos_distintos': sum(distintos for distintos, _ in resultados),
+            'mais_frequentes': [
+                {
+                    'numeros': numeros,
+                    'quantidade': quantidade,
+                    'primeiro_concurso': int(self.matriz.concursos[primeira])
+                }
+                for quantidade, primeira, numeros in candidatos[:top]
+            ]
+        }
@@ -0,0 +1,71 @@
+"""
+URLs base das fontes de resultados das loterias
+Cada fonte tem uma URL base padrão (o endereço público) que pode ser trocada
+por variável de ambiente, LOTERIAS_URL_<FONTE> (ex: LOTERIAS_URL_CAIXA), ou de
+uma vez para todas as fontes com LOTERIAS_URL_BASE: cada fonte passa a ser
+<base>/<fonte> (é o formato do servidor de fixtures, src/servidor_fixtures.py).
+configurar_urls() faz o mesmo em tempo de execução (benchmarks e testes)
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+
+# Fonte -> URL base pública (sem barra final)
+FONTES = {
+    'caixa': 'https://servicebus2.caixa.gov.br/portaldeloterias/api',
+    'caixa_online': 'https://loteriasonline.caixa.gov.br/api',
+    'lotodicas': 'https://lotodicas.com.br/api',
+    'lotodicas_www': 'https://www.lotodicas.com.br/api',
+    'lottolookup': 'https://lottolookup.com.br/api',
+    'apiloterias': 'https://apiloterias.com.br/app',
+}
+
+VARIAVEL_BASE = 'LOTERIAS_URL_BASE'
+
+_lock = threading.Lock()
+_base: Optional[str] = None
+_por_fonte: Dict[str, str] = {}
+
+
+def url_base(fonte: str) -> str:
+    """
+    URL base da fonte, na ordem: configurar_urls(fonte=...), LOTERIAS_URL_<FONTE>,
+    configurar_urls(base=...) ou LOTERIAS_URL_BASE (+ '/<fonte>') e a URL pública
+    """
+    if fonte not in FONTES:
+        raise KeyError(f"Fonte desconhecida: {fonte}")
+    url = _por_fonte.get(fonte) or os.environ.get(f'LOTERIAS_URL_{fonte.upper()}')
+    if url:
+        return url.rstrip('/')
+    base = _base or os.environ.get(VARIAVEL_BASE)
+    if base:
+        return f"{base.rstrip('/')}/{fonte}"
+    return FONTES[fonte]
+
+
+def url_fonte(fonte: str, caminho: str = '') -> str:
+    """URL completa de um caminho da fonte: url_fonte('caixa', 'lotofacil/3000')"""
+    caminho = caminho.lstrip('/')
+    return f"{url_base(fonte)}/{caminho}" if caminho else url_base(fonte)
+
+
+def configurar_urls(base: Optional[str] = None, **fontes: str):
+    """
+    Redireciona as fontes em tempo de execução (tem precedência sobre o ambiente)
+    base: todas as fontes em <base>/<fonte>; fontes: URL base de fontes específicas
+    Sem argumentos volta às URLs do ambiente/públicas
+    """
+    global _base
+    desconhecidas = set(fontes) - set(FONTES)
+    if desconhecidas:
+        raise KeyError(f"Fontes desconhecidas: {', '.join(sorted(desconhecidas))}")
+    with _lock:
+        _base = base
+        _por_fonte.clear()
+        _por_fonte.update(fontes)
+
+
+def urls_configuradas() -> Dict[str, str]:
+    """URL base em uso por fonte"""
+    return {fonte: url_base(fonte) for fonte in FONTES}
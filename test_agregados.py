@@ -0,0 +1,58 @@
+"""
+Testes dos analisadores incrementais: depois de adicionar/remover concursos os
+resultados devem ser os mesmos de um analisador montado do zero
+Executar com: python -m pytest test_agregados.py
+"""
+import pytest
+
+from src.analise import AnalisadorLotofacil
+from src.analise_lotomania import AnalisadorLotomania
+from src.analise_timemania import AnalisadorTimemania
+
+ANALISADORES = {
+    'lotofacil': AnalisadorLotofacil,
+    'timemania': AnalisadorTimemania,
+    'lotomania': AnalisadorLotomania,
+}
+
+
+def resultado(analisador):
+    """Tudo o que o analisador expõe e que depende dos agregados"""
+    estado = dict(analisador.get_estatisticas_completas())
+    estado['combinacao_mais_repetida'] = analisador.combinacao_mais_repetida()
+    estado['historico'] = analisador.historico
+    if isinstance(analisador, AnalisadorLotofacil):
+        estado['quentes'] = analisador.numeros_quentes(5)
+        estado['quadrantes'] = analisador.distribuicao_quadrantes()
+    return repr(estado)
+
+
+@pytest.mark.parametrize('jogo', sorted(ANALISADORES))
+@pytest.mark.parametrize('janela', [None, 7, ('01/01/2000', '15/06/2000')])
+@pytest.mark.parametrize('consultar_antes', [True, False])
+def test_adicionar_igual_a_reconstruir(jogo, janela, consultar_antes, gerar_historico):
+    classe = ANALISADORES[jogo]
+    historico = gerar_historico(jogo, 150, 3)
+    incremental = classe(historico[:50], janela=janela)
+    if consultar_antes:
+        # Agregados já montados: adicionar precisa ajustá-los
+        resultado(incremental)
+    for i, concurso in enumerate(historico[50:], start=51):
+        incremental.adicionar_concurso(concurso)
+        if i % 25 == 0:
+            assert resultado(incremental) == resultado(classe(historico[:i], janela=janela))
+    assert resultado(incremental) == resultado(classe(historico, janela=janela))
+
+
+@pytest.mark.parametrize('jogo', sorted(ANALISADORES))
+def test_remover_igual_a_reconstruir(jogo, gerar_historico):
+    classe = ANALISADORES[jogo]
+    historico = gerar_historico(jogo, 120, 5)
+    incremental = classe(historico)
+    resultado(incremental)
+    for i in range(1, 60):
+        removido = incremental.remover_concurso()
+        assert removido['concurso'] == historico[i - 1]['concurso']
+        if i % 10 == 0:
+            assert resultado(incremental) == resultado(classe(historico[i:]))
+
@@ -0,0 +1,66 @@
+"""
+Testes dos analisadores contra a contagem direta do histórico (Counter)
+Executar com: python -m pytest test_analise.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from src.analise import AnalisadorLotofacil
+from src.analise_lotomania import AnalisadorLotomania
+from src.analise_timemania import AnalisadorTimemania
+from src.matriz import JOGOS, como_matriz
+
+ANALISADORES = [
+    ('lotofacil', AnalisadorLotofacil, 15, 10),
+    ('timemania', AnalisadorTimemania, 20, 20),
+    ('lotomania', AnalisadorLotomania, 30, 30),
+]
+
+
+def gerar_historico(jogo, total, semente):
+    menor, maior, dezenas = JOGOS[jogo]
+    gerador = random.Random(semente)
+    historico = []
+    for numero in range(1, total + 1):
+        concurso = {'concurso': numero, 'numeros': sorted(gerador.sample(range(menor, maior + 1), dezenas)),
+                    'data': f'{numero % 28 + 1:02d}/01/2020'}
+        if jogo == 'timemania':
+            concurso['time_coracao'] = 'FLAMENGO/RJ'
+        historico.append(concurso)
+    return historico
+
+
+@pytest.mark.parametrize('jogo, classe, top_mais, top_menos', ANALISADORES)
+@pytest.mark.parametrize('total', [1, 3, 8, 200])
+def test_empates_na_ordem_do_counter(jogo, classe, top_mais, top_menos, total):
+    historico = gerar_historico(jogo, total, total)
+    contagem = Counter(numero for concurso in historico for numero in concurso['numeros'])
+    mais = sorted(contagem.items(), key=lambda x: x[1], reverse=True)
+    menos = sorted(contagem.items(), key=lambda x: x[1])
+
+    analisador = classe(historico)
+    assert list(analisador.frequencia_numeros().items()) == list(contagem.items())
+    estatisticas = analisador.get_estatisticas_completas()
+    assert estatisticas['mais_sorteados'] == mais[:top_mais]
+    assert estatisticas['menos_sorteados'] == menos[:top_menos]
+    assert analisador.numeros_mais_sorteados(5) == mais[:5]
+    assert analisador.numeros_menos_sorteados(5) == menos[:5]
+
+
+@pytest.mark.parametrize('total', [3, 10, 40])
+def test_quentes_na_ordem_do_counter(total):
+    historico = gerar_historico('lotofacil', total, total)
+    for limite in (3, 10):
+        recentes = Counter(numero for concurso in historico[-limite:] for numero in concurso['numeros'])
+        esperado = [numero for numero, vezes in recentes.items() if vezes >= min(limite, total) // 2]
+        assert AnalisadorLotofacil(historico).numeros_quentes(limite) == esperado
+
+
+def test_primeira_aparicao():
+    historico = gerar_historico('lotomania', 300, 7)
+    matriz = como_matriz(historico, 'lotomania')
+    for numero, linha in zip(matriz.numeros, matriz.primeira_aparicao()):
+        esperada = next((i for i, c in enumerate(historico) if numero in c['numeros']), -1)
+        assert linha == esperada
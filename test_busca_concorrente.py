@@ -0,0 +1,119 @@
+"""
+Testes da busca concorrente com checkpoint (retomada, fontes e erros transitórios)
+Executar com: python -m pytest test_busca_concorrente.py
+"""
+import os
+
+from src.busca_concorrente import BuscadorConcursos, ResultadoBusca
+from src.checkpoint import CheckpointBusca
+
+
+def concurso(numero):
+    return {'concurso': numero, 'numeros': list(range(1, 16)), 'data': ''}
+
+
+class FonteFalsa:
+    """Responde os concursos 1..ultimo; `com_erro` falham (erro transitório) enquanto falhando=True"""
+
+    def __init__(self, ultimo, com_erro=(), fonte='Fonte A'):
+        self.ultimo = ultimo
+        self.com_erro = set(com_erro)
+        self.fonte = fonte
+        self.falhando = True
+        self.pedidos = []
+
+    def __call__(self, numero):
+        self.pedidos.append(numero)
+        if self.falhando and numero in self.com_erro:
+            return ResultadoBusca(None)
+        if numero > self.ultimo:
+            return ResultadoBusca(None, inexistente=True)
+        return ResultadoBusca(concurso(numero), self.fonte)
+
+
+def test_retoma_sem_buscar_de_novo(tmp_path):
+    caminho = str(tmp_path / 'checkpoint.ndjson')
+    CheckpointBusca(caminho).registrar([concurso(n) for n in range(1, 6)], [], {n: 'Fonte B' for n in range(1, 6)})
+
+    fonte = FonteFalsa(10)
+    checkpoint = CheckpointBusca(caminho)
+    encontrados = BuscadorConcursos(fonte, paralelismo=2, tamanho_lote=3).buscar(range(1, 11), checkpoint=checkpoint)
+
+    assert sorted(c['concurso'] for c in encontrados) == list(range(1, 11))
+    assert sorted(fonte.pedidos) == list(range(6, 11))
+    assert checkpoint.concluido and not os.path.exists(caminho)
+
+
+def test_fonte_de_cada_concurso(tmp_path):
+    caminho = str(tmp_path / 'checkpoint.ndjson')
+    respostas = {1: 'Fonte A', 2: 'Fonte B', 3: 'Fonte A'}
+    buscador = BuscadorConcursos(lambda n: ResultadoBusca(concurso(n), respostas[n]), paralelismo=1, tamanho_lote=10)
+    # Lote gravado por uma execução interrompida
+    CheckpointBusca(caminho).registrar([concurso(1), concurso(2)], [], {1: 'Fonte A', 2: 'Fonte B'})
+
+    retomado = CheckpointBusca(caminho)
+    assert retomado.fonte(1) == 'Fonte A' and retomado.fonte(2) == 'Fonte B'
+    assert retomado.resumo()['fontes'] == {'Fonte A': 1, 'Fonte B': 1}
+    buscador.buscar(range(1, 4), checkpoint=retomado)
+    assert retomado.concluido
+
+
+def test_erro_transitorio_fica_pendente(tmp_path):
+    caminho = str(tmp_path / 'checkpoint.ndjson')
+    fonte = FonteFalsa(20, com_erro={4, 7})
+    buscador = BuscadorConcursos(fonte, paralelismo=2, tamanho_lote=5)
+
+    checkpoint = CheckpointBusca(caminho)
+    encontrados = buscador.buscar(range(1, 23), checkpoint=checkpoint)
+    assert len(encontrados) == 18
+    # 21 e 22 não existem (resposta definitiva); 4 e 7 deram erro e não são marcados
+    assert not checkpoint.concluido
+    assert CheckpointBusca(caminho).resumo()['sem_resultado'] == [21, 22]
+    assert list(buscador.faltantes([4, 7, 21])) == [4, 7]
+
+    # Próxima execução: só os concursos com erro são buscados de novo
+    fonte.falhando = False
+    fonte.pedidos = []
+    checkpoint = CheckpointBusca(caminho)
+    encontrados = buscador.buscar(range(1, 23), checkpoint=checkpoint)
+    assert sorted(fonte.pedidos) == [4, 7]
+    assert sorted(c['concurso'] for c in encontrados) == list(range(1, 21))
+    assert checkpoint.concluido
+
+
+def test_excecao_nao_vira_sem_resultado():
+    def buscar(numero):
+        raise TimeoutError()
+
+    buscador = BuscadorConcursos(buscar, paralelismo=1)
+    assert buscador.buscar([1, 2]) == []
+    assert list(buscador.faltantes([1, 2])) == [1, 2]
+
+
+def test_progresso_na_mesma_base(tmp_path, capsys):
+    caminho = str(tmp_path / 'checkpoint.ndjson')
+    CheckpointBusca(caminho).registrar([concurso(n) for n in range(1, 31)], [])
+    fonte = FonteFalsa(60)
+    # O chamador já não pede os 30 retomados (estão no banco)
+    BuscadorConcursos(fonte, paralelismo=2, tamanho_lote=10).buscar(range(31, 61), checkpoint=CheckpointBusca(caminho))
+    progresso = [linha for linha in capsys.readouterr().out.splitlines() if 'Progresso' in linha]
+    assert progresso[-1].strip() == 'Progresso: 30/30 concursos...'
+
+
+def test_funcao_simples_none_e_inexistente():
+    buscador = BuscadorConcursos(lambda n: concurso(n) if n <= 3 else None, paralelismo=1)
+    assert [c['concurso'] for c in buscador.buscar(range(1, 6))] == [1, 2, 3]
+    assert list(buscador.faltantes(range(1, 6))) == [1, 2, 3]
+
+
+def test_de_respostas():
+    achado = concurso(5)
+    assert ResultadoBusca.de_respostas(achado, {'A': None, 'B': achado}) == ResultadoBusca(achado, 'B')
+    assert ResultadoBusca.de_respostas(None, {'A': None}).inexistente
+    assert not ResultadoBusca.de_respostas(None, {}).inexistente
+
+
+def test_buscar_ultimo():
+    fonte = FonteFalsa(137)
+    assert BuscadorConcursos(fonte).buscar_ultimo(100) == 137
+    assert BuscadorConcursos(fonte).buscar_ultimo(400) == 137
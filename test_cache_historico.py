@@ -0,0 +1,118 @@
+"""
+Testes do cache local de histórico (binário + journal NDJSON)
+Executar com: python -m pytest test_cache_historico.py
+"""
+import json
+import os
+import time
+
+from src.cache_historico import CacheHistorico
+
+
+def concurso(numero, deslocamento=0):
+    return {
+        'concurso': numero,
+        'numeros': sorted((numero + deslocamento + i) % 25 + 1 for i in range(15)),
+        'data': f'{numero % 28 + 1:02d}/01/2024'
+    }
+
+
+def test_anexar_e_recarregar(tmp_path):
+    arquivo = str(tmp_path / 'historico.json')
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    assert cache.anexar([concurso(n) for n in range(1, 11)]) == 10
+
+    recarregado = CacheHistorico(arquivo, 'lotofacil').carregar()
+    assert [c['concurso'] for c in recarregado] == list(range(1, 11))
+    assert recarregado[4]['numeros'] == concurso(5)['numeros']
+
+
+def test_anexar_ignora_concursos_iguais(tmp_path):
+    cache = CacheHistorico(str(tmp_path / 'historico.json'), 'lotofacil')
+    cache.anexar([concurso(n) for n in range(1, 6)])
+    assert cache.anexar([concurso(n) for n in range(1, 7)]) == 1
+    with open(cache.cache_journal, encoding='utf-8') as f:
+        assert len(f.readlines()) == 6
+
+
+def test_anexar_compara_campos_normalizados(tmp_path):
+    cache = CacheHistorico(str(tmp_path / 'historico.json'), 'lotofacil')
+    cache.anexar([concurso(n) for n in range(1, 6)])
+    cache.compactar()
+    # Data em ISO, números fora de ordem e campos que o binário não guarda: nada mudou
+    mesmos = []
+    for n in range(1, 6):
+        c = concurso(n)
+        dia, mes, ano = c['data'].split('/')
+        mesmos.append(dict(c, data=f'{ano}-{mes}-{dia}', numeros=c['numeros'][::-1], fonte='API Caixa'))
+    assert cache.anexar(mesmos) == 0
+    assert CacheHistorico(cache.cache_json, 'lotofacil').anexar(mesmos) == 0
+    assert not os.path.exists(cache.cache_journal)
+    assert cache.anexar([dict(concurso(3), data='31/12/2024')]) == 1
+
+
+def test_replay_ultimo_registro_vence(tmp_path):
+    arquivo = str(tmp_path / 'historico.json')
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    cache.anexar([concurso(1), concurso(2)])
+    cache.anexar([concurso(2, deslocamento=3)])
+
+    recarregado = CacheHistorico(arquivo, 'lotofacil').carregar()
+    assert recarregado[1]['numeros'] == concurso(2, deslocamento=3)['numeros']
+
+
+def test_linha_incompleta_no_journal(tmp_path):
+    arquivo = str(tmp_path / 'historico.json')
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    cache.anexar([concurso(1)])
+    with open(cache.cache_journal, 'a', encoding='utf-8') as f:
+        f.write('{"concurso": 2, "numer')
+
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    assert [c['concurso'] for c in cache.carregar()] == [1]
+    cache.anexar([concurso(3)])
+    assert [c['concurso'] for c in CacheHistorico(arquivo, 'lotofacil').carregar()] == [1, 3]
+
+
+def test_compactacao(tmp_path):
+    arquivo = str(tmp_path / 'historico.json')
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    cache.LIMITE_JOURNAL = 5
+    cache.anexar([concurso(n) for n in range(1, 4)])
+    assert os.path.exists(cache.cache_journal)
+    cache.anexar([concurso(n) for n in range(4, 7)])
+    assert not os.path.exists(cache.cache_journal)
+    assert os.path.exists(cache.cache_binario)
+
+    assert [c['concurso'] for c in CacheHistorico(arquivo, 'lotofacil').carregar()] == list(range(1, 7))
+
+
+def test_timemania_preserva_time(tmp_path):
+    arquivo = str(tmp_path / 'historico_timemania.json')
+    cache = CacheHistorico(arquivo, 'timemania')
+    cache.anexar([{'concurso': 1, 'numeros': [1, 2, 3, 4, 5, 6, 80], 'data': '01/01/2024', 'time_coracao': 'FLAMENGO/RJ'}])
+    cache.compactar()
+    assert CacheHistorico(arquivo, 'timemania').carregar()[0]['time_coracao'] == 'FLAMENGO/RJ'
+
+
+def test_json_mais_novo_nao_apaga_journal(tmp_path):
+    arquivo = str(tmp_path / 'historico.json')
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump([concurso(n) for n in range(1, 4)], f)
+    cache = CacheHistorico(arquivo, 'lotofacil')
+    cache.carregar()
+    # Primeira escrita grava o binário; o concurso seguinte fica no journal
+    cache.anexar([concurso(4)])
+    cache.anexar([concurso(5)])
+    assert os.path.exists(cache.cache_journal)
+
+    # JSON antigo tocado depois do binário: a carga lê o JSON mas não pode perder o journal
+    time.sleep(0.01)
+    os.utime(arquivo, (time.time() + 10, time.time() + 10))
+    journal = open(cache.cache_journal, encoding='utf-8').read()
+    binario = os.path.getmtime(cache.cache_binario)
+
+    recarregado = CacheHistorico(arquivo, 'lotofacil').carregar()
+    assert [c['concurso'] for c in recarregado] == [1, 2, 3, 4, 5]
+    assert open(cache.cache_journal, encoding='utf-8').read() == journal
+    assert os.path.getmtime(cache.cache_binario) == binario
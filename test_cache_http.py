@@ -0,0 +1,138 @@
+"""
+Testes do cache HTTP: só concursos completos ficam guardados para sempre
+(respostas vazias ou incompletas de concursos ainda não sorteados voltam à rede)
+Executar com: python -m pytest test_cache_http.py
+"""
+import json
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import src.cliente_http
+from src.cache_http import CacheHTTP
+from src.fontes import limpar_fontes
+from src.historico import HistoricoLotofacil
+from src.historico_lotomania import HistoricoLotomania
+from src.historico_timemania import HistoricoTimemania
+from src.matriz import JOGOS
+
+HISTORICOS = [
+    (HistoricoLotofacil, 'lotofacil'),
+    (HistoricoTimemania, 'timemania'),
+    (HistoricoLotomania, 'lotomania'),
+]
+
+
+def resposta(corpo, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+    response._content = corpo
+    response.encoding = 'utf-8'
+    return response
+
+
+def corpo_concurso(jogo, numero, dezenas=None):
+    menor, _, sorteadas = JOGOS[jogo]
+    lista = [f'{menor + i:02d}' for i in range(sorteadas if dezenas is None else dezenas)]
+    return json.dumps({'numero': numero, 'listaDezenas': lista, 'dataApuracao': '01/01/2020'}).encode()
+
+
+class Rede:
+    """Fonte falsa: concursos até `ultimo` publicados; os seguintes respondem `futuro`"""
+
+    def __init__(self, jogo, ultimo, futuro=b'{}'):
+        self.jogo = jogo
+        self.ultimo = ultimo
+        self.futuro = futuro
+        self.chamadas = []
+
+    def __call__(self, url, timeout=10, **kwargs):
+        self.chamadas.append(url)
+        numero = int(url.rstrip('/').rsplit('/', 1)[1])
+        if numero > self.ultimo:
+            return resposta(self.futuro)
+        return resposta(corpo_concurso(self.jogo, numero))
+
+
+@pytest.fixture(autouse=True)
+def fontes_limpas():
+    limpar_fontes()
+    yield
+    limpar_fontes()
+
+
+def completo(response):
+    return len(response.json().get('listaDezenas', [])) == 15
+
+
+@pytest.mark.parametrize('corpo', [b'{}', b'[]', b'null', b'""', b'', b'<html>erro</html>',
+                                   b'{"numero": 9999}', corpo_concurso('lotofacil', 9999, dezenas=14)])
+def test_vazia_ou_incompleta_nao_fica_no_cache(tmp_path, corpo):
+    cache = CacheHTTP(str(tmp_path / 'http_cache.db'))
+    rede = Rede('lotofacil', 0, futuro=corpo)
+    for _ in range(2):
+        cache.get(rede, 'http://fonte/lotofacil/9999', imutavel=True, validar=completo)
+        cache.get(rede, 'http://fonte/lotofacil/ultimo/9999', ttl=60, validar=completo)
+    assert len(rede.chamadas) == 4
+    assert cache.total() == 0
+
+
+def test_imutavel_so_depois_de_validado(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'http_cache.db'))
+    rede = Rede('lotofacil', 10)
+    # Sem validação do chamador nada é guardado para sempre
+    cache.get(rede, 'http://fonte/lotofacil/5', imutavel=True)
+    assert cache.total() == 0
+    for _ in range(3):
+        assert cache.get(rede, 'http://fonte/lotofacil/5', imutavel=True, validar=completo).json()['numero'] == 5
+    assert len(rede.chamadas) == 2
+
+
+def test_remove_respostas_vazias_guardadas_antes(tmp_path):
+    caminho = str(tmp_path / 'http_cache.db')
+    cache = CacheHTTP(caminho)
+    cache._gravar('http://fonte/lotofacil/9999', resposta(b'{}'), imutavel=True)
+    cache._gravar('http://fonte/lotofacil/5', resposta(corpo_concurso('lotofacil', 5)), imutavel=True)
+    assert CacheHTTP(caminho).total() == 1
+
+
+@pytest.mark.parametrize('classe, jogo', HISTORICOS)
+@pytest.mark.parametrize('futuro', [b'{}', b'null', 'incompleta'])
+def test_concurso_futuro_aparece_quando_sorteado(tmp_path, monkeypatch, classe, jogo, futuro):
+    if futuro == 'incompleta':
+        futuro = corpo_concurso(jogo, 101, dezenas=JOGOS[jogo][2] - 1)
+    rede = Rede(jogo, 100, futuro=futuro)
+    monkeypatch.setattr(src.cliente_http, '_get_limitado', rede)
+    monkeypatch.setattr(src.cliente_http, '_cache', CacheHTTP(str(tmp_path / 'http_cache.db')))
+    historico = classe(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+
+    assert historico._consultar_concurso(101).concurso is None
+    rede.ultimo = 101
+    chamadas = len(rede.chamadas)
+    for _ in range(3):
+        assert historico._consultar_concurso(101).concurso['concurso'] == 101
+    # Depois de sorteado e validado o concurso passa a vir do cache (cada fonte é consultada uma vez)
+    depois = rede.chamadas[chamadas:]
+    assert depois and len(depois) == len(set(depois))
+
+
+@pytest.mark.parametrize('classe, jogo', HISTORICOS)
+def test_buscar_ultimo_acompanha_novos_sorteios(tmp_path, monkeypatch, classe, jogo):
+    rede = Rede(jogo, 100)
+    cache = CacheHTTP(str(tmp_path / 'http_cache.db'))
+    monkeypatch.setattr(src.cliente_http, '_get_limitado', rede)
+    monkeypatch.setattr(src.cliente_http, '_cache', cache)
+    historico = classe(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+
+    assert historico.buscador.buscar_ultimo(90) == 100
+    # Sondagens não entram no cache imutável: o último avança entre duas buscas
+    assert cache.total() == 0
+    rede.ultimo = 103
+    assert historico.buscador.buscar_ultimo(90) == 103
+    rede.ultimo = 104
+    assert historico.buscador.buscar_ultimo(103) == 104
+    # A busca dos concursos continua guardando o que foi validado
+    historico._consultar_concurso(104)
+    assert cache.total() >= 1
@@ -0,0 +1,89 @@
+"""
+Testes da coocorrência (pares Xᵀ·X, triplas e lift) contra a contagem direta das combinações
+Executar com: python -m pytest test_coocorrencia.py
+"""
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from src.agregados import AgregadosIncrementais
+from src.coocorrencia import matriz_pares, matriz_triplas, pares_mais_frequentes, triplas_mais_frequentes
+from src.matriz import JOGOS, como_matriz
+
+
+def contar(historico, tamanho):
+    """Quantas vezes cada combinação de `tamanho` números saiu"""
+    return Counter(c for concurso in historico for c in combinations(concurso['numeros'], tamanho))
+
+
+@pytest.mark.parametrize('jogo', sorted(JOGOS))
+def test_matriz_pares(jogo, gerar_historico):
+    historico = gerar_historico(jogo, 60, 1)
+    matriz = como_matriz(historico, jogo)
+    pares = matriz_pares(matriz)
+    frequencia = contar(historico, 1)
+    contagem = contar(historico, 2)
+    for i in matriz.numeros:
+        for j in matriz.numeros:
+            esperado = frequencia[(i,)] if i == j else contagem[(min(i, j), max(i, j))]
+            assert pares[i - matriz.menor_numero, j - matriz.menor_numero] == esperado
+
+
+@pytest.mark.parametrize('jogo', ['lotofacil', 'timemania'])
+def test_matriz_triplas(jogo, gerar_historico):
+    historico = gerar_historico(jogo, 40, 2)
+    matriz = como_matriz(historico, jogo)
+    triplas = matriz_triplas(matriz)
+    contagem = contar(historico, 3)
+    menor = matriz.menor_numero
+    for a, b, c in combinations(matriz.numeros.tolist(), 3):
+        assert triplas[a - menor, b - menor, c - menor] == contagem[(a, b, c)]
+        assert triplas[c - menor, a - menor, b - menor] == contagem[(a, b, c)]
+
+
+@pytest.mark.parametrize('jogo', sorted(JOGOS))
+@pytest.mark.parametrize('top', [1, 10, 50])
+def test_pares_mais_frequentes(jogo, top, gerar_historico):
+    historico = gerar_historico(jogo, 80, 3)
+    matriz = como_matriz(historico, jogo)
+    frequencia = contar(historico, 1)
+    # Empate: o par de menores números primeiro
+    esperado = sorted(contar(historico, 2).items(), key=lambda item: (-item[1], item[0]))[:top]
+
+    resultado = pares_mais_frequentes(matriz, matriz_pares(matriz), top)
+    assert [(tuple(p['numeros']), p['quantidade']) for p in resultado] == esperado
+    for par in resultado:
+        a, b = par['numeros']
+        lift = par['quantidade'] * len(historico) / (frequencia[(a,)] * frequencia[(b,)])
+        assert par['lift'] == round(lift, 4)
+
+
+def test_triplas_mais_frequentes(gerar_historico):
+    historico = gerar_historico('lotofacil', 50, 4)
+    matriz = como_matriz(historico, 'lotofacil')
+    esperado = sorted(contar(historico, 3).items(), key=lambda item: (-item[1], item[0]))[:30]
+    resultado = triplas_mais_frequentes(matriz, matriz_triplas(matriz), 30)
+    assert [(tuple(t['numeros']), t['quantidade']) for t in resultado] == esperado
+
+
+@pytest.mark.parametrize('jogo', sorted(JOGOS))
+def test_coocorrencia_incremental(jogo, gerar_historico):
+    historico = gerar_historico(jogo, 80, 5)
+    agregados = AgregadosIncrementais(como_matriz(historico[:40], jogo))
+    # Matrizes já montadas: adicionar/remover precisam ajustá-las
+    agregados.pares()
+    if jogo != 'lotomania':
+        agregados.triplas()
+    versao = agregados.versao
+    for concurso in historico[40:]:
+        agregados.adicionar(concurso)
+    for _ in range(15):
+        agregados.remover()
+    assert agregados.versao == versao + 55
+    reconstruido = AgregadosIncrementais(como_matriz(historico[15:], jogo))
+    assert np.array_equal(agregados.pares(), reconstruido.pares())
+    assert np.array_equal(agregados.pares(), matriz_pares(como_matriz(historico[15:], jogo)))
+    if jogo != 'lotomania':
+        assert np.array_equal(agregados.triplas(), reconstruido.triplas())
@@ -0,0 +1,182 @@
+"""
+Testes do banco: upsert em lote (relatório de inseridos/atualizados/inalterados/inválidos)
+e contagem de acertos por bitmask contra a interseção de conjuntos,
+consultas por período, datas inválidas e estatísticas por dezena mantidas a cada inserção
+Executar com: python -m pytest test_database.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from src.analise import AnalisadorLotofacil
+from src.database import DatabaseLoteria, DatabaseLotofacil, data_para_iso
+from src.matriz import JOGOS, data_para_inteiro
+
+
+def concurso(numero, deslocamento=0, data=None):
+    return {
+        'concurso': numero,
+        'numeros': sorted((numero + deslocamento + i) % 25 + 1 for i in range(15)),
+        'data': data if data is not None else f'{numero % 28 + 1:02d}/01/2024'
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    banco = DatabaseLotofacil(str(tmp_path / 'lotofacil.db'))
+    yield banco
+    banco.fechar()
+
+
+def relatorio(inseridos=0, atualizados=0, inalterados=0, invalidos=0):
+    return {'inseridos': inseridos, 'atualizados': atualizados, 'inalterados': inalterados, 'invalidos': invalidos}
+
+
+def test_inserir_e_repetir(db):
+    assert db.upsert_concursos([concurso(n) for n in range(1, 11)]) == relatorio(inseridos=10)
+    assert db.upsert_concursos([concurso(n) for n in range(1, 11)]) == relatorio(inalterados=10)
+    assert db.contar_concursos() == 10
+
+
+def test_lote_misto(db):
+    db.upsert_concursos([concurso(n) for n in range(1, 6)])
+    lote = [concurso(n) for n in range(1, 4)]                       # iguais
+    lote.append(concurso(4, deslocamento=2))                        # números corrigidos
+    lote += [concurso(n) for n in range(6, 9)]                      # novos
+    lote += [{'concurso': 9, 'numeros': []}, {'concurso': 10, 'numeros': [0] + list(range(1, 15))}]  # inválidos
+    assert db.upsert_concursos(lote) == relatorio(inseridos=3, atualizados=1, inalterados=3, invalidos=2)
+    assert db.obter_concurso(4)['numeros'] == concurso(4, deslocamento=2)['numeros']
+
+
+def test_data_vazia_nao_apaga_nem_conta_como_mudanca(db):
+    db.upsert_concursos([concurso(1)])
+    assert db.upsert_concursos([concurso(1, data='')]) == relatorio(inalterados=1)
+    assert db.obter_concurso(1)['data'] == concurso(1)['data']
+    # Data informada e diferente: atualiza
+    assert db.upsert_concursos([concurso(1, data='31/12/2024')]) == relatorio(atualizados=1)
+
+
+def test_repetido_no_mesmo_lote(db):
+    assert db.upsert_concursos([concurso(1), concurso(1)]) == relatorio(inseridos=1, inalterados=1)
+    assert db.upsert_concursos([concurso(2), concurso(2, deslocamento=1)]) == relatorio(inseridos=1, atualizados=1)
+    assert db.obter_concurso(2)['numeros'] == concurso(2, deslocamento=1)['numeros']
+
+
+def test_timemania_time_coracao(tmp_path):
+    db = DatabaseLoteria('timemania', str(tmp_path / 'timemania.db'))
+    base = {'concurso': 1, 'numeros': [1, 2, 3, 4, 5, 6, 80], 'data': '01/01/2024', 'time_coracao': 'FLAMENGO/RJ'}
+    assert db.upsert_concursos([base]) == relatorio(inseridos=1)
+    assert db.upsert_concursos([dict(base, time_coracao='')]) == relatorio(inalterados=1)
+    assert db.upsert_concursos([dict(base, time_coracao='BAHIA/BA')]) == relatorio(atualizados=1)
+    db.fechar()
+
+
+def test_lista_vazia(db):
+    assert db.upsert_concursos([]) == relatorio()
+
+
+@pytest.mark.parametrize('jogo', ['lotofacil', 'timemania', 'lotomania'])
+def test_popcount_igual_a_intersecao(jogo, tmp_path, gerar_historico):
+    historico = gerar_historico(jogo, 150, 2, repetidas=0.2)
+    db = DatabaseLoteria(jogo, str(tmp_path / f'{jogo}.db'))
+    db.upsert_concursos(historico)
+    gerador = random.Random(3)
+    apostas = [concurso['numeros'] for concurso in historico[:5]]
+    apostas += [sorted(gerador.sample(range(db.menor_numero, db.maior_numero + 1), db.dezenas_sorteadas))
+                for _ in range(5)]
+    # Os números das pontas caem nos bits 0 e 62/63 (limite entre as colunas de bitmask)
+    apostas.append(sorted({db.menor_numero, db.maior_numero, db.menor_numero + 62, db.menor_numero + 63}))
+    for aposta in apostas:
+        acertos = [len(set(aposta) & set(concurso['numeros'])) for concurso in historico]
+        minimo = sorted(acertos)[len(acertos) // 2]
+        assert db.conferir_acertos(aposta, minimo) == [
+            {'concurso': concurso['concurso'], 'data': concurso['data'], 'acertos': quantidade}
+            for concurso, quantidade in zip(historico, acertos) if quantidade >= minimo
+        ]
+        assert db.distribuicao_acertos(aposta) == dict(sorted(Counter(acertos).items()))
+        assert db.combinacao_ja_sorteada(aposta) == [
+            concurso['concurso'] for concurso in historico if set(concurso['numeros']) == set(aposta)
+        ]
+    db.fechar()
+
+
+def test_periodo_inclui_as_datas_limite(db):
+    datas = ['28/02/2024', '29/02/2024', '01/03/2024', '31/12/2024', '01/01/2025']
+    db.upsert_concursos([concurso(n, data=data) for n, data in enumerate(datas, start=1)])
+    assert [c['concurso'] for c in db.obter_concursos_por_periodo('29/02/2024', '31/12/2024')] == [2, 3, 4]
+    assert [c['concurso'] for c in db.obter_concursos_por_periodo('2024-12-31', '2025-01-01')] == [4, 5]
+    assert [c['concurso'] for c in db.obter_concursos_por_periodo('01/03/2024', '01/03/2024')] == [3]
+    assert db.obter_concursos_por_periodo('01/01/2025', '28/02/2024') == []
+
+
+@pytest.mark.parametrize('data', ['31/02/2024', '29/02/2023', '31/04/2024', '00/01/2024', '15/13/2024', '2024-02-30'])
+def test_datas_inexistentes(db, data):
+    assert data_para_iso(data) is None
+    assert data_para_inteiro(data) == 0
+    # Limite inexistente não vira um texto ISO que ordena entre datas válidas
+    db.upsert_concursos([concurso(1, data='01/03/2024'), concurso(2, data=data)])
+    assert db.obter_concursos_por_periodo('01/01/2024', data) == []
+    assert db.obter_concursos_por_periodo(data, '31/12/2024') == []
+    assert [c['concurso'] for c in db.obter_concursos_por_periodo('01/01/2000', '31/12/2099')] == [1]
+
+
+def test_migracao_corrige_data_iso_inexistente(tmp_path):
+    caminho = str(tmp_path / 'lotofacil.db')
+    db = DatabaseLotofacil(caminho)
+    db.upsert_concursos([concurso(1, data='29/02/2024'), concurso(2, data='31/02/2024')])
+    # Linha gravada antes da validação, com a data inexistente no índice ISO
+    with db._conexao() as conn:
+        conn.execute("UPDATE concursos SET data_iso = '2024-02-31' WHERE numero = 2")
+    db.fechar()
+
+    db = DatabaseLotofacil(caminho)
+    assert [c['concurso'] for c in db.obter_concursos_por_periodo('01/02/2024', '01/03/2024')] == [1]
+    db.fechar()
+
+
+def estatisticas_diretas(jogo, historico):
+    """Frequência, último concurso, atraso e intervalos (pelo número do concurso) de cada dezena"""
+    menor, maior, _ = JOGOS[jogo]
+    ultimo_banco = historico[-1]['concurso']
+    esperado = {}
+    for dezena in range(menor, maior + 1):
+        saidas = [c['concurso'] for c in historico if dezena in c['numeros']]
+        esperado[dezena] = {
+            'frequencia': len(saidas),
+            'ultimo_concurso': saidas[-1] if saidas else None,
+            'atraso': ultimo_banco - saidas[-1] if saidas else len(historico),
+            'histograma_intervalos': dict(sorted(Counter(b - a for a, b in zip(saidas, saidas[1:])).items()))
+        }
+    return esperado
+
+
+@pytest.mark.parametrize('jogo', ['lotofacil', 'timemania', 'lotomania'])
+def test_estatisticas_incrementais_com_lacunas(jogo, tmp_path, gerar_historico):
+    historico = gerar_historico(jogo, 200, 8)
+    # Lacuna grande no meio além dos concursos pulados pela fábrica
+    historico = historico[:100] + [dict(c, concurso=c['concurso'] + 50) for c in historico[100:]]
+    db = DatabaseLoteria(jogo, str(tmp_path / f'{jogo}.db'))
+    db.upsert_concursos(historico[:80])
+    # Lotes pequenos anexados ao fim: caminho incremental
+    for inicio in range(80, 200, 7):
+        db.upsert_concursos(historico[inicio:inicio + 7])
+
+    incremental = db.estatisticas_numeros()
+    assert incremental == estatisticas_diretas(jogo, historico)
+    db.reconstruir_estatisticas()
+    assert db.estatisticas_numeros() == incremental
+    db.fechar()
+
+
+@pytest.mark.parametrize('lacuna', [0, 50])
+def test_analisador_com_estatisticas_do_banco(db, gerar_historico, lacuna):
+    historico = gerar_historico('lotofacil', 120, 9)
+    historico = [dict(c, concurso=n + 1 + (lacuna if n >= 60 else 0)) for n, c in enumerate(historico)]
+    for inicio in range(0, 120, 10):
+        db.upsert_concursos(historico[inicio:inicio + 10])
+    # Atraso na matriz é contado em linhas e no banco em números de concurso: com lacuna
+    # o analisador não pode usar as estatísticas materializadas
+    com_banco = AnalisadorLotofacil(historico, db=db)
+    assert (com_banco._estatisticas_banco() is not None) == (lacuna == 0)
+    assert com_banco.get_estatisticas_completas() == AnalisadorLotofacil(historico).get_estatisticas_completas()
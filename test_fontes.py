@@ -0,0 +1,199 @@
+"""
+Testes da saúde das fontes (circuit breaker) e da regra de sobrecarga comum ao limitador
+Executar com: python -m pytest test_fontes.py
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+import src.fontes
+import src.historico
+from src.fontes import (ABERTO, FECHADO, MEIO_ABERTO, SaudeFonte, consultar_fontes, limpar_fontes,
+                        registrar_fonte, saude_fonte)
+from src.historico import HistoricoLotofacil
+from src.limitador import STATUS_SOBRECARGA, LimitadorHost
+
+
+@pytest.fixture(autouse=True)
+def fontes_limpas():
+    limpar_fontes()
+    yield
+    limpar_fontes()
+
+
+def test_500_nao_abre_o_circuito():
+    for _ in range(10):
+        registrar_fonte('Fonte', 0.1, 500)
+        registrar_fonte('Fonte', 0.1, 404)
+    assert saude_fonte('Fonte').estado == FECHADO
+
+
+@pytest.mark.parametrize('status', [None] + list(STATUS_SOBRECARGA))
+def test_sobrecarga_abre_o_circuito(status):
+    for _ in range(saude_fonte('Fonte').LIMIAR_FALHAS):
+        registrar_fonte('Fonte', 0.1, status)
+    assert saude_fonte('Fonte').estado == ABERTO
+
+
+def test_conteudo_invalido_conta_como_falha():
+    for _ in range(saude_fonte('Fonte').LIMIAR_FALHAS):
+        registrar_fonte('Fonte', 0.1, 200, valida=False)
+    assert saude_fonte('Fonte').estado == ABERTO
+
+
+@pytest.mark.parametrize('status', [200, 404, 500] + list(STATUS_SOBRECARGA))
+def test_mesma_regra_do_limitador(status):
+    limitador = LimitadorHost(concorrencia=8)
+    limitador.adquirir()
+    limitador.liberar(status=status, latencia=0.1)
+    registrar_fonte('Fonte', 0.1, status)
+
+    reduziu = limitador.concorrencia < 8
+    falhou = saude_fonte('Fonte').falhas_seguidas > 0
+    assert reduziu == falhou == (status in STATUS_SOBRECARGA)
+
+
+class Resposta:
+    def __init__(self, status_code, dados=None):
+        self.status_code = status_code
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+
+def test_sondagem_com_500_nao_derruba_as_fontes(tmp_path, monkeypatch):
+    ultimo = 137
+
+    def requisitar(url, **kwargs):
+        numero = int(url.rsplit('/', 1)[1])
+        if numero > ultimo:
+            # Fonte que responde 500 para concurso inexistente
+            return Resposta(500)
+        return Resposta(200, {'numero': numero, 'listaDezenas': [f'{n:02d}' for n in range(1, 16)],
+                              'dataApuracao': '01/01/2020'})
+
+    monkeypatch.setattr(src.historico, 'requisitar', requisitar)
+    historico = HistoricoLotofacil(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+
+    assert historico.buscador.buscar_ultimo(100) == ultimo
+    assert saude_fonte('API Caixa Oficial').estado == FECHADO
+    assert saude_fonte('LotoDicas').estado == FECHADO
+
+
+# Latência presumida (= p95 sem amostras) das fontes nos testes de hedge
+P95 = 0.05
+
+
+class FontesFalsas:
+    """consultar(fonte) das fontes falsas: nome -> (atraso, resultado); registra a resposta como as fontes reais"""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.chamadas = []
+        self.terminadas = threading.Event()
+        self._pendentes = len(respostas)
+        self._lock = threading.Lock()
+
+    @property
+    def fontes(self):
+        return [{'nome': nome} for nome in self.respostas]
+
+    def __call__(self, fonte):
+        self.chamadas.append(fonte['nome'])
+        atraso, resultado = self.respostas[fonte['nome']]
+        time.sleep(atraso)
+        registrar_fonte(fonte['nome'], atraso, 200 if resultado is not None else 404)
+        with self._lock:
+            self._pendentes -= 1
+            if self._pendentes == 0:
+                self.terminadas.set()
+        return resultado
+
+
+@pytest.fixture
+def p95_curto(monkeypatch):
+    monkeypatch.setattr(SaudeFonte, 'LATENCIA_INICIAL', P95)
+
+
+@pytest.mark.parametrize('respostas, esperado, chamadas', [
+    # Respondeu antes do p95: sem hedge
+    ({'A': (0.005, 'A'), 'B': (0, 'B')}, 'A', ['A']),
+    # Passou do p95: o hedge responde primeiro e vence
+    ({'A': (0.4, 'A'), 'B': (0, 'B')}, 'B', ['A', 'B']),
+    # Hedge sem resultado: continua esperando a primeira fonte
+    ({'A': (0.2, 'A'), 'B': (0, None)}, 'A', ['A', 'B']),
+    # Primeira sem resultado e rápida: a próxima é consultada sem esperar o p95
+    ({'A': (0, None), 'B': (0, 'B')}, 'B', ['A', 'B']),
+    ({'A': (0.1, None), 'B': (0.1, None)}, None, ['A', 'B']),
+])
+def test_hedge_escolhe_a_primeira_resposta(p95_curto, respostas, esperado, chamadas):
+    consultar = FontesFalsas(respostas)
+    assert consultar_fontes(consultar.fontes, consultar, hedge=True) == esperado
+    assert consultar.chamadas == chamadas
+
+
+def test_hedge_dispara_no_p95_e_descarta_a_perdedora(p95_curto):
+    consultar = FontesFalsas({'A': (0.4, 'A'), 'B': (0, 'B')})
+    inicio = time.monotonic()
+    assert consultar_fontes(consultar.fontes, consultar, hedge=True) == 'B'
+    assert P95 <= time.monotonic() - inicio < 0.3
+    assert (saude_fonte('B').hedges, saude_fonte('B').hedges_vencidos) == (1, 1)
+
+    # A perdedora já em curso termina em segundo plano e registra a própria resposta
+    assert len(saude_fonte('A').resultados) == 0
+    assert consultar.terminadas.wait(2)
+    assert list(saude_fonte('A').resultados) == [(True, 0.4)]
+    assert saude_fonte('A').hedges == 0
+
+
+class ExecutorRetido:
+    """Executa a primeira consulta; as seguintes ficam retidas na fila até soltar()"""
+
+    def __init__(self, iniciadas):
+        # iniciadas=True: as retidas já saíram da fila (não dá mais para cancelar), mas ainda não rodaram
+        self.iniciadas = iniciadas
+        self.retidas = []
+        self.enviadas = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, fn, *args):
+        self.enviadas += 1
+        if self.enviadas == 1:
+            return self._executor.submit(fn, *args)
+        futuro = Future()
+        if self.iniciadas:
+            futuro.set_running_or_notify_cancel()
+        self.retidas.append((futuro, fn, args))
+        return futuro
+
+    def soltar(self):
+        self._executor.shutdown(wait=True)
+        for futuro, fn, args in self.retidas:
+            if futuro.running() or futuro.set_running_or_notify_cancel():
+                futuro.set_result(fn(*args))
+
+
+@pytest.mark.parametrize('iniciada', [False, True])
+def test_hedge_perdedor_nao_gasta_a_sondagem(p95_curto, monkeypatch, iniciada):
+    executor = ExecutorRetido(iniciada)
+    monkeypatch.setattr(src.fontes, '_executor', executor)
+    monkeypatch.setattr(src.fontes, '_pid', os.getpid())
+    # B com circuito aberto e já no tempo da sondagem
+    for _ in range(SaudeFonte.LIMIAR_FALHAS):
+        registrar_fonte('B', 0.1)
+    saude_fonte('B').aberto_ate = 0.0
+
+    consultar = FontesFalsas({'A': (0.2, 'A'), 'B': (0, 'B')})
+    assert consultar_fontes(consultar.fontes, consultar, hedge=True) == 'A'
+    futuro = executor.retidas[0][0]
+    assert futuro.cancelled() != iniciada
+    executor.soltar()
+    # O hedge reservou a sondagem do meio-aberto, mas não foi feito: não conta e a sondagem volta livre
+    assert consultar.chamadas == ['A']
+    assert saude_fonte('B').estado == MEIO_ABERTO
+    assert saude_fonte('B').hedges == 0
+    assert saude_fonte('B').permitir()
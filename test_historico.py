@@ -0,0 +1,101 @@
+"""
+Testes da atualização do histórico (busca até o concurso 1, sem meta de quantidade)
+Executar com: python -m pytest test_historico.py
+"""
+import os
+
+import pytest
+
+from src.busca_concorrente import ResultadoBusca
+from src.historico import HistoricoLotofacil
+from src.historico_lotomania import HistoricoLotomania
+from src.historico_timemania import HistoricoTimemania
+from src.matriz import JOGOS
+
+ULTIMO = 1500
+
+
+def concurso(jogo, numero):
+    menor, maior, dezenas = JOGOS[jogo]
+    largura = maior - menor + 1
+    c = {
+        'concurso': numero,
+        'numeros': sorted((numero + i * 3) % largura + menor for i in range(dezenas)),
+        'data': f'{numero % 28 + 1:02d}/01/2020'
+    }
+    if jogo == 'timemania':
+        c['time_coracao'] = 'FLAMENGO/RJ'
+    return c
+
+
+def historico_sem_rede(classe, jogo):
+    """Gerenciador com a rede trocada por uma fonte local (concursos 1..ULTIMO)"""
+
+    class SemRede(classe):
+        pedidos = []
+
+        def _obter_ultimo_concurso(self):
+            return ULTIMO
+
+        def _buscar_api_caixa(self):
+            # Últimos concursos como a API devolve: data em ISO e campos que o cache não guarda
+            return [dict(concurso(jogo, n), data='2020-01-%02d' % (n % 28 + 1), fonte='API Caixa')
+                    for n in range(ULTIMO - 4, ULTIMO + 1)]
+
+        def _buscar_apis_alternativas(self):
+            return []
+
+        def _consultar_concurso(self, numero):
+            self.pedidos.append(numero)
+            if numero > ULTIMO:
+                return ResultadoBusca(None, inexistente=True)
+            return ResultadoBusca(concurso(jogo, numero), 'Fonte local')
+
+    return SemRede
+
+
+@pytest.mark.parametrize('classe, jogo', [
+    (HistoricoLotofacil, 'lotofacil'),
+    (HistoricoTimemania, 'timemania'),
+    (HistoricoLotomania, 'lotomania'),
+])
+def test_atualizar_busca_ate_o_concurso_1(tmp_path, classe, jogo):
+    historico = historico_sem_rede(classe, jogo)(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+    # Mais de 1000 concursos guardados: a antiga meta encerrava a busca aqui
+    historico.salvar_cache([concurso(jogo, n) for n in range(301, ULTIMO + 1)])
+
+    resultado = historico.atualizar_historico()
+    assert [c['concurso'] for c in resultado] == list(range(1, ULTIMO + 1))
+    # Só os que faltavam foram pedidos à rede
+    assert sorted(historico.pedidos) == list(range(1, 301))
+
+
+def test_prazo_esgotado_continua_na_proxima(tmp_path):
+    classe = historico_sem_rede(HistoricoLotofacil, 'lotofacil')
+    historico = classe(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+    historico.salvar_cache([concurso('lotofacil', n) for n in range(1001, ULTIMO + 1)])
+
+    # Prazo já esgotado: nada é buscado e o histórico guardado volta inteiro
+    resultado = historico.atualizar_historico(tempo_limite=1e-9)
+    assert len(resultado) == 500
+
+    resultado = classe(cache_file=str(tmp_path / 'historico.json'), usar_banco=False).atualizar_historico()
+    assert [c['concurso'] for c in resultado] == list(range(1, ULTIMO + 1))
+
+
+@pytest.mark.parametrize('classe, jogo', [
+    (HistoricoLotofacil, 'lotofacil'),
+    (HistoricoTimemania, 'timemania'),
+    (HistoricoLotomania, 'lotomania'),
+])
+def test_atualizar_sem_novidades_nao_regrava_o_cache(tmp_path, classe, jogo):
+    historico = historico_sem_rede(classe, jogo)(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+    historico.salvar_cache([concurso(jogo, n) for n in range(1, ULTIMO + 1)])
+    historico.cache.compactar()
+    matriz = historico.cache.carregar_matriz()
+
+    for _ in range(3):
+        assert len(historico.atualizar_historico()) == ULTIMO
+    # Os concursos repetidos pela API (em outro formato) não entram no journal nem remontam a matriz
+    assert not os.path.exists(historico.cache.cache_journal)
+    assert historico.cache.carregar_matriz() is matriz
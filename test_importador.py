@@ -0,0 +1,86 @@
+"""
+Testes da importação das planilhas oficiais (CSV e XLSX)
+Executar com: python -m pytest test_importador.py
+"""
+import csv
+
+import pytest
+
+from benchmark_importacao import escrever_csv, escrever_xlsx, gerar_linhas
+from src.historico import HistoricoLotofacil
+from src.historico_timemania import HistoricoTimemania
+from src.importador import ImportadorResultados, _inteiro
+
+
+def test_inteiro():
+    assert _inteiro('3200') == 3200
+    assert _inteiro(' 3.200 ') == 3200
+    assert _inteiro('1.234.567') == 1234567
+    assert _inteiro('3200.0') == 3200
+    assert _inteiro('7') == 7
+    for valor in ('3.5', '3.20', '3,2', '', None, 'abc'):
+        assert _inteiro(valor) is None
+
+
+@pytest.mark.parametrize('jogo', ['lotofacil', 'timemania', 'lotomania'])
+@pytest.mark.parametrize('formato', ['csv', 'xlsx'])
+def test_planilha_da_caixa(tmp_path, jogo, formato):
+    linhas = list(gerar_linhas(jogo, 40))
+    arquivo = str(tmp_path / f'resultados.{formato}')
+    (escrever_csv if formato == 'csv' else escrever_xlsx)(arquivo, linhas)
+
+    concursos = list(ImportadorResultados(jogo).concursos(arquivo))
+    # Linhas de cidades (sem número de concurso) ficam de fora
+    assert [c['concurso'] for c in concursos] == list(range(1, 41))
+    esperado = [linha for linha in linhas[1:] if linha[0]]
+    for concurso, linha in zip(concursos, esperado):
+        assert concurso['data'] == linha[1]
+        assert concurso['numeros'] == sorted(int(n) for n in linha[2:2 + len(concurso['numeros'])])
+    if jogo == 'timemania':
+        assert all(c['time_coracao'] for c in concursos)
+
+
+def test_milhar_e_valores_nao_inteiros(tmp_path):
+    arquivo = str(tmp_path / 'resultados.csv')
+    with open(arquivo, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.writer(f, delimiter=';')
+        escritor.writerow(['Concurso', 'Data Sorteio'] + [f'Bola{i}' for i in range(1, 16)])
+        escritor.writerow(['3.200', '01/01/2025'] + [str(n) for n in range(1, 16)])
+        # Concurso e dezena não inteiros: linhas inválidas, não truncadas para 3 e 2
+        escritor.writerow(['3.5', '02/01/2025'] + [str(n) for n in range(1, 16)])
+        escritor.writerow(['3201', '03/01/2025', '2.5'] + [str(n) for n in range(2, 16)])
+
+    importador = ImportadorResultados('lotofacil')
+    resumo = importador.importar(arquivo, lambda lote: None)
+    assert resumo['concursos'] == 1 and resumo['invalidos'] == 2
+    assert [c['concurso'] for c in importador.concursos(arquivo)] == [3200]
+
+
+def test_lotes_vao_para_o_journal(tmp_path):
+    arquivo = str(tmp_path / 'resultados.csv')
+    escrever_csv(arquivo, gerar_linhas('lotofacil', 25))
+    historico = HistoricoLotofacil(cache_file=str(tmp_path / 'historico.json'), usar_banco=False)
+
+    journal = []
+    anexar = historico.cache.anexar
+
+    def anexar_e_medir(lote):
+        journal.append(len(lote))
+        return anexar(lote)
+
+    historico.cache.anexar = anexar_e_medir
+    resumo = historico.importar_arquivo(arquivo, tamanho_lote=10)
+    # Um anexo por lote lido, não um único no fim
+    assert journal == [10, 10, 5] and resumo['lotes'] == 3
+    assert [c['concurso'] for c in historico.get_historico()] == list(range(1, 26))
+
+
+def test_importar_timemania_preserva_time(tmp_path):
+    arquivo = str(tmp_path / 'resultados.xlsx')
+    escrever_xlsx(arquivo, gerar_linhas('timemania', 12))
+    historico = HistoricoTimemania(cache_file=str(tmp_path / 'historico_timemania.json'), usar_banco=False)
+    historico.importar_arquivo(arquivo)
+
+    recarregado = HistoricoTimemania(cache_file=str(tmp_path / 'historico_timemania.json'), usar_banco=False)
+    assert len(recarregado.get_historico()) == 12
+    assert all(c['time_coracao'] for c in recarregado.get_historico())
@@ -0,0 +1,85 @@
+"""
+Testes das janelas de frequência (soma prefixada) contra a contagem direta
+Executar com: python -m pytest test_janelas.py
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from src.analise import AnalisadorLotofacil
+from src.janelas import frequencia_janelas
+from src.matriz import JOGOS, como_matriz
+
+
+def contar(jogo, concursos):
+    """Frequência de todos os números do jogo nos concursos (0 para os que não saíram)"""
+    menor, maior, _ = JOGOS[jogo]
+    contagem = Counter(numero for concurso in concursos for numero in concurso['numeros'])
+    return {numero: contagem[numero] for numero in range(menor, maior + 1)}
+
+
+@pytest.mark.parametrize('jogo', sorted(JOGOS))
+def test_frequencia_intervalo(jogo, gerar_historico):
+    historico = gerar_historico(jogo, 120, 1)
+    matriz = como_matriz(historico, jogo)
+    gerador = random.Random(2)
+    for _ in range(50):
+        inicio, fim = sorted(gerador.sample(range(len(historico) + 1), 2))
+        esperado = contar(jogo, historico[inicio:fim])
+        assert matriz.frequencia_intervalo(inicio, fim).tolist() == list(esperado.values())
+    assert matriz.frequencia_intervalo(0).tolist() == list(contar(jogo, historico).values())
+    assert not matriz.frequencia_intervalo(30, 10).any()
+
+
+@pytest.mark.parametrize('jogo', sorted(JOGOS))
+def test_janelas_e_faixas(jogo, gerar_historico):
+    historico = gerar_historico(jogo, 200, 3)
+    matriz = como_matriz(historico, jogo)
+    numeros = [c['concurso'] for c in historico]
+    faixas = [(numeros[10], numeros[60]), (None, numeros[5]), (numeros[150], None), (numeros[20] + 1000, None)]
+    resultado = frequencia_janelas(matriz, tamanhos=[1, 10, 50, 500], faixas=faixas)
+
+    for tamanho, janela in zip([1, 10, 50, 500], resultado['janelas']):
+        concursos = historico[-tamanho:]
+        assert janela['total_concursos'] == len(concursos)
+        assert janela['frequencia'] == contar(jogo, concursos)
+        assert (janela['primeiro_concurso'], janela['ultimo_concurso']) == (concursos[0]['concurso'],
+                                                                             concursos[-1]['concurso'])
+
+    for (primeiro, ultimo), janela in zip(faixas, resultado['janelas'][4:]):
+        concursos = [c for c in historico if (primeiro is None or c['concurso'] >= primeiro)
+                     and (ultimo is None or c['concurso'] <= ultimo)]
+        assert janela['total_concursos'] == len(concursos)
+        assert janela['frequencia'] == contar(jogo, concursos)
+
+
+def test_serie_movel(gerar_historico):
+    historico = gerar_historico('lotofacil', 60, 4)
+    matriz = como_matriz(historico, 'lotofacil')
+    serie = frequencia_janelas(matriz, tamanhos=[10], pontos_serie=20)['janelas'][0]['serie']
+    assert serie['concursos'] == [c['concurso'] for c in historico[-20:]]
+    for ponto, fim in enumerate(range(41, 61)):
+        esperado = contar('lotofacil', historico[fim - 10:fim])
+        assert {numero: valores[ponto] for numero, valores in serie['frequencia'].items()} == esperado
+
+
+def test_quentes_e_frios_da_lotofacil(gerar_historico):
+    historico = gerar_historico('lotofacil', 80, 5)
+    analisador = AnalisadorLotofacil(historico)
+    for tamanho in (1, 4, 10, 33, 80):
+        janela = analisador.frequencia_janelas(tamanhos=[tamanho])['janelas'][0]
+        assert janela['numeros_quentes'] == sorted(analisador.numeros_quentes(tamanho))
+        assert janela['numeros_frios'] == analisador.numeros_frios(tamanho)
+
+
+def test_soma_prefixada_acompanha_adicionar_e_remover(gerar_historico):
+    historico = gerar_historico('timemania', 90, 6)
+    matriz = como_matriz(historico[:40], 'timemania')
+    matriz.acumulada
+    for concurso in historico[40:]:
+        matriz.adicionar(concurso)
+    for _ in range(25):
+        matriz.remover_primeiro()
+    assert matriz.frequencia_intervalo(0).tolist() == list(contar('timemania', historico[25:]).values())
+    assert matriz.frequencia_intervalo(10, 30).tolist() == list(contar('timemania', historico[35:55]).values())
@@ -0,0 +1,72 @@
+"""
+Testes dos subconjuntos frequentes contra a contagem direta das combinações (Counter)
+Executar com: python -m pytest test_subconjuntos.py
+"""
+from collections import Counter
+from itertools import combinations
+from math import comb
+
+import pytest
+
+import src.subconjuntos
+from src.matriz import como_matriz
+from src.subconjuntos import SubconjuntoFrequente
+
+
+def esperado(historico, k, top):
+    """Top pela quantidade; empate: primeira aparição e depois os números"""
+    contagem = Counter()
+    primeiro = {}
+    for concurso in historico:
+        for subconjunto in combinations(concurso['numeros'], k):
+            contagem[subconjunto] += 1
+            primeiro.setdefault(subconjunto, concurso['concurso'])
+    ordem = sorted(contagem, key=lambda s: (-contagem[s], primeiro[s], s))
+    return len(contagem), [
+        {'numeros': list(s), 'quantidade': contagem[s], 'primeiro_concurso': primeiro[s]} for s in ordem[:top]
+    ]
+
+
+CASOS = [
+    ('lotofacil', 60, [1, 2, 5, 13, 14, 15]),
+    ('timemania', 60, [1, 3, 6, 7]),
+    # k >= 18 na Lotomania: C(100, k) não cabe em 63 bits, os códigos são máscaras
+    ('lotomania', 30, [1, 2, 17, 18, 19, 20]),
+]
+
+
+@pytest.mark.parametrize('jogo, total, tamanhos', CASOS)
+@pytest.mark.parametrize('top', [1, 10, 40])
+def test_contra_counter(jogo, total, tamanhos, top, gerar_historico):
+    historico = gerar_historico(jogo, total, top, repetidas=0.2)
+    matriz = como_matriz(historico, jogo)
+    for k in tamanhos:
+        distintos, mais_frequentes = esperado(historico, k, top)
+        assert mais_frequentes
+        resultado = SubconjuntoFrequente(matriz, k, processos=1).mais_frequentes(top)
+        assert resultado['k'] == k
+        assert resultado['total_concursos'] == total
+        assert resultado['subconjuntos_gerados'] == comb(len(historico[0]['numeros']), k) * total
+        assert resultado['subconjuntos_distintos'] == distintos
+        assert resultado['mais_frequentes'] == mais_frequentes
+
+
+@pytest.mark.parametrize('jogo, k', [('lotofacil', 12), ('timemania', 5), ('lotomania', 18)])
+def test_particoes_e_processos(jogo, k, monkeypatch, gerar_historico):
+    historico = gerar_historico(jogo, 40, 7, repetidas=0.2)
+    matriz = como_matriz(historico, jogo)
+    distintos, mais_frequentes = esperado(historico, k, 25)
+    # Limites baixos: muitas partições com prefixos longos e contagem no pool
+    monkeypatch.setattr(src.subconjuntos, 'LIMITE_PARTICAO', 500)
+    monkeypatch.setattr(src.subconjuntos, 'LIMITE_PARALELO', 0)
+    for processos in (1, 2):
+        resultado = SubconjuntoFrequente(matriz, k, processos=processos).mais_frequentes(25)
+        assert resultado['subconjuntos_distintos'] == distintos
+        assert resultado['mais_frequentes'] == mais_frequentes
+
+
+def test_k_invalido(gerar_historico):
+    matriz = como_matriz(gerar_historico('lotofacil', 5, 1), 'lotofacil')
+    for k in (0, 26):
+        with pytest.raises(ValueError):
+            SubconjuntoFrequente(matriz, k)